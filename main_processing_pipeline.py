@@ -5,7 +5,13 @@ import sys
 project_root = os.path.abspath(os.path.dirname(__file__))
 sys.path.insert(0, project_root)
 
-from src.pipeline.main_pipeline import run_processing_pipeline
+from src.pipeline.main_pipeline import parse_args, run_processing_pipeline
 
 if __name__ == "__main__":
-    run_processing_pipeline()
\ No newline at end of file
+    args = parse_args()
+    run_processing_pipeline(threaded=args.threaded, follow=args.follow, idle_timeout_s=args.idle_timeout,
+                            memory_budget_mb=args.memory_budget, time_window=args.window, track=args.track,
+                            num_shards=args.shards, live_view=args.live_view,
+                            pose_graph=args.pose_graph, daemon=args.daemon, daemon_port=args.port,
+                            metrics_port=args.metrics_port, latency_target_s=args.latency_target,
+                            acquire_port=args.acquire, ring_name=args.ring, export_dataset=args.export_dataset)
\ No newline at end of file
@@ -21,21 +21,47 @@ FULL_IMU_DATA_PATH = IMU_DATA_FILE
 # These parameters are based on the BGT60TR13C sensor and common configurations.
 # They might need to be adjusted based on your specific chirp configuration.
 MAX_RANGE_M = 8.0  # Maximum range of the radar in meters
+RADAR_BORESIGHT = (1.0, 0.0, 0.0)  # Direction of the radar beam in the IMU body frame (x forward, y left, z up)
 
 # --- CFAR (Constant False Alarm Rate) Parameters ---
 # These values control the sensitivity of the object detection algorithm.
 CFAR_NUM_TRAINING_CELLS = 10 # Number of cells on each side of the CUT to estimate noise
 CFAR_NUM_GUARD_CELLS = 2    # Number of cells to ignore on each side of the CUT
 CFAR_P_FA = 1e-1 # Desired Probability of False Alarm
+CFAR_NOISE_FLOOR = 1e-12 # Lower bound of the noise estimate used for the SNR, so empty training cells never give an infinite SNR
+
+# --- Clutter Removal Parameters ---
+# Static reflections (scanner housing, near-field leakage) are removed before CFAR by
+# subtracting an exponential running mean of the range profiles.
+CLUTTER_REMOVAL_ENABLED = False # Enable for recordings dominated by static reflections
+CLUTTER_TIME_CONSTANT_S = 2.0 # How quickly the background adapts; shorter values also suppress slow-moving targets
+CLUTTER_SEED_FRAMES = 50 # The background starts as the mean of up to this many first frames
 
 # --- Clustering (DBSCAN) Parameters ---
 # These values control how detected points are grouped into objects.
 DBSCAN_EPS = 0.5        # The maximum distance between two samples for one to be considered as in the neighborhood of the other (in meters).
 DBSCAN_MIN_SAMPLES = 3  # The number of samples in a neighborhood for a point to be considered as a core point.
 
+# --- Downsampling Parameters ---
+# If enabled, detections are merged into grid cells before clustering and plotting, so both work
+# on a bounded number of points. Each merged point keeps its hit count as DBSCAN sample weight.
+# The memory-budget and follow modes always merge, as they never hold all points at once.
+DOWNSAMPLE_ENABLED = False
+DOWNSAMPLE_CELL_SIZE_M = 0.05 # Edge length of a merge cell (in meters); keep well below DBSCAN_EPS
+
 # --- Visualization Parameters ---
 MAP_EXTENT_M = 10.0     # The total size of the 2D map visualization (e.g., 10 means -5m to +5m)
 GRID_RESOLUTION_M = 0.1 # The size of each cell in the occupancy grid background (in meters)
+DENSITY_RENDER_MIN_POINTS = 50000   # Above this many points, maps are drawn as density images instead of scattering every point
+DENSITY_POLAR_MAX_ANGLE_BINS = 720  # Upper limit on the azimuth bins of the polar density image
+
+# --- Tiled Map Parameters ---
+# Unbounded occupancy map stored as memory-mapped tiles on disk, with a resolution pyramid.
+TILED_MAP_ENABLED = False
+TILED_MAP_RESOLUTION_M = 0.05 # Cell size of the finest level (in meters)
+TILED_MAP_TILE_SIZE = 256     # Cells along each side of a tile
+TILED_MAP_LEVELS = 5          # Number of pyramid levels; each level halves the resolution
+TILED_MAP_MAX_PIXELS = 1024   # Largest image side when rendering, used to pick the level of detail
 
 # --- IMU Parameters ---
 # The sampling rate of your IMU. This is crucial for accurate orientation estimation.
@@ -43,5 +69,161 @@ GRID_RESOLUTION_M = 0.1 # The size of each cell in the occupancy grid background
 IMU_SAMPLE_RATE_HZ = 100.0
 IMU_DT = 1.0 / IMU_SAMPLE_RATE_HZ # Time delta in seconds
 
+# --- Threaded Pipeline Parameters ---
+# Controls the stage-parallel executor used for offline processing.
+PIPELINE_BLOCK_SIZE = 64    # Number of radar frames handed from one stage to the next at a time
+PIPELINE_QUEUE_SIZE = 4     # Maximum number of blocks waiting between two stages
+PIPELINE_READ_CHUNK_FRAMES = 1024 # Frames parsed from the file at a time when streaming; split into blocks afterwards
+PIPELINE_NUM_WORKERS = max(1, min(4, (os.cpu_count() or 1) - 1)) # Worker threads for the stateless FFT, CFAR and projection stage
+
+# --- Stage Graph ---
+# The detection stages are declared as a graph (see stage_graph.py); fused stages run on batches of frames.
+GRAPH_BATCH_FRAMES = 256    # Frames pushed through FFT, CFAR and projection at a time; keeps the intermediates in cache
+
+# --- Tracking ---
+# Moving objects are followed across frames with Kalman-filtered tracks (see tracking.py).
+TRACK_MEASUREMENT_CELL_M = 0.3   # Detections of one frame within a cell of this size form one measurement
+TRACK_GATE_M = 1.0               # Maximum distance between a predicted track and its measurement; also the spatial-hash cell size
+TRACK_GATE_CHI2 = 9.21           # Mahalanobis gate (99% for 2 degrees of freedom)
+TRACK_ACCEL_STD = 2.0            # Process noise of the constant-velocity model, in m/s^2
+TRACK_MEASUREMENT_STD_M = 0.15   # Position noise of a measurement, in meters
+TRACK_INITIAL_SPEED_STD = 1.5    # Speed uncertainty of a new track, in m/s
+TRACK_CONFIRM_HITS = 3           # Hits before a tentative track is reported
+TRACK_MAX_COAST_S = 1.0          # Tracks without a hit for this long are retired
+TRACK_CHUNK_FRAMES = 1024        # Radar frames read and processed at a time by the tracking pipeline
+
+# --- Pose Graph ---
+# Corrects the drift of the IMU yaw by aligning keyframe scans with each other.
+POSE_GRAPH_KEYFRAME_FRAMES = 400        # Radar frames per keyframe (2 s at 200 frames/s)
+POSE_GRAPH_SCAN_FRAMES = 2000           # Frames around a keyframe whose points form its scan (about one full turn)
+POSE_GRAPH_SCAN_CELL_M = 0.05           # Scans are downsampled to cells of this size before alignment (in meters)
+POSE_GRAPH_MIN_SCAN_POINTS = 20         # Keyframes whose scan has fewer cells get no alignment edges
+POSE_GRAPH_ICP_ITERATIONS = 30          # Maximum iterations of one scan alignment
+POSE_GRAPH_ICP_MAX_DISTANCE_M = 0.3     # Point pairs further apart are not used by the alignment (in meters)
+POSE_GRAPH_MIN_INLIER_RATIO = 0.6       # Alignments matching fewer of the scan points are rejected
+POSE_GRAPH_ODOMETRY_STD = (0.05, 0.05, 0.02) # Std of the IMU keyframe-to-keyframe motion (m, m, rad); the IMU gives no translation
+POSE_GRAPH_SCAN_STD = (0.02, 0.02, 0.005)    # Std of an accepted scan alignment (m, m, rad)
+POSE_GRAPH_LOOP_MIN_GAP = 10            # Minimum keyframes between the two ends of a loop closure
+POSE_GRAPH_LOOP_RADIUS_M = 1.0          # Keyframes this close to the current pose are loop-closure candidates (in meters)
+POSE_GRAPH_LOOP_CANDIDATES = 3          # Loop closures tried per keyframe
+POSE_GRAPH_OPTIMIZE_EVERY = 20          # Keyframes between two incremental re-optimisations while loop closures come in
+POSE_GRAPH_HUBER_DELTA = 3.0            # Residuals beyond this many standard deviations are down-weighted
+POSE_GRAPH_MAX_ITERATIONS = 20          # Maximum Gauss-Newton iterations per optimisation
+POSE_GRAPH_TOLERANCE = 1e-6             # Stop when no pose changes by more than this (m or rad)
+
+# --- Dataset Export ---
+# Labeled windows of radar and IMU frames for training, see dataset_export.py.
+DATASET_SESSIONS_ROOT = os.path.join(PROJECT_ROOT, "Deep Craft", "Test") # Default session directory of --export-dataset
+DATASET_WINDOW_FRAMES = 200        # Radar frames per window (1 s at 200 frames/s)
+DATASET_STRIDE_FRAMES = 100        # Radar frames between the starts of two windows
+DATASET_MIN_LABEL_OVERLAP = 0.5    # Share of a window a label must cover to label it
+DATASET_SHARD_WINDOWS = 1024       # Windows per shard file (about 100 MB of radar windows)
+DATASET_CHUNK_FRAMES = 4096        # Radar frames read at a time
+DATASET_RADAR_SAMPLES = 128        # Samples per radar frame
+DATASET_IMU_COLUMNS = ('accel_x', 'accel_y', 'accel_z', 'gyro_x', 'gyro_y', 'gyro_z') # IMU channels joined to each radar frame
+
+# --- Time Windows ---
+# Sessions can be processed for a time window only (--window T0 T1), using a sidecar time index.
+TIME_INDEX_STRIDE = 256      # Index every n-th row; a window read parses at most this many extra rows
+WINDOW_IMU_WARMUP_S = 5.0    # IMU data processed before the window so the orientation filter has settled
+
+# --- Sharded Processing ---
+# One session can be split into time shards processed by parallel worker processes (--shards N).
+SHARD_NUM_WORKERS = os.cpu_count() or 1      # Worker processes, one shard each
+SHARD_MARGIN_S = max(WINDOW_IMU_WARMUP_S, 5 * CLUTTER_TIME_CONSTANT_S) # Warm-up before each shard so the filters have converged at its edge
+
+# --- Framed Recordings ---
+# Live serial captures are stored as framed binary recordings (see frame_recording.py).
+RECORDING_FLUSH_EVERY_FRAMES = 64 # Frames buffered before they are handed to the OS; at most these are lost in a crash
+
+# --- Shared Frame Ring ---
+# Live frames are passed between processes through a shared-memory ring buffer (see frame_ring.py).
+RING_CAPACITY_FRAMES = 4096  # Frame slots; at 200 frames/s a reader may fall about 20 s behind before it loses frames
+RING_POLL_INTERVAL_S = 0.005 # Time a reader waits when no new frame is available
+RING_FRAME_WIDTH = 128       # Samples per frame as sent by the sensor in live acquisition (--acquire)
+RING_DTYPE = 'float32'       # Sample type of the frames on the serial link
+
+# --- .data Parser ---
+# Large .data files are split at line boundaries and parsed by several processes at once.
+PARSER_NUM_WORKERS = os.cpu_count() or 1     # Worker processes for parsing
+PARSER_PARALLEL_MIN_BYTES = 16 * 2**20       # Smaller files are parsed in-process
+PARSER_PIECE_BYTES = 16 * 2**20              # Bytes parsed at a time by one worker, bounding its temporary memory
+
+# --- Checkpointing ---
+# Long runs periodically save their state so a failed run can resume where it stopped.
+CHECKPOINT_ENABLED = False
+CHECKPOINT_INTERVAL_S = 60.0 # Minimum wall-clock time between two checkpoints (in seconds)
+
+# --- Memory Budget ---
+# With a memory budget (--memory-budget MB), the radar file is read and processed in chunks
+# sized from the frame width, and detected points beyond the point buffer are spilled to disk.
+MEMORY_BUDGET_MB = None            # Default budget for the run; None reads the whole session at once
+MEMORY_DTYPE = 'float32'           # Dtype of raw frames and buffered points in budgeted runs
+MEMORY_CSV_BYTES_PER_VALUE = 17    # Average text size of one value in a .data file, including the separator
+MEMORY_MIN_CHUNK_FRAMES = 16       # Smallest read chunk, used when the budget is too small
+MEMORY_BUDGET_SHARES = {'frames': 0.4, 'points': 0.3, 'tiles': 0.15, 'cells': 0.15} # Split of the budget between buffers
+MEMORY_SAMPLE_INTERVAL_S = 0.05    # How often the peak memory is sampled (in seconds)
+MEMORY_PLOT_MAX_POINTS = 20000     # Points drawn in the polar plot of a budgeted run
+
+# --- Follow Mode ---
+# Processes .data files while DeepCraft Studio is still recording them.
+FOLLOW_POLL_INTERVAL_S = 0.2        # Time between checks for newly appended lines (in seconds)
+FOLLOW_IDLE_TIMEOUT_S = 30.0        # Stop after this long without new data (in seconds); None runs until Ctrl+C
+FOLLOW_MAP_UPDATE_INTERVAL_S = 2.0  # Minimum time between two live map updates (in seconds)
+FOLLOW_IMU_HISTORY_S = 5.0          # IMU orientation kept for aligning new radar frames (in seconds)
+FOLLOW_SWEEP_FRAMES = 1000          # Frames per half-turn for the assumed sweep when no IMU yaw is available
+
+# --- Live Map Viewer ---
+LIVE_VIEWER_FPS = 25                # Refresh rate of the live map window, independent of the processing rate
+LIVE_VIEWER_RECENT_POINTS = 500     # Newest detections highlighted on top of the occupancy image
+LIVE_VIEWER_IMAGE_INTERVAL_S = 0.5  # Minimum time between two redraws of the occupancy image (in seconds)
+LIVE_VIEWER_STATS_FRAMES = 100      # Refreshes over which the reported frame time is averaged
+
+# --- Processing Daemon ---
+# Long-running process that answers processing jobs over localhost HTTP, see processing_daemon.py.
+DAEMON_HOST = "127.0.0.1"    # Bind address; the job API has no authentication, so keep it local
+DAEMON_PORT = 8765           # TCP port of the job API
+DAEMON_CACHE_SESSIONS = 4    # Sessions kept warm (time index, IMU orientation, frames once mapped)
+DAEMON_CACHE_MB = 2048       # Memory limit of the session cache in MB; least recently used sessions are dropped first
+DAEMON_CHUNK_FRAMES = 4096   # Frames processed between two progress events of a job
+
+# --- Runtime Metrics ---
+# Prometheus text endpoint and periodic JSON log line, see runtime_metrics.py.
+METRICS_HOST = "127.0.0.1"       # Bind address of the metrics endpoint
+METRICS_PORT = 9108              # Port of http://METRICS_HOST:METRICS_PORT/metrics
+METRICS_LOG_INTERVAL_S = 10.0    # Time between two JSON metrics log lines (in seconds)
+METRICS_LATENCY_BUCKETS_S = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5) # Stage latency histogram buckets (in seconds)
+
+# --- Adaptive Quality ---
+# With a latency target (--latency-target S), live runs step processing quality down while frames wait
+# too long and back up when there is headroom, see quality_controller.py.
+QUALITY_TARGET_LATENCY_S = None  # Target time from reading new frames to their points being out; None keeps full quality
+QUALITY_SMOOTHING = 0.3          # Weight of the newest latency sample in the smoothed latency
+QUALITY_HEADROOM = 0.5           # Quality goes back up while the smoothed latency stays below this share of the target
+QUALITY_HOLD_S = 2.0             # Minimum time between two quality changes, so the effect of one is measured first
+QUALITY_UPGRADE_AFTER_S = 10.0   # Time the latency must stay below the headroom before quality goes back up
+# Quality levels from full to lowest. Render and map rates go first, and dropping frames comes last.
+# CFAR keeps its settings at every level: the cost of the running-sum CA-CFAR does not shrink with fewer training cells.
+QUALITY_LEVELS = (
+    {'decimation': 1, 'map_interval_scale': 1, 'render_fps_scale': 1.0},
+    {'decimation': 1, 'map_interval_scale': 2, 'render_fps_scale': 0.5},
+    {'decimation': 1, 'map_interval_scale': 4, 'render_fps_scale': 0.25},
+    {'decimation': 2, 'map_interval_scale': 4, 'render_fps_scale': 0.25},
+    {'decimation': 4, 'map_interval_scale': 8, 'render_fps_scale': 0.25},
+)
+
+# --- Result Archive ---
+# Processed range profiles, CFAR masks and orientation kept for later analysis, see result_archive.py.
+ARCHIVE_BLOCK_FRAMES = 1024        # Frames per compressed block, the unit of random access
+ARCHIVE_MAGNITUDE_BITS = 8         # Bits per quantized FFT magnitude (8 or 16); the scale is chosen per block and bin
+ARCHIVE_ORIENTATION_BITS = 16      # Bits per quantized roll, pitch and yaw (8 or 16)
+ARCHIVE_COMPRESSION_LEVEL = 6      # zlib level of every block
+
 # --- Output Directories ---
 PLOTS_OUTPUT_DIR = os.path.join(PROJECT_ROOT, "output", "plots")
+CHECKPOINT_DIR = os.path.join(PROJECT_ROOT, "output", "checkpoints")
+TILED_MAP_DIR = os.path.join(PROJECT_ROOT, "output", "tiled_map", SESSION_DIR_NAME)
+SPILL_DIR = os.path.join(PROJECT_ROOT, "output", "spill")
+DATASET_OUTPUT_DIR = os.path.join(PROJECT_ROOT, "output", "dataset")
+ARCHIVE_OUTPUT_DIR = os.path.join(PROJECT_ROOT, "output", "archive")
+RECORDINGS_OUTPUT_DIR = os.path.join(PROJECT_ROOT, "output", "recordings")
@@ -0,0 +1,324 @@
+import asyncio
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+import serial
+from src.monitoring.runtime_metrics import CLOCK_DRIFT, CLOCK_OFFSET, FRAMES_DROPPED, FRAMES_RECEIVED, IMU_RADAR_SKEW, QUEUE_DEPTH
+
+class ClockSkewEstimator:
+    """
+    Estimates the offset and drift of a device clock relative to the host clock.
+
+    Keeps running sums for a least-squares fit of host time against device time, so each
+    update is O(1) and no history has to be stored.
+    """
+    def __init__(self):
+        self.count = 0
+        self._device_origin = None
+        self._host_origin = None
+        self._sum_d = 0.0
+        self._sum_h = 0.0
+        self._sum_dd = 0.0
+        self._sum_dh = 0.0
+
+    def update(self, device_ts, host_ts):
+        """
+        Adds one (device timestamp, host timestamp) pair to the fit.
+        """
+        if self._device_origin is None:
+            # Fit relative to the first sample to keep the sums well conditioned
+            self._device_origin = device_ts
+            self._host_origin = host_ts
+        d = device_ts - self._device_origin
+        h = host_ts - self._host_origin
+        self.count += 1
+        self._sum_d += d
+        self._sum_h += h
+        self._sum_dd += d * d
+        self._sum_dh += d * h
+
+    @property
+    def drift(self):
+        """
+        Host seconds elapsed per device second (1.0 means both clocks run at the same rate).
+        """
+        denominator = self.count * self._sum_dd - self._sum_d ** 2
+        if self.count < 2 or denominator <= 0:
+            return 1.0
+        return (self.count * self._sum_dh - self._sum_d * self._sum_h) / denominator
+
+    @property
+    def offset(self):
+        """
+        Host time minus device time at the device clock's zero, in seconds.
+        """
+        if self.count == 0:
+            return 0.0
+        drift = self.drift
+        intercept = (self._sum_h - drift * self._sum_d) / self.count
+        return self._host_origin + intercept - drift * self._device_origin
+
+    def to_host(self, device_ts):
+        """
+        Converts a device timestamp to the host clock.
+        """
+        return self.offset + self.drift * device_ts
+
+class SerialSource:
+    """
+    Reads newline-terminated CSV packets ("device_time,value1,value2,...") from a serial port.
+
+    pyserial is blocking, so each read runs in a thread of the source's own executor.
+    """
+    def __init__(self, name, port, baudrate=115200):
+        self.name = name
+        self.port = port
+        self.baudrate = baudrate
+        self._serial = None
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"serial-{name}")
+
+    async def open(self):
+        loop = asyncio.get_running_loop()
+        self._serial = await loop.run_in_executor(self._executor, lambda: serial.Serial(self.port, self.baudrate, timeout=1))
+        print(f"[{self.name}] Opened serial port {self.port} at {self.baudrate} baud.")
+
+    async def readline(self):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, self._serial.readline)
+
+    async def close(self):
+        # Cancelling readline does not stop its thread, which keeps reading until the port
+        # timeout; the port is closed only once that read has returned
+        await asyncio.get_running_loop().run_in_executor(None, self._executor.shutdown)
+        if self._serial and self._serial.is_open:
+            self._serial.close()
+            print(f"[{self.name}] Serial port {self.port} closed.")
+
+class SocketSource:
+    """
+    Reads newline-terminated CSV packets ("device_time,value1,value2,...") from a TCP socket.
+    """
+    def __init__(self, name, host, port):
+        self.name = name
+        self.host = host
+        self.port = port
+        self._reader = None
+        self._writer = None
+
+    async def open(self):
+        self._reader, self._writer = await asyncio.open_connection(self.host, self.port)
+        print(f"[{self.name}] Connected to {self.host}:{self.port}.")
+
+    async def readline(self):
+        line = await self._reader.readline()
+        if not line:
+            raise ConnectionError(f"[{self.name}] Connection closed by peer.")
+        return line
+
+    async def close(self):
+        if self._writer:
+            self._writer.close()
+            try:
+                await self._writer.wait_closed()
+            except OSError:
+                pass
+            print(f"[{self.name}] Connection to {self.host}:{self.port} closed.")
+
+class AcquisitionService:
+    """
+    Reads several sensor sources concurrently and records them on one shared host clock.
+
+    Every packet is stamped with `time.monotonic()` as soon as its line arrives, relative to
+    the start of the service. These arrival times feed a per-stream fit of the device clock
+    against the host clock (ClockSkewEstimator), and each row is written with its device
+    timestamp converted to the host clock by the fit so far. This removes the jitter of the
+    serial and socket transfers; within a stream the times never go backwards. Each stream is written as a DeepCraft-style `.data` file
+    ('# Time (seconds),...' header), so the files are already sorted in time and can be
+    loaded with the existing readers. A stream can be attached to another one (e.g. the
+    magnetometer to the IMU): its latest values are then appended as extra columns to each
+    row of the target stream, which removes the need for `merge_asof` when loading.
+    """
+    def __init__(self, output_dir, flush_interval_s=1.0):
+        self.output_dir = output_dir
+        self.flush_interval_s = flush_interval_s
+        self.streams = {}
+        self._start_time = None
+
+    def add_source(self, source, columns, attach_to=None, prefix=None):
+        """
+        Registers a source.
+
+        Args:
+            source (SerialSource or SocketSource): The source to read from.
+            columns (list): Names of the values following the device timestamp in each packet.
+            attach_to (str, optional): Name of another stream to append this stream's values to,
+                                       instead of writing a separate file.
+            prefix (str, optional): Prefix for the column names when attached (e.g. 'Mag_').
+        """
+        self.streams[source.name] = {
+            'source': source,
+            'columns': list(columns),
+            'attach_to': attach_to,
+            'prefix': prefix or '',
+            'attached': [],
+            'latest': [float('nan')] * len(columns),
+            'skew': ClockSkewEstimator(),
+            'received': 0,
+            'dropped': 0,
+            'last_time': float('-inf'),
+            'file': None,
+            'received_metric': FRAMES_RECEIVED.labels(stream=source.name),
+            'dropped_metric': FRAMES_DROPPED.labels(stream=source.name, reason='malformed'),
+        }
+
+    async def _read_source(self, name, packet_queue):
+        stream = self.streams[name]
+        source = stream['source']
+        await source.open()
+        try:
+            while True:
+                line = await source.readline()
+                host_ts = time.monotonic() - self._start_time
+                if not line:
+                    continue
+                try:
+                    fields = [float(v) for v in line.decode('ascii').strip().split(',')]
+                except (UnicodeDecodeError, ValueError):
+                    stream['dropped'] += 1
+                    stream['dropped_metric'].inc()
+                    continue
+                if len(fields) != len(stream['columns']) + 1:
+                    stream['dropped'] += 1
+                    stream['dropped_metric'].inc()
+                    continue
+                await packet_queue.put((name, host_ts, fields[0], fields[1:]))
+        finally:
+            await source.close()
+
+    def _open_outputs(self):
+        os.makedirs(self.output_dir, exist_ok=True)
+        for name, stream in self.streams.items():
+            target = stream['attach_to']
+            if target:
+                if target not in self.streams:
+                    raise ValueError(f"Stream '{name}' is attached to unknown stream '{target}'.")
+                self.streams[target]['attached'].append(name)
+        for name, stream in self.streams.items():
+            if stream['attach_to']:
+                continue
+            columns = list(stream['columns'])
+            for attached_name in stream['attached']:
+                attached = self.streams[attached_name]
+                columns += [attached['prefix'] + col for col in attached['columns']]
+            file_path = os.path.join(self.output_dir, f"{name}-Data.data")
+            stream['file'] = open(file_path, 'w')
+            stream['file'].write('# Time (seconds),' + ','.join(columns) + '\n')
+            print(f"[{name}] Writing to {file_path}")
+
+    def _write_packet(self, name, host_ts, device_ts, values):
+        stream = self.streams[name]
+        stream['received'] += 1
+        stream['received_metric'].inc()
+        stream['skew'].update(device_ts, host_ts)
+        if stream['attach_to']:
+            stream['latest'] = values
+            return
+        # The fit can still move while it has few packets; keep the stream's times in order
+        row_time = max(stream['skew'].to_host(device_ts), stream['last_time'])
+        stream['last_time'] = row_time
+        row = [row_time] + values
+        for attached_name in stream['attached']:
+            row += self.streams[attached_name]['latest']
+        stream['file'].write(','.join(repr(v) for v in row) + '\n')
+
+    async def _write_packets(self, packet_queue):
+        last_flush = time.monotonic()
+        while True:
+            name, host_ts, device_ts, values = await packet_queue.get()
+            self._write_packet(name, host_ts, device_ts, values)
+            if time.monotonic() - last_flush > self.flush_interval_s:
+                for stream in self.streams.values():
+                    if stream['file']:
+                        stream['file'].flush()
+                last_flush = time.monotonic()
+
+    def clock_report(self):
+        """
+        Returns the packet counts and estimated clock skew of every stream.
+
+        Returns:
+            dict: Per stream: received and dropped packets, clock offset (s) and drift (ppm).
+        """
+        return {
+            name: {
+                'received': stream['received'],
+                'dropped': stream['dropped'],
+                'clock_offset_s': stream['skew'].offset,
+                'clock_drift_ppm': (stream['skew'].drift - 1.0) * 1e6,
+            }
+            for name, stream in self.streams.items()
+        }
+
+    def _register_metrics(self, packet_queue):
+        # Read only when the metrics are scraped, so they cost nothing per packet
+        QUEUE_DEPTH.labels(queue='acquisition_packets').set_function(packet_queue.qsize)
+        for name, stream in self.streams.items():
+            CLOCK_OFFSET.labels(stream=name).set_function(lambda skew=stream['skew']: skew.offset)
+            CLOCK_DRIFT.labels(stream=name).set_function(lambda skew=stream['skew']: (skew.drift - 1.0) * 1e6)
+        by_kind = {name.lower(): stream['skew'] for name, stream in self.streams.items()}
+        if 'imu' in by_kind and 'radar' in by_kind:
+            IMU_RADAR_SKEW.set_function(lambda: by_kind['imu'].offset - by_kind['radar'].offset)
+
+    async def run(self, duration=None):
+        """
+        Acquires from all sources until `duration` seconds have passed or the task is cancelled.
+
+        If a source or the writer fails, the others are stopped, everything received so far
+        is written and the files are closed; the error is then raised.
+
+        Args:
+            duration (float, optional): Acquisition time in seconds. If None, runs until cancelled.
+        """
+        self._open_outputs()
+        packet_queue = asyncio.Queue()
+        self._register_metrics(packet_queue)
+        self._start_time = time.monotonic()
+        tasks = [asyncio.create_task(self._read_source(name, packet_queue)) for name in self.streams]
+        writer = asyncio.create_task(self._write_packets(packet_queue))
+        failure = None
+        try:
+            done, _ = await asyncio.wait(tasks + [writer], timeout=duration, return_when=asyncio.FIRST_EXCEPTION)
+            failure = next((task.exception() for task in done if not task.cancelled() and task.exception()), None)
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+            # Write out what the readers already queued (unless writing is what failed)
+            while not writer.done() and not packet_queue.empty():
+                self._write_packet(*packet_queue.get_nowait())
+            writer.cancel()
+            await asyncio.gather(writer, return_exceptions=True)
+            for stream in self.streams.values():
+                if stream['file']:
+                    stream['file'].close()
+
+            report = self.clock_report()
+            with open(os.path.join(self.output_dir, "acquisition.json"), 'w') as f:
+                json.dump(report, f, indent=2)
+            for name, stats in report.items():
+                print(f"[{name}] {stats['received']} packets ({stats['dropped']} dropped), "
+                      f"clock offset {stats['clock_offset_s']:.6f} s, drift {stats['clock_drift_ppm']:.1f} ppm")
+        if failure is not None:
+            raise failure
+
+if __name__ == "__main__":
+    # Example usage: record radar from one serial port and IMU + magnetometer from another
+    # for 10 seconds. The magnetometer values are appended to the IMU rows.
+    service = AcquisitionService(output_dir="live_session")
+    service.add_source(SerialSource("Radar", port='COM6'), columns=[f"f0_f0_f{i}" for i in range(128)])
+    service.add_source(SerialSource("IMU", port='COM7'),
+                       columns=['Accel_X', 'Accel_Y', 'Accel_Z', 'Gyro_X', 'Gyro_Y', 'Gyro_Z'])
+    service.add_source(SocketSource("Magnetometer", host='127.0.0.1', port=5005),
+                       columns=['X', 'Y', 'Z'], attach_to="IMU", prefix='Mag_')
+    asyncio.run(service.run(duration=10))
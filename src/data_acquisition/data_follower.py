@@ -0,0 +1,107 @@
+import os
+import numpy as np
+
+class DataFileFollower:
+    """
+    Incrementally reads a DeepCraft `.data` file that is still being written.
+
+    Remembers the byte offset up to which the file has been read. Each `poll` reads only the
+    bytes appended since the previous call and parses the complete lines among them; a partly
+    written last line is held back until its newline arrives. If the file shrinks (a new
+    recording replaced it), reading starts over from the beginning.
+    """
+    def __init__(self, file_path):
+        self.file_path = file_path
+        self.columns = None
+        self.offset = 0
+        self.rows_read = 0
+        self._partial = b''
+
+    def _reset(self):
+        self.columns = None
+        self.offset = 0
+        self.rows_read = 0
+        self._partial = b''
+
+    def poll(self):
+        """
+        Returns the rows appended since the last call.
+
+        Returns:
+            np.array: 2D float array of shape (num_new_rows, num_columns). Empty if nothing new
+                      has been completed (or the header has not been written yet).
+        """
+        if not os.path.exists(self.file_path):
+            return np.empty((0, len(self.columns) if self.columns else 0))
+        size = os.path.getsize(self.file_path)
+        if size < self.offset:
+            print(f"{self.file_path} was truncated; reading it again from the start.")
+            self._reset()
+        if size == self.offset:
+            return np.empty((0, len(self.columns) if self.columns else 0))
+
+        with open(self.file_path, 'rb') as f:
+            f.seek(self.offset)
+            chunk = f.read(size - self.offset)
+
+        data = self._partial + chunk
+        last_newline = data.rfind(b'\n')
+        if last_newline < 0:
+            self._partial = data
+            self.offset += len(chunk)
+            return np.empty((0, len(self.columns) if self.columns else 0))
+        complete, partial = data[:last_newline + 1], data[last_newline + 1:]
+
+        columns = self.columns
+        if columns is None:
+            header_end = complete.index(b'\n')
+            header = complete[:header_end].decode('utf-8').strip()
+            columns = [name.strip() for name in header.lstrip('# ').split(',')]
+            complete = complete[header_end + 1:]
+
+        rows = self._parse_rows(complete.decode('ascii', errors='replace'), len(columns))
+        # Only advance once the new bytes have been parsed
+        self.columns = columns
+        self._partial = partial
+        self.offset += len(chunk)
+        self.rows_read += len(rows)
+        return rows
+
+    def _parse_rows(self, text, num_columns):
+        # Parses complete lines; blank lines are skipped and malformed ones dropped with a warning
+        lines = [line for line in text.splitlines() if line.strip()]
+        if not lines:
+            return np.empty((0, num_columns))
+        try:
+            values = np.array(','.join(lines).split(','), dtype=float)
+            if len(values) == len(lines) * num_columns:
+                return values.reshape(-1, num_columns)
+        except ValueError:
+            pass
+        # Some line is malformed: parse line by line so it does not shift the values of the others
+        rows = []
+        for line in lines:
+            try:
+                row = np.array(line.split(','), dtype=float)
+            except ValueError:
+                row = None
+            if row is None or len(row) != num_columns:
+                print(f"Warning: {self.file_path} contains a malformed line near byte {self.offset}; dropping it: {line[:80]!r}")
+                continue
+            rows.append(row)
+        return np.array(rows).reshape(-1, num_columns)
+
+if __name__ == "__main__":
+    # Example usage: follow a file while it is being written, including a half-written line
+    import tempfile
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "Radar-Data.data")
+        follower = DataFileFollower(path)
+        with open(path, 'w') as f:
+            f.write("# Time (seconds),f0_f0_f0,f0_f0_f1\n0.0,1.0,2.0\n0.005,1.1,")
+        print(f"First poll: {follower.poll().tolist()}")
+        with open(path, 'a') as f:
+            f.write("2.1\n0.01,1.2,2.2\n")
+        print(f"Second poll: {follower.poll().tolist()}")
+        print(f"Columns: {follower.columns}, rows read: {follower.rows_read}")
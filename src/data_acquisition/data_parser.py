@@ -0,0 +1,268 @@
+import io
+import mmap
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import resource_tracker, shared_memory
+import numpy as np
+from src.config import constants
+
+# Bytes a blank line may consist of; blank lines are not rows, as for pandas
+BLANK_LINE_BYTES = b' \t\r'
+# A newline that ends a line followed by a blank one, and a blank line at the start of a range
+_NEWLINE_BEFORE_BLANK_LINE = re.compile(rb'\n[' + BLANK_LINE_BYTES + rb']*(?=\n)')
+_BLANK_FIRST_LINE = re.compile(rb'[' + BLANK_LINE_BYTES + rb']*\n')
+
+def read_data_header(file_path):
+    """
+    Returns the column names from the '# Time (seconds),...' header line of a .data file.
+    """
+    with open(file_path, 'r') as f:
+        header_line = f.readline().strip()
+    return [name.strip() for name in header_line.lstrip('# ').split(',')]
+
+def _newline_aligned_ranges(mm, start, end, num_ranges):
+    """
+    Splits the bytes [start, end) into up to `num_ranges` ranges that each end just after a newline.
+    """
+    bounds = [start]
+    for i in range(1, num_ranges):
+        newline = mm.find(b'\n', start + (end - start) * i // num_ranges, end)
+        if newline < 0:
+            break
+        if newline + 1 > bounds[-1]:
+            bounds.append(newline + 1)
+    if bounds[-1] < end:
+        bounds.append(end)
+    return list(zip(bounds[:-1], bounds[1:]))
+
+def _count_data_rows(mm, start, end):
+    """
+    Counts the rows in the bytes [start, end), which start at a line start and end after a newline.
+
+    Blank lines are not rows: they are skipped by the parser, as they were by pandas.
+    """
+    num_rows = 0
+    for piece_start in range(start, end, constants.PARSER_PIECE_BYTES):
+        num_rows += mm[piece_start:min(piece_start + constants.PARSER_PIECE_BYTES, end)].count(b'\n')
+    num_rows -= sum(1 for _ in _NEWLINE_BEFORE_BLANK_LINE.finditer(mm, start, end))
+    if _BLANK_FIRST_LINE.match(mm, start, end):
+        num_rows -= 1
+    return num_rows
+
+def _count_rows(file_path, start, end):
+    """
+    Worker process entry point: counts the newline-terminated rows in a byte range of a file.
+    """
+    with open(file_path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        return _count_data_rows(mm, start, end)
+
+def _data_bounds(mm):
+    """
+    Returns (data_start, data_end, tail): the byte range of the complete data lines, and the
+    stripped last line if it has no newline yet (it may still be being written).
+    """
+    header_end = mm.find(b'\n')
+    data_start = len(mm) if header_end < 0 else header_end + 1
+    data_end = mm.rfind(b'\n') + 1 if mm.rfind(b'\n') >= data_start else data_start
+    return data_start, data_end, mm[data_end:].strip()
+
+def count_data_rows(file_path):
+    """
+    Counts the rows `parse_data_file` returns for a .data file, without parsing them.
+    """
+    with open(file_path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return 0
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            data_start, data_end, tail = _data_bounds(mm)
+            return _count_data_rows(mm, data_start, data_end) + (1 if tail else 0)
+
+def parse_data_bytes(data_bytes, num_columns):
+    """
+    Parses complete lines of a .data file (without the header) into a float64 array of shape (num_rows, num_columns).
+    """
+    if not data_bytes.strip():
+        return np.empty((0, num_columns))
+    if _NEWLINE_BEFORE_BLANK_LINE.search(data_bytes) or _BLANK_FIRST_LINE.match(data_bytes):
+        # np.loadtxt only skips empty lines, not ones with spaces or tabs
+        data_bytes = _NEWLINE_BEFORE_BLANK_LINE.sub(b'', data_bytes)
+        first_line = _BLANK_FIRST_LINE.match(data_bytes)
+        data_bytes = data_bytes[first_line.end() if first_line else 0:]
+    rows = np.loadtxt(io.BytesIO(data_bytes), delimiter=',', dtype=np.float64, ndmin=2)
+    if rows.shape[1] != num_columns:
+        raise ValueError(f"expected {num_columns} columns, found {rows.shape[1]}")
+    return rows
+
+def _parse_range_into(mm, start, end, time_out, values_out):
+    """
+    Parses the rows in the byte range [start, end) into the given output arrays, one piece at a time.
+
+    Values are parsed as correctly rounded float64 before being stored, so the result does not
+    depend on how the file was split.
+    """
+    row = 0
+    for piece_start, piece_end in _newline_aligned_ranges(mm, start, end, max(1, (end - start) // constants.PARSER_PIECE_BYTES)):
+        try:
+            rows = parse_data_bytes(mm[piece_start:piece_end], values_out.shape[1] + 1)
+        except ValueError as e:
+            raise ValueError(f"{e} near byte {piece_start}") from e
+        time_out[row:row + len(rows)] = rows[:, 0]
+        values_out[row:row + len(rows)] = rows[:, 1:]
+        row += len(rows)
+    if row != len(time_out):
+        raise ValueError(f"bytes {start}-{end} hold {row} rows instead of {len(time_out)}")
+
+def attach_shared_memory(name, shares_tracker=False):
+    """
+    Opens an existing shared memory segment in another process without taking over its cleanup.
+
+    Args:
+        name (str): Name of the segment.
+        shares_tracker (bool): True in child processes of the segment's owner (e.g. pool workers),
+                               which use the owner's resource tracker.
+    """
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        # Before Python 3.13 attaching registers the segment with the resource tracker. A
+        # child of the owner shares its tracker, where the name is registered already, so the
+        # registration is a no-op and must not be undone. Any other process has a tracker of
+        # its own, which would remove the segment when that process exits, so this name (and
+        # only this one) is unregistered again.
+        segment = shared_memory.SharedMemory(name=name)
+        if not shares_tracker:
+            resource_tracker.unregister(segment._name, 'shared_memory')
+        return segment
+
+def _detach_array(segment, shape, dtype):
+    """
+    Returns an array over a shared memory segment that owns the segment's memory from then on.
+
+    The segment is closed and unlinked, except for its mapping, which is handed to the array
+    instead of being closed: the memory stays valid without a copy and is freed along with
+    the last view of the array. SharedMemory has no public way to do this.
+    """
+    mapping = segment._mmap
+    segment._buf.release()
+    segment._buf = segment._mmap = None
+    segment.close()
+    segment.unlink()
+    return np.ndarray(shape, dtype=dtype, buffer=mapping)
+
+def _parse_range_worker(file_path, start, end, first_row, num_rows, num_samples, time_shm_name, values_shm_name, total_rows):
+    """
+    Worker process entry point: parses one byte range straight into the shared output arrays.
+    """
+    time_shm = attach_shared_memory(time_shm_name, shares_tracker=True)
+    values_shm = attach_shared_memory(values_shm_name, shares_tracker=True)
+    try:
+        time_all = np.ndarray((total_rows,), dtype=np.float64, buffer=time_shm.buf)
+        values_all = np.ndarray((total_rows, num_samples), dtype=np.float32, buffer=values_shm.buf)
+        with open(file_path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            _parse_range_into(mm, start, end, time_all[first_row:first_row + num_rows], values_all[first_row:first_row + num_rows])
+        del time_all, values_all
+    finally:
+        time_shm.close()
+        values_shm.close()
+
+def parse_data_file(file_path, num_workers=constants.PARSER_NUM_WORKERS):
+    """
+    Parses a DeepCraft .data file into NumPy arrays.
+
+    The file is memory-mapped and split at newline boundaries into one byte range per worker.
+    The workers count their rows, then parse their range straight into a preallocated shared
+    float32 array at their row offset. That array, with a row reserved for an unterminated last
+    line, is returned as is, so the rows are never gathered, concatenated or copied.
+    Small files are parsed in-process. The values are identical to those of
+    `pd.read_csv(..., float_precision='round_trip')` converted to float32.
+
+    Args:
+        file_path (str): Path to the .data file. The first column must be the time.
+        num_workers (int): Number of worker processes.
+
+    Returns:
+        tuple: (column_names, time_s, values), where time_s is a float64 array of the first
+               column and values a float32 array of shape (num_rows, num_columns - 1).
+    """
+    column_names = read_data_header(file_path)
+    num_samples = len(column_names) - 1
+    with open(file_path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return column_names, np.empty(0), np.empty((0, num_samples), dtype=np.float32)
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            # A last line without a newline may still be being written; it is parsed on its own
+            data_start, data_end, tail = _data_bounds(mm)
+
+            parallel = num_workers > 1 and data_end - data_start >= constants.PARSER_PARALLEL_MIN_BYTES
+            ranges = _newline_aligned_ranges(mm, data_start, data_end, num_workers if parallel else 1) if data_end > data_start else []
+
+            tail_rows = 1 if tail else 0
+            if not parallel:
+                num_rows = sum(_count_data_rows(mm, start, end) for start, end in ranges)
+                time_s = np.empty(num_rows + tail_rows)
+                values = np.empty((num_rows + tail_rows, num_samples), dtype=np.float32)
+                for start, end in ranges:
+                    _parse_range_into(mm, start, end, time_s[:num_rows], values[:num_rows])
+            else:
+                time_s, values = _parse_ranges_parallel(file_path, ranges, num_samples, num_workers, tail_rows)
+
+    if tail:
+        # Same as pandas: empty fields become NaN
+        last = np.array([float(field) if field.strip() else np.nan for field in tail.decode('ascii').split(',')])
+        if len(last) != num_samples + 1:
+            # Same as pandas: missing trailing values of an incomplete last row become NaN
+            last = np.concatenate((last[:num_samples + 1], np.full(max(0, num_samples + 1 - len(last)), np.nan)))
+        time_s[-1] = last[0]
+        values[-1] = last[1:]
+    return column_names, time_s, values
+
+def _parse_ranges_parallel(file_path, ranges, num_samples, num_workers, extra_rows=0):
+    # Started before the workers, so they inherit this process's tracker instead of starting their own
+    resource_tracker.ensure_running()
+    with ProcessPoolExecutor(max_workers=num_workers) as pool:
+        counts = list(pool.map(_count_rows, [file_path] * len(ranges), *zip(*ranges)))
+        first_rows = np.concatenate(([0], np.cumsum(counts)[:-1])).tolist()
+        # The rows after the parsed ones are left for the caller to fill
+        total_rows = int(sum(counts)) + extra_rows
+
+        time_shm = shared_memory.SharedMemory(create=True, size=max(1, total_rows * 8))
+        values_shm = shared_memory.SharedMemory(create=True, size=max(1, total_rows * num_samples * 4))
+        try:
+            futures = [
+                pool.submit(_parse_range_worker, file_path, start, end, first_row, count, num_samples,
+                            time_shm.name, values_shm.name, total_rows)
+                for (start, end), first_row, count in zip(ranges, first_rows, counts)
+            ]
+            for future in futures:
+                future.result()
+        except BaseException:
+            for segment in (time_shm, values_shm):
+                segment.close()
+                segment.unlink()
+            raise
+    return _detach_array(time_shm, (total_rows,), np.float64), _detach_array(values_shm, (total_rows, num_samples), np.float32)
+
+if __name__ == "__main__":
+    # Example usage: compare against pandas on a synthetic recording
+    import tempfile
+    import time
+    import pandas as pd
+
+    np.random.seed(0)
+    num_rows, num_samples = 20000, 128
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "Radar-Data.data")
+        with open(path, 'w') as f:
+            f.write("# Time (seconds)," + ",".join(f"f0_f0_f{i}" for i in range(num_samples)) + "\n")
+            np.savetxt(f, np.column_stack((np.arange(num_rows) * 0.005, np.random.rand(num_rows, num_samples))), delimiter=',', fmt='%.10g')
+
+        start = time.perf_counter()
+        df = pd.read_csv(path, skiprows=1, header=None, float_precision='round_trip')
+        pandas_s = time.perf_counter() - start
+        start = time.perf_counter()
+        columns, time_s, values = parse_data_file(path)
+        parser_s = time.perf_counter() - start
+
+        print(f"pandas: {pandas_s:.2f} s, parse_data_file: {parser_s:.2f} s with {constants.PARSER_NUM_WORKERS} workers")
+        print(f"Identical: {np.array_equal(df.iloc[:, 1:].to_numpy(dtype=np.float32), values) and np.array_equal(df.iloc[:, 0].to_numpy(), time_s)}")
@@ -0,0 +1,245 @@
+import json
+import os
+import struct
+import time
+import zlib
+import numpy as np
+from src.config import constants
+
+# Layout (all integers little-endian):
+#   file header:  magic, version, config length, config JSON, CRC32 of the config
+#   frame record: frame magic, payload length, host timestamp (float64 seconds), CRC32, payload
+#   index:        frame offsets (uint64) and timestamps (float64), followed by the footer
+#   footer:       index offset, number of frames, CRC32 of the index, end magic
+FILE_MAGIC = b'RDRREC\x00\x01'
+FORMAT_VERSION = 1
+FRAME_MAGIC = b'FRM1'
+END_MAGIC = b'REND'
+_FILE_HEADER = struct.Struct('<8sHI')
+_FRAME_HEADER = struct.Struct('<4sIdI')
+_FOOTER = struct.Struct('<QQI4s')
+
+def _frame_crc(timestamp, payload):
+    return zlib.crc32(payload, zlib.crc32(struct.pack('<d', timestamp)))
+
+def _read_file_header(f):
+    """
+    Reads the file header. Returns (config, offset of the first frame).
+    """
+    raw = f.read(_FILE_HEADER.size)
+    if len(raw) < _FILE_HEADER.size:
+        raise ValueError("file is too short to be a frame recording")
+    magic, version, config_length = _FILE_HEADER.unpack(raw)
+    if magic != FILE_MAGIC:
+        raise ValueError("not a frame recording (bad magic)")
+    if version > FORMAT_VERSION:
+        raise ValueError(f"unsupported recording version {version}")
+    config_bytes = f.read(config_length)
+    crc = f.read(4)
+    if len(crc) < 4 or struct.unpack('<I', crc)[0] != zlib.crc32(config_bytes):
+        raise ValueError("corrupt recording header")
+    return json.loads(config_bytes.decode('utf-8')), _FILE_HEADER.size + config_length + 4
+
+def _read_index(f, file_size, data_start):
+    """
+    Reads the trailing index. Returns (offsets, timestamps, index offset), or None if the file has no valid index.
+    """
+    if file_size < data_start + _FOOTER.size:
+        return None
+    f.seek(file_size - _FOOTER.size)
+    index_offset, num_frames, crc, magic = _FOOTER.unpack(f.read(_FOOTER.size))
+    if magic != END_MAGIC or index_offset < data_start or index_offset + num_frames * 16 != file_size - _FOOTER.size:
+        return None
+    f.seek(index_offset)
+    index_bytes = f.read(num_frames * 16)
+    if zlib.crc32(index_bytes) != crc:
+        return None
+    offsets = np.frombuffer(index_bytes, dtype='<u8', count=num_frames).astype(np.int64)
+    timestamps = np.frombuffer(index_bytes, dtype='<f8', count=num_frames, offset=num_frames * 8).copy()
+    return offsets, timestamps, index_offset
+
+def _scan_frames(f, data_start, file_size):
+    """
+    Walks the frame records from the start, stopping at the first truncated or corrupt one.
+
+    Returns:
+        tuple: (offsets, timestamps, end offset of the last valid frame).
+    """
+    offsets, timestamps = [], []
+    position = data_start
+    f.seek(position)
+    while position + _FRAME_HEADER.size <= file_size:
+        magic, length, timestamp, crc = _FRAME_HEADER.unpack(f.read(_FRAME_HEADER.size))
+        if magic != FRAME_MAGIC or position + _FRAME_HEADER.size + length > file_size:
+            break
+        payload = f.read(length)
+        if _frame_crc(timestamp, payload) != crc:
+            break
+        offsets.append(position)
+        timestamps.append(timestamp)
+        position += _FRAME_HEADER.size + length
+    return np.array(offsets, dtype=np.int64), np.array(timestamps, dtype=float), position
+
+class FrameRecordingWriter:
+    """
+    Writes radar frames to a framed binary recording.
+
+    Each frame is stored with its length, the host time at which it was received and a CRC32,
+    and the offsets of all frames are kept in memory and written as an index when the file is
+    closed. Appending a frame is a single buffered write. If the process dies before `close`,
+    the frames already flushed can be recovered: reopening the file with `append=True` (or
+    reading it with FrameRecordingReader) rebuilds the index by scanning the frame records
+    and drops a partly written last frame.
+    """
+    def __init__(self, file_path, config=None, append=False, flush_every=constants.RECORDING_FLUSH_EVERY_FRAMES):
+        self.file_path = file_path
+        self.flush_every = flush_every
+        self._offsets = []
+        self._timestamps = []
+        self._unflushed = 0
+
+        if append and os.path.exists(file_path) and os.path.getsize(file_path) > 0:
+            self._file = open(file_path, 'r+b')
+            self.config, data_start = _read_file_header(self._file)
+            file_size = os.path.getsize(file_path)
+            index = _read_index(self._file, file_size, data_start)
+            if index is not None:
+                offsets, timestamps, end = index
+            else:
+                offsets, timestamps, end = _scan_frames(self._file, data_start, file_size)
+                print(f"Recovered {len(offsets)} frames from {file_path} (no valid index); discarding {file_size - end} trailing bytes.")
+            # New frames overwrite the old index (or the damaged tail)
+            self._file.truncate(end)
+            self._file.seek(end)
+            self._offsets = offsets.tolist()
+            self._timestamps = timestamps.tolist()
+        else:
+            output_dir = os.path.dirname(file_path)
+            if output_dir:
+                os.makedirs(output_dir, exist_ok=True)
+            self.config = config or {}
+            config_bytes = json.dumps(self.config, sort_keys=True).encode('utf-8')
+            self._file = open(file_path, 'wb')
+            self._file.write(_FILE_HEADER.pack(FILE_MAGIC, FORMAT_VERSION, len(config_bytes)))
+            self._file.write(config_bytes)
+            self._file.write(struct.pack('<I', zlib.crc32(config_bytes)))
+
+    def __len__(self):
+        return len(self._offsets)
+
+    def write_frame(self, payload, timestamp=None):
+        """
+        Appends one frame.
+
+        Args:
+            payload (bytes): The frame data.
+            timestamp (float, optional): Host time of the frame in seconds. Defaults to now.
+        """
+        timestamp = time.time() if timestamp is None else float(timestamp)
+        payload = bytes(payload)
+        self._offsets.append(self._file.tell())
+        self._timestamps.append(timestamp)
+        self._file.write(_FRAME_HEADER.pack(FRAME_MAGIC, len(payload), timestamp, _frame_crc(timestamp, payload)))
+        self._file.write(payload)
+        self._unflushed += 1
+        if self._unflushed >= self.flush_every:
+            self.flush()
+
+    def flush(self):
+        """
+        Hands buffered frames to the OS, so they survive a crash of this process.
+        """
+        self._file.flush()
+        self._unflushed = 0
+
+    def close(self):
+        """
+        Writes the index and footer, syncs the file to disk and closes it.
+        """
+        if self._file is None:
+            return
+        index_offset = self._file.tell()
+        index_bytes = np.asarray(self._offsets, dtype='<u8').tobytes() + np.asarray(self._timestamps, dtype='<f8').tobytes()
+        self._file.write(index_bytes)
+        self._file.write(_FOOTER.pack(index_offset, len(self._offsets), zlib.crc32(index_bytes), END_MAGIC))
+        # A finished recording must survive a power loss right after the capture
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        self._file.close()
+        self._file = None
+
+class FrameRecordingReader:
+    """
+    Random access to the frames of a framed binary recording.
+
+    The index at the end of the file gives the offset of every frame, so `read_frame(n)`
+    is one seek and one read. Files without a valid index (e.g. after a crash) are indexed
+    by scanning the frame records once when opened.
+    """
+    def __init__(self, file_path):
+        self.file_path = file_path
+        self._file = open(file_path, 'rb')
+        self.config, data_start = _read_file_header(self._file)
+        file_size = os.path.getsize(file_path)
+        index = _read_index(self._file, file_size, data_start)
+        self.recovered = index is None
+        if index is not None:
+            self.offsets, self.timestamps, _ = index
+        else:
+            self.offsets, self.timestamps, end = _scan_frames(self._file, data_start, file_size)
+            print(f"{file_path} has no valid index; recovered {len(self.offsets)} frames ({file_size - end} trailing bytes ignored).")
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def read_frame(self, n):
+        """
+        Returns (timestamp, payload) of frame `n`.
+        """
+        self._file.seek(int(self.offsets[n]))
+        magic, length, timestamp, crc = _FRAME_HEADER.unpack(self._file.read(_FRAME_HEADER.size))
+        payload = self._file.read(length)
+        if magic != FRAME_MAGIC or len(payload) != length or _frame_crc(timestamp, payload) != crc:
+            raise ValueError(f"frame {n} of {self.file_path} is corrupt")
+        return timestamp, payload
+
+    def iter_frames(self, start=0, stop=None):
+        """
+        Yields (timestamp, payload) for frames `start` up to (not including) `stop`.
+        """
+        for n in range(start, len(self) if stop is None else min(stop, len(self))):
+            yield self.read_frame(n)
+
+    def frame_at_time(self, timestamp):
+        """
+        Returns the number of the first frame received at or after `timestamp`.
+        """
+        return int(np.searchsorted(self.timestamps, timestamp, side='left'))
+
+    def close(self):
+        self._file.close()
+
+if __name__ == "__main__":
+    # Example usage: write frames, simulate a crash, recover and append, then jump to a frame
+    import tempfile
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "capture.rdr")
+        writer = FrameRecordingWriter(path, config={'port': 'COM6', 'baudrate': 115200, 'frame_bytes': 256})
+        for i in range(1000):
+            writer.write_frame(bytes([i % 256]) * 256, timestamp=i * 0.005)
+        writer.flush()
+        # Crash: no index is written and the last frame is cut in half
+        with open(path, 'r+b') as f:
+            f.truncate(os.path.getsize(path) - 100)
+
+        writer = FrameRecordingWriter(path, append=True)
+        for i in range(999, 1200):
+            writer.write_frame(bytes([i % 256]) * 256, timestamp=i * 0.005)
+        writer.close()
+
+        reader = FrameRecordingReader(path)
+        timestamp, payload = reader.read_frame(1100)
+        print(f"{len(reader)} frames, config {reader.config}")
+        print(f"Frame 1100: t={timestamp:.3f} s, first byte {payload[0]}; frame at t=2.0 s: {reader.frame_at_time(2.0)}")
+        reader.close()
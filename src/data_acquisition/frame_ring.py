@@ -0,0 +1,270 @@
+import time
+from multiprocessing import shared_memory
+import numpy as np
+from src.config import constants
+from src.data_acquisition.data_parser import attach_shared_memory
+
+# Layout of the shared segment:
+#   header:         int64 fields, see the _H_* indexes
+#   slot sequences: int64 per slot, the sequence number of the frame in the slot (-1 while it is written)
+#   timestamps:     float64 per slot
+#   frames:         capacity x frame_width values of the ring's dtype
+RING_MAGIC = 0x52494E4731 # 'RING1'
+_H_MAGIC, _H_CAPACITY, _H_WIDTH, _H_DTYPE, _H_WRITE_SEQ, _H_CLOSED = range(6)
+_HEADER_FIELDS = 8
+
+def _layout(capacity, frame_width, dtype):
+    header_bytes = _HEADER_FIELDS * 8
+    sequences_offset = header_bytes
+    timestamps_offset = sequences_offset + capacity * 8
+    frames_offset = timestamps_offset + capacity * 8
+    total = frames_offset + capacity * frame_width * np.dtype(dtype).itemsize
+    return sequences_offset, timestamps_offset, frames_offset, total
+
+class _RingViews:
+    """
+    NumPy views of the ring arrays in a shared memory segment.
+    """
+    def __init__(self, segment, capacity, frame_width, dtype):
+        sequences_offset, timestamps_offset, frames_offset, _ = _layout(capacity, frame_width, dtype)
+        self.header = np.ndarray((_HEADER_FIELDS,), dtype=np.int64, buffer=segment.buf)
+        self.sequences = np.ndarray((capacity,), dtype=np.int64, buffer=segment.buf, offset=sequences_offset)
+        self.timestamps = np.ndarray((capacity,), dtype=np.float64, buffer=segment.buf, offset=timestamps_offset)
+        self.frames = np.ndarray((capacity, frame_width), dtype=dtype, buffer=segment.buf, offset=frames_offset)
+
+class SharedFrameRing:
+    """
+    Producer side of a single-producer, multi-consumer ring buffer of fixed-size frames in shared memory.
+
+    The acquisition process writes frames and timestamps into preallocated slots; any number
+    of processes attach with FrameRingReader and read the frames in place, without pickling
+    or copying. There are no locks: frame n goes to slot n % capacity, the slot records n
+    once the frame is complete, and the published write sequence is advanced last. Readers
+    compare these numbers to detect frames they missed because the producer lapped them.
+    The producer never waits for readers, so a slow reader loses frames instead of stalling
+    acquisition.
+
+    Publication relies on the stores becoming visible in program order, which holds on
+    x86-64; on weakly ordered CPUs a reader can in rare cases see a torn frame, which the
+    slot sequence check catches but not in every case.
+
+    Args:
+        capacity (int): Number of frame slots.
+        frame_width (int): Values per frame.
+        dtype (str or np.dtype): Value type of the frames.
+        name (str, optional): Name of the shared memory segment. Chosen by the OS if None.
+    """
+    def __init__(self, capacity=constants.RING_CAPACITY_FRAMES, frame_width=128, dtype='float32', name=None):
+        self.capacity = int(capacity)
+        self.frame_width = int(frame_width)
+        self.dtype = np.dtype(dtype)
+        *_, total = _layout(self.capacity, self.frame_width, self.dtype)
+        self._segment = shared_memory.SharedMemory(name=name, create=True, size=total)
+        self.name = self._segment.name
+        self._views = _RingViews(self._segment, self.capacity, self.frame_width, self.dtype)
+        self._views.sequences[:] = -1
+        header = self._views.header
+        header[:] = 0
+        header[_H_CAPACITY] = self.capacity
+        header[_H_WIDTH] = self.frame_width
+        header[_H_DTYPE] = ord(self.dtype.char)
+        header[_H_MAGIC] = RING_MAGIC
+
+    @property
+    def write_seq(self):
+        """
+        Number of frames written so far (the sequence number of the next frame).
+        """
+        return int(self._views.header[_H_WRITE_SEQ])
+
+    def write(self, frame, timestamp):
+        """
+        Appends one frame.
+        """
+        self.write_many(np.asarray(frame).reshape(1, -1), [timestamp])
+
+    def write_many(self, frames, timestamps):
+        """
+        Appends a block of frames, with one slice assignment per contiguous run of slots.
+
+        Args:
+            frames (np.array): Frames of shape (num_frames, frame_width).
+            timestamps (array-like): Time of each frame in seconds.
+        """
+        frames = np.asarray(frames).reshape(-1, self.frame_width)
+        timestamps = np.asarray(timestamps, dtype=np.float64)
+        # Only the newest frames would survive anyway; the older ones keep their sequence numbers and count as lost
+        skipped = max(0, len(frames) - self.capacity)
+        frames, timestamps = frames[skipped:], timestamps[skipped:]
+        views = self._views
+        first_seq = self.write_seq + skipped
+        done = 0
+        while done < len(frames):
+            slot = (first_seq + done) % self.capacity
+            count = min(len(frames) - done, self.capacity - slot)
+            slots = slice(slot, slot + count)
+            views.sequences[slots] = -1
+            views.frames[slots] = frames[done:done + count]
+            views.timestamps[slots] = timestamps[done:done + count]
+            views.sequences[slots] = np.arange(first_seq + done, first_seq + done + count)
+            done += count
+        views.header[_H_WRITE_SEQ] = first_seq + len(frames)
+
+    def close(self):
+        """
+        Marks the ring as finished, so readers stop once they have read the last frame, and releases it.
+        """
+        if self._segment is None:
+            return
+        self._views.header[_H_CLOSED] = 1
+        self._views = None
+        self._segment.close()
+        self._segment.unlink()
+        self._segment = None
+
+class FrameRingReader:
+    """
+    Consumer side of a SharedFrameRing, attached by name from any process.
+
+    Each reader keeps its own position, so readers do not affect each other or the producer.
+    `poll` returns views into the shared segment: they are valid until the producer laps
+    them, which the caller checks with `still_valid` after using them (or copies the frames
+    it needs to keep).
+
+    Args:
+        name (str): Name of the ring's shared memory segment.
+        start (str): 'oldest' to start with the oldest frame still in the ring, 'latest' to
+                     start with the next frame written.
+        shares_tracker (bool): True in child processes of the ring's producer, see attach_shared_memory.
+    """
+    def __init__(self, name, start='oldest', shares_tracker=False):
+        self._segment = attach_shared_memory(name, shares_tracker)
+        header = np.ndarray((_HEADER_FIELDS,), dtype=np.int64, buffer=self._segment.buf)
+        if header[_H_MAGIC] != RING_MAGIC:
+            self._segment.close()
+            raise ValueError(f"shared memory segment {name} is not a frame ring")
+        self.capacity = int(header[_H_CAPACITY])
+        self.frame_width = int(header[_H_WIDTH])
+        self.dtype = np.dtype(chr(int(header[_H_DTYPE])))
+        self._views = _RingViews(self._segment, self.capacity, self.frame_width, self.dtype)
+        write_seq = int(header[_H_WRITE_SEQ])
+        self.next_seq = max(0, write_seq - self.capacity) if start == 'oldest' else write_seq
+        self.frames_read = 0
+        self.frames_lost = 0
+
+    @property
+    def closed(self):
+        """
+        True once the producer has closed the ring and every frame has been read.
+        """
+        header = self._views.header
+        return bool(header[_H_CLOSED]) and self.next_seq >= int(header[_H_WRITE_SEQ])
+
+    @property
+    def backlog(self):
+        """
+        Frames written but not read yet (at most the ring capacity; older ones are lost).
+        """
+        return min(int(self._views.header[_H_WRITE_SEQ]) - self.next_seq, self.capacity)
+
+    def poll(self, max_frames=None):
+        """
+        Returns the next frames written since the last call, without copying them.
+
+        At most one contiguous run of slots is returned, so a call may return fewer frames than
+        are available; call again to get the rest.
+
+        Args:
+            max_frames (int, optional): Maximum number of frames to return.
+
+        Returns:
+            tuple: (first_seq, timestamps, frames) views, or None if there is no new frame.
+        """
+        views = self._views
+        while True:
+            write_seq = int(views.header[_H_WRITE_SEQ])
+            oldest = write_seq - self.capacity
+            if self.next_seq < oldest:
+                # The producer lapped this reader
+                self.frames_lost += oldest - self.next_seq
+                self.next_seq = oldest
+            if self.next_seq >= write_seq:
+                return None
+            slot = self.next_seq % self.capacity
+            count = min(write_seq - self.next_seq, self.capacity - slot)
+            if max_frames is not None:
+                count = min(count, max_frames)
+            first_seq = self.next_seq
+            if views.sequences[slot] == first_seq and views.sequences[slot + count - 1] == first_seq + count - 1:
+                break
+            # The oldest slot was overwritten between reading the write sequence and the slots; skip ahead
+            self.frames_lost += 1
+            self.next_seq += 1
+        self.next_seq += count
+        self.frames_read += count
+        return first_seq, views.timestamps[slot:slot + count], views.frames[slot:slot + count]
+
+    def still_valid(self, first_seq):
+        """
+        Returns True if the frames returned by `poll` from `first_seq` on have not been overwritten.
+
+        The producer overwrites the oldest slots first, so checking the first frame of a block is enough.
+        """
+        return self._views.sequences[first_seq % self.capacity] == first_seq
+
+    def iter_blocks(self, max_frames=None, poll_interval_s=constants.RING_POLL_INTERVAL_S, idle_timeout_s=None):
+        """
+        Yields the blocks returned by `poll` until the ring is closed.
+
+        Args:
+            max_frames (int, optional): Maximum number of frames per block.
+            poll_interval_s (float): Time to wait when no new frame is available.
+            idle_timeout_s (float, optional): Stop after this many seconds without a new frame.
+
+        Yields:
+            tuple: (first_seq, timestamps, frames) views.
+        """
+        last_data_time = time.monotonic()
+        while True:
+            block = self.poll(max_frames)
+            if block is not None:
+                last_data_time = time.monotonic()
+                yield block
+                continue
+            if self.closed:
+                return
+            if idle_timeout_s is not None and time.monotonic() - last_data_time > idle_timeout_s:
+                return
+            time.sleep(poll_interval_s)
+
+    def close(self):
+        self._views = None
+        self._segment.close()
+
+def _demo_consumer(name, delay_s):
+    # Consumer process of the example below; at module level so it can be started with spawn
+    reader = FrameRingReader(name, shares_tracker=True)
+    checksum = 0.0
+    for first_seq, timestamps, frames in reader.iter_blocks(max_frames=64):
+        time.sleep(delay_s)
+        value = float(frames[:, 0].sum())
+        if reader.still_valid(first_seq):
+            checksum += value
+    reader.close()
+    return reader.frames_read, reader.frames_lost, checksum
+
+if __name__ == "__main__":
+    # Example usage: a producer writing 200 frames/s and two consumer processes reading them in place
+    from concurrent.futures import ProcessPoolExecutor
+
+    ring = SharedFrameRing(capacity=256, frame_width=128)
+    with ProcessPoolExecutor(max_workers=2) as pool:
+        futures = [pool.submit(_demo_consumer, ring.name, delay) for delay in (0.0, 0.5)]
+        time.sleep(0.5)
+        for i in range(1000):
+            ring.write(np.full(128, i, dtype=np.float32), timestamp=i * 0.005)
+            time.sleep(0.005)
+        time.sleep(1.0)
+        ring.close()
+        for (frames_read, frames_lost, checksum), delay in zip((future.result() for future in futures), (0.0, 0.5)):
+            print(f"Consumer with {delay} s per block: {frames_read} frames read, {frames_lost} lost to overruns.")
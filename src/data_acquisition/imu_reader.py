@@ -1,7 +1,31 @@
 import pandas as pd
 import os
+import time
+from src.data_acquisition.data_follower import DataFileFollower
+from src.data_acquisition.time_index import read_data_window
 
-def read_imu_csv(file_path):
+def normalize_imu_columns(columns):
+    """
+    Converts DeepCraft IMU column names to the names used by the pipeline.
+
+    Strips a leading '#', renames 'Time (seconds)' to 'timestamp' and lowercases everything,
+    e.g. '# Time (seconds),Accel_X' becomes 'timestamp,accel_x'.
+
+    Args:
+        columns (list): Column names as found in the file header.
+
+    Returns:
+        list: The normalized column names.
+    """
+    normalized = []
+    for name in columns:
+        name = name.lstrip('# ').strip()
+        if name == 'Time (seconds)':
+            name = 'timestamp'
+        normalized.append(name.lower())
+    return normalized
+
+def read_imu_csv(file_path, time_window=None):
     """
     Reads IMU data from a specified CSV file.
 
@@ -9,6 +33,8 @@ def read_imu_csv(file_path):
         file_path (str): The absolute path to the IMU data CSV file.
                          Assumes columns like 'timestamp', 'accel_x', 'accel_y', 'accel_z',
                          'gyro_x', 'gyro_y', 'gyro_z', 'mag_x', 'mag_y', 'mag_z'.
+        time_window (tuple, optional): (t0, t1) in seconds. If given, only these rows are read,
+                                       using the file's time index (see read_data_window).
 
     Returns:
         pd.DataFrame: A DataFrame containing the IMU data, or None if the file is not found or an error occurs.
@@ -21,17 +47,15 @@ def read_imu_csv(file_path):
         with open(file_path, 'r') as f:
             header_line = f.readline().strip()
         
-        # Read the CSV data, using the first line as header
-        df_imu = pd.read_csv(file_path, header=0)
-        # Remove '#' from column names if present
-        df_imu.columns = df_imu.columns.str.lstrip('# ').str.strip()
-        
-        # Rename 'Time (seconds)' column to 'timestamp' for consistency
-        if 'Time (seconds)' in df_imu.columns:
-            df_imu.rename(columns={'Time (seconds)': 'timestamp'}, inplace=True)
-        
-        # Convert all column names to lowercase
-        df_imu.columns = df_imu.columns.str.lower()
+        if time_window is not None:
+            column_names, time_s, values, _ = read_data_window(file_path, *time_window)
+            df_imu = pd.DataFrame(values.astype(float), columns=normalize_imu_columns(column_names[1:]))
+            df_imu.insert(0, 'timestamp', time_s)
+        else:
+            # Read the CSV data, using the first line as header
+            df_imu = pd.read_csv(file_path, header=0)
+            # Remove '#', rename 'Time (seconds)' to 'timestamp' and lowercase the column names
+            df_imu.columns = normalize_imu_columns(df_imu.columns)
         print(f"Successfully loaded IMU data from {file_path}.")
         print(f"IMU DataFrame shape: {df_imu.shape}")
         return df_imu
@@ -41,12 +65,13 @@ def read_imu_csv(file_path):
 
 
 
-def read_imu_data(file_path):
+def read_imu_data(file_path, time_window=None):
     """
     Reads IMU data from a specified file, dispatching based on file extension.
 
     Args:
         file_path (str): The absolute path to the IMU data file (e.g., .csv or .data).
+        time_window (tuple, optional): (t0, t1) in seconds; if given, only these rows are read.
 
     Returns:
         pd.DataFrame: A DataFrame containing the IMU data, or None if the file is not found or an error occurs.
@@ -58,23 +83,50 @@ def read_imu_data(file_path):
     file_extension = os.path.splitext(file_path)[1].lower()
 
     if file_extension == '.csv' or file_extension == '.data':
-        return read_imu_csv(file_path)
+        return read_imu_csv(file_path, time_window)
     else:
         print(f"Error: Unsupported IMU data file format: {file_extension}")
         return None
 
-def read_and_merge_imu_data(imu_file_path, mag_file_path):
+def follow_imu_data(file_path, poll_interval_s=0.2, idle_timeout_s=None):
+    """
+    Follows an IMU .data file that is still being recorded, yielding the rows appended to it.
+
+    Only newly appended bytes are read and parsed on each poll; see DataFileFollower.
+
+    Args:
+        file_path (str): Path to the IMU data file.
+        poll_interval_s (float): Time to wait between polls when no new data has arrived.
+        idle_timeout_s (float, optional): Stop after this many seconds without new data. If None, follows forever.
+
+    Yields:
+        pd.DataFrame: The new rows, with the same column names as `read_imu_csv`.
+    """
+    follower = DataFileFollower(file_path)
+    last_data_time = time.monotonic()
+    while True:
+        rows = follower.poll()
+        if len(rows):
+            last_data_time = time.monotonic()
+            yield pd.DataFrame(rows, columns=normalize_imu_columns(follower.columns))
+            continue
+        if idle_timeout_s is not None and time.monotonic() - last_data_time > idle_timeout_s:
+            return
+        time.sleep(poll_interval_s)
+
+def read_and_merge_imu_data(imu_file_path, mag_file_path, time_window=None):
     """
     Reads and merges IMU (accel/gyro) and magnetometer data.
 
     Args:
         imu_file_path (str): Path to the IMU data file.
         mag_file_path (str): Path to the magnetometer data file.
+        time_window (tuple, optional): (t0, t1) in seconds; if given, only these rows are read.
 
     Returns:
         pd.DataFrame: A merged DataFrame with IMU and magnetometer data, or None if reading fails.
     """
-    df_imu = read_imu_data(imu_file_path)
+    df_imu = read_imu_data(imu_file_path, time_window)
     if df_imu is None:
         return None
 
@@ -82,7 +134,7 @@ def read_and_merge_imu_data(imu_file_path, mag_file_path):
         print("Magnetometer file not provided or not found. Proceeding without magnetometer data.")
         return df_imu
 
-    df_mag = read_imu_data(mag_file_path)
+    df_mag = read_imu_data(mag_file_path, time_window)
     if df_mag is None:
         return df_imu
 
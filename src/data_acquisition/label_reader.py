@@ -0,0 +1,46 @@
+import os
+import pandas as pd
+
+def read_labels(file_path):
+    """
+    Reads a DeepCraft Studio label track (e.g. Live-Labeling.label).
+
+    The file is a CSV with the columns Time(Seconds), Length(Seconds), Label(string),
+    Confidence(double) and Comment(string); each row labels the interval [time, time + length).
+
+    Args:
+        file_path (str): Path to the .label file.
+
+    Returns:
+        pd.DataFrame: Columns 'start', 'end', 'label', 'confidence' and 'comment', one row per
+                      labeled interval, sorted by start (empty if the track has no labels),
+                      or None if the file cannot be read.
+    """
+    if not os.path.exists(file_path):
+        print(f"Error: Label file not found at {file_path}")
+        return None
+    try:
+        df = pd.read_csv(file_path, dtype={'Label(string)': str, 'Comment(string)': str}, keep_default_na=False)
+        labels = pd.DataFrame({
+            'start': pd.to_numeric(df['Time(Seconds)'], errors='coerce'),
+            'end': pd.to_numeric(df['Time(Seconds)'], errors='coerce') + pd.to_numeric(df['Length(Seconds)'], errors='coerce'),
+            'label': df['Label(string)'].astype(str).str.strip(),
+            'confidence': pd.to_numeric(df['Confidence(double)'], errors='coerce'),
+            'comment': df['Comment(string)'].astype(str),
+        })
+        return labels.dropna(subset=['start', 'end']).sort_values('start', kind='stable').reset_index(drop=True)
+    except Exception as e:
+        print(f"Error reading labels from {file_path}: {e}")
+        return None
+
+if __name__ == "__main__":
+    # Example usage: list the labels of the sessions in the test project
+    import glob
+    from src.config import constants
+
+    for label_file_path in sorted(glob.glob(os.path.join(constants.PROJECT_ROOT, "Deep Craft", "Test", "*", "*.label"))):
+        labels = read_labels(label_file_path)
+        print(f"{os.path.basename(os.path.dirname(label_file_path))}: {0 if labels is None else len(labels)} labels")
+        if labels is not None:
+            for row in labels.itertuples():
+                print(f"  {row.label}: {row.start:.2f}-{row.end:.2f} s (confidence {row.confidence:g})")
@@ -1,27 +1,52 @@
 import serial
 import time
 import os
+import numpy as np
+from src.data_acquisition.frame_recording import FrameRecordingWriter
+from src.monitoring.runtime_metrics import FRAMES_DROPPED, FRAMES_RECEIVED, SERIAL_BYTES
 
-def collect_radar_data(port='COM6', baudrate=115200, output_file=None, duration=None):
+def collect_radar_data(port='COM6', baudrate=115200, output_file=None, duration=None, framed=False, frame_bytes=None, append=False, ring=None,
+                       echo=True):
     """
     Connects to a specified serial port, reads incoming data, and prints it to the console.
-    Optionally saves the raw data to a file.
+    Optionally saves the collected data to a file.
+
+    By default the file holds the raw byte stream as it arrives. With `framed=True` it is a
+    framed binary recording instead (see FrameRecordingWriter): every frame is stored with its
+    host receive time and a CRC, and the file ends with a seek index. Either file is synced to
+    disk when the collection stops.
 
     Args:
         port (str): The serial port to connect to (e.g., 'COM6', '/dev/ttyUSB0').
         baudrate (int): The baud rate for serial communication.
-        output_file (str, optional): Path to a file to save the raw collected data.
+        output_file (str, optional): Path to a file to save the collected data.
         duration (int, optional): Duration in seconds to collect data. If None, collects indefinitely.
+        framed (bool): If True, write a framed recording; if False, write the raw byte stream as it arrives.
+        frame_bytes (int, optional): Size of one sensor frame. The stream is cut into frames of this size;
+                                     if None, every serial read is stored as one frame.
+        append (bool): If True, continue an existing framed recording (recovering it if it was not closed).
+        ring (SharedFrameRing, optional): Ring buffer to publish each frame to, for processing and viewer
+                                          processes. Requires `frame_bytes` to match the ring's frame size.
+        echo (bool): If True, print every read as hex and ASCII. Turn it off at high data rates and
+                     follow the runtime metrics (bytes and frames received) instead.
     """
     ser = None
     f = None # Initialize f to None
+    recording = None
+    pending = b''
+    if ring is not None and frame_bytes != ring.frame_width * ring.dtype.itemsize:
+        print(f"Error: frames of {frame_bytes} bytes do not fit the ring's frames of {ring.frame_width * ring.dtype.itemsize} bytes.")
+        return
     try:
         print(f"Attempting to open serial port {port} at {baudrate} baud...")
         ser = serial.Serial(port, baudrate, timeout=1) # 1-second timeout
-        ser = serial.Serial('COM6', baudrate=115200, timeout=1) # 1-second timeout
         print(f"Successfully opened serial port {port}.")
 
-        if output_file:
+        if output_file and framed:
+            config = {'port': port, 'baudrate': baudrate, 'frame_bytes': frame_bytes, 'started': time.time()}
+            recording = FrameRecordingWriter(output_file, config=config, append=append)
+            print(f"Saving framed recording to {output_file} ({len(recording)} frames already in it)")
+        elif output_file:
             output_dir = os.path.dirname(output_file)
             if output_dir and not os.path.exists(output_dir):
                 os.makedirs(output_dir)
@@ -30,6 +55,8 @@ def collect_radar_data(port='COM6', baudrate=115200, output_file=None, duration=
         else:
             f = None
 
+        bytes_metric = SERIAL_BYTES.labels(port=port)
+        frames_metric = FRAMES_RECEIVED.labels(stream='radar')
         start_time = time.time()
         while True:
             if duration and (time.time() - start_time > duration):
@@ -39,14 +66,30 @@ def collect_radar_data(port='COM6', baudrate=115200, output_file=None, duration=
             if ser.in_waiting > 0:
                 # Read all available bytes
                 data = ser.read(ser.in_waiting)
-                
-                # Print raw bytes (hex representation) and also try to decode as ASCII for readability
-                print(f"Received ({len(data)} bytes): {data.hex()} | ASCII: {data.decode('ascii', errors='ignore')}")
+                bytes_metric.inc(len(data))
+
+                if echo:
+                    # Print raw bytes (hex representation) and also try to decode as ASCII for readability
+                    print(f"Received ({len(data)} bytes): {data.hex()} | ASCII: {data.decode('ascii', errors='ignore')}")
                 
                 if f:
                     f.write(data)
+                receive_time = time.time()
+                if frame_bytes and (recording is not None or ring is not None):
+                    pending += data
+                    while len(pending) >= frame_bytes:
+                        frames_metric.inc()
+                        if recording is not None:
+                            recording.write_frame(pending[:frame_bytes], timestamp=receive_time)
+                        if ring is not None:
+                            ring.write(np.frombuffer(pending[:frame_bytes], dtype=ring.dtype), receive_time)
+                        pending = pending[frame_bytes:]
+                elif recording is not None:
+                    frames_metric.inc()
+                    recording.write_frame(data, timestamp=receive_time)
             else:
-                print("Waiting for data...", end='\r') # Indicate waiting without new line
+                if echo:
+                    print("Waiting for data...", end='\r') # Indicate waiting without new line
                 time.sleep(0.01) # Small delay to prevent busy-waiting
 
     except serial.SerialException as e:
@@ -58,12 +101,22 @@ def collect_radar_data(port='COM6', baudrate=115200, output_file=None, duration=
             ser.close()
             print(f"Serial port {port} closed.")
         if f:
+            f.flush()
+            os.fsync(f.fileno())
             f.close()
+        if recording is not None:
+            if pending:
+                print(f"Dropping {len(pending)} bytes of an incomplete frame.")
+                FRAMES_DROPPED.labels(stream='radar', reason='incomplete').inc()
+            recording.close()
+            print(f"Framed recording closed with {len(recording)} frames.")
 
 if __name__ == "__main__":
     # Example usage:
     # To collect data for 10 seconds and save to a file:
     # collect_radar_data(port='COM6', baudrate=115200, output_file='raw_radar_data.bin', duration=10)
+    # To save a framed recording of 256-byte frames instead:
+    # collect_radar_data(port='COM6', baudrate=115200, output_file='radar_capture.rdr', duration=10, framed=True, frame_bytes=256)
     
     # To collect data indefinitely and print to console:
     collect_radar_data(port='COM6', baudrate=115200)
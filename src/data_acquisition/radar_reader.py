@@ -1,13 +1,23 @@
 import pandas as pd
 import os
+import time
+from src.data_acquisition.data_follower import DataFileFollower
+from src.data_acquisition.data_parser import parse_data_file, read_data_header
+from src.data_acquisition.time_index import read_data_window
 
-def read_radar_data(file_path):
+def read_radar_data(file_path, time_window=None):
     """
     Reads radar data from a specified .data file.
 
+    Uses the parallel .data parser (see `parse_data_file`): the time column is read as float64
+    and the sample columns as float32.
+
     Args:
         file_path (str): The absolute path to the radar data .data file.
                          Assumes a header line starting with '#' and comma-separated values.
+        time_window (tuple, optional): (t0, t1) in seconds. If given, only these frames are read,
+                                       using the file's time index, and the row number of the first
+                                       frame within the file is stored in `df.attrs['first_row']`.
 
     Returns:
         pd.DataFrame: A DataFrame containing the radar data, or None if the file is not found or an error occurs.
@@ -17,14 +27,14 @@ def read_radar_data(file_path):
         return None
 
     try:
-        with open(file_path, 'r') as f:
-            header_line = f.readline().strip()
-        
-        # Remove '#' and split by comma to get column names
-        column_names = [name.strip() for name in header_line.lstrip('# ').split(',')]
-
-        # Read the CSV data, skipping the header line and assigning column names
-        df_radar = pd.read_csv(file_path, skiprows=1, header=None, names=column_names)
+        first_row = 0
+        if time_window is not None:
+            column_names, time_s, samples, first_row = read_data_window(file_path, *time_window)
+        else:
+            column_names, time_s, samples = parse_data_file(file_path)
+        df_radar = pd.DataFrame(samples, columns=column_names[1:], copy=False)
+        df_radar.insert(0, column_names[0], time_s)
+        df_radar.attrs['first_row'] = first_row
         
         print(f"Successfully loaded radar data from {file_path}.")
         print(f"Radar DataFrame shape: {df_radar.shape}")
@@ -33,6 +43,50 @@ def read_radar_data(file_path):
         print(f"Error reading radar data from {file_path}: {e}")
         return None
 
+def read_radar_data_chunks(file_path, chunk_frames, dtype='float32'):
+    """
+    Reads a radar .data file in chunks of frames, so memory use does not depend on the file size.
+
+    Args:
+        file_path (str): The absolute path to the radar data .data file.
+        chunk_frames (int): Number of frames (rows) per chunk.
+        dtype (str): Dtype of the sample columns. The time column is always read as float64.
+
+    Yields:
+        pd.DataFrame: Consecutive chunks of rows, with the same column names as `read_radar_data`.
+    """
+    column_names = read_data_header(file_path)
+    dtypes = {name: ('float64' if name == 'Time (seconds)' else dtype) for name in column_names}
+    for chunk in pd.read_csv(file_path, skiprows=1, header=None, names=column_names, dtype=dtypes, chunksize=chunk_frames):
+        yield chunk
+
+def follow_radar_data(file_path, poll_interval_s=0.2, idle_timeout_s=None):
+    """
+    Follows a radar .data file that is still being recorded, yielding the rows appended to it.
+
+    Only newly appended bytes are read and parsed on each poll, and a partly written last
+    line is held back until it is complete; see DataFileFollower.
+
+    Args:
+        file_path (str): Path to the radar .data file.
+        poll_interval_s (float): Time to wait between polls when no new data has arrived.
+        idle_timeout_s (float, optional): Stop after this many seconds without new data. If None, follows forever.
+
+    Yields:
+        pd.DataFrame: The new rows, with the same column names as `read_radar_data`.
+    """
+    follower = DataFileFollower(file_path)
+    last_data_time = time.monotonic()
+    while True:
+        rows = follower.poll()
+        if len(rows):
+            last_data_time = time.monotonic()
+            yield pd.DataFrame(rows, columns=follower.columns)
+            continue
+        if idle_timeout_s is not None and time.monotonic() - last_data_time > idle_timeout_s:
+            return
+        time.sleep(poll_interval_s)
+
 if __name__ == "__main__":
     # Example usage: Create a dummy radar data file for demonstration
     dummy_radar_data = {
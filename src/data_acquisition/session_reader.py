@@ -0,0 +1,71 @@
+import os
+import glob
+import numpy as np
+import xml.etree.ElementTree as ET
+
+def read_imsession(session_file_path):
+    """
+    Reads the track list of a DeepCraft Studio `.imsession` file.
+
+    Args:
+        session_file_path (str): Path to the .imsession file.
+
+    Returns:
+        list: One dict per track with the keys 'name', 'type', 'payload_file', 'frequency'
+              (Hz, or None if not recorded), 'offset_s' and 'shape' (tuple of axis sizes),
+              or None if the file cannot be read.
+    """
+    try:
+        root = ET.parse(session_file_path).getroot()
+    except (OSError, ET.ParseError) as e:
+        print(f"Error reading session file {session_file_path}: {e}")
+        return None
+
+    tracks = []
+    for track in root.iter('Track'):
+        offset = track.find('Offset')
+        frequency = track.get('frequency')
+        tracks.append({
+            'name': track.get('name'),
+            'type': track.get('type'),
+            'payload_file': track.findtext('PayloadFile'),
+            'frequency': float(frequency) if frequency else None,
+            'offset_s': float(offset.text) if offset is not None else 0.0,
+            'shape': tuple(int(axis.get('size')) for axis in track.findall('Shape/Axis')),
+        })
+    return tracks
+
+def find_track_for_file(data_file_path):
+    """
+    Looks up the track describing a data file in the `.imsession` file next to it.
+
+    Args:
+        data_file_path (str): Path to a payload file, e.g. .../Session/Radar-Data.data.
+
+    Returns:
+        dict: The track as returned by `read_imsession`, or None if no session file describes it.
+    """
+    session_dir = os.path.dirname(os.path.abspath(data_file_path))
+    payload_name = os.path.basename(data_file_path)
+    for session_file_path in sorted(glob.glob(os.path.join(session_dir, "*.imsession"))):
+        for track in read_imsession(session_file_path) or []:
+            if track['payload_file'] == payload_name:
+                return track
+    return None
+
+def frame_width(track):
+    """
+    Returns the number of values per frame of a track (the product of its shape), or None if it has no shape.
+    """
+    if not track or not track['shape']:
+        return None
+    return int(np.prod(track['shape']))
+
+if __name__ == "__main__":
+    # Example usage: list the tracks of the sessions in the test project
+    from src.config import constants
+
+    for session_file_path in sorted(glob.glob(os.path.join(constants.PROJECT_ROOT, "Deep Craft", "Test", "*", "*.imsession"))):
+        print(os.path.basename(session_file_path))
+        for track in read_imsession(session_file_path) or []:
+            print(f"  {track['name']}: {track['payload_file']}, shape {track['shape']}, {frame_width(track)} values per frame")
@@ -0,0 +1,197 @@
+import os
+import zlib
+import numpy as np
+from src.config import constants
+from src.data_acquisition.data_parser import BLANK_LINE_BYTES, read_data_header, parse_data_bytes
+
+INDEX_SUFFIX = ".tidx.npz"
+_SCAN_BUFFER_BYTES = 16 * 2**20
+_CHECK_BYTES = 65536
+
+def _block_crc(file_path, start):
+    # CRC of the _CHECK_BYTES bytes from `start` on
+    with open(file_path, 'rb') as f:
+        f.seek(max(0, start))
+        return zlib.crc32(f.read(_CHECK_BYTES))
+
+class TimeIndex:
+    """
+    Maps timestamps to byte offsets in a .data file, so a time window can be read without parsing the rest.
+
+    Every `stride`-th row is indexed with its row number, timestamp and byte offset. Finding a
+    window is a binary search, after which at most `stride` rows outside the window are read.
+    The index is stored next to the data file as `<file>.tidx.npz`. Since DeepCraft only appends
+    to .data files, an index built while recording is extended rather than rebuilt when the file grows.
+    The saved index is checked against the first and the last indexed bytes of the file, and
+    against its modification time while its size is unchanged.
+    """
+    def __init__(self, file_path, rows, times, offsets, num_rows, data_end, stride):
+        self.file_path = file_path
+        self.rows = rows
+        self.times = times
+        self.offsets = offsets
+        self.num_rows = num_rows
+        self.data_end = data_end
+        self.stride = stride
+
+    def byte_range(self, t0, t1):
+        """
+        Returns the bytes that hold all rows with t0 <= time <= t1.
+
+        Returns:
+            tuple: (start offset, end offset, row number of the row at the start offset).
+        """
+        if len(self.times) == 0:
+            return self.data_end, self.data_end, self.num_rows
+        first = max(0, int(np.searchsorted(self.times, t0, side='right')) - 1)
+        last = int(np.searchsorted(self.times, t1, side='right'))
+        end = int(self.offsets[last]) if last < len(self.offsets) else self.data_end
+        return int(self.offsets[first]), end, int(self.rows[first])
+
+    def save(self):
+        stat = os.stat(self.file_path)
+        np.savez(self.file_path + INDEX_SUFFIX, rows=self.rows, times=self.times, offsets=self.offsets,
+                 num_rows=self.num_rows, data_end=self.data_end, stride=self.stride,
+                 file_size=stat.st_size, file_mtime_ns=stat.st_mtime_ns, head_crc=_block_crc(self.file_path, 0),
+                 tail_crc=_block_crc(self.file_path, self.data_end - _CHECK_BYTES))
+
+    def matches(self, saved):
+        """
+        Returns True if the saved index still describes the file, which may only have grown since.
+        """
+        stat = os.stat(self.file_path)
+        if int(saved['file_size']) > stat.st_size:
+            return False
+        if int(saved['file_size']) == stat.st_size and int(saved['file_mtime_ns']) != stat.st_mtime_ns:
+            return False
+        return (int(saved['head_crc']) == _block_crc(self.file_path, 0)
+                and int(saved['tail_crc']) == _block_crc(self.file_path, self.data_end - _CHECK_BYTES))
+
+def _scan_rows(file_path, start_offset, start_row, stride):
+    """
+    Indexes every `stride`-th complete row from `start_offset` on, counting rows from `start_row`.
+
+    Blank lines are skipped and not counted, the same as by the parser.
+
+    Returns:
+        tuple: (rows, times, offsets, number of rows, offset after the last complete line).
+    """
+    rows, times, offsets = [], [], []
+    row = start_row
+    position = start_offset
+    with open(file_path, 'rb') as f:
+        f.seek(start_offset)
+        carry = b''
+        while True:
+            chunk = f.read(_SCAN_BUFFER_BYTES)
+            if not chunk:
+                break
+            buffer = carry + chunk
+            buffer_bytes = np.frombuffer(buffer, dtype=np.uint8)
+            newlines = np.flatnonzero(buffer_bytes == ord('\n'))
+            if len(newlines) == 0:
+                carry = buffer
+                continue
+            line_starts = np.concatenate(([0], newlines[:-1] + 1))
+            # A line is blank if all its bytes are blank bytes
+            blank_bytes = np.concatenate(([0], np.cumsum(np.isin(buffer_bytes, np.frombuffer(BLANK_LINE_BYTES, dtype=np.uint8)))))
+            data_lines = np.flatnonzero(blank_bytes[newlines] - blank_bytes[line_starts] < newlines - line_starts)
+            row_numbers = row + np.arange(len(data_lines))
+            for i in np.flatnonzero(row_numbers % stride == 0):
+                start = int(line_starts[data_lines[i]])
+                times.append(float(buffer[start:buffer.find(b',', start)]))
+                offsets.append(position + start)
+                rows.append(row + int(i))
+            row += len(data_lines)
+            consumed = int(newlines[-1]) + 1
+            position += consumed
+            carry = buffer[consumed:]
+    return rows, times, offsets, row, position
+
+def build_time_index(file_path, stride=constants.TIME_INDEX_STRIDE):
+    """
+    Builds the time index of a .data file and saves it next to the file.
+    """
+    with open(file_path, 'rb') as f:
+        data_start = len(f.readline())
+    rows, times, offsets, num_rows, data_end = _scan_rows(file_path, data_start, 0, stride)
+    index = TimeIndex(file_path, np.array(rows, dtype=np.int64), np.array(times), np.array(offsets, dtype=np.int64), num_rows, data_end, stride)
+    index.save()
+    return index
+
+def load_time_index(file_path, stride=constants.TIME_INDEX_STRIDE):
+    """
+    Returns the time index of a .data file, building or extending the sidecar file if needed.
+
+    Args:
+        file_path (str): Path to the .data file.
+        stride (int): Index every `stride`-th row when the index has to be built.
+
+    Returns:
+        TimeIndex: The up-to-date index.
+    """
+    index_path = file_path + INDEX_SUFFIX
+    if os.path.exists(index_path):
+        try:
+            with np.load(index_path) as saved:
+                index = TimeIndex(file_path, saved['rows'], saved['times'], saved['offsets'], int(saved['num_rows']),
+                                  int(saved['data_end']), int(saved['stride']))
+                if index.matches(saved):
+                    if int(saved['file_size']) == os.path.getsize(file_path):
+                        return index
+                    # The file grew: index only the appended rows
+                    rows, times, offsets, index.num_rows, index.data_end = _scan_rows(file_path, index.data_end, index.num_rows, index.stride)
+                    index.rows = np.concatenate((index.rows, np.array(rows, dtype=np.int64)))
+                    index.times = np.concatenate((index.times, np.array(times)))
+                    index.offsets = np.concatenate((index.offsets, np.array(offsets, dtype=np.int64)))
+                    index.save()
+                    return index
+        except (OSError, KeyError, ValueError) as e:
+            print(f"Rebuilding unreadable time index {index_path}: {e}")
+    print(f"Building time index for {file_path}...")
+    return build_time_index(file_path, stride)
+
+def read_data_window(file_path, t0, t1, index=None):
+    """
+    Reads only the rows of a .data file with t0 <= time <= t1.
+
+    Args:
+        file_path (str): Path to the .data file. The first column must be the time.
+        t0 (float): Start of the window in seconds.
+        t1 (float): End of the window in seconds.
+        index (TimeIndex, optional): The file's index. Loaded (or built) if not given.
+
+    Returns:
+        tuple: (column_names, time_s, values, first_row), where time_s is float64, values is
+               float32 with the remaining columns, and first_row is the row number of the first
+               returned row within the whole file.
+    """
+    index = index or load_time_index(file_path)
+    column_names = read_data_header(file_path)
+    start, end, start_row = index.byte_range(t0, t1)
+    with open(file_path, 'rb') as f:
+        f.seek(start)
+        rows = parse_data_bytes(f.read(end - start), len(column_names))
+    inside = np.flatnonzero((rows[:, 0] >= t0) & (rows[:, 0] <= t1))
+    first_row = start_row + (int(inside[0]) if len(inside) else 0)
+    rows = rows[inside]
+    return column_names, rows[:, 0].copy(), rows[:, 1:].astype(np.float32), first_row
+
+if __name__ == "__main__":
+    # Example usage: index a synthetic 10-minute, 200 Hz recording and read a 10-second window
+    import tempfile
+    import time
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        path = os.path.join(tmp_dir, "Radar-Data.data")
+        with open(path, 'w') as f:
+            f.write("# Time (seconds),f0_f0_f0,f0_f0_f1\n")
+            t = np.arange(200 * 600) * 0.005
+            np.savetxt(f, np.column_stack((t, np.sin(t), np.cos(t))), delimiter=',', fmt='%.10g')
+
+        start_time = time.perf_counter()
+        index = load_time_index(path)
+        print(f"Indexed {index.num_rows} rows in {time.perf_counter() - start_time:.2f} s ({len(index.rows)} index entries).")
+        start_time = time.perf_counter()
+        columns, time_s, values, first_row = read_data_window(path, 300.0, 310.0, index)
+        print(f"Window 300-310 s: {len(time_s)} rows from row {first_row}, read in {time.perf_counter() - start_time:.3f} s.")
@@ -46,18 +46,51 @@ class ComplementaryFilter:
 
         return np.degrees(self.roll), np.degrees(self.pitch), np.degrees(self.yaw)
 
-def estimate_orientation(imu_data_df, dt=0.01, alpha=0.98):
+    def get_state(self):
+        """
+        Returns the internal angles (roll, pitch, yaw in radians) as an array, e.g. for checkpointing.
+        """
+        return np.array([self.roll, self.pitch, self.yaw], dtype=float)
+
+    def set_state(self, state):
+        """
+        Restores the internal angles saved with `get_state`.
+        """
+        self.roll, self.pitch, self.yaw = (float(v) for v in state)
+
+def estimate_orientation(imu_data_df, dt=0.01, alpha=0.98, resume_state=None, on_progress=None, progress_every=1000, verbose=True):
     """
     Estimates orientation (roll, pitch, yaw) from a DataFrame of IMU data.
+
+    The filter can be resumed part-way through the data: `resume_state` holds the rows already
+    processed, the filter state after them and their orientation, as passed to `on_progress`.
+
+    Args:
+        imu_data_df (pd.DataFrame): IMU data.
+        dt (float): Time between IMU samples in seconds.
+        alpha (float): Complementary filter weight of the gyroscope.
+        resume_state (dict, optional): Keys 'rows_done', 'filter_state', 'roll', 'pitch', 'yaw'.
+        on_progress (callable, optional): Called as on_progress(state) every `progress_every` rows and
+                                          after the last row, with a dict in the same format as
+                                          `resume_state` (the angle lists are passed by reference).
+        progress_every (int): Number of rows between `on_progress` calls.
+        verbose (bool): If False, does not report missing magnetometer data (e.g. when called once per incoming batch).
     """
     filter = ComplementaryFilter(dt, alpha)
     rolls, pitchs, yaws = [], [], []
+    start_row = 0
+    if resume_state is not None:
+        start_row = int(resume_state['rows_done'])
+        filter.set_state(resume_state['filter_state'])
+        rolls = list(resume_state['roll'])
+        pitchs = list(resume_state['pitch'])
+        yaws = list(resume_state['yaw'])
 
     has_mag = all(col in imu_data_df.columns for col in ['mag_x', 'mag_y', 'mag_z'])
-    if not has_mag:
+    if not has_mag and verbose:
         print("Magnetometer data not found. Yaw estimation will be based on gyroscope integration only.")
 
-    for index, row in imu_data_df.iterrows():
+    for index, row in imu_data_df.iloc[start_row:].iterrows():
         mag_x, mag_y, mag_z = (row['mag_x'], row['mag_y'], row['mag_z']) if has_mag else (None, None, None)
         
         roll, pitch, yaw = filter.update(
@@ -68,12 +101,56 @@ def estimate_orientation(imu_data_df, dt=0.01, alpha=0.98):
         rolls.append(roll)
         pitchs.append(pitch)
         yaws.append(yaw)
+
+        if on_progress is not None and len(rolls) % progress_every == 0:
+            on_progress({'rows_done': len(rolls), 'filter_state': filter.get_state(), 'roll': rolls, 'pitch': pitchs, 'yaw': yaws})
+
+    if on_progress is not None:
+        on_progress({'rows_done': len(rolls), 'filter_state': filter.get_state(), 'roll': rolls, 'pitch': pitchs, 'yaw': yaws})
     
     imu_data_df['roll'] = rolls
     imu_data_df['pitch'] = pitchs
     imu_data_df['yaw'] = yaws
     return imu_data_df
 
+def align_orientation_to_timestamps(imu_data_with_orientation, timestamps):
+    """
+    Looks up the IMU orientation closest in time to each of the given timestamps.
+
+    Uses a binary search over the sorted IMU timestamps, so aligning a whole
+    recording costs O(n log m) instead of a full scan of the IMU data per frame.
+
+    Args:
+        imu_data_with_orientation (pd.DataFrame): IMU data with 'timestamp', 'roll', 'pitch'
+                                                  and optionally 'yaw' columns (in degrees).
+        timestamps (np.array): Timestamps (in seconds) to align to, e.g. radar frame times.
+
+    Returns:
+        tuple: (roll_rad, pitch_rad, yaw_rad) arrays with one entry per timestamp.
+               yaw_rad is None if the IMU data has no 'yaw' column.
+    """
+    timestamps = np.asarray(timestamps, dtype=float)
+    imu_timestamps = imu_data_with_orientation['timestamp'].to_numpy(dtype=float)
+    order = np.argsort(imu_timestamps, kind='stable')
+    sorted_timestamps = imu_timestamps[order]
+
+    if len(sorted_timestamps) == 1:
+        nearest = np.zeros(len(timestamps), dtype=int)
+    else:
+        right = np.clip(np.searchsorted(sorted_timestamps, timestamps), 1, len(sorted_timestamps) - 1)
+        left = right - 1
+        # Ties go to the earlier sample
+        take_left = (timestamps - sorted_timestamps[left]) <= (sorted_timestamps[right] - timestamps)
+        nearest = np.where(take_left, left, right)
+    rows = order[nearest]
+
+    roll_rad = np.deg2rad(imu_data_with_orientation['roll'].to_numpy(dtype=float)[rows])
+    pitch_rad = np.deg2rad(imu_data_with_orientation['pitch'].to_numpy(dtype=float)[rows])
+    yaw_rad = None
+    if 'yaw' in imu_data_with_orientation.columns:
+        yaw_rad = np.deg2rad(imu_data_with_orientation['yaw'].to_numpy(dtype=float)[rows])
+    return roll_rad, pitch_rad, yaw_rad
+
 if __name__ == "__main__":
     # Example usage with dummy data
     dummy_data = {
@@ -0,0 +1,106 @@
+import os
+import numpy as np
+from src.config import constants
+from src.data_acquisition.radar_reader import read_radar_data_chunks
+from src.data_acquisition.data_parser import count_data_rows, read_data_header
+from src.data_acquisition.imu_reader import read_and_merge_imu_data
+from src.data_acquisition.session_reader import find_track_for_file, frame_width
+from src.pipeline.follow_pipeline import IncrementalFrameProcessor
+from src.pipeline.memory_budget import MemoryMonitor, SpillBuffer, plan_memory_budget, print_memory_plan
+from src.processing.downsampling import StreamingDownsampler
+from src.processing.object_clustering import cluster_detected_points
+from src.processing.tiled_map import TiledMapStore
+from src.visualization.map_viewer import cluster_centroids, create_2d_map, plot_cfar_detection, plot_polar_map, plot_tiled_map
+
+def run_budgeted_pipeline(file_path, imu_file_path=None, mag_file_path=None, memory_budget_mb=constants.MEMORY_BUDGET_MB):
+    """
+    Processes a session within a memory budget, for machines with little RAM.
+
+    The frame width is taken from the `.imsession` shape of the radar track (or the file
+    header if there is none) and, together with the dtype policy MEMORY_DTYPE, sizes the read
+    chunks, the in-memory point buffer and the tile cache (see `plan_memory_budget`). Radar
+    frames are read and processed one chunk at a time; detected points beyond the point
+    buffer are spilled to disk, and the map is built from downsampled cells, which grow with
+    the mapped area rather than with the recording length. The peak memory actually used
+    is reported against the budget at the end.
+
+    Args:
+        file_path (str): Absolute path to the Radar-Data.data file.
+        imu_file_path (str, optional): Absolute path to the IMU data file.
+        mag_file_path (str, optional): Absolute path to the Magnetometer data file.
+        memory_budget_mb (float): Memory the run may use on top of the interpreter baseline, in MB.
+    """
+    if not os.path.exists(file_path):
+        print(f"Error: File not found at {file_path}")
+        return
+
+    monitor = MemoryMonitor()
+    monitor.start()
+    points = None
+    try:
+        radar_track = find_track_for_file(file_path)
+        width = frame_width(radar_track)
+        if width is None:
+            width = sum(1 for col in read_data_header(file_path) if col.startswith('f0_f0_'))
+            print(f"No .imsession shape found for {os.path.basename(file_path)}; using {width} samples per frame from the header.")
+        num_frames = count_data_rows(file_path)
+
+        # --- IMU Data Processing ---
+        processor = IncrementalFrameProcessor(sweep_frames=num_frames, imu_history_s=np.inf)
+        reserved_bytes = 0
+        if imu_file_path:
+            df_imu = read_and_merge_imu_data(imu_file_path, mag_file_path)
+            if df_imu is not None:
+                processor.add_imu_rows(df_imu)
+                reserved_bytes = processor.imu_nbytes()
+                del df_imu
+            else:
+                print("IMU data could not be loaded or processed.")
+
+        plan = plan_memory_budget(memory_budget_mb, width, reserved_bytes=reserved_bytes, num_frames=num_frames)
+        print_memory_plan(plan, memory_budget_mb)
+
+        # --- Radar Data Processing, one chunk at a time ---
+        points = SpillBuffer(num_columns=5, max_rows_in_memory=plan['max_buffered_points'], dtype=plan['dtype'], spill_dir=constants.SPILL_DIR)
+        cells = StreamingDownsampler(constants.DOWNSAMPLE_CELL_SIZE_M, max_cells=plan['max_cells'])
+        for chunk in read_radar_data_chunks(file_path, plan['chunk_frames'], dtype=plan['dtype']):
+            radar_columns = [col for col in chunk.columns if col.startswith('f0_f0_')]
+            corrected_r, corrected_azimuth_rad, x, y, snr = processor.detect_frames(
+                chunk[radar_columns].to_numpy(), chunk['Time (seconds)'].to_numpy()
+            )
+            del chunk
+            points.append(np.column_stack((corrected_r, corrected_azimuth_rad, x, y, snr)))
+            cells.add(np.column_stack((x, y)), snr)
+        print(f"Processed {processor.frames_processed} frames in chunks of {plan['chunk_frames']}: "
+              f"{len(points)} points detected, {points.spilled_rows} spilled to disk.")
+
+        # --- Mapping ---
+        if len(points):
+            centroids, hit_counts, _ = cells.result()
+            print(f"\nDownsampled {len(points)} detected points to {len(centroids)} cells.")
+            clusters_indices = cluster_detected_points(centroids, eps=constants.DBSCAN_EPS, min_samples=constants.DBSCAN_MIN_SAMPLES, sample_weight=hit_counts)
+            print(f"\nDetected {len(clusters_indices)} clusters.")
+            create_2d_map(clusters=clusters_indices, all_detected_points_cartesian=centroids.tolist(), title="2D Radar Occupancy Grid with Clusters", map_extent_m=constants.MAP_EXTENT_M, grid_resolution=constants.GRID_RESOLUTION_M, save_path=os.path.join(constants.PLOTS_OUTPUT_DIR, "2d_radar_map.png"), point_weights=hit_counts)
+
+            if constants.TILED_MAP_ENABLED:
+                map_store = TiledMapStore(constants.TILED_MAP_DIR, resolution_m=constants.TILED_MAP_RESOLUTION_M, tile_size=constants.TILED_MAP_TILE_SIZE, num_levels=constants.TILED_MAP_LEVELS, max_open_tiles=plan['max_open_tiles'], overwrite=True)
+                map_store.add_points(centroids, weights=hit_counts)
+                map_store.flush()
+                plot_tiled_map(map_store, max_pixels=constants.TILED_MAP_MAX_PIXELS, save_path=os.path.join(constants.PLOTS_OUTPUT_DIR, "tiled_radar_map.png"))
+
+            polar_sample = points.sample(constants.MEMORY_PLOT_MAX_POINTS)[:, :2].astype(float)
+            plot_polar_map(polar_sample, save_path=os.path.join(constants.PLOTS_OUTPUT_DIR, "2d_radar_polar_plot.png"), centroids_cartesian=cluster_centroids(centroids, clusters_indices))
+        else:
+            print("\nNo points detected for clustering or mapping.")
+
+        if processor.first_frame_viz_data:
+            viz = processor.first_frame_viz_data
+            plot_cfar_detection(viz['range_profile'], viz['cfar_threshold'], viz['detected_indices'], frame_index=0, save_path=os.path.join(constants.PLOTS_OUTPUT_DIR, "cfar_detection.png"))
+
+    except Exception as e:
+        print(f"Error processing radar data: {e}")
+    finally:
+        if points is not None:
+            points.close()
+        monitor.stop()
+        monitor.report(memory_budget_mb)
@@ -0,0 +1,221 @@
+import hashlib
+import json
+import os
+import time
+import numpy as np
+
+def session_signature(file_paths, settings):
+    """
+    Describes the inputs and settings of a run, so a checkpoint is only reused for the same run.
+
+    Args:
+        file_paths (list): Input files (None entries are allowed). Each file is identified by
+                           its absolute path, size and modification time.
+        settings (dict): Processing settings that influence the result (JSON-serializable).
+
+    Returns:
+        str: A JSON string describing the run.
+    """
+    files = []
+    for path in file_paths:
+        if path and os.path.exists(path):
+            stat = os.stat(path)
+            files.append([os.path.abspath(path), stat.st_size, stat.st_mtime_ns])
+        else:
+            files.append(None)
+    return json.dumps({'files': files, 'settings': settings}, sort_keys=True)
+
+class PipelineCheckpoint:
+    """
+    Periodically saves the state of a long processing run and restores it on the next run.
+
+    The small part of the state (counters, filter states) is a flat dict of NumPy arrays and
+    scalars, stored as one `.npz` file that is written to a temporary name and then renamed,
+    so a crash while saving never leaves a corrupt checkpoint behind. Tables that only grow,
+    such as the detected points, are kept in append-only row logs next to it: each save
+    appends just the rows added since the previous one, and the `.npz` records how many rows
+    of each log belong to the checkpoint, so rows of an interrupted save are ignored. A
+    checkpoint is ignored if it was written for different input files or settings.
+    """
+    def __init__(self, checkpoint_dir, signature, interval_s=60.0):
+        self.signature = signature
+        self.interval_s = interval_s
+        # One checkpoint per run signature, so different sessions do not overwrite each other
+        digest = hashlib.sha1(signature.encode('utf-8')).hexdigest()[:16]
+        self._base_path = os.path.join(checkpoint_dir, f"checkpoint_{digest}")
+        self.path = self._base_path + ".npz"
+        self._saved_rows = {}
+        self._last_save = time.monotonic()
+
+    def _log_path(self, name):
+        return f"{self._base_path}_{name}.rows"
+
+    def saved_rows(self, name):
+        """
+        Returns the number of rows of the log `name` stored so far.
+        """
+        return self._saved_rows.get(name, (0, 0))[0]
+
+    def load(self):
+        """
+        Returns the saved state, or None if there is no usable checkpoint.
+
+        The rows of each log are included in the state as a 2D array under the log's name.
+        """
+        state = self._load() if os.path.exists(self.path) else None
+        if state is None:
+            # Start over: rows logged after the last usable state must not be picked up by the next save
+            self._remove_logs()
+            return None
+        print(f"Resuming from checkpoint {self.path}.")
+        return state
+
+    def _load(self):
+        try:
+            with np.load(self.path, allow_pickle=False) as data:
+                if str(data['signature']) != self.signature:
+                    print(f"Ignoring checkpoint {self.path}: it was written for different inputs or settings.")
+                    return None
+                state = {key: data[key] for key in data.files if key != 'signature' and not key.startswith('log_')}
+                logs = {key[len('log_'):]: tuple(int(v) for v in data[key]) for key in data.files if key.startswith('log_')}
+            for name, (num_rows, num_columns) in logs.items():
+                rows = np.fromfile(self._log_path(name), dtype=np.float64, count=num_rows * num_columns)
+                if len(rows) != num_rows * num_columns:
+                    raise ValueError(f"the {name} log holds fewer than {num_rows} rows")
+                # Drop rows appended by a save that did not complete
+                os.truncate(self._log_path(name), rows.nbytes)
+                state[name] = rows.reshape(num_rows, num_columns)
+        except Exception as e:
+            print(f"Ignoring unreadable checkpoint {self.path}: {e}")
+            return None
+        self._saved_rows = logs
+        return state
+
+    def due(self):
+        """
+        Returns True if the save interval has passed since the last save.
+        """
+        return time.monotonic() - self._last_save >= self.interval_s
+
+    def save(self, state, new_rows=None):
+        """
+        Writes the state atomically, after appending new rows to the row logs.
+
+        Args:
+            state (dict): Arrays and scalars to store.
+            new_rows (dict, optional): For each log name, the 2D float array of rows added since the last save.
+        """
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        for name, rows in (new_rows or {}).items():
+            rows = np.asarray(rows, dtype=np.float64)
+            if len(rows) == 0:
+                continue
+            with open(self._log_path(name), 'ab') as f:
+                rows.tofile(f)
+                f.flush()
+                os.fsync(f.fileno())
+            self._saved_rows[name] = (self.saved_rows(name) + len(rows), rows.shape[1])
+        logs = {'log_' + name: np.array(counts, dtype=np.int64) for name, counts in self._saved_rows.items()}
+        tmp_path = self.path + ".tmp.npz"
+        np.savez(tmp_path, signature=np.array(self.signature), **logs, **state)
+        os.replace(tmp_path, self.path)
+        self._last_save = time.monotonic()
+
+    def _remove_logs(self):
+        directory = os.path.dirname(self._base_path)
+        prefix = os.path.basename(self._base_path) + "_"
+        if os.path.isdir(directory):
+            for file_name in os.listdir(directory):
+                if file_name.startswith(prefix) and file_name.endswith(".rows"):
+                    os.remove(os.path.join(directory, file_name))
+        self._saved_rows = {}
+
+    def remove(self):
+        """
+        Deletes the checkpoint, e.g. once the run has completed.
+        """
+        if os.path.exists(self.path):
+            os.remove(self.path)
+        self._remove_logs()
+
+def radar_point_rows(points_x, points_y, points_range, points_azimuth, snr):
+    """
+    Stacks detected points into rows for the 'points' log of a checkpoint.
+    """
+    return np.column_stack((points_x, points_y, points_range, points_azimuth, snr)).astype(np.float64)
+
+def radar_progress_state(frames_done, clutter_background=None, first_frame_viz_data=None, suppressed_detections=0):
+    """
+    Packs the progress of the radar frame loop into a dict of arrays for `PipelineCheckpoint.save`.
+
+    The detected points are not part of it; they go to the 'points' log, see `radar_point_rows`.
+
+    Args:
+        frames_done (int): Number of frames fully processed.
+        clutter_background (np.array, optional): State of the clutter background subtractor.
+        first_frame_viz_data (dict, optional): 'range_profile', 'cfar_threshold' and 'detected_indices' of frame 0.
+        suppressed_detections (int): Detections removed by clutter removal so far.
+
+    Returns:
+        dict: The state, restorable with `restore_radar_progress`.
+    """
+    state = {'frames_done': np.int64(frames_done), 'suppressed_detections': np.int64(suppressed_detections)}
+    if clutter_background is not None:
+        state['clutter_background'] = clutter_background
+    if first_frame_viz_data:
+        for key, value in first_frame_viz_data.items():
+            if value is not None:
+                state['first_frame_' + key] = value
+    return state
+
+def restore_radar_progress(state):
+    """
+    Unpacks a state written by `radar_progress_state`, together with the logged points.
+
+    Returns:
+        tuple: (frames_done, points_cartesian, points_polar, snr, clutter_background,
+                first_frame_viz_data, suppressed_detections), with the points as lists of tuples.
+    """
+    first_frame_viz_data = {key[len('first_frame_'):]: value for key, value in state.items() if key.startswith('first_frame_')}
+    rows = state.get('points', np.empty((0, 5)))
+    return (
+        int(state['frames_done']),
+        [tuple(p) for p in rows[:, 0:2].tolist()],
+        [tuple(p) for p in rows[:, 2:4].tolist()],
+        rows[:, 4].tolist(),
+        state.get('clutter_background'),
+        first_frame_viz_data,
+        int(state.get('suppressed_detections', 0)),
+    )
+
+def imu_progress_state(progress):
+    """
+    Packs the filter state reported by `estimate_orientation` into a dict of arrays, with keys prefixed 'imu_'.
+
+    The orientation computed so far goes to the 'imu_angles' log, see `imu_angle_rows`.
+    """
+    return {
+        'imu_rows_done': np.int64(progress['rows_done']),
+        'imu_filter_state': np.asarray(progress['filter_state'], dtype=float),
+    }
+
+def imu_angle_rows(progress, start=0):
+    """
+    Returns the (roll, pitch, yaw) rows reported by `estimate_orientation` from row `start` on, for the 'imu_angles' log.
+    """
+    return np.column_stack((progress['roll'][start:], progress['pitch'][start:], progress['yaw'][start:])).astype(np.float64)
+
+def restore_imu_progress(state):
+    """
+    Returns the `resume_state` for `estimate_orientation` from a checkpoint, or None if it holds no IMU progress.
+    """
+    if 'imu_rows_done' not in state:
+        return None
+    angles = state.get('imu_angles', np.empty((0, 3)))
+    return {
+        'rows_done': int(state['imu_rows_done']),
+        'filter_state': state['imu_filter_state'],
+        'roll': angles[:, 0].tolist(),
+        'pitch': angles[:, 1].tolist(),
+        'yaw': angles[:, 2].tolist(),
+    }
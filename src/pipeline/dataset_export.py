@@ -0,0 +1,385 @@
+import os
+import csv
+import glob
+import json
+import numpy as np
+import pandas as pd
+from numpy.lib.format import open_memmap
+from numpy.lib.stride_tricks import sliding_window_view
+from src.config import constants
+from src.data_acquisition.data_parser import read_data_header
+from src.data_acquisition.imu_reader import normalize_imu_columns
+from src.data_acquisition.label_reader import read_labels
+from src.data_acquisition.radar_reader import read_radar_data_chunks
+from src.data_acquisition.session_reader import find_track_for_file
+
+DATASET_INDEX_COLUMNS = ('window', 'session', 'shard', 'row', 'first_frame', 'start_time', 'end_time', 'label', 'label_id', 'overlap')
+
+def window_labels(window_starts, window_ends, labels, min_overlap=constants.DATASET_MIN_LABEL_OVERLAP):
+    """
+    Assigns each window the label interval that overlaps it most.
+
+    Args:
+        window_starts (np.array): Start time of every window.
+        window_ends (np.array): End time of every window.
+        labels (pd.DataFrame): Label intervals with 'start' and 'end' columns, see `read_labels`.
+        min_overlap (float): Share of a window a label must cover to label it.
+
+    Returns:
+        tuple: (label_row, overlap): the row in `labels` of each window's label (-1 if none
+               covers enough of it) and the share of the window it covers.
+    """
+    window_starts, window_ends = np.asarray(window_starts, dtype=float), np.asarray(window_ends, dtype=float)
+    best = np.full(len(window_starts), -1)
+    best_overlap = np.zeros(len(window_starts))
+    durations = np.maximum(window_ends - window_starts, 1e-12)
+    for row, (start, end) in enumerate(zip(labels['start'].to_numpy(), labels['end'].to_numpy())):
+        overlap = np.clip(np.minimum(end, window_ends) - np.maximum(start, window_starts), 0, None) / durations
+        better = overlap > best_overlap
+        best[better] = row
+        best_overlap[better] = overlap[better]
+    best[best_overlap < min_overlap] = -1
+    return best, best_overlap
+
+class ShardedArrayWriter:
+    """
+    Appends fixed-shape windows to a series of memory-mapped .npy shards.
+
+    Only the shard being written is mapped, so memory use does not grow with the number of
+    windows. Each shard is a plain .npy file that `np.load(..., mmap_mode='r')` opens without
+    reading it.
+
+    Args:
+        directory (str): Output directory.
+        name (str): Prefix of the shard files, e.g. 'radar' for radar_00000.npy.
+        window_shape (tuple): Shape of one window.
+        dtype (str or np.dtype): Value type.
+        shard_windows (int): Windows per shard.
+    """
+    def __init__(self, directory, name, window_shape, dtype='float32', shard_windows=constants.DATASET_SHARD_WINDOWS):
+        self.directory = directory
+        self.name = name
+        self.window_shape = tuple(window_shape)
+        self.dtype = np.dtype(dtype)
+        self.shard_windows = int(shard_windows)
+        self.shard_files = []
+        self.num_windows = 0
+        self._shard = None
+        self._shard_rows = 0
+
+    def _open_shard(self):
+        file_name = f"{self.name}_{len(self.shard_files):05d}.npy"
+        self.shard_files.append(file_name)
+        self._shard = open_memmap(os.path.join(self.directory, file_name), mode='w+', dtype=self.dtype,
+                                  shape=(self.shard_windows,) + self.window_shape)
+        self._shard_rows = 0
+
+    def append(self, windows):
+        """
+        Appends windows of shape (n,) + window_shape.
+
+        Returns:
+            tuple: (shard, row) arrays giving the position of every appended window.
+        """
+        windows = np.asarray(windows)
+        shards, rows = np.empty(len(windows), dtype=np.int64), np.empty(len(windows), dtype=np.int64)
+        done = 0
+        while done < len(windows):
+            if self._shard is None or self._shard_rows == self.shard_windows:
+                self._finish_shard()
+                self._open_shard()
+            count = min(len(windows) - done, self.shard_windows - self._shard_rows)
+            self._shard[self._shard_rows:self._shard_rows + count] = windows[done:done + count]
+            shards[done:done + count] = len(self.shard_files) - 1
+            rows[done:done + count] = np.arange(self._shard_rows, self._shard_rows + count)
+            self._shard_rows += count
+            done += count
+        self.num_windows += len(windows)
+        return shards, rows
+
+    def _finish_shard(self):
+        if self._shard is None:
+            return
+        shard, self._shard = self._shard, None
+        shard.flush()
+        if self._shard_rows < self.shard_windows:
+            # Shrink the last shard to the windows it holds
+            path = os.path.join(self.directory, self.shard_files[-1])
+            trimmed = open_memmap(path + '.tmp', mode='w+', dtype=self.dtype, shape=(self._shard_rows,) + self.window_shape)
+            trimmed[:] = shard[:self._shard_rows]
+            trimmed.flush()
+            del trimmed, shard
+            os.replace(path + '.tmp', path)
+
+    def mark(self):
+        """
+        Returns the current write position, to undo later appends with `rollback`.
+        """
+        return len(self.shard_files), self._shard_rows, self.num_windows
+
+    def rollback(self, mark):
+        """
+        Removes the windows appended since `mark` was taken.
+        """
+        num_shards, shard_rows, num_windows = mark
+        self._shard = None
+        for file_name in self.shard_files[num_shards:]:
+            os.remove(os.path.join(self.directory, file_name))
+        self.shard_files = self.shard_files[:num_shards]
+        if num_shards:
+            # Shards are only left when full, so the shard of the mark is still untrimmed
+            self._shard = np.load(os.path.join(self.directory, self.shard_files[-1]), mmap_mode='r+')
+        self._shard_rows = shard_rows
+        self.num_windows = num_windows
+
+    def close(self):
+        """
+        Flushes the last shard and trims it to its windows.
+        """
+        self._finish_shard()
+
+class _NearestSampleStream:
+    """
+    Looks up the samples of a chunked time series nearest to increasing timestamps, keeping only a short tail in memory.
+    """
+    def __init__(self, chunks, num_channels):
+        self._chunks = iter(chunks)
+        self._times = np.empty(0)
+        self._values = np.empty((0, num_channels), dtype=np.float32)
+        self._exhausted = False
+
+    def lookup(self, timestamps, keep_from):
+        """
+        Returns the sample nearest to each timestamp; samples before `keep_from` are then dropped.
+        """
+        while not self._exhausted and (len(self._times) == 0 or self._times[-1] < timestamps[-1]):
+            try:
+                times, values = next(self._chunks)
+            except StopIteration:
+                self._exhausted = True
+                break
+            self._times = np.concatenate([self._times, times])
+            self._values = np.concatenate([self._values, values])
+        if len(self._times) == 0:
+            return np.full((len(timestamps), self._values.shape[1]), np.nan, dtype=np.float32)
+        right = np.minimum(np.searchsorted(self._times, timestamps), len(self._times) - 1)
+        left = np.maximum(right - 1, 0)
+        nearest = np.where(np.abs(self._times[right] - timestamps) < np.abs(self._times[left] - timestamps), right, left)
+        result = self._values[nearest]
+        # Keep the last sample before keep_from, which may still be the nearest one
+        drop = max(int(np.searchsorted(self._times, keep_from)) - 1, 0)
+        self._times, self._values = self._times[drop:], self._values[drop:]
+        return result
+
+def _imu_chunks(imu_file_path, columns, offset_s, chunk_rows):
+    # Yields (session time, values of `columns`) per chunk; columns missing from the file are NaN
+    file_columns = normalize_imu_columns(read_data_header(imu_file_path))
+    for chunk in pd.read_csv(imu_file_path, skiprows=1, header=None, names=file_columns, chunksize=chunk_rows):
+        values = np.full((len(chunk), len(columns)), np.nan, dtype=np.float32)
+        for i, column in enumerate(columns):
+            if column in chunk.columns:
+                values[:, i] = chunk[column].to_numpy(dtype=np.float32)
+        yield chunk['timestamp'].to_numpy(dtype=float) + offset_s, values
+
+def _track_timing(data_file_path):
+    # Offset of the track on the session timeline and its frame interval (None if not recorded)
+    track = find_track_for_file(data_file_path)
+    if track is None:
+        return 0.0, None
+    return track['offset_s'], (1.0 / track['frequency'] if track['frequency'] else None)
+
+def export_session_windows(session_dir, radar_writer, imu_writer, index_writer, label_ids, first_window_id=0,
+                           window_frames=constants.DATASET_WINDOW_FRAMES, stride_frames=constants.DATASET_STRIDE_FRAMES,
+                           min_overlap=constants.DATASET_MIN_LABEL_OVERLAP, include_unlabeled=False,
+                           chunk_frames=constants.DATASET_CHUNK_FRAMES):
+    """
+    Cuts one session into windows, labels them and appends them to the dataset.
+
+    The radar file is read in chunks of `chunk_frames` frames; only the frames of a window
+    that is not complete yet carry over to the next chunk. IMU samples are read in chunks
+    alongside it and joined to every radar frame by nearest timestamp, after moving both
+    tracks onto the session timeline with the offsets in the .imsession file.
+
+    Args:
+        session_dir (str): Session directory with Radar-Data.data and optionally IMU-Data.data and a .label file.
+        radar_writer (ShardedArrayWriter): Writer of the radar windows.
+        imu_writer (ShardedArrayWriter): Writer of the IMU windows.
+        index_writer (csv.writer): Writer of the index rows, see DATASET_INDEX_COLUMNS.
+        label_ids (dict): Label name to id; new labels are added to it.
+        first_window_id (int): Id of the first window written.
+        window_frames (int): Radar frames per window.
+        stride_frames (int): Radar frames between the starts of two windows.
+        min_overlap (float): Share of a window a label must cover to label it.
+        include_unlabeled (bool): If True, also write windows without a label (label_id -1).
+        chunk_frames (int): Radar frames read at a time.
+
+    Returns:
+        int: The number of windows written.
+    """
+    session_name = os.path.basename(os.path.normpath(session_dir))
+    radar_file_path = os.path.join(session_dir, "Radar-Data.data")
+    if not os.path.exists(radar_file_path):
+        print(f"Skipping {session_name}: no radar data.")
+        return 0
+    label_files = sorted(glob.glob(os.path.join(session_dir, "*.label")))
+    labels = read_labels(label_files[0]) if label_files else None
+    if labels is None:
+        labels = pd.DataFrame({'start': [], 'end': [], 'label': []})
+    if labels.empty and not include_unlabeled:
+        print(f"Skipping {session_name}: no labels.")
+        return 0
+
+    radar_offset, frame_dt = _track_timing(radar_file_path)
+    imu_file_path = os.path.join(session_dir, "IMU-Data.data")
+    imu_columns = list(constants.DATASET_IMU_COLUMNS)
+    if os.path.exists(imu_file_path):
+        imu_offset, _ = _track_timing(imu_file_path)
+        imu_stream = _NearestSampleStream(_imu_chunks(imu_file_path, imu_columns, imu_offset, chunk_frames), len(imu_columns))
+    else:
+        imu_stream = _NearestSampleStream(iter(()), len(imu_columns))
+
+    tail_frames, tail_times = np.empty((0, radar_writer.window_shape[1]), dtype=np.float32), np.empty(0)
+    window_start = 0 # Frame number at which the next window starts; the tail holds the frames from there on
+    frames_read = 0
+    written = 0
+    for chunk in read_radar_data_chunks(radar_file_path, chunk_frames):
+        radar_columns = [col for col in chunk.columns if col.startswith('f0_f0_')]
+        if len(radar_columns) != radar_writer.window_shape[1]:
+            print(f"Skipping the rest of {session_name}: {len(radar_columns)} samples per frame, expected {radar_writer.window_shape[1]}.")
+            break
+        times = chunk['Time (seconds)'].to_numpy(dtype=float) + radar_offset
+        if frame_dt is None and len(times) > 1:
+            frame_dt = float(np.median(np.diff(times)))
+        # Frames before the next window start (a stride longer than a window) are not needed
+        first_needed = max(window_start - frames_read, 0)
+        frames_read += len(chunk)
+        frames = np.concatenate([tail_frames, chunk[radar_columns].to_numpy(dtype=np.float32)[first_needed:]])
+        times = np.concatenate([tail_times, times[first_needed:]])
+
+        starts = np.arange(0, len(frames) - window_frames + 1, stride_frames)
+        if len(starts):
+            window_starts = times[starts]
+            window_ends = times[starts + window_frames - 1] + (frame_dt or 0.0)
+            label_rows, overlap = window_labels(window_starts, window_ends, labels, min_overlap)
+            next_start = starts[-1] + stride_frames
+            imu = imu_stream.lookup(times[starts[0]:starts[-1] + window_frames], keep_from=times[min(next_start, len(times) - 1)])
+            keep = np.nonzero((label_rows >= 0) | include_unlabeled)[0]
+            if len(keep):
+                radar_windows = sliding_window_view(frames, window_frames, axis=0)[starts[keep]].transpose(0, 2, 1)
+                shards, rows = radar_writer.append(radar_windows)
+                imu_writer.append(imu[starts[keep, np.newaxis] - starts[0] + np.arange(window_frames)])
+                for n, k in enumerate(keep):
+                    label = labels['label'].iloc[label_rows[k]] if label_rows[k] >= 0 else ''
+                    label_id = label_ids.setdefault(label, len(label_ids)) if label else -1
+                    index_writer.writerow([first_window_id + written + n, session_name, shards[n], rows[n], window_start + starts[k],
+                                           f"{window_starts[k]:.6f}", f"{window_ends[k]:.6f}", label, label_id, f"{overlap[k]:.4f}"])
+                written += len(keep)
+            tail_frames, tail_times = frames[next_start:], times[next_start:]
+            window_start += next_start
+        else:
+            tail_frames, tail_times = frames, times
+    print(f"{session_name}: {written} windows exported.")
+    return written
+
+def export_labeled_windows(session_dirs, output_dir=constants.DATASET_OUTPUT_DIR, window_frames=constants.DATASET_WINDOW_FRAMES,
+                           stride_frames=constants.DATASET_STRIDE_FRAMES, min_overlap=constants.DATASET_MIN_LABEL_OVERLAP,
+                           include_unlabeled=False, shard_windows=constants.DATASET_SHARD_WINDOWS,
+                           chunk_frames=constants.DATASET_CHUNK_FRAMES):
+    """
+    Exports labeled, fixed-length windows of radar and IMU frames from several sessions as a sharded dataset.
+
+    The output directory holds radar_NNNNN.npy shards of shape (windows, window_frames, 128),
+    imu_NNNNN.npy shards of shape (windows, window_frames, len(DATASET_IMU_COLUMNS)) with the
+    IMU sample nearest to each radar frame (NaN without IMU data), index.csv with one row per
+    window (see DATASET_INDEX_COLUMNS) and metadata.json. Sessions are read in chunks and the
+    windows and index rows are written as they are cut, so memory use stays flat however many
+    sessions are exported. If a session fails part-way, its windows, index rows and new labels
+    are removed again, so the dataset only holds complete sessions. Open the result with
+    `load_window_dataset`.
+
+    Args:
+        session_dirs (list): Session directories.
+        output_dir (str): Output directory; a dataset already in it is replaced.
+        window_frames (int): Radar frames per window.
+        stride_frames (int): Radar frames between the starts of two windows.
+        min_overlap (float): Share of a window a label must cover to label it.
+        include_unlabeled (bool): If True, also export windows without a label.
+        shard_windows (int): Windows per shard file.
+        chunk_frames (int): Radar frames read at a time.
+
+    Returns:
+        dict: The metadata written to metadata.json.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    for old_file in glob.glob(os.path.join(output_dir, "radar_*.npy")) + glob.glob(os.path.join(output_dir, "imu_*.npy")):
+        os.remove(old_file)
+    radar_width = constants.DATASET_RADAR_SAMPLES
+    radar_writer = ShardedArrayWriter(output_dir, 'radar', (window_frames, radar_width), shard_windows=shard_windows)
+    imu_writer = ShardedArrayWriter(output_dir, 'imu', (window_frames, len(constants.DATASET_IMU_COLUMNS)), shard_windows=shard_windows)
+    label_ids = {}
+    sessions = {}
+    with open(os.path.join(output_dir, "index.csv"), 'w', newline='') as index_file:
+        index_writer = csv.writer(index_file)
+        index_writer.writerow(DATASET_INDEX_COLUMNS)
+        for session_dir in session_dirs:
+            index_file.flush()
+            radar_mark, imu_mark, index_mark, known_labels = radar_writer.mark(), imu_writer.mark(), index_file.tell(), dict(label_ids)
+            try:
+                sessions[os.path.basename(os.path.normpath(session_dir))] = export_session_windows(
+                    session_dir, radar_writer, imu_writer, index_writer, label_ids, radar_writer.num_windows,
+                    window_frames, stride_frames, min_overlap, include_unlabeled, chunk_frames)
+            except Exception as e:
+                print(f"Error exporting {session_dir}: {e}. Its windows are left out.")
+                radar_writer.rollback(radar_mark)
+                imu_writer.rollback(imu_mark)
+                index_file.seek(index_mark)
+                index_file.truncate()
+                label_ids.clear()
+                label_ids.update(known_labels)
+    radar_writer.close()
+    imu_writer.close()
+
+    metadata = {
+        'num_windows': radar_writer.num_windows,
+        'window_frames': window_frames,
+        'stride_frames': stride_frames,
+        'min_overlap': min_overlap,
+        'radar_shape': [window_frames, radar_width],
+        'imu_columns': list(constants.DATASET_IMU_COLUMNS),
+        'dtype': 'float32',
+        'radar_shards': radar_writer.shard_files,
+        'imu_shards': imu_writer.shard_files,
+        'labels': label_ids,
+        'sessions': sessions,
+    }
+    with open(os.path.join(output_dir, "metadata.json"), 'w') as f:
+        json.dump(metadata, f, indent=2)
+    print(f"Exported {radar_writer.num_windows} windows with {len(label_ids)} labels to {output_dir}.")
+    return metadata
+
+def find_labeled_sessions(sessions_root):
+    """
+    Returns the session directories directly below `sessions_root` that hold a .label file.
+    """
+    return sorted({os.path.dirname(path) for path in glob.glob(os.path.join(sessions_root, "*", "*.label"))})
+
+def load_window_dataset(dataset_dir):
+    """
+    Opens a dataset written by `export_labeled_windows` without reading the windows.
+
+    Returns:
+        tuple: (index DataFrame, metadata dict, list of radar shards, list of IMU shards),
+               the shards as read-only memory maps; window i is radar[index.shard[i]][index.row[i]].
+    """
+    with open(os.path.join(dataset_dir, "metadata.json")) as f:
+        metadata = json.load(f)
+    index = pd.read_csv(os.path.join(dataset_dir, "index.csv"), keep_default_na=False)
+    radar = [np.load(os.path.join(dataset_dir, name), mmap_mode='r') for name in metadata['radar_shards']]
+    imu = [np.load(os.path.join(dataset_dir, name), mmap_mode='r') for name in metadata['imu_shards']]
+    return index, metadata, radar, imu
+
+if __name__ == "__main__":
+    # Example usage: export the labeled sessions of the test project
+    export_labeled_windows(find_labeled_sessions(constants.DATASET_SESSIONS_ROOT))
+    index, metadata, radar, imu = load_window_dataset(constants.DATASET_OUTPUT_DIR)
+    print(index.groupby('label').size() if len(index) else "No labeled windows.")
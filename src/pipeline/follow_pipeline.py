@@ -0,0 +1,455 @@
+import os
+import multiprocessing
+import time
+import numpy as np
+import pandas as pd
+import matplotlib.pyplot as plt
+from src.config import constants
+from src.data_acquisition.data_follower import DataFileFollower
+from src.data_acquisition.frame_ring import FrameRingReader, SharedFrameRing
+from src.data_acquisition.radar_collector import collect_radar_data
+from src.data_acquisition.imu_reader import normalize_imu_columns
+from src.fusion.imu_fusion import estimate_orientation, align_orientation_to_timestamps
+from src.pipeline.quality_controller import QualityController
+from src.pipeline.radar_graph import RADAR_GRAPH_OUTPUTS, RADAR_GRAPH_VIZ_OUTPUTS, build_radar_graph, radar_sources
+from src.pipeline.stage_graph import GraphRunner
+from src.processing.downsampling import StreamingDownsampler
+from src.processing.object_clustering import cluster_detected_points
+from src.visualization.map_viewer import bin_points_2d, cluster_centroids
+from src.monitoring.runtime_metrics import FRAMES_DROPPED, FRAMES_PROCESSED, FRAMES_RECEIVED, IMU_LAG, QUEUE_DEPTH, STAGE_LATENCY
+
+MAP_UPDATE_LATENCY = STAGE_LATENCY.labels(stage='map_update')
+
+class IncrementalFrameProcessor:
+    """
+    Runs the processing stages on radar and IMU rows as they arrive, keeping state between calls.
+
+    Radar frames go through the detection graph of `build_radar_graph`. The complementary
+    filter and the clutter background carry over from one batch of rows to the next, so
+    feeding a recording in pieces gives the same orientation and detections as feeding it
+    at once. Only a short tail of the IMU orientation is kept for aligning new
+    radar frames, which keeps the cost per batch independent of the recording length.
+    `set_quality` trades detail for speed in live runs (see QualityController).
+    """
+    def __init__(self, sweep_frames=constants.FOLLOW_SWEEP_FRAMES, imu_history_s=constants.FOLLOW_IMU_HISTORY_S, start_frame=0,
+                 filter_state=None, imu_dt=None):
+        self.sweep_frames = sweep_frames
+        self.imu_history_s = imu_history_s
+        # Frame number of the first frame within the recording, for the fallback sweep azimuth
+        self.start_frame = start_frame
+        self.frames_processed = 0
+        self.imu_rows_processed = 0
+        self.points_cartesian = []
+        self.points_polar = []
+        self.snr = []
+        self.first_frame_viz_data = {}
+        # Both may be handed over from a run over the preceding data (see sharded_pipeline.py)
+        self._imu_dt = imu_dt
+        self._filter_state = filter_state
+        self._imu_orientation = None
+        self._imu_pending = None
+        # The total number of frames is unknown while recording, so the fallback sweep uses a fixed length
+        self._graph = GraphRunner(build_radar_graph(self._orientation, sweep_frames))
+        # Only every decimation-th frame is processed; the phase is the position of the next one in the following batch
+        self.decimation = 1
+        self._decimation_phase = 0
+        self._decimated_metric = FRAMES_DROPPED.labels(stream='radar', reason='decimated')
+
+    def set_quality(self, settings):
+        """
+        Applies the frame decimation of a quality level (see QUALITY_LEVELS).
+        """
+        if settings['decimation'] != self.decimation:
+            self.decimation = settings['decimation']
+            self._decimation_phase = 0
+
+    def add_imu_rows(self, df_imu):
+        """
+        Updates the orientation estimate with new IMU rows.
+
+        Args:
+            df_imu (pd.DataFrame): New IMU rows, with the column names of `read_imu_csv`.
+        """
+        if self._imu_dt is None:
+            # The sample interval is taken from the first two rows, which may arrive in separate batches
+            if self._imu_pending is not None:
+                df_imu = pd.concat([self._imu_pending, df_imu], ignore_index=True)
+            if len(df_imu) < 2:
+                self._imu_pending = df_imu
+                return
+            self._imu_pending = None
+            self._imu_dt = df_imu['timestamp'].iloc[1] - df_imu['timestamp'].iloc[0]
+
+        resume_state = None
+        if self._filter_state is not None:
+            resume_state = {'rows_done': 0, 'filter_state': self._filter_state, 'roll': [], 'pitch': [], 'yaw': []}
+        final_progress = {}
+        oriented = estimate_orientation(df_imu.copy(), dt=self._imu_dt, resume_state=resume_state,
+                                        on_progress=final_progress.update, progress_every=len(df_imu) + 1,
+                                        verbose=self.imu_rows_processed == 0)
+        self._filter_state = final_progress['filter_state']
+        self.imu_rows_processed += len(df_imu)
+
+        oriented = oriented[['timestamp', 'roll', 'pitch', 'yaw']]
+        if self._imu_orientation is not None:
+            oriented = pd.concat([self._imu_orientation, oriented], ignore_index=True)
+        latest = oriented['timestamp'].iloc[-1]
+        self._imu_orientation = oriented[oriented['timestamp'] >= latest - self.imu_history_s].reset_index(drop=True)
+
+    def imu_nbytes(self):
+        """
+        Returns the memory held by the kept IMU orientation in bytes.
+        """
+        if self._imu_orientation is None:
+            return 0
+        return int(self._imu_orientation.memory_usage(deep=True).sum())
+
+    def detect_frames(self, frames, timestamps, outputs=RADAR_GRAPH_OUTPUTS):
+        """
+        Detects points in the next radar frames without storing them.
+
+        Args:
+            frames (np.array): Raw samples, shape (num_frames, frame_width).
+            timestamps (np.array): Time of each frame in seconds.
+            outputs (tuple): Names of the graph outputs to return, e.g. with 'point_frame' added.
+
+        Returns:
+            tuple: (range, azimuth_rad, x, y, snr) arrays with one entry per detected point, or
+                   the arrays named in `outputs`.
+        """
+        frames = np.asarray(frames, dtype=float)
+        timestamps = np.asarray(timestamps, dtype=float)
+        num_frames = len(frames)
+        sources = radar_sources(frames, timestamps, self.start_frame + self.frames_processed)
+        if self.decimation > 1:
+            keep = np.arange(self._decimation_phase, num_frames, self.decimation)
+            self._decimation_phase = (self._decimation_phase - num_frames) % self.decimation
+            self._decimated_metric.inc(num_frames - len(keep))
+            sources = {name: values[keep] for name, values in sources.items()}
+        requested = tuple(outputs)
+        if not self.first_frame_viz_data and len(sources['frames']):
+            outputs = requested + RADAR_GRAPH_VIZ_OUTPUTS
+        result = self._graph.process(sources, outputs)
+        if len(outputs) > len(requested):
+            self.first_frame_viz_data = {
+                'range_profile': result['range_profile'][0],
+                'cfar_threshold': result['threshold'][0],
+                'detected_indices': np.where(result['detections'][0])[0],
+            }
+        self.frames_processed += num_frames
+        FRAMES_PROCESSED.inc(len(sources['frames']))
+        if len(timestamps) and self._imu_orientation is not None and not self._imu_orientation.empty:
+            IMU_LAG.set(float(timestamps[-1]) - float(self._imu_orientation['timestamp'].iloc[-1]))
+        return tuple(result[name] for name in requested)
+
+    def _orientation(self, timestamps):
+        if self._imu_orientation is None or self._imu_orientation.empty:
+            return None
+        return align_orientation_to_timestamps(self._imu_orientation, timestamps)
+
+    def add_frames(self, frames, timestamps):
+        """
+        Detects points in the next radar frames and appends them to the accumulated point lists.
+
+        Args:
+            frames (np.array): Raw samples, shape (num_frames, frame_width).
+            timestamps (np.array): Time of each frame in seconds.
+
+        Returns:
+            int: The number of points detected in these frames.
+        """
+        corrected_r, corrected_azimuth_rad, x, y, snr = self.detect_frames(frames, timestamps)
+        self.points_polar.extend(zip(corrected_r.tolist(), corrected_azimuth_rad.tolist()))
+        self.points_cartesian.extend(zip(x.tolist(), y.tolist()))
+        self.snr.extend(snr.tolist())
+        return len(x)
+
+    def add_radar_rows(self, df_radar):
+        """
+        Detects points in new radar frames and appends them to the accumulated point lists.
+
+        Args:
+            df_radar (pd.DataFrame): New radar rows, with the column names of `read_radar_data`.
+
+        Returns:
+            int: The number of points detected in these frames.
+        """
+        radar_columns = [col for col in df_radar.columns if col.startswith('f0_f0_')]
+        return self.add_frames(df_radar[radar_columns].to_numpy(dtype=float), df_radar['Time (seconds)'].to_numpy(dtype=float))
+
+class FollowMap:
+    """
+    The 2D map of a follow run, saved as an image and updated with the points detected since the last update.
+
+    New points are added to an occupancy grid and merged into downsampling cells, so an update
+    costs O(new points) plus the clustering of the occupied cells, whose number is bounded by
+    the mapped area rather than by the length of the recording. One figure is created and only
+    the data of its artists changes between updates.
+    """
+    def __init__(self, save_path, map_extent_m=constants.MAP_EXTENT_M, grid_resolution=constants.GRID_RESOLUTION_M,
+                 cell_size=constants.DOWNSAMPLE_CELL_SIZE_M, title="2D Radar Map (live)"):
+        self.save_path = save_path
+        self.map_extent_m = map_extent_m
+        num_cells = int(round(map_extent_m / grid_resolution))
+        self.grid = np.zeros((num_cells, num_cells))
+        self.points_done = 0
+        self._cells = StreamingDownsampler(cell_size)
+        half = map_extent_m / 2
+        self.fig, self.ax = plt.subplots(figsize=(10, 10))
+        self.image = self.ax.imshow(self.grid, cmap='Greys', origin='lower', extent=[-half, half, -half, half], alpha=0.5, vmin=0, vmax=1)
+        self.centroid_artist = self.ax.scatter([], [], s=60, marker='x', color='red', label='Objects')
+        self.ax.set_title(title)
+        self.ax.set_xlabel('X Position (m)')
+        self.ax.set_ylabel('Y Position (m)')
+        self.ax.grid(True)
+        self.ax.set_aspect('equal', adjustable='box')
+        self.ax.legend(loc='lower right')
+
+    def update(self, processor):
+        """
+        Adds the points the processor detected since the last update, re-clusters the cells and saves the map.
+        """
+        if len(processor.points_cartesian) <= self.points_done:
+            return
+        new_points = np.asarray(processor.points_cartesian[self.points_done:], dtype=float).reshape(-1, 2)
+        new_snr = processor.snr[self.points_done:]
+        self.points_done = len(processor.points_cartesian)
+        half = self.map_extent_m / 2
+        self.grid += bin_points_2d(new_points[:, 0], new_points[:, 1], (-half, half), (-half, half), self.grid.shape[::-1])
+        self._cells.add(new_points, new_snr)
+
+        centroids, hit_counts, _ = self._cells.result()
+        clusters = cluster_detected_points(centroids, eps=constants.DBSCAN_EPS, min_samples=constants.DBSCAN_MIN_SAMPLES, sample_weight=hit_counts)
+        self.image.set_data(self.grid)
+        self.image.set_clim(0, max(float(self.grid.max()), 1.0))
+        self.centroid_artist.set_offsets(cluster_centroids(centroids, clusters))
+        os.makedirs(os.path.dirname(self.save_path) or '.', exist_ok=True)
+        self.fig.savefig(self.save_path)
+
+    def close(self):
+        plt.close(self.fig)
+
+def _apply_quality(processor, settings, map_update_interval_s, on_quality_change):
+    # Applies a new quality level; returns the map update interval for it
+    processor.set_quality(settings)
+    if on_quality_change is not None:
+        on_quality_change(settings)
+    return None if map_update_interval_s is None else map_update_interval_s * settings['map_interval_scale']
+
+def run_follow_pipeline(radar_file_path, imu_file_path=None,
+                        poll_interval_s=constants.FOLLOW_POLL_INTERVAL_S,
+                        idle_timeout_s=constants.FOLLOW_IDLE_TIMEOUT_S,
+                        map_update_interval_s=constants.FOLLOW_MAP_UPDATE_INTERVAL_S,
+                        on_update=None, on_points=None, latency_target_s=constants.QUALITY_TARGET_LATENCY_S,
+                        on_quality_change=None):
+    """
+    Processes radar (and IMU) .data files while DeepCraft Studio is still recording them.
+
+    Each poll reads only the newly appended complete lines of each file and pushes them through
+    the processing stages. The map is re-rendered at most every `map_update_interval_s` seconds.
+    With a latency target, a QualityController lowers the quality while new rows take longer
+    than the target (the time from reading them until their points are out, map update
+    included) and raises it again when there is headroom. The poll interval is not part of the
+    latency: no quality level can shorten it.
+
+    Args:
+        radar_file_path (str): Path to the Radar-Data.data file being recorded.
+        imu_file_path (str, optional): Path to the IMU-Data.data file being recorded.
+        poll_interval_s (float): Time to wait between polls when no new data has arrived.
+        idle_timeout_s (float, optional): Stop after this many seconds without new data. If None, runs until interrupted.
+        map_update_interval_s (float): Minimum time between two map updates. If None, no map is saved.
+        on_update (callable, optional): Called with the IncrementalFrameProcessor after each map update.
+        on_points (callable, optional): Called with the (num_points, 2) array of the points detected in each new batch of frames.
+        latency_target_s (float, optional): Target latency in seconds; if None, processing always runs at full quality.
+        on_quality_change (callable, optional): Called with the settings of each new quality level, e.g. to lower the render rate.
+
+    Returns:
+        IncrementalFrameProcessor: The processor holding all detections.
+    """
+    radar_follower = DataFileFollower(radar_file_path)
+    imu_follower = DataFileFollower(imu_file_path) if imu_file_path else None
+    processor = IncrementalFrameProcessor()
+    live_map = FollowMap(os.path.join(constants.PLOTS_OUTPUT_DIR, "2d_radar_map_live.png")) if map_update_interval_s is not None else None
+    radar_rows_metric, imu_rows_metric = FRAMES_RECEIVED.labels(stream='radar_file'), FRAMES_RECEIVED.labels(stream='imu_file')
+    controller = QualityController(latency_target_s) if latency_target_s else None
+    map_interval_s = map_update_interval_s
+    print(f"Following {radar_file_path}" + (f" and {imu_file_path}" if imu_file_path else "") + ". Press Ctrl+C to stop.")
+
+    last_data_time = time.monotonic()
+    last_update_time = 0.0
+    frames_at_last_update = 0
+    try:
+        while True:
+            got_data = False
+            poll_time = time.monotonic()
+            # IMU first, so the orientation already covers the new radar frames
+            if imu_follower is not None:
+                rows = imu_follower.poll()
+                if len(rows):
+                    imu_rows_metric.inc(len(rows))
+                    processor.add_imu_rows(pd.DataFrame(rows, columns=normalize_imu_columns(imu_follower.columns)))
+                    got_data = True
+            rows = radar_follower.poll()
+            if len(rows):
+                radar_rows_metric.inc(len(rows))
+                num_points = len(processor.snr)
+                processor.add_radar_rows(pd.DataFrame(rows, columns=radar_follower.columns))
+                if on_points is not None:
+                    on_points(np.asarray(processor.points_cartesian[num_points:]))
+                got_data = True
+
+            now = time.monotonic()
+            if map_interval_s is not None and processor.frames_processed > frames_at_last_update \
+                    and now - last_update_time >= map_interval_s:
+                live_map.update(processor)
+                MAP_UPDATE_LATENCY.observe(time.monotonic() - now)
+                print(f"Processed {processor.frames_processed} radar frames, {len(processor.points_cartesian)} points detected.")
+                if on_update is not None:
+                    on_update(processor)
+                last_update_time = now
+                frames_at_last_update = processor.frames_processed
+
+            if got_data and controller is not None:
+                settings = controller.observe(time.monotonic() - poll_time)
+                if settings is not None:
+                    map_interval_s = _apply_quality(processor, settings, map_update_interval_s, on_quality_change)
+
+            if got_data:
+                last_data_time = now
+                continue
+            if idle_timeout_s is not None and now - last_data_time > idle_timeout_s:
+                print(f"No new data for {idle_timeout_s} seconds; stopping.")
+                break
+            time.sleep(poll_interval_s)
+    except KeyboardInterrupt:
+        print("\nFollow mode stopped by user.")
+
+    if live_map is not None:
+        if processor.frames_processed > frames_at_last_update:
+            live_map.update(processor)
+        live_map.close()
+    print(f"Follow mode finished: {processor.frames_processed} radar frames, {len(processor.points_cartesian)} points.")
+    return processor
+
+def run_ring_pipeline(ring_name, idle_timeout_s=constants.FOLLOW_IDLE_TIMEOUT_S,
+                      map_update_interval_s=constants.FOLLOW_MAP_UPDATE_INTERVAL_S,
+                      block_frames=constants.PIPELINE_BLOCK_SIZE, on_update=None, on_points=None,
+                      latency_target_s=constants.QUALITY_TARGET_LATENCY_S, on_quality_change=None, shares_tracker=False):
+    """
+    Processes live radar frames from a shared-memory ring buffer filled by the acquisition process.
+
+    Frames are read from the ring without being pickled between processes. Each block is
+    copied out once and checked for overwrites before it is processed, so a block the
+    producer overwrote while it was being read is dropped before it can change the clutter
+    background or the detections. The sweep position skips ahead over dropped and missed
+    frames; the number of lost frames is reported at the end. With a latency target,
+    quality is adapted as in `run_follow_pipeline`; the latency of a block is the time its
+    first frame waited in the ring, estimated from the frame rate, plus its processing time.
+
+    Args:
+        ring_name (str): Name of the SharedFrameRing, as passed by the acquisition process.
+        idle_timeout_s (float, optional): Stop after this many seconds without new frames. If None, runs until the ring is closed.
+        map_update_interval_s (float): Minimum time between two map updates. If None, no map is saved.
+        block_frames (int): Maximum number of frames processed at a time.
+        on_update (callable, optional): Called with the IncrementalFrameProcessor after each map update.
+        on_points (callable, optional): Called with the (num_points, 2) array of the points detected in each new batch of frames.
+        latency_target_s (float, optional): Target latency in seconds; if None, processing always runs at full quality.
+        on_quality_change (callable, optional): Called with the settings of each new quality level, e.g. to lower the render rate.
+        shares_tracker (bool): True when this runs in a child process of the ring's producer, see attach_shared_memory.
+
+    Returns:
+        IncrementalFrameProcessor: The processor holding all detections.
+    """
+    reader = FrameRingReader(ring_name, start='latest', shares_tracker=shares_tracker)
+    processor = IncrementalFrameProcessor()
+    live_map = FollowMap(os.path.join(constants.PLOTS_OUTPUT_DIR, "2d_radar_map_live.png")) if map_update_interval_s is not None else None
+    expected_seq = reader.next_seq
+    dropped_frames = 0
+    last_update_time = 0.0
+    frames_at_last_update = 0
+    # Frames the reader skipped because the producer lapped it count as overruns too
+    overrun_metric = FRAMES_DROPPED.labels(stream='ring', reason='overrun')
+    QUEUE_DEPTH.labels(queue='frame_ring').set_function(lambda: reader.backlog)
+    lost_at_start = reader.frames_lost
+    controller = QualityController(latency_target_s) if latency_target_s else None
+    map_interval_s = map_update_interval_s
+    frame_interval_s = 0.0
+    print(f"Reading live frames from shared memory ring {ring_name}. Press Ctrl+C to stop.")
+    try:
+        for first_seq, timestamps, frames in reader.iter_blocks(block_frames, idle_timeout_s=idle_timeout_s):
+            read_time = time.monotonic()
+            if len(timestamps) > 1:
+                frame_interval_s = float(timestamps[-1] - timestamps[0]) / (len(timestamps) - 1)
+            # Frames lost to overruns still advance the sweep
+            processor.start_frame += first_seq - expected_seq
+            expected_seq = first_seq + len(frames)
+            overrun_metric.inc(reader.frames_lost - lost_at_start)
+            lost_at_start = reader.frames_lost
+            frames, timestamps = np.array(frames), np.array(timestamps)
+            if not reader.still_valid(first_seq):
+                # Overwritten while being copied: skip it without touching the processing state
+                processor.start_frame += len(frames)
+                dropped_frames += len(frames)
+                overrun_metric.inc(len(frames))
+                continue
+            num_points = len(processor.snr)
+            processor.add_frames(frames, timestamps)
+            if on_points is not None:
+                on_points(np.asarray(processor.points_cartesian[num_points:]))
+
+            now = time.monotonic()
+            if map_interval_s is not None and processor.frames_processed > frames_at_last_update \
+                    and now - last_update_time >= map_interval_s:
+                live_map.update(processor)
+                MAP_UPDATE_LATENCY.observe(time.monotonic() - now)
+                if on_update is not None:
+                    on_update(processor)
+                last_update_time = now
+                frames_at_last_update = processor.frames_processed
+
+            if controller is not None:
+                # The first frame of the block had waited about one block length before it was read
+                latency_s = time.monotonic() - read_time + (len(frames) + reader.backlog) * frame_interval_s
+                settings = controller.observe(latency_s)
+                if settings is not None:
+                    map_interval_s = _apply_quality(processor, settings, map_update_interval_s, on_quality_change)
+    except KeyboardInterrupt:
+        print("\nRing processing stopped by user.")
+    finally:
+        reader.close()
+
+    if live_map is not None:
+        if processor.frames_processed > frames_at_last_update:
+            live_map.update(processor)
+        live_map.close()
+    print(f"Ring processing finished: {processor.frames_processed} frames, {len(processor.points_cartesian)} points, "
+          f"{reader.frames_lost + dropped_frames} frames lost to overruns.")
+    return processor
+
+def run_live_acquisition(port, baudrate=115200, output_file=None, duration=None,
+                         latency_target_s=constants.QUALITY_TARGET_LATENCY_S):
+    """
+    Records radar frames from a serial port and processes them live in a second process.
+
+    This process reads the port with `collect_radar_data` and publishes every frame to a
+    SharedFrameRing (and, with `output_file`, to a framed recording). A processing process
+    started here runs `run_ring_pipeline` on the ring, so slow processing never stalls the
+    serial reads; it stops once it has read the last frame of the closed ring.
+
+    Args:
+        port (str): The serial port of the radar (e.g. 'COM6', '/dev/ttyUSB0').
+        baudrate (int): The baud rate of the serial link.
+        output_file (str, optional): Framed recording to write the frames to as well.
+        duration (float, optional): Acquisition time in seconds. If None, runs until Ctrl+C.
+        latency_target_s (float, optional): Latency target of the processing process, see `run_ring_pipeline`.
+    """
+    ring = SharedFrameRing(frame_width=constants.RING_FRAME_WIDTH, dtype=constants.RING_DTYPE)
+    processing = multiprocessing.Process(target=run_ring_pipeline, args=(ring.name,), name="ring-processing",
+                                         kwargs={'idle_timeout_s': None, 'latency_target_s': latency_target_s, 'shares_tracker': True})
+    processing.start()
+    try:
+        collect_radar_data(port, baudrate, output_file=output_file, duration=duration, framed=True,
+                           frame_bytes=ring.frame_width * ring.dtype.itemsize, ring=ring, echo=False)
+    finally:
+        ring.close()
+        processing.join()
@@ -1,4 +1,6 @@
 import os
+import time
+import argparse
 import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
@@ -7,12 +9,99 @@ import matplotlib.pyplot as plt
 from src.config import constants
 from src.data_acquisition.radar_reader import read_radar_data
 from src.processing.cfar_processor import process_and_cfar_data # Import the main processing function
+from src.pipeline.follow_pipeline import run_follow_pipeline, run_live_acquisition, run_ring_pipeline
+from src.pipeline.budget_pipeline import run_budgeted_pipeline
+from src.pipeline.window_pipeline import process_time_window
+from src.pipeline.tracking_pipeline import run_tracking_pipeline
+from src.pipeline.sharded_pipeline import run_sharded_pipeline
+from src.pipeline.pose_graph_pipeline import run_pose_graph_pipeline
+from src.pipeline.processing_daemon import serve_daemon
+from src.pipeline.dataset_export import export_labeled_windows, find_labeled_sessions
+from src.monitoring.runtime_metrics import MetricsLogger, start_metrics_server
+from src.visualization.live_viewer import LiveMapViewer
 
-def run_processing_pipeline():
+def parse_args(argv=None):
+    """
+    Parses the command-line options of the processing pipeline.
+
+    Args:
+        argv (list, optional): Arguments to parse. Defaults to sys.argv.
+
+    Returns:
+        argparse.Namespace: The parsed options.
+    """
+    parser = argparse.ArgumentParser(description="Run the radar data processing pipeline.")
+    # Each run uses one processing mode; the options of one mode are ignored by the others
+    modes = parser.add_mutually_exclusive_group()
+    modes.add_argument('--threaded', action='store_true',
+                       help="Load the next block of radar frames in a second thread while detection runs on the current one.")
+    modes.add_argument('--follow', action='store_true',
+                       help="Process the session files while they are still being recorded and update the map live.")
+    parser.add_argument('--live-view', action='store_true',
+                        help="In follow mode, show the map in a window refreshed at a fixed rate instead of saving it periodically.")
+    modes.add_argument('--acquire', metavar='PORT',
+                       help="Record radar frames from serial PORT into RECORDINGS_OUTPUT_DIR and process them live in a second process.")
+    modes.add_argument('--ring', metavar='NAME',
+                       help="Process live frames from the shared-memory frame ring NAME of a running acquisition process.")
+    parser.add_argument('--idle-timeout', type=float, default=constants.FOLLOW_IDLE_TIMEOUT_S,
+                        help="In follow mode, stop after this many seconds without new data (0 runs until Ctrl+C).")
+    modes.add_argument('--memory-budget', type=float, default=constants.MEMORY_BUDGET_MB, metavar='MB',
+                       help="Process the session in chunks so the run uses at most about this many MB, spilling to disk if needed.")
+    modes.add_argument('--window', type=float, nargs=2, metavar=('T0', 'T1'),
+                       help="Process only the frames between T0 and T1 seconds, using the sidecar time index.")
+    modes.add_argument('--track', action='store_true',
+                       help="Track moving objects across frames instead of building the map.")
+    modes.add_argument('--shards', type=int, metavar='N',
+                       help="Split the session into time shards processed by N worker processes.")
+    modes.add_argument('--pose-graph', action='store_true',
+                       help="Correct the IMU yaw drift with a pose graph of aligned keyframe scans before mapping.")
+    modes.add_argument('--daemon', action='store_true',
+                       help="Stay running and answer processing jobs over localhost HTTP, keeping recent sessions in memory.")
+    modes.add_argument('--export-dataset', nargs='?', const=constants.DATASET_SESSIONS_ROOT, metavar='DIR',
+                       help="Export labeled radar and IMU windows of the sessions in DIR (default DATASET_SESSIONS_ROOT) to DATASET_OUTPUT_DIR.")
+    parser.add_argument('--port', type=int, default=constants.DAEMON_PORT,
+                        help="Port of the processing daemon.")
+    parser.add_argument('--latency-target', type=float, default=constants.QUALITY_TARGET_LATENCY_S, metavar='S',
+                        help="In follow mode, lower the processing quality while frames wait longer than S seconds.")
+    parser.add_argument('--metrics-port', type=int, nargs='?', const=constants.METRICS_PORT, metavar='PORT',
+                        help=f"Serve runtime metrics in Prometheus format on this port (default {constants.METRICS_PORT}) and log them as JSON lines.")
+    args = parser.parse_args(argv)
+    if args.live_view and not args.follow:
+        parser.error("--live-view requires --follow")
+    return args
+
+def run_processing_pipeline(threaded=False, follow=False, idle_timeout_s=constants.FOLLOW_IDLE_TIMEOUT_S,
+                            memory_budget_mb=constants.MEMORY_BUDGET_MB, time_window=None, track=False,
+                            num_shards=None, live_view=False, pose_graph=False, daemon=False,
+                            daemon_port=constants.DAEMON_PORT, metrics_port=None,
+                            latency_target_s=constants.QUALITY_TARGET_LATENCY_S, acquire_port=None, ring_name=None,
+                            export_dataset=None):
     """
     Main function to run the complete radar data processing pipeline.
+
+    Args:
+        threaded (bool): If True, load radar frames in a second thread while detection runs.
+        follow (bool): If True, follow the session files while they are being recorded.
+        idle_timeout_s (float, optional): In follow mode, stop after this many seconds without new data.
+        memory_budget_mb (float, optional): If set, process the session in chunks within this memory budget.
+        time_window (tuple, optional): (t0, t1) in seconds; if set, process only this part of the session.
+        track (bool): If True, track moving objects across frames instead of building the map.
+        num_shards (int, optional): If set, process the session in this many time shards in parallel worker processes.
+        live_view (bool): In follow mode, show the map in a live window instead of saving it periodically.
+        pose_graph (bool): If True, correct the yaw drift with a pose graph before mapping.
+        daemon (bool): If True, serve processing jobs on localhost until interrupted instead of running once.
+        daemon_port (int): Port of the processing daemon.
+        metrics_port (int, optional): If set, serve runtime metrics on this port and log them every METRICS_LOG_INTERVAL_S.
+        latency_target_s (float, optional): In follow mode, adapt the processing quality to keep the frame latency below this.
+        acquire_port (str, optional): If set, record radar frames from this serial port and process them live.
+        ring_name (str, optional): If set, process live frames from this shared-memory frame ring.
+        export_dataset (str, optional): If set, export the labeled sessions in this directory as a training dataset.
     """
     print("--- Starting Radar Processing Pipeline ---")
+    if metrics_port:
+        # Both run in background threads for the rest of the process
+        start_metrics_server(port=metrics_port)
+        MetricsLogger().start()
 
     # Create output directory for plots if it doesn't exist
     os.makedirs(constants.PLOTS_OUTPUT_DIR, exist_ok=True)
@@ -23,13 +112,84 @@ def run_processing_pipeline():
     mag_file_path = constants.MAGNETOMETER_DATA_FILE if os.path.exists(constants.MAGNETOMETER_DATA_FILE) else None
 
     # --- 2. Run the main processing and visualization ---
+    if daemon:
+        serve_daemon(port=daemon_port)
+        print("\n--- Pipeline Finished ---")
+        return
+
+    if export_dataset:
+        export_labeled_windows(find_labeled_sessions(export_dataset))
+        print("\n--- Pipeline Finished ---")
+        return
+
+    if acquire_port:
+        output_file = os.path.join(constants.RECORDINGS_OUTPUT_DIR, time.strftime("capture-%Y%m%d-%H%M%S.rdr"))
+        run_live_acquisition(acquire_port, output_file=output_file, latency_target_s=latency_target_s)
+        print("\n--- Pipeline Finished ---")
+        return
+
+    if ring_name:
+        run_ring_pipeline(ring_name, idle_timeout_s=idle_timeout_s or None, latency_target_s=latency_target_s)
+        print("\n--- Pipeline Finished ---")
+        return
+
+    if follow:
+        # The files may not exist yet when recording has not started
+        imu_file_path = constants.IMU_DATA_FILE
+        if live_view:
+            # Processing runs in a background thread; the window is refreshed from this one
+            def produce_points(viewer):
+                def set_render_rate(settings):
+                    viewer.fps = constants.LIVE_VIEWER_FPS * settings['render_fps_scale']
+                run_follow_pipeline(radar_file_path, imu_file_path=imu_file_path, idle_timeout_s=idle_timeout_s or None,
+                                    map_update_interval_s=None, on_points=viewer.add_points,
+                                    latency_target_s=latency_target_s, on_quality_change=set_render_rate)
+            LiveMapViewer().run(producer=produce_points)
+        else:
+            run_follow_pipeline(radar_file_path, imu_file_path=imu_file_path, idle_timeout_s=idle_timeout_s or None,
+                                latency_target_s=latency_target_s)
+        print("\n--- Pipeline Finished ---")
+        return
+
+    if track:
+        run_tracking_pipeline(radar_file_path, imu_file_path=imu_file_path, mag_file_path=mag_file_path)
+        print("\n--- Pipeline Finished ---")
+        return
+
+    if pose_graph:
+        run_pose_graph_pipeline(radar_file_path, imu_file_path=imu_file_path, mag_file_path=mag_file_path)
+        print("\n--- Pipeline Finished ---")
+        return
+
+    if time_window:
+        process_time_window(radar_file_path, *time_window, imu_file_path=imu_file_path, mag_file_path=mag_file_path)
+        print("\n--- Pipeline Finished ---")
+        return
+
+    if num_shards:
+        run_sharded_pipeline(radar_file_path, imu_file_path=imu_file_path, mag_file_path=mag_file_path, num_workers=num_shards)
+        print("\n--- Pipeline Finished ---")
+        return
+
+    if memory_budget_mb:
+        run_budgeted_pipeline(radar_file_path, imu_file_path=imu_file_path, mag_file_path=mag_file_path, memory_budget_mb=memory_budget_mb)
+        print("\n--- Pipeline Finished ---")
+        return
+
     process_and_cfar_data(
         file_path=radar_file_path,
         imu_file_path=imu_file_path,
-        mag_file_path=mag_file_path
+        mag_file_path=mag_file_path,
+        threaded=threaded
     )
     
     print("\n--- Pipeline Finished ---")
 
 if __name__ == "__main__":
-    run_processing_pipeline()
+    args = parse_args()
+    run_processing_pipeline(threaded=args.threaded, follow=args.follow, idle_timeout_s=args.idle_timeout,
+                            memory_budget_mb=args.memory_budget, time_window=args.window, track=args.track,
+                            num_shards=args.shards, live_view=args.live_view,
+                            pose_graph=args.pose_graph, daemon=args.daemon, daemon_port=args.port,
+                            metrics_port=args.metrics_port, latency_target_s=args.latency_target,
+                            acquire_port=args.acquire, ring_name=args.ring, export_dataset=args.export_dataset)
@@ -0,0 +1,225 @@
+import os
+import tempfile
+import threading
+import numpy as np
+from src.config import constants
+from src.monitoring.runtime_metrics import resident_memory_bytes
+
+class MemoryMonitor:
+    """
+    Samples the resident memory of the process in a background thread and keeps the peak.
+
+    The memory in use when the monitor starts (interpreter, libraries, loaded modules) is
+    the baseline; a memory budget applies to what the run allocates on top of it. Where the
+    resident memory cannot be read, the baseline and peak stay None.
+    """
+    def __init__(self, sample_interval_s=constants.MEMORY_SAMPLE_INTERVAL_S):
+        self.sample_interval_s = sample_interval_s
+        self.baseline_bytes = None
+        self.peak_bytes = None
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self.baseline_bytes = self.peak_bytes = resident_memory_bytes()
+        if self.baseline_bytes is None:
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._sample, name="memory-monitor", daemon=True)
+        self._thread.start()
+
+    def _sample(self):
+        while not self._stop_event.wait(self.sample_interval_s):
+            self.peak_bytes = max(self.peak_bytes, resident_memory_bytes())
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+            self.peak_bytes = max(self.peak_bytes, resident_memory_bytes())
+
+    def report(self, budget_mb):
+        """
+        Prints the peak memory of the run against the budget.
+
+        Returns:
+            float: The peak memory above the baseline in MB, or None if it could not be measured.
+        """
+        if self.peak_bytes is None:
+            print(f"Peak memory: unavailable on this platform (budget {budget_mb:.0f} MB).")
+            return None
+        used_mb = (self.peak_bytes - self.baseline_bytes) / 2**20
+        print(f"Peak memory: {used_mb:.1f} MB used by the run (budget {budget_mb:.0f} MB), "
+              f"{self.peak_bytes / 2**20:.1f} MB total including the {self.baseline_bytes / 2**20:.1f} MB baseline.")
+        if used_mb > budget_mb:
+            print(f"Warning: the run exceeded its memory budget by {used_mb - budget_mb:.1f} MB.")
+        return used_mb
+
+def stage_bytes_per_frame(frame_width, dtype=constants.MEMORY_DTYPE, clutter_removal=constants.CLUTTER_REMOVAL_ENABLED):
+    """
+    Estimates the memory each processing stage needs per radar frame.
+
+    Args:
+        frame_width (int): Raw samples per frame.
+        dtype (str): Dtype in which raw frames and buffered points are held.
+        clutter_removal (bool): Whether the clutter removal stage runs.
+
+    Returns:
+        dict: Bytes per frame for each stage.
+    """
+    itemsize = np.dtype(dtype).itemsize
+    num_bins = frame_width // 2
+    model = {
+        # CSV text, the parser's float64 values and the converted frame
+        'read': (frame_width + 1) * (constants.MEMORY_CSV_BYTES_PER_VALUE + 8 + itemsize),
+        # float64 input, complex spectrum and magnitudes
+        'fft': frame_width * 8 + (num_bins + 1) * 16 + num_bins * 8,
+        # Padded cumulative sums, noise estimate, threshold and detection mask
+        'cfar': num_bins * (4 * 8 + 1),
+    }
+    if clutter_removal:
+        model['clutter'] = frame_width * 8 * 2
+    return model
+
+def plan_memory_budget(budget_mb, frame_width, dtype=constants.MEMORY_DTYPE, reserved_bytes=0, num_frames=None):
+    """
+    Chooses chunk and buffer sizes so a run stays within a memory budget.
+
+    The budget (minus memory already reserved, e.g. by the IMU data) is split between the
+    frames being processed, the buffer of detected points, the cache of open map tiles and
+    the downsampled map cells, following MEMORY_BUDGET_SHARES.
+
+    Args:
+        budget_mb (float): Memory the run may use on top of the baseline, in MB.
+        frame_width (int): Raw samples per radar frame, e.g. from the .imsession shape.
+        dtype (str): Dtype policy for raw frames and buffered points.
+        reserved_bytes (int): Memory already in use by the run.
+        num_frames (int, optional): Frames in the recording; chunks are never larger.
+
+    Returns:
+        dict: The plan, with 'chunk_frames', 'max_buffered_points', 'max_open_tiles',
+              'max_cells', 'dtype' and the per-stage estimate 'stage_bytes_per_frame'.
+    """
+    available = budget_mb * 2**20 - reserved_bytes
+    if available <= 0:
+        print(f"Warning: {reserved_bytes / 2**20:.1f} MB are already in use, more than the {budget_mb} MB budget. Using minimum sizes.")
+        available = 0
+    shares = constants.MEMORY_BUDGET_SHARES
+    stage_bytes = stage_bytes_per_frame(frame_width, dtype)
+    point_bytes = 5 * np.dtype(dtype).itemsize # range, azimuth, x, y, SNR
+    tile_bytes = constants.TILED_MAP_TILE_SIZE ** 2 * 4
+    cell_bytes = 7 * 8 # cell key, sorted key and its cell, coordinate sums, hit count, max SNR
+
+    chunk_frames = max(constants.MEMORY_MIN_CHUNK_FRAMES, int(available * shares['frames'] / sum(stage_bytes.values())))
+    if num_frames:
+        chunk_frames = min(chunk_frames, max(1, num_frames))
+    plan = {
+        'dtype': dtype,
+        'chunk_frames': chunk_frames,
+        'max_buffered_points': max(constants.MEMORY_MIN_CHUNK_FRAMES, int(available * shares['points'] / point_bytes)),
+        'max_open_tiles': max(1, int(available * shares['tiles'] / tile_bytes)),
+        'max_cells': max(1, int(available * shares['cells'] / cell_bytes)),
+        'stage_bytes_per_frame': stage_bytes,
+    }
+    return plan
+
+def print_memory_plan(plan, budget_mb):
+    print(f"Memory plan for a {budget_mb:.0f} MB budget ({plan['dtype']} samples):")
+    print(f"  Read chunk: {plan['chunk_frames']} frames "
+          f"({plan['chunk_frames'] * sum(plan['stage_bytes_per_frame'].values()) / 2**20:.1f} MB in flight; per frame: "
+          + ", ".join(f"{stage} {size} B" for stage, size in plan['stage_bytes_per_frame'].items()) + ")")
+    print(f"  Point buffer: {plan['max_buffered_points']} points in memory before spilling to disk")
+    print(f"  Tile cache: {plan['max_open_tiles']} open tiles; map cells: up to {plan['max_cells']}")
+
+class SpillBuffer:
+    """
+    An append-only table of fixed-width rows that moves to disk when it outgrows its memory limit.
+
+    Rows are collected in a preallocated array of `max_rows_in_memory` rows. Whenever it
+    fills up, its contents are appended to a raw binary file, so memory stays bounded no
+    matter how many rows are added. The rows can be read back in order, chunk by chunk.
+    """
+    def __init__(self, num_columns, max_rows_in_memory, dtype=constants.MEMORY_DTYPE, spill_dir=None):
+        self.num_columns = num_columns
+        self.dtype = np.dtype(dtype)
+        self.spill_dir = spill_dir
+        self._memory = np.empty((max(1, int(max_rows_in_memory)), num_columns), dtype=self.dtype)
+        self._memory_rows = 0
+        self.spilled_rows = 0
+        self.spill_path = None
+
+    def __len__(self):
+        return self.spilled_rows + self._memory_rows
+
+    def append(self, rows):
+        """
+        Adds rows of shape (n, num_columns).
+        """
+        rows = np.asarray(rows, dtype=self.dtype).reshape(-1, self.num_columns)
+        while len(rows):
+            take = min(len(rows), len(self._memory) - self._memory_rows)
+            self._memory[self._memory_rows:self._memory_rows + take] = rows[:take]
+            self._memory_rows += take
+            rows = rows[take:]
+            if self._memory_rows == len(self._memory):
+                self._spill()
+
+    def _spill(self):
+        if self.spill_path is None:
+            if self.spill_dir:
+                os.makedirs(self.spill_dir, exist_ok=True)
+            fd, self.spill_path = tempfile.mkstemp(suffix=".spill", dir=self.spill_dir)
+            os.close(fd)
+            print(f"Point buffer is full; spilling to {self.spill_path}.")
+        with open(self.spill_path, 'ab') as f:
+            self._memory[:self._memory_rows].tofile(f)
+        self.spilled_rows += self._memory_rows
+        self._memory_rows = 0
+
+    def iter_chunks(self, chunk_rows=None):
+        """
+        Yields the rows in the order they were added, as arrays of at most `chunk_rows` rows.
+        """
+        chunk_rows = chunk_rows or len(self._memory)
+        if self.spilled_rows:
+            spilled = np.memmap(self.spill_path, dtype=self.dtype, mode='r', shape=(self.spilled_rows, self.num_columns))
+            for start in range(0, self.spilled_rows, chunk_rows):
+                yield np.array(spilled[start:start + chunk_rows])
+            del spilled
+        for start in range(0, self._memory_rows, chunk_rows):
+            yield self._memory[start:min(start + chunk_rows, self._memory_rows)]
+
+    def sample(self, max_rows):
+        """
+        Returns at most `max_rows` rows spread evenly over the buffer, e.g. for plotting.
+        """
+        step = max(1, int(np.ceil(len(self) / max_rows)))
+        rows, offset = [], 0
+        for chunk in self.iter_chunks():
+            rows.append(chunk[(-offset) % step::step])
+            offset += len(chunk)
+        return np.concatenate(rows) if rows else np.empty((0, self.num_columns), dtype=self.dtype)
+
+    def close(self):
+        """
+        Deletes the spill file.
+        """
+        if self.spill_path is not None and os.path.exists(self.spill_path):
+            os.remove(self.spill_path)
+        self.spill_path = None
+
+if __name__ == "__main__":
+    # Example usage: plan a 64 MB run for 128-sample frames and overflow a small point buffer
+    plan = plan_memory_budget(64, frame_width=128, num_frames=1_000_000)
+    print_memory_plan(plan, 64)
+
+    monitor = MemoryMonitor()
+    monitor.start()
+    buffer = SpillBuffer(num_columns=5, max_rows_in_memory=10000)
+    for _ in range(25):
+        buffer.append(np.random.rand(1000, 5))
+    print(f"Buffered {len(buffer)} rows, {buffer.spilled_rows} of them on disk; sample of {len(buffer.sample(100))} rows.")
+    buffer.close()
+    monitor.stop()
+    monitor.report(64)
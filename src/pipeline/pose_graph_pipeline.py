@@ -0,0 +1,226 @@
+import os
+import time
+import numpy as np
+from scipy.spatial import cKDTree
+from src.config import constants
+from src.data_acquisition.data_parser import count_data_rows
+from src.data_acquisition.radar_reader import read_radar_data_chunks
+from src.data_acquisition.imu_reader import read_and_merge_imu_data
+from src.pipeline.follow_pipeline import IncrementalFrameProcessor
+from src.pipeline.radar_graph import RADAR_GRAPH_FRAME_OUTPUT
+from src.processing.downsampling import downsample_points
+from src.processing.object_clustering import cluster_detected_points
+from src.processing.pose_graph import PoseGraph, compose_pose, relative_pose, wrap_angle
+from src.processing.scan_matching import align_scans, transform_points
+from src.visualization.map_viewer import create_2d_map
+
+def keyframe_scans(points, point_frame, frame_yaw, first_frame=0, keyframe_frames=constants.POSE_GRAPH_KEYFRAME_FRAMES,
+                   scan_frames=constants.POSE_GRAPH_SCAN_FRAMES, cell_size=constants.POSE_GRAPH_SCAN_CELL_M):
+    """
+    Splits a recording into keyframes and builds the scan of each keyframe in its own frame.
+
+    A keyframe covers `keyframe_frames` consecutive frames and sits at the IMU yaw of its
+    middle frame. Its scan holds the points of the `scan_frames` frames around it, rotated
+    into the keyframe frame and downsampled; scans overlap so that they cover enough of the
+    surroundings to be aligned. Over the span of one scan the IMU yaw drifts little.
+
+    Args:
+        points (np.array): Detected points of shape (n, 2), as projected with the IMU yaw.
+        point_frame (np.array): Frame index of every point, in non-decreasing order.
+        frame_yaw (np.array): Yaw of every frame in radians, starting at frame `first_frame`.
+        first_frame (int): Frame index of frame_yaw[0].
+        keyframe_frames (int): Frames per keyframe.
+        scan_frames (int): Frames around a keyframe whose points form its scan.
+        cell_size (float): Cell size the scans are downsampled to.
+
+    Returns:
+        tuple: (keyframe_yaw, scans, point_keyframe): the yaw of every keyframe, the list of
+               scans of shape (m, 2), and the keyframe of every point.
+    """
+    points = np.asarray(points, dtype=float).reshape(-1, 2)
+    frame_offset = np.asarray(point_frame) - first_frame
+    num_keyframes = max(-(-len(frame_yaw) // keyframe_frames), 1)
+    centers = np.minimum(np.arange(num_keyframes) * keyframe_frames + keyframe_frames // 2, max(len(frame_yaw) - 1, 0))
+    keyframe_yaw = np.asarray(frame_yaw, dtype=float)[centers] if len(frame_yaw) else np.zeros(num_keyframes)
+    starts = np.searchsorted(frame_offset, centers - scan_frames // 2, side='left')
+    ends = np.searchsorted(frame_offset, centers + scan_frames // 2, side='left')
+    scans = []
+    for yaw, start, end in zip(keyframe_yaw, starts, ends):
+        local = transform_points(points[start:end], (0.0, 0.0, -yaw))
+        scans.append(downsample_points(local, cell_size)[0])
+    return keyframe_yaw, scans, np.minimum(frame_offset // keyframe_frames, num_keyframes - 1)
+
+def build_pose_graph(keyframe_yaw, scans, optimize_every=constants.POSE_GRAPH_OPTIMIZE_EVERY):
+    """
+    Builds the pose graph of a sequence of keyframes, re-optimising it as loop closures are found.
+
+    Consecutive keyframes are linked by the IMU yaw change (the IMU gives no translation, so
+    this edge says the scanner stayed in place, with a loose translation std) and, when
+    their scans align, by the scan alignment. Each keyframe is also aligned with up to
+    POSE_GRAPH_LOOP_CANDIDATES older keyframes near its current pose estimate; accepted
+    alignments become loop-closure edges. Every `optimize_every` keyframes with new loop
+    closures, the graph is re-optimised from its current poses, so the poses that new
+    keyframes and loop candidates are based on have their drift removed.
+
+    Args:
+        keyframe_yaw (np.array): IMU yaw of every keyframe in radians.
+        scans (list): Scan of every keyframe in its own frame, see `keyframe_scans`.
+        optimize_every (int): Keyframes between two incremental re-optimisations.
+
+    Returns:
+        tuple: (PoseGraph, stats dict with 'scan_edges', 'loop_closures', 'optimizations',
+               'solve_time_s' (total) and 'last_solve_time_s').
+    """
+    graph = PoseGraph()
+    trees = [cKDTree(scan) if len(scan) >= constants.POSE_GRAPH_MIN_SCAN_POINTS else None for scan in scans]
+    stats = {'scan_edges': 0, 'loop_closures': 0, 'optimizations': 0, 'solve_time_s': 0.0, 'last_solve_time_s': 0.0}
+
+    def optimize():
+        result = graph.optimize()
+        stats['optimizations'] += 1
+        stats['solve_time_s'] += result['solve_time_s']
+        stats['last_solve_time_s'] = result['solve_time_s']
+
+    def try_alignment(i, j, guess):
+        pose, inlier_ratio, _ = align_scans(scans[j], scans[i], guess, target_tree=trees[i])
+        if inlier_ratio < constants.POSE_GRAPH_MIN_INLIER_RATIO:
+            return False
+        graph.add_edge(i, j, pose, constants.POSE_GRAPH_SCAN_STD)
+        return True
+
+    graph.add_node((0.0, 0.0, keyframe_yaw[0]) if len(keyframe_yaw) else (0.0, 0.0, 0.0))
+    pending_loops = 0
+    for k in range(1, len(keyframe_yaw)):
+        odometry = np.array([0.0, 0.0, wrap_angle(keyframe_yaw[k] - keyframe_yaw[k - 1])])
+        graph.add_node(compose_pose(graph.poses[k - 1], odometry))
+        graph.add_edge(k - 1, k, odometry, constants.POSE_GRAPH_ODOMETRY_STD)
+        if trees[k] is None:
+            continue
+        if trees[k - 1] is not None and try_alignment(k - 1, k, odometry):
+            stats['scan_edges'] += 1
+
+        newest_candidate = k - constants.POSE_GRAPH_LOOP_MIN_GAP
+        if newest_candidate >= 0:
+            poses = graph.poses
+            distances = np.hypot(*(poses[:newest_candidate + 1, :2] - poses[k, :2]).T)
+            candidates = np.nonzero((distances <= constants.POSE_GRAPH_LOOP_RADIUS_M) &
+                                    np.array([tree is not None for tree in trees[:newest_candidate + 1]]))[0]
+            if len(candidates):
+                # Spread the tries over the candidates; the oldest one closes the longest loop
+                picks = np.unique(np.linspace(0, len(candidates) - 1, constants.POSE_GRAPH_LOOP_CANDIDATES).round().astype(int))
+                for j in candidates[picks]:
+                    if try_alignment(j, k, relative_pose(poses[j], poses[k])):
+                        stats['loop_closures'] += 1
+                        pending_loops += 1
+        if pending_loops and k % optimize_every == 0:
+            optimize()
+            pending_loops = 0
+    optimize()
+    return graph, stats
+
+def reconstruct_points(points, point_keyframe, keyframe_yaw, poses):
+    """
+    Re-projects detected points with the optimised keyframe poses.
+
+    Args:
+        points (np.array): Points of shape (n, 2), as projected with the IMU yaw.
+        point_keyframe (np.array): Keyframe of every point.
+        keyframe_yaw (np.array): IMU yaw of every keyframe.
+        poses (np.array): Optimised pose (x, y, theta) of every keyframe.
+
+    Returns:
+        np.array: The corrected points, shape (n, 2).
+    """
+    points = np.asarray(points, dtype=float).reshape(-1, 2)
+    correction = wrap_angle(poses[:, 2] - keyframe_yaw)[point_keyframe]
+    c, s = np.cos(correction), np.sin(correction)
+    return np.column_stack((c * points[:, 0] - s * points[:, 1], s * points[:, 0] + c * points[:, 1])) + poses[point_keyframe, :2]
+
+def run_pose_graph_pipeline(file_path, imu_file_path=None, mag_file_path=None, keyframe_frames=constants.POSE_GRAPH_KEYFRAME_FRAMES,
+                            chunk_frames=constants.TRACK_CHUNK_FRAMES, show_plots=True):
+    """
+    Detects points, corrects the drift of the IMU yaw with a pose graph and maps the corrected points.
+
+    Args:
+        file_path (str): Absolute path to the Radar-Data.data file.
+        imu_file_path (str, optional): Absolute path to the IMU data file.
+        mag_file_path (str, optional): Absolute path to the Magnetometer data file.
+        keyframe_frames (int): Frames per keyframe.
+        chunk_frames (int): Radar frames read and processed at a time.
+        show_plots (bool): If True, map the corrected points.
+
+    Returns:
+        dict: 'points_cartesian' (corrected, (n, 2)), 'snr', 'poses' and 'keyframe_yaw' arrays and
+              the 'graph', or None if the data cannot be processed.
+    """
+    if not os.path.exists(file_path):
+        print(f"Error: File not found at {file_path}")
+        return None
+
+    processor = IncrementalFrameProcessor(sweep_frames=count_data_rows(file_path), imu_history_s=np.inf)
+    if imu_file_path:
+        df_imu = read_and_merge_imu_data(imu_file_path, mag_file_path)
+        if df_imu is not None:
+            processor.add_imu_rows(df_imu)
+        else:
+            print("IMU data could not be loaded or processed.")
+
+    outputs = ('point_x', 'point_y', 'point_snr', RADAR_GRAPH_FRAME_OUTPUT, 'yaw')
+    xs, ys, snrs, point_frames, frame_yaws = [], [], [], [], []
+    try:
+        for chunk in read_radar_data_chunks(file_path, chunk_frames):
+            radar_columns = [col for col in chunk.columns if col.startswith('f0_f0_')]
+            timestamps = chunk['Time (seconds)'].to_numpy(dtype=float)
+            for results, name in zip((xs, ys, snrs, point_frames, frame_yaws),
+                                     processor.detect_frames(chunk[radar_columns].to_numpy(), timestamps, outputs=outputs)):
+                results.append(name)
+    except Exception as e:
+        print(f"Error processing radar data: {e}")
+        return None
+    if not frame_yaws:
+        print("Error: The radar file has no frames.")
+        return None
+
+    points = np.column_stack((np.concatenate(xs), np.concatenate(ys)))
+    snr, point_frame, frame_yaw = np.concatenate(snrs), np.concatenate(point_frames), np.concatenate(frame_yaws)
+    start_time = time.perf_counter()
+    keyframe_yaw, scans, point_keyframe = keyframe_scans(points, point_frame, frame_yaw, keyframe_frames=keyframe_frames)
+    graph, stats = build_pose_graph(keyframe_yaw, scans)
+    corrected = reconstruct_points(points, point_keyframe, keyframe_yaw, graph.poses)
+    yaw_correction = np.degrees(np.abs(wrap_angle(graph.poses[:, 2] - keyframe_yaw)))
+    print(f"Pose graph: {graph.num_nodes} keyframes, {stats['scan_edges']} scan alignments, {stats['loop_closures']} loop closures, "
+          f"{stats['optimizations']} optimisations in {stats['solve_time_s']:.2f} s (last {stats['last_solve_time_s'] * 1000:.0f} ms); "
+          f"built in {time.perf_counter() - start_time:.2f} s.")
+    print(f"Yaw correction: up to {yaw_correction.max():.2f} degrees, {yaw_correction[-1]:.2f} degrees at the last keyframe.")
+
+    if show_plots:
+        if len(corrected):
+            centroids, hit_counts, _ = downsample_points(corrected, constants.DOWNSAMPLE_CELL_SIZE_M, snr=snr)
+            clusters_indices = cluster_detected_points(centroids, eps=constants.DBSCAN_EPS, min_samples=constants.DBSCAN_MIN_SAMPLES, sample_weight=hit_counts)
+            print(f"\nDetected {len(clusters_indices)} clusters.")
+            create_2d_map(clusters=clusters_indices, all_detected_points_cartesian=centroids.tolist(), title="2D Radar Map, Pose Graph Corrected", map_extent_m=constants.MAP_EXTENT_M, grid_resolution=constants.GRID_RESOLUTION_M, save_path=os.path.join(constants.PLOTS_OUTPUT_DIR, "2d_radar_map_pose_graph.png"), point_weights=hit_counts)
+        else:
+            print("\nNo points detected for clustering or mapping.")
+    return {'points_cartesian': corrected, 'snr': snr, 'poses': graph.poses.copy(), 'keyframe_yaw': keyframe_yaw, 'graph': graph}
+
+if __name__ == "__main__":
+    # Example usage: a scanner turning in place in a square room, with a drifting gyro yaw
+    rng = np.random.default_rng(0)
+    frames_per_turn, num_frames = 2000, 200000
+    true_yaw = np.arange(num_frames) * (2 * np.pi / frames_per_turn)
+    imu_yaw = true_yaw + np.arange(num_frames) * 2e-6  # About 23 degrees of drift over the recording
+    # One wall hit per frame where the beam meets the 8 m x 6 m room
+    c, s = np.cos(true_yaw), np.sin(true_yaw)
+    with np.errstate(divide='ignore'):
+        distance = np.minimum(np.abs(4.0 / c), np.abs(3.0 / s))
+    distance += rng.normal(scale=0.01, size=num_frames)
+    points = np.column_stack((distance * np.cos(imu_yaw), distance * np.sin(imu_yaw)))
+
+    keyframe_yaw, scans, point_keyframe = keyframe_scans(points, np.arange(num_frames), imu_yaw)
+    graph, stats = build_pose_graph(keyframe_yaw, scans)
+    corrected = reconstruct_points(points, point_keyframe, keyframe_yaw, graph.poses)
+    truth = np.column_stack((distance * c, distance * s))
+    print(f"{graph.num_nodes} keyframes, {stats['loop_closures']} loop closures, {stats['optimizations']} optimisations "
+          f"in {stats['solve_time_s']:.2f} s (last {stats['last_solve_time_s'] * 1000:.0f} ms)")
+    print(f"Largest point error: {np.max(np.hypot(*(points - truth).T)):.2f} m with IMU yaw, "
+          f"{np.max(np.hypot(*(corrected - truth).T)):.2f} m after optimisation")
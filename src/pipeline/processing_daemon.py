@@ -0,0 +1,395 @@
+import http.client
+import http.server
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+import numpy as np
+import matplotlib.pyplot as plt
+from src.config import constants
+from src.data_acquisition.imu_reader import read_and_merge_imu_data
+from src.data_acquisition.time_index import load_time_index, read_data_window
+from src.fusion.imu_fusion import estimate_orientation
+from src.pipeline.checkpoint import session_signature
+from src.pipeline.radar_graph import RADAR_GRAPH_FRAME_OUTPUT, RADAR_GRAPH_OUTPUTS, build_radar_graph, imu_orientation_lookup, radar_sources
+from src.pipeline.stage_graph import run_chunked
+from src.processing.downsampling import downsample_points
+from src.processing.object_clustering import cluster_detected_points
+from src.visualization.map_viewer import cluster_centroids, create_2d_map
+
+class SessionEntry:
+    """
+    What the daemon keeps in memory for one session.
+
+    The time index of the radar file and the orientation of the whole IMU track are loaded
+    when the session is first used. The radar frames themselves and the full-session map are
+    only loaded by the first 'map' job. Because the orientation covers the whole track, a window
+    job needs no IMU warm-up, and its yaw equals that of a full-session run.
+    """
+    def __init__(self, session_dir, signature):
+        self.session_dir = session_dir
+        self.signature = signature
+        self.radar_file_path = os.path.join(session_dir, "Radar-Data.data")
+        imu_file_path = os.path.join(session_dir, "IMU-Data.data")
+        mag_file_path = os.path.join(session_dir, "Magnetometer-Data.data")
+        self.radar_index = load_time_index(self.radar_file_path)
+        self.imu_orientation = None
+        if os.path.exists(imu_file_path):
+            df_imu = read_and_merge_imu_data(imu_file_path, mag_file_path if os.path.exists(mag_file_path) else None)
+            if df_imu is not None and not df_imu.empty:
+                imu_dt = (df_imu['timestamp'].iloc[1] - df_imu['timestamp'].iloc[0]) if len(df_imu) > 1 else 0.01
+                self.imu_orientation = estimate_orientation(df_imu, dt=imu_dt)
+        self.frames = None
+        self.timestamps = None
+        self.map_result = None
+        self.lock = threading.Lock()
+
+    @property
+    def nbytes(self):
+        total = self.radar_index.times.nbytes + self.radar_index.offsets.nbytes
+        if self.imu_orientation is not None:
+            total += int(self.imu_orientation.memory_usage(index=False).sum())
+        if self.frames is not None:
+            total += self.frames.nbytes + self.timestamps.nbytes
+        return total
+
+    def read_frames(self, t0=-np.inf, t1=np.inf):
+        """
+        Returns (frames, timestamps, first_frame) for t0 <= time <= t1, from memory if the whole session is loaded.
+        """
+        if self.frames is not None:
+            start, stop = np.searchsorted(self.timestamps, t0, side='left'), np.searchsorted(self.timestamps, t1, side='right')
+            return self.frames[start:stop], self.timestamps[start:stop], int(start)
+        column_names, timestamps, values, first_row = read_data_window(self.radar_file_path, t0, t1, self.radar_index)
+        radar_columns = [i for i, name in enumerate(column_names[1:]) if name.startswith('f0_f0_')]
+        return values[:, radar_columns], timestamps, first_row
+
+    def load_frames(self):
+        if self.frames is None:
+            self.frames, self.timestamps, _ = self.read_frames()
+
+class SessionCache:
+    """
+    A least-recently-used cache of SessionEntry objects.
+
+    An entry is rebuilt when one of the session's files has changed size or modification time
+    (see `session_signature`). Entries are evicted beyond `max_sessions` or `max_mb`; the entry
+    in use is never evicted. A session is loaded under a lock of its own, so jobs for other
+    sessions are not held up while it loads, and two jobs for the same session load it once.
+    The lock is dropped again with the session's entry.
+
+    Args:
+        max_sessions (int): Maximum number of cached sessions.
+        max_mb (float): Maximum memory of all entries in MB.
+    """
+    def __init__(self, max_sessions=constants.DAEMON_CACHE_SESSIONS, max_mb=constants.DAEMON_CACHE_MB):
+        self.max_sessions = max_sessions
+        self.max_bytes = max_mb * 1024 * 1024
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.RLock()
+        self._load_locks = {}
+
+    def get(self, session_dir):
+        """
+        Returns the entry of a session directory, loading it if needed.
+        """
+        session_dir = os.path.abspath(session_dir)
+        signature = session_signature([os.path.join(session_dir, name) for name in ("Radar-Data.data", "IMU-Data.data", "Magnetometer-Data.data")], {})
+        with self._lock:
+            entry = self._cached(session_dir, signature)
+            if entry is not None:
+                return entry
+            load_lock = self._load_locks.setdefault(session_dir, threading.Lock())
+        with load_lock:
+            with self._lock:
+                # Another job may have loaded the session while this one waited
+                entry = self._cached(session_dir, signature)
+                if entry is not None:
+                    return entry
+                self.misses += 1
+            try:
+                entry = SessionEntry(session_dir, signature)
+            except Exception:
+                with self._lock:
+                    self._load_locks.pop(session_dir, None)
+                raise
+            with self._lock:
+                self._entries[session_dir] = entry
+                self._entries.move_to_end(session_dir)
+                self.trim(keep=session_dir)
+            return entry
+
+    def _cached(self, session_dir, signature):
+        # Returns the cached entry if it is up to date; the caller holds the lock
+        entry = self._entries.get(session_dir)
+        if entry is None or entry.signature != signature:
+            return None
+        self._entries.move_to_end(session_dir)
+        self.hits += 1
+        return entry
+
+    def trim(self, keep=None):
+        """
+        Evicts the least recently used entries (other than `keep`) until the cache is within its limits.
+        """
+        with self._lock:
+            for session_dir in list(self._entries):
+                if len(self._entries) <= self.max_sessions and self.nbytes <= self.max_bytes:
+                    break
+                if session_dir != keep:
+                    del self._entries[session_dir]
+                    # A lock held by a load in progress is kept for the entry that load adds
+                    load_lock = self._load_locks.get(session_dir)
+                    if load_lock is not None and not load_lock.locked():
+                        del self._load_locks[session_dir]
+
+    @property
+    def nbytes(self):
+        return sum(entry.nbytes for entry in self._entries.values())
+
+    def status(self):
+        with self._lock:
+            return {'sessions': list(self._entries), 'memory_mb': self.nbytes / (1024 * 1024), 'hits': self.hits, 'misses': self.misses}
+
+class ProcessingDaemon:
+    """
+    Runs processing jobs against warm sessions.
+
+    A job is a dict with a 'type' and a 'session' directory (defaults to DATA_DIR):
+      - 'info': frame count, duration and whether IMU data is available.
+      - 'window': points detected between 't0' and 't1' seconds, with cluster centroids.
+      - 'map': the downsampled, clustered map of the whole session; 'plot': true also saves
+        the map image. The detections are cached, so repeating it only re-clusters.
+    Jobs report through `emit(event)` with 'progress' events followed by one 'result' or 'error' event.
+
+    Args:
+        cache (SessionCache, optional): The session cache. A new one by default.
+        chunk_frames (int): Frames processed between two progress events.
+    """
+    def __init__(self, cache=None, chunk_frames=constants.DAEMON_CHUNK_FRAMES):
+        self.cache = cache or SessionCache()
+        self.chunk_frames = chunk_frames
+        self.jobs_done = 0
+        self.started = time.time()
+        # pyplot is not thread-safe
+        self._plot_lock = threading.Lock()
+
+    def status(self):
+        return {'uptime_s': time.time() - self.started, 'jobs_done': self.jobs_done, 'cache': self.cache.status()}
+
+    def run_job(self, job, emit):
+        start = time.perf_counter()
+        try:
+            handler = {'info': self._info, 'window': self._window, 'map': self._map}.get(job.get('type'))
+            if handler is None:
+                raise ValueError(f"Unknown job type {job.get('type')!r}")
+            session_dir = job.get('session') or constants.DATA_DIR
+            if not os.path.exists(os.path.join(session_dir, "Radar-Data.data")):
+                raise FileNotFoundError(f"No Radar-Data.data in {session_dir}")
+            emit({'event': 'progress', 'stage': 'session', 'done': 0, 'total': 1})
+            entry = self.cache.get(session_dir)
+            with entry.lock:
+                result = handler(entry, job, emit)
+            self.jobs_done += 1
+            emit({'event': 'result', 'result': result, 'elapsed_s': time.perf_counter() - start})
+        except (BrokenPipeError, ConnectionResetError):
+            print(f"Client disconnected, job {job} abandoned.")
+        except Exception as e:
+            print(f"Error running job {job}: {e}")
+            emit({'event': 'error', 'message': str(e), 'elapsed_s': time.perf_counter() - start})
+
+    def _info(self, entry, job, emit):
+        index = entry.radar_index
+        duration_s = 0.0
+        if len(index.times):
+            # The index holds every stride-th row; the last frame is among the rows after the last indexed one
+            _, timestamps, _ = entry.read_frames(index.times[-1])
+            duration_s = float(timestamps[-1] - index.times[0])
+        return {'session': entry.session_dir, 'num_frames': index.num_rows, 'duration_s': duration_s,
+                'imu': entry.imu_orientation is not None, 'frames_cached': entry.frames is not None}
+
+    def _detect(self, entry, frames, timestamps, first_frame, emit, keep_from=None):
+        # Detects points in consecutive chunks of frames, reporting progress after each chunk
+        graph = build_radar_graph(imu_orientation_lookup(entry.imu_orientation), sweep_frames=entry.radar_index.num_rows)
+        chunks = (radar_sources(frames[i:i + self.chunk_frames], timestamps[i:i + self.chunk_frames], first_frame + i)
+                  for i in range(0, len(frames), self.chunk_frames))
+        parts = []
+        for number, out in enumerate(run_chunked(graph, chunks, outputs=RADAR_GRAPH_OUTPUTS + (RADAR_GRAPH_FRAME_OUTPUT,)), start=1):
+            keep = out[RADAR_GRAPH_FRAME_OUTPUT] >= keep_from if keep_from is not None else slice(None)
+            parts.append(np.column_stack([out[name][keep] for name in RADAR_GRAPH_OUTPUTS]))
+            emit({'event': 'progress', 'stage': 'detect', 'done': min(number * self.chunk_frames, len(frames)), 'total': len(frames)})
+        return np.concatenate(parts) if parts else np.empty((0, len(RADAR_GRAPH_OUTPUTS)))
+
+    @staticmethod
+    def _cluster(points):
+        # Columns of points follow RADAR_GRAPH_OUTPUTS: range, azimuth, x, y, snr
+        if not len(points):
+            return np.empty((0, 2)), np.empty(0), []
+        cells, hit_counts, _ = downsample_points(points[:, 2:4], constants.DOWNSAMPLE_CELL_SIZE_M, snr=points[:, 4])
+        clusters = cluster_detected_points(cells, eps=constants.DBSCAN_EPS, min_samples=constants.DBSCAN_MIN_SAMPLES, sample_weight=hit_counts)
+        return cells, hit_counts, clusters
+
+    def _window(self, entry, job, emit):
+        t0, t1 = float(job['t0']), float(job['t1'])
+        if t1 < t0:
+            raise ValueError(f"The window end {t1} s is before its start {t0} s")
+        # Only the clutter background needs a warm-up; the orientation covers the whole session
+        warmup_s = constants.WINDOW_IMU_WARMUP_S if constants.CLUTTER_REMOVAL_ENABLED else 0.0
+        frames, timestamps, first_frame = entry.read_frames(t0 - warmup_s, t1)
+        keep_from = first_frame + int(np.searchsorted(timestamps, t0))
+        points = self._detect(entry, frames, timestamps, first_frame, emit, keep_from=keep_from)
+        cells, _, clusters = self._cluster(points)
+        return {'num_frames': int(len(frames) - (keep_from - first_frame)), 'first_frame': keep_from,
+                'points_cartesian': points[:, 2:4].tolist(), 'points_polar': points[:, 0:2].tolist(), 'snr': points[:, 4].tolist(),
+                'cluster_centroids': cluster_centroids(cells, clusters).tolist()}
+
+    def _map(self, entry, job, emit):
+        if entry.map_result is None:
+            emit({'event': 'progress', 'stage': 'load', 'done': 0, 'total': 1})
+            entry.load_frames()
+            self.cache.trim(keep=entry.session_dir)
+            points = self._detect(entry, entry.frames, entry.timestamps, 0, emit)
+            entry.map_result = (len(points),) + self._cluster(points)
+        num_points, cells, hit_counts, clusters = entry.map_result
+        result = {'num_frames': len(entry.frames), 'num_points': num_points, 'cells': cells.tolist(),
+                  'cell_weights': np.asarray(hit_counts).tolist(), 'cluster_centroids': cluster_centroids(cells, clusters).tolist()}
+        if job.get('plot') and len(cells):
+            save_path = os.path.join(constants.PLOTS_OUTPUT_DIR, f"2d_radar_map_{os.path.basename(entry.session_dir)}.png")
+            with self._plot_lock:
+                create_2d_map(clusters=clusters, all_detected_points_cartesian=cells, title=f"2D Radar Map, {os.path.basename(entry.session_dir)}",
+                              map_extent_m=constants.MAP_EXTENT_M, grid_resolution=constants.GRID_RESOLUTION_M, save_path=save_path,
+                              point_weights=hit_counts, show=False)
+            result['plot_path'] = save_path
+        return result
+
+class _JobRequestHandler(http.server.BaseHTTPRequestHandler):
+    # HTTP/1.1 for chunked responses and keep-alive
+    protocol_version = 'HTTP/1.1'
+
+    def _send_json(self, status, payload):
+        body = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path != '/status':
+            self._send_json(404, {'error': f"Unknown path {self.path}"})
+            return
+        self._send_json(200, self.server.processing_daemon.status())
+
+    def do_POST(self):
+        if self.path != '/jobs':
+            self._send_json(404, {'error': f"Unknown path {self.path}"})
+            return
+        try:
+            job = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+        except ValueError as e:
+            self._send_json(400, {'error': f"Invalid job: {e}"})
+            return
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/x-ndjson')
+        self.send_header('Transfer-Encoding', 'chunked')
+        self.end_headers()
+
+        def emit(event):
+            # One JSON line per chunk, flushed at once so the client sees progress as it happens
+            line = json.dumps(event).encode() + b'\n'
+            self.wfile.write(b'%x\r\n%s\r\n' % (len(line), line))
+            self.wfile.flush()
+
+        self.server.processing_daemon.run_job(job, emit)
+        try:
+            self.wfile.write(b'0\r\n\r\n')
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def log_message(self, format, *args):
+        pass
+
+def serve_daemon(host=constants.DAEMON_HOST, port=constants.DAEMON_PORT, daemon=None):
+    """
+    Serves processing jobs on localhost until interrupted with Ctrl+C.
+
+    The process stays up between jobs, so the imports (pandas, scikit-learn, matplotlib), the
+    time indexes and the IMU orientation of recently used sessions are paid for once.
+    POST a job (see `ProcessingDaemon`) as JSON to /jobs; the response streams newline-delimited
+    JSON events. GET /status returns the uptime, job count and cached sessions.
+
+    Args:
+        host (str): Address to bind; keep it on localhost, the API has no authentication.
+        port (int): TCP port.
+        daemon (ProcessingDaemon, optional): The daemon to serve. A new one by default.
+    """
+    # Plots are only ever saved, from the request threads
+    plt.switch_backend('Agg')
+    server = http.server.ThreadingHTTPServer((host, port), _JobRequestHandler)
+    server.daemon_threads = True
+    server.processing_daemon = daemon or ProcessingDaemon()
+    print(f"Processing daemon listening on http://{host}:{port} (POST /jobs, GET /status). Press Ctrl+C to stop.")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\nStopping the processing daemon.")
+    finally:
+        server.server_close()
+
+def submit_job(job, host=constants.DAEMON_HOST, port=constants.DAEMON_PORT, on_progress=None, timeout_s=None):
+    """
+    Sends a job to a running daemon and waits for its result.
+
+    Args:
+        job (dict): The job, see `ProcessingDaemon`.
+        host (str): Address of the daemon.
+        port (int): Port of the daemon.
+        on_progress (callable, optional): Called with every progress event.
+        timeout_s (float, optional): Socket timeout in seconds.
+
+    Returns:
+        dict: The result of the job, or None if the daemon cannot be reached or the job failed.
+    """
+    connection = http.client.HTTPConnection(host, port, timeout=timeout_s)
+    try:
+        connection.request('POST', '/jobs', body=json.dumps(job), headers={'Content-Type': 'application/json'})
+        response = connection.getresponse()
+        if response.status != 200:
+            print(f"Error: The processing daemon rejected the job: {response.read().decode(errors='replace')}")
+            return None
+        for line in response:
+            event = json.loads(line)
+            if event['event'] == 'progress':
+                if on_progress is not None:
+                    on_progress(event)
+            elif event['event'] == 'result':
+                return event['result']
+            else:
+                print(f"Error from the processing daemon: {event['message']}")
+                return None
+        print("Error: The processing daemon closed the connection without a result.")
+        return None
+    except (OSError, ValueError) as e:
+        print(f"Error: Could not reach the processing daemon at {host}:{port}: {e}")
+        return None
+    finally:
+        connection.close()
+
+if __name__ == "__main__":
+    # Example usage: with a daemon running (main_processing_pipeline.py --daemon), time a few jobs
+    import sys
+
+    session_dir = sys.argv[1] if len(sys.argv) > 1 else constants.DATA_DIR
+    for job in ({'type': 'info', 'session': session_dir},
+                {'type': 'window', 'session': session_dir, 't0': 1.0, 't1': 2.0},
+                {'type': 'window', 'session': session_dir, 't0': 1.0, 't1': 2.0},
+                {'type': 'map', 'session': session_dir},
+                {'type': 'map', 'session': session_dir}):
+        start = time.perf_counter()
+        result = submit_job(job, port=int(sys.argv[2]) if len(sys.argv) > 2 else constants.DAEMON_PORT)
+        if result is not None:
+            summary = {key: value for key, value in result.items() if not isinstance(value, list)}
+            print(f"{job['type']}: {(time.perf_counter() - start) * 1000:.1f} ms, {summary}")
@@ -2,9 +2,9 @@ import numpy as np
 import pandas as pd
 from src.data_acquisition.imu_reader import read_imu_data
 from src.fusion.imu_fusion import estimate_orientation
-from src.processing.radar_fft import perform_fft, polar_to_cartesian, correct_for_imu_orientation
-from src.processing.cfar_detection import cfar_ca
-from src.config.constants import CFAR_NUM_TRAINING_CELLS, CFAR_NUM_GUARD_CELLS, CFAR_P_FA, MAX_RANGE_M
+from src.pipeline.radar_graph import RADAR_GRAPH_OUTPUTS, RADAR_GRAPH_VIZ_OUTPUTS, build_radar_graph, imu_orientation_lookup, radar_sources
+from src.pipeline.stage_graph import GraphRunner
+from src.config import constants
 from src.visualization.map_viewer import plot_raw_imu_data, plot_imu_orientation
 
 def process_imu_data(imu_file_path):
@@ -40,6 +40,9 @@ def process_radar_frames(df_radar, imu_data_with_orientation):
     """
     Processes radar frames to detect points using FFT and CFAR.
 
+    Runs the detection graph of `build_radar_graph` over all frames. The first batch of
+    frames is run on its own, as only it also returns the per-frame arrays for the CFAR plot.
+
     Args:
         df_radar (pd.DataFrame): DataFrame containing radar data.
         imu_data_with_orientation (pd.DataFrame): DataFrame with IMU orientation data.
@@ -53,54 +56,23 @@ def process_radar_frames(df_radar, imu_data_with_orientation):
         print("Error: No radar data columns found.")
         return [], [], None
 
-    all_detected_points_cartesian = []
-    all_detected_points_polar = []
-    first_frame_viz_data = {}
+    runner = GraphRunner(build_radar_graph(imu_orientation_lookup(imu_data_with_orientation), sweep_frames=len(df_radar)))
+    frames = df_radar[radar_columns].to_numpy(dtype=float)
+    timestamps = df_radar['Time (seconds)'].to_numpy(dtype=float)
+    split = min(constants.GRAPH_BATCH_FRAMES, len(frames))
+    first = runner.process(radar_sources(frames[:split], timestamps[:split]), RADAR_GRAPH_OUTPUTS + RADAR_GRAPH_VIZ_OUTPUTS)
+    rest = runner.process(radar_sources(frames[split:], timestamps[split:], split), RADAR_GRAPH_OUTPUTS)
+    result = {name: np.concatenate((first[name], rest[name])) for name in RADAR_GRAPH_OUTPUTS}
 
-    for index, row in df_radar.iterrows():
-        raw_radar_profile = row[radar_columns].values.astype(float)
-        range_profile = perform_fft(raw_radar_profile)
-        range_bins = np.linspace(0, MAX_RANGE_M, len(range_profile))
-        
-        detections = cfar_ca(range_profile, CFAR_NUM_TRAINING_CELLS, CFAR_NUM_GUARD_CELLS, CFAR_P_FA)
-        detected_indices = np.where(detections)[0]
-
-        if index == 0:
-            first_frame_viz_data['range_profile'] = range_profile
-            first_frame_viz_data['detected_indices'] = detected_indices
-            # Calculate CFAR threshold for visualization
-            cfar_threshold_values = np.zeros_like(range_profile)
-            N = 2 * CFAR_NUM_TRAINING_CELLS
-            alpha = N * (CFAR_P_FA**(-1/N) - 1)
-            offset = CFAR_NUM_TRAINING_CELLS + CFAR_NUM_GUARD_CELLS
-            for i in range(len(range_profile)):
-                if i >= offset and i < len(range_profile) - offset:
-                    sum_training_cells = np.sum(range_profile[i - offset : i - CFAR_NUM_GUARD_CELLS]) + \
-                                         np.sum(range_profile[i + CFAR_NUM_GUARD_CELLS + 1 : i + offset + 1])
-                    noise_estimate = sum_training_cells / N
-                    cfar_threshold_values[i] = alpha * noise_estimate
-                else:
-                    cfar_threshold_values[i] = np.nan
-            first_frame_viz_data['cfar_threshold'] = cfar_threshold_values
-
-        azimuth_angle_rad = (index / len(df_radar)) * np.pi
-        current_roll_rad, current_pitch_rad, current_yaw_rad = 0.0, 0.0, azimuth_angle_rad
-
-        if imu_data_with_orientation is not None:
-            radar_timestamp = row['Time (seconds)']
-            closest_imu = imu_data_with_orientation.iloc[(imu_data_with_orientation['timestamp'] - radar_timestamp).abs().argsort()[:1]]
-            if not closest_imu.empty:
-                current_roll_rad = np.deg2rad(closest_imu['roll'].values[0])
-                current_pitch_rad = np.deg2rad(closest_imu['pitch'].values[0])
-
-        for detected_bin_index in detected_indices:
-            r = range_bins[detected_bin_index]
-            corrected_r, corrected_azimuth_rad = correct_for_imu_orientation(r, azimuth_angle_rad, current_roll_rad, current_pitch_rad, current_yaw_rad)
-            
-            all_detected_points_polar.append((corrected_r, corrected_azimuth_rad))
-            x, y = polar_to_cartesian(corrected_r, corrected_azimuth_rad)
-            all_detected_points_cartesian.append((x, y))
-            
+    all_detected_points_cartesian = list(zip(result['point_x'].tolist(), result['point_y'].tolist()))
+    all_detected_points_polar = list(zip(result['point_range'].tolist(), result['point_azimuth'].tolist()))
+    first_frame_viz_data = {}
+    if split:
+        first_frame_viz_data = {
+            'range_profile': first['range_profile'][0],
+            'cfar_threshold': first['threshold'][0],
+            'detected_indices': np.where(first['detections'][0])[0],
+        }
     return all_detected_points_cartesian, all_detected_points_polar, first_frame_viz_data
 
 def cluster_and_visualize(all_detected_points_cartesian, all_detected_points_polar, first_frame_viz_data):
@@ -113,7 +85,7 @@ def cluster_and_visualize(all_detected_points_cartesian, all_detected_points_pol
         first_frame_viz_data (dict): Data for the first frame's CFAR visualization.
     """
     from src.processing.object_clustering import cluster_detected_points
-    from src.visualization.map_viewer import create_2d_map, plot_cfar_detection, plot_polar_map
+    from src.visualization.map_viewer import cluster_centroids, create_2d_map, plot_cfar_detection, plot_polar_map
     from src.config.constants import DBSCAN_EPS, DBSCAN_MIN_SAMPLES, MAP_EXTENT_M, GRID_RESOLUTION_M
 
     if not all_detected_points_cartesian:
@@ -142,4 +114,4 @@ def cluster_and_visualize(all_detected_points_cartesian, all_detected_points_pol
         print(f"\nCFAR applied to first frame. Detected targets at range bins: {first_frame_viz_data['detected_indices'].tolist()}")
 
     if all_detected_points_polar:
-        plot_polar_map(all_detected_points_polar)
+        plot_polar_map(all_detected_points_polar, centroids_cartesian=cluster_centroids(all_detected_points_cartesian, clusters_indices))
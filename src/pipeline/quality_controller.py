@@ -0,0 +1,106 @@
+import time
+from src.config import constants
+from src.monitoring.runtime_metrics import QUALITY_LEVEL
+
+def describe_quality(settings):
+    """
+    Returns a quality level's settings as short text for log messages.
+    """
+    frames = "every frame" if settings['decimation'] == 1 else f"1 in {settings['decimation']} frames"
+    return (f"{frames}, map every {settings['map_interval_scale']:g}x interval, render at {settings['render_fps_scale']:g}x rate")
+
+class QualityController:
+    """
+    Steps live processing quality down when frames wait too long and back up when there is headroom.
+
+    Every processed batch reports its latency, the time from its frames being read to their
+    points being out. The latency is smoothed, and when it exceeds the target the
+    controller moves to the next lower level of `levels`; when it stays below
+    `headroom * target` for `upgrade_after_s` seconds, it moves one level back up. After any
+    change the controller waits `hold_s` seconds, so the effect of one step is measured
+    before the next. Every change is printed and kept in `changes`.
+
+    Args:
+        target_latency_s (float): Latency target in seconds.
+        levels (tuple): Settings dicts from full to lowest quality, see QUALITY_LEVELS.
+        smoothing (float): Weight of the newest sample in the smoothed latency.
+        headroom (float): Share of the target below which quality may go up.
+        hold_s (float): Minimum time between two changes in seconds.
+        upgrade_after_s (float): Time below the headroom before quality goes up, in seconds.
+        clock (callable): Returns the current time in seconds.
+    """
+    def __init__(self, target_latency_s, levels=constants.QUALITY_LEVELS, smoothing=constants.QUALITY_SMOOTHING,
+                 headroom=constants.QUALITY_HEADROOM, hold_s=constants.QUALITY_HOLD_S,
+                 upgrade_after_s=constants.QUALITY_UPGRADE_AFTER_S, clock=time.monotonic):
+        if target_latency_s <= 0:
+            raise ValueError("the latency target must be positive")
+        self.target_latency_s = target_latency_s
+        self.levels = tuple(levels)
+        self.smoothing = smoothing
+        self.headroom = headroom
+        self.hold_s = hold_s
+        self.upgrade_after_s = upgrade_after_s
+        self.clock = clock
+        self.level = 0
+        self.latency_s = None
+        self.changes = []
+        self._last_change = clock()
+        self._calm_since = None
+        QUALITY_LEVEL.set(0)
+
+    @property
+    def settings(self):
+        """
+        The settings of the current level.
+        """
+        return self.levels[self.level]
+
+    def observe(self, latency_s):
+        """
+        Records the latency of one processed batch and changes the quality level if needed.
+
+        Args:
+            latency_s (float): The batch latency in seconds.
+
+        Returns:
+            dict: The settings of the new level if the level changed, otherwise None.
+        """
+        if self.latency_s is None:
+            self.latency_s = latency_s
+        else:
+            self.latency_s += self.smoothing * (latency_s - self.latency_s)
+        now = self.clock()
+        if self.latency_s < self.headroom * self.target_latency_s:
+            if self._calm_since is None:
+                self._calm_since = now
+        else:
+            self._calm_since = None
+        if now - self._last_change < self.hold_s:
+            return None
+        if self.latency_s > self.target_latency_s and self.level < len(self.levels) - 1:
+            return self._change(self.level + 1, now)
+        if self._calm_since is not None and now - self._calm_since >= self.upgrade_after_s and self.level > 0:
+            return self._change(self.level - 1, now)
+        return None
+
+    def _change(self, level, now):
+        change = {'time': now, 'from': self.level, 'to': level, 'latency_s': self.latency_s}
+        self.changes.append(change)
+        print(f"Quality {'down' if level > self.level else 'up'} to level {level} ({describe_quality(self.levels[level])}): "
+              f"latency {self.latency_s * 1000:.0f} ms, target {self.target_latency_s * 1000:.0f} ms.")
+        self.level = level
+        self._last_change = now
+        self._calm_since = None
+        QUALITY_LEVEL.set(level)
+        return self.settings
+
+if __name__ == "__main__":
+    # Example usage: a simulated host that is too slow at full quality for the first minute
+    simulated_time = [0.0]
+    controller = QualityController(0.5, clock=lambda: simulated_time[0])
+    cost_per_level = [1.2, 0.8, 0.6, 0.35, 0.2]
+    for step in range(600):
+        simulated_time[0] = step * 0.5
+        load = 1.0 if simulated_time[0] < 60 else 0.3
+        controller.observe(cost_per_level[controller.level] * load)
+    print(f"{len(controller.changes)} changes, final level {controller.level}")
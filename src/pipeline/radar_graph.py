@@ -0,0 +1,153 @@
+import numpy as np
+from src.config import constants
+from src.fusion.imu_fusion import align_orientation_to_timestamps
+from src.processing.radar_fft import perform_fft_batch
+from src.processing.projection import project_detections
+from src.processing.cfar_detection import cfar_ca_alpha, cfar_ca_batch
+from src.processing.clutter_removal import BackgroundSubtractor, background_alpha
+from src.pipeline.stage_graph import GraphStage, StageGraph
+
+# Arrays every run of the radar graph must be given, one row per frame
+RADAR_GRAPH_SOURCES = ('frames', 'timestamps', 'frame_index')
+# One entry per detected point
+RADAR_GRAPH_OUTPUTS = ('point_range', 'point_azimuth', 'point_x', 'point_y', 'point_snr')
+# Frame index of every detected point, e.g. for tracking
+RADAR_GRAPH_FRAME_OUTPUT = 'point_frame'
+# Per-frame arrays that can be requested in addition, e.g. for the CFAR plot
+RADAR_GRAPH_VIZ_OUTPUTS = ('range_profile', 'threshold', 'detections')
+# Per-frame number of detections removed by clutter removal; only in graphs with clutter removal
+RADAR_GRAPH_SUPPRESSED_OUTPUT = 'suppressed_detections'
+
+class ClutterStage:
+    """
+    Clutter removal as a graph stage. The background carries over between calls, so the stage is not fusible.
+
+    `background` can be read after a call and set before the first one, e.g. to checkpoint and resume a run.
+    """
+    def __init__(self, time_constant_s=constants.CLUTTER_TIME_CONSTANT_S):
+        self.time_constant_s = time_constant_s
+        self._subtractor = None
+        self._initial_background = None
+
+    @property
+    def background(self):
+        return self._subtractor.background if self._subtractor is not None else self._initial_background
+
+    @background.setter
+    def background(self, value):
+        if self._subtractor is not None:
+            self._subtractor.background = value
+        else:
+            self._initial_background = value
+
+    def __call__(self, frames, timestamps):
+        if self._subtractor is None:
+            frame_dt = np.median(np.diff(timestamps)) if len(timestamps) > 1 else 1.0
+            self._subtractor = BackgroundSubtractor(background_alpha(self.time_constant_s, frame_dt))
+            self._subtractor.background = self._initial_background
+        return self._subtractor.apply(np.asarray(frames, dtype=float))
+
+def imu_orientation_lookup(imu_data_with_orientation):
+    """
+    Returns an orientation lookup for `build_radar_graph` from IMU data with orientation estimates (or None).
+    """
+    def lookup(timestamps):
+        if imu_data_with_orientation is None or imu_data_with_orientation.empty:
+            return None
+        return align_orientation_to_timestamps(imu_data_with_orientation, timestamps)
+    return lookup
+
+def build_radar_graph(orientation_lookup=None, sweep_frames=constants.FOLLOW_SWEEP_FRAMES,
+                      clutter_removal=constants.CLUTTER_REMOVAL_ENABLED):
+    """
+    Builds the detection graph clutter removal -> FFT magnitude -> CFAR -> orientation -> projection.
+
+    Everything after clutter removal treats frames independently and is fused, so a block of
+    frames is processed GRAPH_BATCH_FRAMES at a time from FFT to projected points, and the
+    complex spectrum, CFAR threshold and per-frame orientation are never held for the whole
+    block. The stateful clutter stage runs unfused, on the whole block, before them.
+
+    With clutter removal, RADAR_GRAPH_SUPPRESSED_OUTPUT can be requested as well: CFAR is then
+    also run on the raw range profile, in the same batches, and the detections found there
+    but not after clutter removal are counted per frame.
+
+    Args:
+        orientation_lookup (callable, optional): Called with the frame timestamps; returns
+                                                 (roll_rad, pitch_rad, yaw_rad) arrays, where
+                                                 yaw_rad may be None, or None without IMU data.
+        sweep_frames (int): Frames per half turn for the fallback sweep azimuth.
+        clutter_removal (bool): If True, subtract the static background before the FFT.
+
+    Returns:
+        StageGraph: The graph, with sources RADAR_GRAPH_SOURCES and outputs RADAR_GRAPH_OUTPUTS.
+    """
+    cfar_alpha = cfar_ca_alpha(constants.CFAR_NUM_TRAINING_CELLS, constants.CFAR_P_FA)
+
+    def cfar(range_profile):
+        return cfar_ca_batch(range_profile, constants.CFAR_NUM_TRAINING_CELLS, constants.CFAR_NUM_GUARD_CELLS,
+                             constants.CFAR_P_FA, return_threshold=True)
+
+    def orientation(timestamps, frame_index):
+        # Without IMU yaw the sensor is assumed to sweep half a turn every sweep_frames frames
+        roll, pitch, yaw = np.zeros(len(frame_index)), np.zeros(len(frame_index)), (frame_index / sweep_frames) * np.pi
+        aligned = orientation_lookup(timestamps) if orientation_lookup is not None else None
+        if aligned is not None:
+            roll, pitch, imu_yaw = aligned
+            if imu_yaw is not None:
+                yaw = imu_yaw
+        return roll, pitch, yaw
+
+    def project(range_profile, detections, threshold, frame_index, roll, pitch, yaw):
+        rows, bins = np.nonzero(detections)
+        corrected_r, corrected_azimuth, x, y = project_detections(rows, bins, roll, pitch, yaw, range_profile.shape[1])
+        snr = range_profile[rows, bins] / np.maximum(threshold[rows, bins] / cfar_alpha, constants.CFAR_NOISE_FLOOR)
+        return corrected_r, corrected_azimuth, x, y, snr, frame_index[rows]
+
+    def suppressed(raw_range_profile, detections):
+        raw_detections = cfar_ca_batch(raw_range_profile, constants.CFAR_NUM_TRAINING_CELLS, constants.CFAR_NUM_GUARD_CELLS, constants.CFAR_P_FA)
+        return np.count_nonzero(raw_detections & ~detections, axis=1)
+
+    frames = 'frames'
+    stages = []
+    if clutter_removal:
+        stages += [
+            GraphStage('clutter', ClutterStage(), inputs=('frames', 'timestamps'), outputs=('clean_frames',), fusible=False),
+            GraphStage('raw_fft', perform_fft_batch, inputs=('frames',), outputs=('raw_range_profile',), batch_size=constants.GRAPH_BATCH_FRAMES),
+            GraphStage('suppressed', suppressed, inputs=('raw_range_profile', 'detections'), outputs=(RADAR_GRAPH_SUPPRESSED_OUTPUT,), batch_size=constants.GRAPH_BATCH_FRAMES),
+        ]
+        frames = 'clean_frames'
+    stages += [
+        GraphStage('fft', perform_fft_batch, inputs=(frames,), outputs=('range_profile',), batch_size=constants.GRAPH_BATCH_FRAMES),
+        GraphStage('cfar', cfar, inputs=('range_profile',), outputs=('detections', 'threshold'), batch_size=constants.GRAPH_BATCH_FRAMES),
+        GraphStage('orientation', orientation, inputs=('timestamps', 'frame_index'), outputs=('roll', 'pitch', 'yaw')),
+        GraphStage('projection', project, inputs=('range_profile', 'detections', 'threshold', 'frame_index', 'roll', 'pitch', 'yaw'),
+                   outputs=RADAR_GRAPH_OUTPUTS + (RADAR_GRAPH_FRAME_OUTPUT,)),
+    ]
+    return StageGraph(stages, RADAR_GRAPH_OUTPUTS)
+
+def radar_sources(frames, timestamps, start_frame=0):
+    """
+    Returns the source arrays of the radar graph for consecutive frames starting at frame `start_frame`.
+    """
+    return {
+        'frames': frames,
+        'timestamps': np.asarray(timestamps, dtype=float),
+        'frame_index': start_frame + np.arange(len(frames)),
+    }
+
+if __name__ == "__main__":
+    # Example usage: the same graph over a synthetic recording, offline and in chunks
+    from src.pipeline.stage_graph import run_offline, run_chunked
+
+    rng = np.random.default_rng(0)
+    frames = rng.normal(size=(2000, 128))
+    frames[:, 40] += 20.0
+    timestamps = np.arange(len(frames)) * 0.005
+
+    graph = build_radar_graph(sweep_frames=len(frames), clutter_removal=False)
+    print(f"Plan: {graph.describe()}")
+    offline = run_offline(graph, radar_sources(frames, timestamps))
+    chunks = (radar_sources(frames[i:i + 300], timestamps[i:i + 300], i) for i in range(0, len(frames), 300))
+    chunked = list(run_chunked(build_radar_graph(sweep_frames=len(frames), clutter_removal=False), chunks))
+    chunked_x = np.concatenate([out['point_x'] for out in chunked])
+    print(f"{len(offline['point_x'])} points offline, identical in chunks: {np.array_equal(offline['point_x'], chunked_x)}")
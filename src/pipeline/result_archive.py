@@ -0,0 +1,427 @@
+import json
+import os
+import struct
+import zlib
+import numpy as np
+from src.config import constants
+
+# Layout (all integers little-endian):
+#   file header:  magic, version, config length, config JSON, CRC32 of the config
+#   block record: block magic, first frame, number of frames, payload length, CRC32, zlib payload
+#   index:        first frame (uint64) and offset (uint64) of every block, followed by the footer
+#   footer:       index offset, number of blocks, number of frames, CRC32 of the index, end magic
+# A block payload holds, in this order and each present only if the archive has the field:
+#   timestamps:   float64 per frame
+#   magnitude:    offset and step (float32 per bin), then one uint8/uint16 code per frame and bin
+#   detections:   CFAR mask, np.packbits along the bins
+#   orientation:  offset and step (float64 per angle), then one uint16 code per frame and angle
+# Multi-byte arrays are byte-shuffled (all first bytes, then all second bytes, ...) before
+# compression, which lets zlib find the runs in the slowly changing high bytes.
+FILE_MAGIC = b'RDRARC\x00\x01'
+FORMAT_VERSION = 1
+BLOCK_MAGIC = b'BLK1'
+END_MAGIC = b'AEND'
+ARCHIVE_FIELDS = ('magnitude', 'detections', 'orientation')
+_FILE_HEADER = struct.Struct('<8sHI')
+_BLOCK_HEADER = struct.Struct('<4sQIII')
+_FOOTER = struct.Struct('<QQQI4s')
+
+def _shuffle(values):
+    # Byte planes of a contiguous array, most compressible first for little-endian codes
+    values = np.ascontiguousarray(values)
+    if values.itemsize == 1:
+        return values.tobytes()
+    return values.view(np.uint8).reshape(-1, values.itemsize).T.tobytes()
+
+def _unshuffle(buffer, offset, dtype, count):
+    dtype = np.dtype(dtype)
+    raw = np.frombuffer(buffer, dtype=np.uint8, count=count * dtype.itemsize, offset=offset)
+    if dtype.itemsize > 1:
+        raw = raw.reshape(dtype.itemsize, count).T.copy()
+    return raw.view(dtype).reshape(count), offset + count * dtype.itemsize
+
+def quantize(values, bits):
+    """
+    Quantizes a block of values column by column to unsigned integers.
+
+    Every column is mapped linearly from its own [min, max] onto [0, 2**bits - 1], so a
+    column of small values keeps its resolution next to a column of large ones.
+
+    Args:
+        values (np.array): 2D array, one row per frame.
+        bits (int): 8 or 16.
+
+    Returns:
+        tuple: (codes, offset, step) with values ~ offset + codes * step; the error is at most step / 2.
+    """
+    values = np.asarray(values, dtype=float)
+    levels = (1 << bits) - 1
+    offset = values.min(axis=0)
+    span = values.max(axis=0) - offset
+    step = np.where(span > 0, span / levels, 1.0)
+    codes = np.rint((values - offset) / step).astype(np.uint8 if bits == 8 else np.uint16)
+    return codes, offset, step
+
+def dequantize(codes, offset, step, dtype=np.float32):
+    """
+    Inverse of `quantize`.
+    """
+    return (codes * step.astype(dtype)) + offset.astype(dtype)
+
+class ResultArchiveWriter:
+    """
+    Writes processed radar results (FFT magnitudes, CFAR masks, orientation) to a compact archive.
+
+    Frames are buffered and written in blocks of `block_frames`. Each block is quantized with
+    its own per-bin (or per-angle) scale, the CFAR mask is bit-packed and the block is
+    compressed on its own, so a reader decompresses only the blocks of the frames it asks for.
+    Block offsets are written as an index when the archive is closed.
+    """
+    def __init__(self, file_path, num_bins, fields=ARCHIVE_FIELDS, config=None,
+                 block_frames=constants.ARCHIVE_BLOCK_FRAMES, magnitude_bits=constants.ARCHIVE_MAGNITUDE_BITS,
+                 orientation_bits=constants.ARCHIVE_ORIENTATION_BITS, compression_level=constants.ARCHIVE_COMPRESSION_LEVEL):
+        unknown = set(fields) - set(ARCHIVE_FIELDS)
+        if unknown:
+            raise ValueError(f"unknown archive fields {sorted(unknown)}")
+        if magnitude_bits not in (8, 16) or orientation_bits not in (8, 16):
+            raise ValueError("quantization must use 8 or 16 bits")
+        self.file_path = file_path
+        self.num_bins = int(num_bins)
+        self.fields = tuple(name for name in ARCHIVE_FIELDS if name in fields)
+        self.block_frames = int(block_frames)
+        self.magnitude_bits = magnitude_bits
+        self.orientation_bits = orientation_bits
+        self.compression_level = compression_level
+        self.num_frames = 0
+        self._pending = []
+        self._pending_frames = 0
+        self._index = []
+
+        output_dir = os.path.dirname(file_path)
+        if output_dir:
+            os.makedirs(output_dir, exist_ok=True)
+        header = {'num_bins': self.num_bins, 'fields': list(self.fields), 'block_frames': self.block_frames,
+                  'magnitude_bits': magnitude_bits, 'orientation_bits': orientation_bits, 'config': config or {}}
+        header_bytes = json.dumps(header, sort_keys=True).encode('utf-8')
+        self._file = open(file_path, 'wb')
+        self._file.write(_FILE_HEADER.pack(FILE_MAGIC, FORMAT_VERSION, len(header_bytes)))
+        self._file.write(header_bytes)
+        self._file.write(struct.pack('<I', zlib.crc32(header_bytes)))
+
+    def __len__(self):
+        return self.num_frames + self._pending_frames
+
+    def write(self, timestamps, magnitude=None, detections=None, orientation=None):
+        """
+        Appends consecutive frames.
+
+        Args:
+            timestamps (np.array): Time of every frame in seconds.
+            magnitude (np.array): FFT magnitude, shape (frames, num_bins).
+            detections (np.array): CFAR mask, boolean of shape (frames, num_bins).
+            orientation (tuple or np.array): (roll, pitch, yaw) arrays in radians, or an array of shape (frames, 3).
+        """
+        timestamps = np.asarray(timestamps, dtype=np.float64)
+        given = {'magnitude': magnitude, 'detections': detections, 'orientation': orientation}
+        chunk = {'timestamps': timestamps}
+        for name in self.fields:
+            if given[name] is None:
+                raise ValueError(f"the archive stores '{name}', but none was given")
+            value = np.column_stack(orientation) if name == 'orientation' and isinstance(orientation, tuple) else np.asarray(given[name])
+            if len(value) != len(timestamps):
+                raise ValueError(f"'{name}' has {len(value)} frames, timestamps have {len(timestamps)}")
+            if name != 'orientation' and value.shape[1:] != (self.num_bins,):
+                raise ValueError(f"'{name}' has {value.shape[1:]} bins per frame, the archive {self.num_bins}")
+            chunk[name] = value
+        self._pending.append(chunk)
+        self._pending_frames += len(timestamps)
+        while self._pending_frames >= self.block_frames:
+            self._write_block(self._take(self.block_frames))
+
+    def _take(self, num_frames):
+        # Removes the first num_frames buffered frames and returns them as one block
+        block = {name: np.concatenate([chunk[name] for chunk in self._pending]) for name in self._pending[0]}
+        rest = {name: value[num_frames:] for name, value in block.items()}
+        self._pending = [rest] if len(rest['timestamps']) else []
+        self._pending_frames = len(rest['timestamps'])
+        return {name: value[:num_frames] for name, value in block.items()}
+
+    def _write_block(self, block):
+        parts = [_shuffle(block['timestamps'])]
+        if 'magnitude' in block:
+            codes, offset, step = quantize(block['magnitude'], self.magnitude_bits)
+            parts += [offset.astype('<f4').tobytes(), step.astype('<f4').tobytes(), _shuffle(codes)]
+        if 'detections' in block:
+            parts.append(np.packbits(np.asarray(block['detections'], dtype=bool), axis=1).tobytes())
+        if 'orientation' in block:
+            codes, offset, step = quantize(block['orientation'], self.orientation_bits)
+            parts += [offset.astype('<f8').tobytes(), step.astype('<f8').tobytes(), _shuffle(codes)]
+        payload = zlib.compress(b''.join(parts), self.compression_level)
+        num_frames = len(block['timestamps'])
+        self._index.append((self.num_frames, self._file.tell()))
+        self._file.write(_BLOCK_HEADER.pack(BLOCK_MAGIC, self.num_frames, num_frames, len(payload), zlib.crc32(payload)))
+        self._file.write(payload)
+        self.num_frames += num_frames
+
+    def close(self):
+        """
+        Writes the buffered frames as a last, shorter block, followed by the index.
+        """
+        if self._file is None:
+            return
+        if self._pending_frames:
+            self._write_block(self._take(self._pending_frames))
+        index_offset = self._file.tell()
+        index_bytes = np.array(self._index, dtype='<u8').reshape(-1, 2).tobytes()
+        self._file.write(index_bytes)
+        self._file.write(_FOOTER.pack(index_offset, len(self._index), self.num_frames, zlib.crc32(index_bytes), END_MAGIC))
+        self._file.close()
+        self._file = None
+
+    def abort(self):
+        """
+        Closes and removes an archive that could not be completed.
+        """
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        if os.path.exists(self.file_path):
+            os.remove(self.file_path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+class ResultArchiveReader:
+    """
+    Random access to the frames of a result archive.
+
+    Only the index is read when the archive is opened. `read` decompresses the blocks that
+    overlap the requested frame range and keeps the last decoded block, so reading an archive
+    front to back in pieces smaller than a block decodes every block once.
+    """
+    def __init__(self, file_path):
+        self.file_path = file_path
+        with open(file_path, 'rb') as f:
+            raw = f.read(_FILE_HEADER.size)
+            if len(raw) < _FILE_HEADER.size:
+                raise ValueError("file is too short to be a result archive")
+            magic, version, header_length = _FILE_HEADER.unpack(raw)
+            if magic != FILE_MAGIC:
+                raise ValueError("not a result archive (bad magic)")
+            if version > FORMAT_VERSION:
+                raise ValueError(f"unsupported archive version {version}")
+            header_bytes = f.read(header_length)
+            crc = f.read(4)
+            if len(crc) < 4 or struct.unpack('<I', crc)[0] != zlib.crc32(header_bytes):
+                raise ValueError("corrupt archive header")
+            header = json.loads(header_bytes.decode('utf-8'))
+            f.seek(0, os.SEEK_END)
+            file_size = f.tell()
+            if file_size < _FOOTER.size:
+                raise ValueError("archive has no index (was it closed?)")
+            f.seek(file_size - _FOOTER.size)
+            index_offset, num_blocks, num_frames, crc, magic = _FOOTER.unpack(f.read(_FOOTER.size))
+            if magic != END_MAGIC or index_offset + num_blocks * 16 != file_size - _FOOTER.size:
+                raise ValueError("archive has no index (was it closed?)")
+            f.seek(index_offset)
+            index_bytes = f.read(num_blocks * 16)
+            if zlib.crc32(index_bytes) != crc:
+                raise ValueError("corrupt archive index")
+        index = np.frombuffer(index_bytes, dtype='<u8').reshape(-1, 2).astype(np.int64)
+        self.num_bins = header['num_bins']
+        self.fields = tuple(header['fields'])
+        self.magnitude_bits = header['magnitude_bits']
+        self.orientation_bits = header['orientation_bits']
+        self.config = header['config']
+        self.num_frames = int(num_frames)
+        self._block_starts = np.append(index[:, 0], self.num_frames)
+        self._block_offsets = index[:, 1]
+        self._file = open(file_path, 'rb')
+        self._cached = (None, None)
+
+    def __len__(self):
+        return self.num_frames
+
+    def _decode_block(self, number):
+        if self._cached[0] == number:
+            return self._cached[1]
+        self._file.seek(self._block_offsets[number])
+        magic, first_frame, n, length, crc = _BLOCK_HEADER.unpack(self._file.read(_BLOCK_HEADER.size))
+        payload = self._file.read(length)
+        if magic != BLOCK_MAGIC or first_frame != self._block_starts[number] or zlib.crc32(payload) != crc:
+            raise ValueError(f"corrupt archive block {number} in {self.file_path}")
+        buffer = zlib.decompress(payload)
+        block = {}
+        block['timestamps'], position = _unshuffle(buffer, 0, '<f8', n)
+        if 'magnitude' in self.fields:
+            offset = np.frombuffer(buffer, dtype='<f4', count=self.num_bins, offset=position)
+            step = np.frombuffer(buffer, dtype='<f4', count=self.num_bins, offset=position + 4 * self.num_bins)
+            codes, position = _unshuffle(buffer, position + 8 * self.num_bins, np.uint8 if self.magnitude_bits == 8 else '<u2', n * self.num_bins)
+            block['magnitude'] = dequantize(codes.reshape(n, self.num_bins), offset, step)
+        if 'detections' in self.fields:
+            packed_bins = (self.num_bins + 7) // 8
+            packed = np.frombuffer(buffer, dtype=np.uint8, count=n * packed_bins, offset=position).reshape(n, packed_bins)
+            block['detections'] = np.unpackbits(packed, axis=1, count=self.num_bins).view(bool)
+            position += n * packed_bins
+        if 'orientation' in self.fields:
+            offset = np.frombuffer(buffer, dtype='<f8', count=3, offset=position)
+            step = np.frombuffer(buffer, dtype='<f8', count=3, offset=position + 24)
+            codes, position = _unshuffle(buffer, position + 48, np.uint8 if self.orientation_bits == 8 else '<u2', n * 3)
+            block['orientation'] = dequantize(codes.reshape(n, 3), offset, step, dtype=np.float64)
+        self._cached = (number, block)
+        return block
+
+    def read(self, start=0, stop=None, fields=None):
+        """
+        Returns frames [start, stop) of the archive.
+
+        Args:
+            start (int): First frame.
+            stop (int, optional): Frame after the last one; defaults to the end of the archive.
+            fields (tuple, optional): Fields to return besides 'timestamps'; defaults to all stored fields.
+
+        Returns:
+            dict: 'timestamps' and the requested fields: 'magnitude' (float32, frames x bins),
+                  'detections' (bool, frames x bins) and 'orientation' (float64, frames x 3,
+                  roll, pitch and yaw in radians).
+        """
+        stop = self.num_frames if stop is None else min(stop, self.num_frames)
+        start = max(0, start)
+        fields = self.fields if fields is None else tuple(fields)
+        missing = [name for name in fields if name not in self.fields]
+        if missing:
+            raise ValueError(f"the archive does not store {missing}")
+        names = ('timestamps',) + fields
+        if stop <= start:
+            empty = self._decode_block(0) if len(self._block_offsets) else None
+            return {name: (empty[name][:0] if empty is not None else np.empty(0)) for name in names}
+        first = int(np.searchsorted(self._block_starts, start, side='right')) - 1
+        last = int(np.searchsorted(self._block_starts, stop, side='left'))
+        pieces = {name: [] for name in names}
+        for number in range(first, last):
+            block = self._decode_block(number)
+            lo = max(start - self._block_starts[number], 0)
+            hi = min(stop, self._block_starts[number + 1]) - self._block_starts[number]
+            for name in names:
+                pieces[name].append(block[name][lo:hi])
+        return {name: (values[0] if len(values) == 1 else np.concatenate(values)) for name, values in pieces.items()}
+
+    def iter_blocks(self, fields=None):
+        """
+        Yields the archive block by block, as (first frame, arrays) with arrays as returned by `read`.
+        """
+        for number in range(len(self._block_offsets)):
+            yield int(self._block_starts[number]), self.read(self._block_starts[number], self._block_starts[number + 1], fields)
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+def archive_session(session_dir, output_path=None, fields=ARCHIVE_FIELDS, chunk_frames=constants.DATASET_CHUNK_FRAMES):
+    """
+    Runs the detection graph over a session and archives its FFT magnitudes, CFAR masks and orientation.
+
+    The radar file is read and processed in chunks, so memory use does not depend on the
+    session length. The archive is written to a temporary file that replaces `output_path`
+    only once it is complete, so a failed run leaves no partial archive behind.
+
+    Args:
+        session_dir (str): Directory with Radar-Data.data and, optionally, IMU-Data.data.
+        output_path (str, optional): Archive file; defaults to ARCHIVE_OUTPUT_DIR/<session>.rdrarc.
+        fields (tuple): Fields to store, a subset of ARCHIVE_FIELDS.
+        chunk_frames (int): Radar frames read and processed at a time.
+
+    Returns:
+        str: Path of the archive, or None if the session could not be read.
+    """
+    from src.data_acquisition.imu_reader import read_and_merge_imu_data
+    from src.data_acquisition.radar_reader import read_radar_data_chunks
+    from src.data_acquisition.time_index import load_time_index
+    from src.fusion.imu_fusion import estimate_orientation
+    from src.pipeline.radar_graph import build_radar_graph, imu_orientation_lookup, radar_sources
+    from src.pipeline.stage_graph import GraphRunner
+
+    radar_file_path = os.path.join(session_dir, "Radar-Data.data")
+    if not os.path.exists(radar_file_path):
+        print(f"Error: Radar data file not found at {radar_file_path}")
+        return None
+    output_path = output_path or os.path.join(constants.ARCHIVE_OUTPUT_DIR, os.path.basename(os.path.normpath(session_dir)) + ".rdrarc")
+    imu_file_path = os.path.join(session_dir, "IMU-Data.data")
+    mag_file_path = os.path.join(session_dir, "Magnetometer-Data.data")
+    imu_orientation = None
+    if os.path.exists(imu_file_path):
+        df_imu = read_and_merge_imu_data(imu_file_path, mag_file_path if os.path.exists(mag_file_path) else None)
+        if df_imu is not None and not df_imu.empty:
+            imu_dt = (df_imu['timestamp'].iloc[1] - df_imu['timestamp'].iloc[0]) if len(df_imu) > 1 else 0.01
+            imu_orientation = estimate_orientation(df_imu, dt=imu_dt)
+
+    graph = build_radar_graph(imu_orientation_lookup(imu_orientation), sweep_frames=load_time_index(radar_file_path).num_rows)
+    runner = GraphRunner(graph)
+    outputs = tuple({'magnitude': 'range_profile', 'detections': 'detections'}[name] for name in fields if name != 'orientation')
+    if 'orientation' in fields:
+        outputs += ('roll', 'pitch', 'yaw')
+    partial_path = output_path + ".part"
+    writer = None
+    frames_done = 0
+    try:
+        for chunk in read_radar_data_chunks(radar_file_path, chunk_frames):
+            radar_columns = [col for col in chunk.columns if col.startswith('f0_f0_')]
+            timestamps = chunk['Time (seconds)'].to_numpy(dtype=float)
+            out = runner.process(radar_sources(chunk[radar_columns].to_numpy(dtype=float), timestamps, frames_done), outputs)
+            frames_done += len(chunk)
+            if writer is None:
+                # The number of range bins is that of the FFT output, not of the raw samples
+                binned = [name for name in ('range_profile', 'detections') if name in out]
+                num_bins = out[binned[0]].shape[1] if binned else 0
+                writer = ResultArchiveWriter(partial_path, num_bins, fields,
+                                             config={'session': os.path.abspath(session_dir), 'chunk_frames': chunk_frames})
+            writer.write(timestamps, magnitude=out.get('range_profile'), detections=out.get('detections'),
+                         orientation=(out['roll'], out['pitch'], out['yaw']) if 'orientation' in fields else None)
+        if writer is None:
+            print(f"Error: No radar frames in {radar_file_path}")
+            return None
+        writer.close()
+        os.replace(partial_path, output_path)
+    except Exception as e:
+        print(f"Error archiving {session_dir}: {e}")
+        if writer is not None:
+            writer.abort()
+        return None
+    print(f"Archived {len(writer)} frames of {session_dir} to {output_path} ({os.path.getsize(output_path) / 2**20:.1f} MB).")
+    return output_path
+
+if __name__ == "__main__":
+    # Example usage: archive a session, then compare size and decode speed with float64 arrays
+    import sys
+    import time
+
+    session_dir = sys.argv[1] if len(sys.argv) > 1 else constants.DATA_DIR
+    archive_path = archive_session(session_dir)
+    if archive_path:
+        with ResultArchiveReader(archive_path) as reader:
+            start = time.perf_counter()
+            for _ in reader.iter_blocks():
+                pass
+            decode_s = time.perf_counter() - start
+            # The same content as float64 .npy arrays: magnitude, mask, orientation and timestamps
+            raw_bytes = len(reader) * (reader.num_bins * 8 + reader.num_bins + 4 * 8)
+            csv_bytes = len(reader) * (2 * reader.num_bins + 4) * constants.MEMORY_CSV_BYTES_PER_VALUE
+            archive_bytes = os.path.getsize(archive_path)
+            print(f"{len(reader)} frames: {archive_bytes / 2**20:.2f} MB archived, {raw_bytes / archive_bytes:.1f}x smaller than "
+                  f"float64 arrays ({raw_bytes / 2**20:.2f} MB) and {csv_bytes / archive_bytes:.0f}x smaller than CSV")
+            print(f"Decoded all frames in {decode_s:.3f} s ({len(reader) / max(decode_s, 1e-9):,.0f} frames/s)")
+            middle = len(reader) // 2
+            window = reader.read(middle, middle + 100)
+            print(f"Frames {middle}-{middle + 100}: {int(window['detections'].sum()) if 'detections' in window else 0} detections, "
+                  f"t = {window['timestamps'][0]:.3f}-{window['timestamps'][-1]:.3f} s")
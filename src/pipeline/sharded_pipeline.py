@@ -0,0 +1,156 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from src.config import constants
+from src.data_acquisition.imu_reader import read_imu_data
+from src.data_acquisition.time_index import load_time_index
+from src.pipeline.window_pipeline import detect_time_window
+from src.processing.downsampling import downsample_points
+from src.processing.object_clustering import cluster_detected_points
+from src.visualization.map_viewer import cluster_centroids, create_2d_map, plot_cfar_detection, plot_polar_map
+
+def plan_time_shards(index, num_shards):
+    """
+    Splits a recording into `num_shards` time ranges with about the same number of frames.
+
+    Boundaries fall on indexed rows, so every frame belongs to exactly one shard when the
+    shards are read as [start, end), with the last one including its end.
+
+    Args:
+        index (TimeIndex): Time index of the radar file.
+        num_shards (int): Number of shards wanted.
+
+    Returns:
+        list: (t0, t1) per shard.
+    """
+    if len(index.times) == 0:
+        return []
+    entries = np.unique(np.linspace(0, len(index.times), num_shards + 1).astype(int)[:-1])
+    starts = index.times[entries]
+    # The last shard ends at the last frame; its time is not indexed, so use an open end
+    ends = np.append(starts[1:], np.inf)
+    return list(zip(starts.tolist(), ends.tolist()))
+
+def shard_filter_states(imu_file_path, warmup_starts):
+    """
+    Returns the orientation filter state each shard's warm-up starts from.
+
+    Roll and pitch converge during the warm-up, whatever they start from. Gyroscope-only yaw
+    never converges, but it is a plain sum of the gyro rates, so its value at the start of
+    each warm-up is computed here with one cumulative sum over the IMU file instead of
+    running the filter up to that point. With a magnetometer, yaw converges during the
+    warm-up like roll and pitch.
+
+    Args:
+        imu_file_path (str): Path to the IMU data file.
+        warmup_starts (list): Time at which each shard's warm-up starts.
+
+    Returns:
+        tuple: (list of filter states (roll, pitch, yaw in radians), IMU sample interval),
+               or (None, None) if the IMU file cannot be read.
+    """
+    df_imu = read_imu_data(imu_file_path)
+    if df_imu is None or len(df_imu) < 2:
+        return None, None
+    imu_times = df_imu['timestamp'].to_numpy(dtype=float)
+    imu_dt = imu_times[1] - imu_times[0]
+    yaw = np.cumsum(df_imu['gyro_z'].to_numpy(dtype=float) * imu_dt)
+    states = []
+    for start in warmup_starts:
+        # Rows before the first one the shard reads
+        done = int(np.searchsorted(imu_times, start, side='left'))
+        states.append(np.array([0.0, 0.0, yaw[done - 1] if done > 0 else 0.0]))
+    return states, imu_dt
+
+def _process_shard(task):
+    file_path, t0, t1, imu_file_path, mag_file_path, warmup_s, filter_state, imu_dt = task
+    return detect_time_window(file_path, t0, t1, imu_file_path, mag_file_path, warmup_s,
+                              include_end=np.isinf(t1), filter_state=filter_state, imu_dt=imu_dt)
+
+def run_sharded_pipeline(file_path, imu_file_path=None, mag_file_path=None, num_workers=constants.SHARD_NUM_WORKERS,
+                         num_shards=None, margin_s=constants.SHARD_MARGIN_S, show_plots=True):
+    """
+    Processes one session in parallel worker processes, one time shard each, and stitches the results.
+
+    Every shard starts `margin_s` seconds early so that the orientation filter and the clutter
+    background have converged by its first frame; the detections of the margin are discarded.
+    CFAR works on single frames and needs no margin. Yaw is handed to each shard by
+    `shard_filter_states`, and the sweep azimuth depends only on the frame number, so the
+    stitched points match a sequential run up to the residual of the converged filters.
+
+    Args:
+        file_path (str): Absolute path to the Radar-Data.data file.
+        imu_file_path (str, optional): Absolute path to the IMU data file.
+        mag_file_path (str, optional): Absolute path to the Magnetometer data file.
+        num_workers (int): Worker processes.
+        num_shards (int, optional): Number of shards. Defaults to the number of workers.
+        margin_s (float): Warm-up processed before each shard, in seconds.
+        show_plots (bool): If True, map and plot the stitched result.
+
+    Returns:
+        dict: 'points_cartesian' (n, 2), 'points_polar' (n, 2) and 'snr' (n,) arrays and
+              'num_frames', in frame order as in a sequential run. None if processing fails.
+    """
+    if not os.path.exists(file_path):
+        print(f"Error: File not found at {file_path}")
+        return None
+
+    start_time = time.perf_counter()
+    # Build the sidecar indexes once, before the workers need them
+    index = load_time_index(file_path)
+    if imu_file_path:
+        load_time_index(imu_file_path)
+    if mag_file_path and os.path.exists(mag_file_path):
+        load_time_index(mag_file_path)
+
+    shards = plan_time_shards(index, num_shards or num_workers)
+    if not shards:
+        print("Error: The radar file has no frames.")
+        return None
+    filter_states, imu_dt = [None] * len(shards), None
+    if imu_file_path:
+        states, imu_dt = shard_filter_states(imu_file_path, [t0 - margin_s for t0, _ in shards])
+        if states is not None:
+            filter_states = states
+    print(f"Processing {index.num_rows} frames in {len(shards)} time shards on {num_workers} worker processes "
+          f"(margin {margin_s:g} s).")
+
+    tasks = [(file_path, t0, t1, imu_file_path, mag_file_path, margin_s, state, imu_dt)
+             for (t0, t1), state in zip(shards, filter_states)]
+    try:
+        with ProcessPoolExecutor(max_workers=num_workers) as pool:
+            results = list(pool.map(_process_shard, tasks))
+    except Exception as e:
+        print(f"Error processing time shards: {e}")
+        return None
+    if any(result is None for result in results):
+        print("Error: A time shard could not be processed.")
+        return None
+
+    stitched = {
+        'points_cartesian': np.concatenate([result['points_cartesian'] for result in results]),
+        'points_polar': np.concatenate([result['points_polar'] for result in results]),
+        'snr': np.concatenate([result['snr'] for result in results]),
+        'num_frames': sum(result['num_frames'] for result in results),
+    }
+    print(f"Detected {len(stitched['snr'])} points in {stitched['num_frames']} frames in {time.perf_counter() - start_time:.2f} s.")
+    if stitched['num_frames'] != index.num_rows:
+        print(f"Warning: the shards covered {stitched['num_frames']} of {index.num_rows} frames.")
+
+    if show_plots:
+        points_cartesian = stitched['points_cartesian']
+        if len(points_cartesian):
+            map_points, point_weights = points_cartesian, None
+            if constants.DOWNSAMPLE_ENABLED:
+                map_points, point_weights, _ = downsample_points(points_cartesian, constants.DOWNSAMPLE_CELL_SIZE_M, snr=stitched['snr'])
+            clusters_indices = cluster_detected_points(map_points, eps=constants.DBSCAN_EPS, min_samples=constants.DBSCAN_MIN_SAMPLES, sample_weight=point_weights)
+            print(f"\nDetected {len(clusters_indices)} clusters.")
+            create_2d_map(clusters=clusters_indices, all_detected_points_cartesian=map_points.tolist(), title="2D Radar Occupancy Grid with Clusters", map_extent_m=constants.MAP_EXTENT_M, grid_resolution=constants.GRID_RESOLUTION_M, save_path=os.path.join(constants.PLOTS_OUTPUT_DIR, "2d_radar_map.png"), point_weights=point_weights)
+            plot_polar_map(stitched['points_polar'], save_path=os.path.join(constants.PLOTS_OUTPUT_DIR, "2d_radar_polar_plot.png"), centroids_cartesian=cluster_centroids(map_points, clusters_indices))
+        else:
+            print("\nNo points detected for clustering or mapping.")
+        viz = results[0]['first_frame_viz_data']
+        if viz:
+            plot_cfar_detection(viz['range_profile'], viz['cfar_threshold'], viz['detected_indices'], frame_index=0, save_path=os.path.join(constants.PLOTS_OUTPUT_DIR, "cfar_detection.png"))
+    return stitched
@@ -0,0 +1,239 @@
+import time
+import numpy as np
+from src.monitoring.runtime_metrics import STAGE_LATENCY
+
+class GraphStage:
+    """
+    One step of a stage graph, declared by the named arrays it reads and writes.
+
+    `func` is called with the input arrays in the order of `inputs` and returns the output
+    arrays in the order of `outputs` (a single output may be returned as is). All arrays of
+    one call have their rows along the first axis.
+
+    Args:
+        name (str): Stage name, used in messages.
+        func (callable): The computation.
+        inputs (tuple): Names of the arrays the stage reads.
+        outputs (tuple): Names of the arrays the stage writes.
+        batch_size (int, optional): Preferred number of rows per call. The executor splits larger
+                                    inputs into batches of this size when it can.
+        fusible (bool): If True, the stage treats rows independently and may be fused with its
+                        neighbours. Stages that keep state between calls must set this to False.
+    """
+    def __init__(self, name, func, inputs, outputs, batch_size=None, fusible=True):
+        self.name = name
+        self.func = func
+        self.inputs = tuple(inputs)
+        self.outputs = tuple(outputs)
+        self.batch_size = batch_size
+        self.fusible = fusible
+        # Time per call, exposed as a runtime metric
+        self.latency = STAGE_LATENCY.labels(stage=name)
+
+    def __call__(self, arrays):
+        result = self.func(*(arrays[name] for name in self.inputs))
+        if len(self.outputs) == 1:
+            result = (result,)
+        return dict(zip(self.outputs, result))
+
+class StageGraph:
+    """
+    A set of stages connected through the names of their arrays.
+
+    The stages are ordered by their dependencies (ties keep the declared order), and arrays
+    no stage produces are the sources that must be supplied to every run. Runs of adjacent
+    fusible stages are fused: the executor pushes each batch through the whole run before
+    starting the next batch, so intermediates such as the complex spectrum or the CFAR
+    threshold only ever exist for one batch, and an array is dropped as soon as no later
+    stage or graph output needs it.
+
+    Args:
+        stages (list): GraphStage objects.
+        outputs (tuple): Names of the arrays returned by a run.
+    """
+    def __init__(self, stages, outputs):
+        self.stages = self._sort(stages)
+        self.outputs = tuple(outputs)
+        produced = {name for stage in self.stages for name in stage.outputs}
+        self.sources = tuple(dict.fromkeys(name for stage in self.stages for name in stage.inputs if name not in produced))
+        missing = [name for name in self.outputs if name not in produced and name not in self.sources]
+        if missing:
+            raise ValueError(f"no stage produces the graph outputs {missing}")
+        self.groups = self._fuse(self.stages)
+
+    @staticmethod
+    def _sort(stages):
+        producers = {}
+        for stage in stages:
+            for name in stage.outputs:
+                if name in producers:
+                    raise ValueError(f"array '{name}' is produced by both '{producers[name].name}' and '{stage.name}'")
+                producers[name] = stage
+        ordered, done = [], set()
+        remaining = list(stages)
+        while remaining:
+            for stage in remaining:
+                if all(name in done or name not in producers for name in stage.inputs):
+                    ordered.append(stage)
+                    done.update(stage.outputs)
+                    remaining.remove(stage)
+                    break
+            else:
+                raise ValueError(f"stages {[stage.name for stage in remaining]} form a cycle")
+        return ordered
+
+    @staticmethod
+    def _fuse(stages):
+        groups = []
+        for stage in stages:
+            if stage.fusible and groups and groups[-1][-1].fusible:
+                groups[-1].append(stage)
+            else:
+                groups.append([stage])
+        return groups
+
+    def stage(self, name):
+        """
+        Returns the stage called `name`, e.g. to read or set the state of its callable.
+        """
+        for stage in self.stages:
+            if stage.name == name:
+                return stage
+        raise KeyError(f"no stage named '{name}'")
+
+    def describe(self):
+        """
+        Returns the execution plan as text, with fused stages joined by '+'.
+        """
+        return " -> ".join("+".join(stage.name for stage in group) for group in self.groups)
+
+class GraphRunner:
+    """
+    Executes a StageGraph on one set of source arrays at a time.
+
+    The runner holds no data between calls, only the stage objects do, so stateful stages
+    (e.g. a running background estimate) carry over from one call to the next. The same
+    graph therefore runs offline (one call with the whole recording), chunked (one call per
+    chunk read from disk) or live (one call per batch of newly recorded frames).
+    """
+    def __init__(self, graph):
+        self.graph = graph
+
+    def _plan(self, outputs, supplied=()):
+        # Keep only the stages the requested outputs depend on, and whose outputs are not supplied already
+        needed = set(outputs)
+        groups = []
+        for group in reversed(self.graph.groups):
+            kept = []
+            for stage in reversed(group):
+                if needed.intersection(stage.outputs) and not set(stage.outputs).issubset(supplied):
+                    kept.insert(0, stage)
+                    needed.update(stage.inputs)
+            if kept:
+                groups.append(kept)
+        groups.reverse()
+        # For every group, the arrays still needed after it
+        live_after = []
+        live = set(outputs)
+        for group in reversed(groups):
+            live_after.append(set(live))
+            for stage in group:
+                live.update(stage.inputs)
+        live_after.reverse()
+        return groups, live_after
+
+    def process(self, sources, outputs=None):
+        """
+        Runs the graph.
+
+        Stages whose outputs are all among `sources` are skipped, so a graph can be run in parts,
+        e.g. a stateful stage in one thread and the stages after it in others.
+
+        Args:
+            sources (dict): The source arrays, all with one row per frame.
+            outputs (tuple, optional): Arrays to return instead of the graph outputs.
+
+        Returns:
+            dict: The requested arrays.
+        """
+        outputs = tuple(outputs or self.graph.outputs)
+        missing = [name for name in self.graph.sources if name not in sources]
+        if missing:
+            raise ValueError(f"missing source arrays {missing}")
+        arrays = dict(sources)
+        groups, live_after = self._plan(outputs, sources)
+        for group, needed_after in zip(groups, live_after):
+            arrays.update(self._run_group(group, arrays, needed_after))
+            for name in list(arrays):
+                if name not in needed_after:
+                    del arrays[name]
+        return {name: arrays[name] for name in outputs}
+
+    def _run_group(self, group, arrays, needed_after):
+        produced = {name for stage in group for name in stage.outputs}
+        group_inputs = list(dict.fromkeys(name for stage in group for name in stage.inputs if name not in produced))
+        group_outputs = [name for name in produced if name in needed_after]
+        batch_sizes = [stage.batch_size for stage in group if stage.batch_size]
+        num_rows = {len(arrays[name]) for name in group_inputs}
+        if not batch_sizes or len(num_rows) != 1 or num_rows.pop() <= min(batch_sizes):
+            return self._run_batch(group, {name: arrays[name] for name in group_inputs}, group_outputs)
+
+        total = len(arrays[group_inputs[0]])
+        batch_size = min(batch_sizes)
+        pieces = {name: [] for name in group_outputs}
+        for start in range(0, total, batch_size):
+            batch = {name: arrays[name][start:start + batch_size] for name in group_inputs}
+            for name, value in self._run_batch(group, batch, group_outputs).items():
+                pieces[name].append(value)
+        return {name: np.concatenate(values) for name, values in pieces.items()}
+
+    @staticmethod
+    def _run_batch(group, arrays, group_outputs):
+        # Liveness within the group: drop each intermediate after its last reader
+        last_use = {}
+        for i, stage in enumerate(group):
+            for name in stage.inputs:
+                last_use[name] = i
+        for i, stage in enumerate(group):
+            try:
+                start = time.perf_counter()
+                arrays.update(stage(arrays))
+                stage.latency.observe(time.perf_counter() - start)
+            except Exception as e:
+                raise RuntimeError(f"Stage '{stage.name}' failed: {e}") from e
+            for name in stage.inputs:
+                if last_use[name] == i and name not in group_outputs:
+                    arrays.pop(name, None)
+        return {name: arrays[name] for name in group_outputs}
+
+def run_offline(graph, sources, outputs=None):
+    """
+    Runs a graph once over complete source arrays.
+    """
+    return GraphRunner(graph).process(sources, outputs)
+
+def run_chunked(graph, source_chunks, outputs=None):
+    """
+    Runs a graph over consecutive chunks of source arrays (from disk, or live from a recording).
+
+    Yields:
+        dict: The outputs for each chunk.
+    """
+    runner = GraphRunner(graph)
+    for sources in source_chunks:
+        yield runner.process(sources, outputs)
+
+if __name__ == "__main__":
+    # Example usage: a three-stage graph, run offline and in chunks
+    graph = StageGraph([
+        GraphStage('square', lambda x: x ** 2, inputs=('x',), outputs=('x2',), batch_size=1000),
+        GraphStage('sum_rows', lambda x2: x2.sum(axis=1), inputs=('x2',), outputs=('total',), batch_size=1000),
+        GraphStage('scale', lambda total, w: total * w, inputs=('total', 'w'), outputs=('weighted',)),
+    ], outputs=('weighted',))
+    print(f"Plan: {graph.describe()}, sources {graph.sources}")
+
+    x = np.random.rand(10000, 64)
+    w = np.random.rand(10000)
+    offline = run_offline(graph, {'x': x, 'w': w})['weighted']
+    chunked = np.concatenate([out['weighted'] for out in run_chunked(graph, ({'x': x[i:i + 3000], 'w': w[i:i + 3000]} for i in range(0, 10000, 3000)))])
+    print(f"Offline and chunked runs agree: {np.allclose(offline, chunked)}")
@@ -0,0 +1,183 @@
+import queue
+import threading
+import time
+from src.config import constants
+from src.monitoring.runtime_metrics import QUEUE_DEPTH, STAGE_LATENCY
+
+# Marks the end of the block stream on a hand-off queue
+_END_OF_STREAM = object()
+# How often a thread blocked on a queue checks whether the pipeline was stopped (in seconds)
+_STOP_CHECK_INTERVAL_S = 0.1
+
+class _StageFailure:
+    """
+    Carries an exception raised by a stage downstream, so the pipeline drains instead of deadlocking.
+    """
+    def __init__(self, stage_name, error):
+        self.stage_name = stage_name
+        self.error = error
+
+class PipelineStage:
+    """
+    One step of the threaded frame pipeline.
+
+    Stages with a single worker see blocks strictly in order, so they may keep state
+    between blocks. Stages with several workers must be stateless; their output is put
+    back in order further down the pipeline.
+    """
+    def __init__(self, name, func, num_workers=1):
+        self.name = name
+        self.func = func
+        self.num_workers = max(1, int(num_workers))
+        self.latency = STAGE_LATENCY.labels(stage=name)
+
+def _put(out_queue, item, stop):
+    """
+    Puts an item on a bounded queue, giving up once `stop` is set. Returns False if it gave up.
+    """
+    while not stop.is_set():
+        try:
+            out_queue.put(item, timeout=_STOP_CHECK_INTERVAL_S)
+            return True
+        except queue.Full:
+            pass
+    return False
+
+def _get(in_queue, stop):
+    """
+    Takes an item from a queue, giving up once `stop` is set. Returns _END_OF_STREAM if it gave up.
+    """
+    while not stop.is_set():
+        try:
+            return in_queue.get(timeout=_STOP_CHECK_INTERVAL_S)
+        except queue.Empty:
+            pass
+    return _END_OF_STREAM
+
+def _run_stage_worker(stage, in_queue, out_queue, state, stop):
+    """
+    Worker loop for one thread of a stage: takes (seq, block) items, applies the stage and passes them on.
+    """
+    pending = {}
+    while not stop.is_set():
+        item = _get(in_queue, stop)
+        if item is _END_OF_STREAM:
+            if stop.is_set():
+                return
+            with state['lock']:
+                state['remaining'] -= 1
+                last_worker = state['remaining'] == 0
+            if last_worker:
+                _put(out_queue, _END_OF_STREAM, stop)
+            else:
+                # Let the sibling workers of this stage see the end marker too
+                _put(in_queue, _END_OF_STREAM, stop)
+            return
+
+        if stage.num_workers == 1:
+            # Single-worker stages process blocks in sequence order
+            pending[item[0]] = item[1]
+            while state['next_seq'] in pending:
+                seq = state['next_seq']
+                if not _put(out_queue, (seq, _apply_stage(stage, pending.pop(seq))), stop):
+                    return
+                state['next_seq'] += 1
+        else:
+            seq, block = item
+            if not _put(out_queue, (seq, _apply_stage(stage, block)), stop):
+                return
+
+def _drain(queues):
+    # Empties the queues, so no thread stays blocked on a full one
+    for stage_queue in queues:
+        try:
+            while True:
+                stage_queue.get_nowait()
+        except queue.Empty:
+            pass
+
+def _apply_stage(stage, block):
+    if isinstance(block, _StageFailure):
+        return block
+    try:
+        start = time.perf_counter()
+        result = stage.func(block)
+        stage.latency.observe(time.perf_counter() - start)
+        return result
+    except Exception as e:
+        return _StageFailure(stage.name, e)
+
+def run_stage_pipeline(blocks, stages, queue_size=constants.PIPELINE_QUEUE_SIZE):
+    """
+    Runs blocks through a chain of stages, with every stage working concurrently on a different block.
+
+    Each stage runs in its own thread(s) and hands blocks to the next one through a bounded
+    queue, so a slow stage applies back-pressure instead of letting memory grow. Stages that
+    spend their time inside NumPy (FFT, reductions) release the GIL and overlap with each other.
+
+    When a stage or the `blocks` iterator raises, the error is raised here once the blocks
+    before it have been yielded. Whenever the consumer stops, because of an error or by
+    closing the generator early, the threads are stopped, the queues drained and the threads
+    joined, so nothing keeps running in the background.
+
+    Args:
+        blocks (iterable): The input blocks, in order.
+        stages (list): List of PipelineStage objects, applied in order.
+        queue_size (int): Maximum number of blocks waiting between two stages.
+
+    Yields:
+        The output of the last stage for each input block, in the same order as `blocks`.
+    """
+    queues = [queue.Queue(maxsize=queue_size) for _ in range(len(stages) + 1)]
+    # Blocks waiting in front of each stage, read only when the metrics are scraped
+    for stage, stage_queue in zip(stages, queues):
+        QUEUE_DEPTH.labels(queue=f"pipeline_{stage.name}").set_function(stage_queue.qsize)
+    stop = threading.Event()
+    threads = []
+
+    def feed():
+        seq = 0
+        try:
+            for block in blocks:
+                if not _put(queues[0], (seq, block), stop):
+                    return
+                seq += 1
+        except Exception as e:
+            # Passed through the stages like a stage failure, so it is raised in order
+            _put(queues[0], (seq, _StageFailure('input', e)), stop)
+        finally:
+            _put(queues[0], _END_OF_STREAM, stop)
+
+    threads.append(threading.Thread(target=feed, name="pipeline-feed", daemon=True))
+    for i, stage in enumerate(stages):
+        state = {'lock': threading.Lock(), 'remaining': stage.num_workers, 'next_seq': 0}
+        for w in range(stage.num_workers):
+            threads.append(threading.Thread(
+                target=_run_stage_worker,
+                args=(stage, queues[i], queues[i + 1], state, stop),
+                name=f"pipeline-{stage.name}-{w}",
+                daemon=True
+            ))
+    for thread in threads:
+        thread.start()
+
+    # Multi-worker stages may finish blocks out of order; restore the input order here
+    pending = {}
+    next_seq = 0
+    try:
+        while True:
+            item = queues[-1].get()
+            if item is _END_OF_STREAM:
+                break
+            pending[item[0]] = item[1]
+            while next_seq in pending:
+                result = pending.pop(next_seq)
+                if isinstance(result, _StageFailure):
+                    raise RuntimeError(f"Pipeline stage '{result.stage_name}' failed: {result.error}") from result.error
+                yield result
+                next_seq += 1
+    finally:
+        stop.set()
+        _drain(queues)
+        for thread in threads:
+            thread.join()
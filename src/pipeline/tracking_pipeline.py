@@ -0,0 +1,80 @@
+import os
+import numpy as np
+from src.config import constants
+from src.data_acquisition.data_parser import count_data_rows
+from src.data_acquisition.radar_reader import read_radar_data_chunks
+from src.data_acquisition.imu_reader import read_and_merge_imu_data
+from src.pipeline.follow_pipeline import IncrementalFrameProcessor
+from src.pipeline.radar_graph import RADAR_GRAPH_FRAME_OUTPUT, RADAR_GRAPH_OUTPUTS
+from src.processing.tracking import MultiTargetTracker, frame_measurements
+from src.visualization.map_viewer import plot_tracks
+
+def track_detections(tracker, x, y, point_frame, frame_timestamps, first_frame):
+    """
+    Feeds the detections of consecutive frames to a tracker, one update per frame with detections.
+
+    Args:
+        tracker (MultiTargetTracker): The tracker to update.
+        x (np.array): X coordinate of every detected point.
+        y (np.array): Y coordinate of every detected point.
+        point_frame (np.array): Frame index of every point, in non-decreasing order.
+        frame_timestamps (np.array): Time of each frame, starting at frame `first_frame`.
+        first_frame (int): Frame index of frame_timestamps[0].
+    """
+    if len(point_frame) == 0:
+        return
+    frame_numbers, starts = np.unique(point_frame, return_index=True)
+    ends = np.append(starts[1:], len(point_frame))
+    points = np.column_stack((x, y))
+    for frame, start, end in zip(frame_numbers, starts, ends):
+        tracker.update(frame_timestamps[frame - first_frame], frame_measurements(points[start:end]))
+
+def run_tracking_pipeline(file_path, imu_file_path=None, mag_file_path=None, chunk_frames=constants.TRACK_CHUNK_FRAMES):
+    """
+    Detects points frame by frame and follows the moving objects among them with a multi-target tracker.
+
+    The detections of each frame are merged into object measurements and associated with
+    the existing tracks (see MultiTargetTracker). The session is read in chunks, so the run
+    uses little memory however long the recording is.
+
+    Args:
+        file_path (str): Absolute path to the Radar-Data.data file.
+        imu_file_path (str, optional): Absolute path to the IMU data file.
+        mag_file_path (str, optional): Absolute path to the Magnetometer data file.
+        chunk_frames (int): Radar frames read and processed at a time.
+
+    Returns:
+        MultiTargetTracker: The tracker after the last frame, or None if the data cannot be read.
+    """
+    if not os.path.exists(file_path):
+        print(f"Error: File not found at {file_path}")
+        return None
+
+    processor = IncrementalFrameProcessor(sweep_frames=count_data_rows(file_path), imu_history_s=np.inf)
+    if imu_file_path:
+        df_imu = read_and_merge_imu_data(imu_file_path, mag_file_path)
+        if df_imu is not None:
+            processor.add_imu_rows(df_imu)
+        else:
+            print("IMU data could not be loaded or processed.")
+
+    tracker = MultiTargetTracker()
+    outputs = RADAR_GRAPH_OUTPUTS + (RADAR_GRAPH_FRAME_OUTPUT,)
+    try:
+        for chunk in read_radar_data_chunks(file_path, chunk_frames):
+            radar_columns = [col for col in chunk.columns if col.startswith('f0_f0_')]
+            timestamps = chunk['Time (seconds)'].to_numpy(dtype=float)
+            first_frame = processor.start_frame + processor.frames_processed
+            _, _, x, y, _, point_frame = processor.detect_frames(chunk[radar_columns].to_numpy(), timestamps, outputs=outputs)
+            track_detections(tracker, x, y, point_frame, timestamps, first_frame)
+    except Exception as e:
+        print(f"Error tracking radar data: {e}")
+        return None
+
+    confirmed = tracker.confirmed_tracks()
+    print(f"Processed {processor.frames_processed} frames: {tracker.num_tracks_created} tracks started, "
+          f"{tracker.num_tracks_retired} retired, {len(confirmed['id'])} confirmed tracks active at the end.")
+    for track_id, state in zip(confirmed['id'], confirmed['state']):
+        print(f"  Track {track_id}: position ({state[0]:.2f}, {state[1]:.2f}) m, velocity ({state[2]:.2f}, {state[3]:.2f}) m/s")
+    plot_tracks(tracker.history(), save_path=os.path.join(constants.PLOTS_OUTPUT_DIR, "object_tracks.png"))
+    return tracker
@@ -0,0 +1,124 @@
+import os
+import numpy as np
+from src.config import constants
+from src.data_acquisition.radar_reader import read_radar_data
+from src.data_acquisition.imu_reader import read_and_merge_imu_data
+from src.data_acquisition.time_index import load_time_index
+from src.pipeline.follow_pipeline import IncrementalFrameProcessor
+from src.processing.downsampling import downsample_points
+from src.processing.object_clustering import cluster_detected_points
+from src.visualization.map_viewer import cluster_centroids, create_2d_map, plot_cfar_detection, plot_polar_map
+
+def detect_time_window(file_path, t0, t1, imu_file_path=None, mag_file_path=None, warmup_s=constants.WINDOW_IMU_WARMUP_S,
+                       include_end=True, filter_state=None, imu_dt=None):
+    """
+    Detects points in the radar frames with t0 <= time <= t1, reading only that part of the session.
+
+    The radar and IMU files are read through their sidecar time indexes (built on first use).
+    The orientation filter starts `warmup_s` seconds before t0 so that roll and pitch have
+    settled when the window begins; without a magnetometer, yaw is integrated from the start
+    of the warm-up unless `filter_state` provides its value there. With clutter removal
+    enabled, the background is warmed up over the same margin. Without IMU yaw, the sweep
+    azimuth of each frame matches that of a full-session run.
+
+    Args:
+        file_path (str): Absolute path to the Radar-Data.data file.
+        t0 (float): Start of the window in seconds.
+        t1 (float): End of the window in seconds.
+        imu_file_path (str, optional): Absolute path to the IMU data file.
+        mag_file_path (str, optional): Absolute path to the Magnetometer data file.
+        warmup_s (float): Data processed before t0 to settle the filters, in seconds.
+        include_end (bool): If False, frames at exactly t1 are left out, so adjacent windows do not overlap.
+        filter_state (np.array, optional): Orientation filter state (roll, pitch, yaw in radians) at the start of the warm-up.
+        imu_dt (float, optional): Time between IMU samples. Taken from the first samples read if not given.
+
+    Returns:
+        dict: 'points_cartesian' (n, 2), 'points_polar' (n, 2) and 'snr' (n,) arrays, 'num_frames',
+              the number of radar frames in the window, 'first_frame', the frame number of its
+              first frame, and 'first_frame_viz_data' for the CFAR plot. None if the data cannot be read.
+    """
+    if not os.path.exists(file_path):
+        print(f"Error: File not found at {file_path}")
+        return None
+    if t1 < t0:
+        print(f"Error: The window end {t1} s is before its start {t0} s.")
+        return None
+
+    radar_index = load_time_index(file_path)
+    radar_start = t0 - warmup_s if constants.CLUTTER_REMOVAL_ENABLED else t0
+    df = read_radar_data(file_path, time_window=(radar_start, t1))
+    if df is None:
+        print("Error: Could not load radar data.")
+        return None
+    print(f"Processing {t0:.2f}-{t1:.2f} s: {len(df)} frames starting at frame {df.attrs['first_row']} of {radar_index.num_rows}.")
+
+    processor = IncrementalFrameProcessor(sweep_frames=radar_index.num_rows, imu_history_s=np.inf, start_frame=df.attrs['first_row'],
+                                          filter_state=filter_state, imu_dt=imu_dt)
+    if imu_file_path:
+        df_imu = read_and_merge_imu_data(imu_file_path, mag_file_path, time_window=(t0 - warmup_s, t1))
+        if df_imu is not None and not df_imu.empty:
+            processor.add_imu_rows(df_imu)
+        else:
+            print("IMU data could not be loaded for this window.")
+
+    radar_columns = [col for col in df.columns if col.startswith('f0_f0_')]
+    timestamps = df['Time (seconds)'].to_numpy(dtype=float)
+    frames = df[radar_columns].to_numpy()
+    in_window = (timestamps >= t0) & ((timestamps <= t1) if include_end else (timestamps < t1))
+    before = timestamps < t0
+    if before.any():
+        # Warm up the clutter background; detections before t0 are discarded
+        processor.detect_frames(frames[before], timestamps[before])
+        processor.first_frame_viz_data = {}
+    corrected_r, corrected_azimuth_rad, x, y, snr = processor.detect_frames(frames[in_window], timestamps[in_window])
+
+    return {
+        'points_cartesian': np.column_stack((x, y)),
+        'points_polar': np.column_stack((corrected_r, corrected_azimuth_rad)),
+        'snr': snr,
+        'num_frames': int(in_window.sum()),
+        'first_frame': df.attrs['first_row'] + int(before.sum()),
+        'first_frame_viz_data': processor.first_frame_viz_data,
+    }
+
+def process_time_window(file_path, t0, t1, imu_file_path=None, mag_file_path=None, warmup_s=constants.WINDOW_IMU_WARMUP_S):
+    """
+    Detects and maps points for the time window [t0, t1] of a session only.
+
+    Only the window (and the warm-up before it) is parsed, so the run time grows with the
+    window length, not the session length. See `detect_time_window`.
+
+    Args:
+        file_path (str): Absolute path to the Radar-Data.data file.
+        t0 (float): Start of the window in seconds.
+        t1 (float): End of the window in seconds.
+        imu_file_path (str, optional): Absolute path to the IMU data file.
+        mag_file_path (str, optional): Absolute path to the Magnetometer data file.
+        warmup_s (float): Data processed before t0 to settle the filters, in seconds.
+
+    Returns:
+        dict: 'points_cartesian' (n, 2), 'points_polar' (n, 2) and 'snr' (n,) arrays, and
+              'num_frames', the number of radar frames in the window. None if the data cannot be read.
+    """
+    result = detect_time_window(file_path, t0, t1, imu_file_path, mag_file_path, warmup_s)
+    if result is None:
+        return None
+
+    suffix = f"_{t0:g}-{t1:g}s"
+    points_cartesian, snr = result['points_cartesian'], result['snr']
+    if len(points_cartesian):
+        map_points, point_weights = points_cartesian, None
+        if constants.DOWNSAMPLE_ENABLED:
+            map_points, point_weights, _ = downsample_points(points_cartesian, constants.DOWNSAMPLE_CELL_SIZE_M, snr=snr)
+        clusters_indices = cluster_detected_points(map_points, eps=constants.DBSCAN_EPS, min_samples=constants.DBSCAN_MIN_SAMPLES, sample_weight=point_weights)
+        print(f"\nDetected {len(points_cartesian)} points in {len(clusters_indices)} clusters.")
+        create_2d_map(clusters=clusters_indices, all_detected_points_cartesian=map_points.tolist(), title=f"2D Radar Map, {t0:g}-{t1:g} s", map_extent_m=constants.MAP_EXTENT_M, grid_resolution=constants.GRID_RESOLUTION_M, save_path=os.path.join(constants.PLOTS_OUTPUT_DIR, f"2d_radar_map{suffix}.png"), point_weights=point_weights)
+        plot_polar_map(result['points_polar'], save_path=os.path.join(constants.PLOTS_OUTPUT_DIR, f"2d_radar_polar_plot{suffix}.png"), centroids_cartesian=cluster_centroids(map_points, clusters_indices))
+    else:
+        print("\nNo points detected in this window.")
+
+    if result['first_frame_viz_data']:
+        viz = result['first_frame_viz_data']
+        plot_cfar_detection(viz['range_profile'], viz['cfar_threshold'], viz['detected_indices'], frame_index=result['first_frame'], save_path=os.path.join(constants.PLOTS_OUTPUT_DIR, f"cfar_detection{suffix}.png"))
+
+    return {key: result[key] for key in ('points_cartesian', 'points_polar', 'snr', 'num_frames')}
@@ -48,6 +48,67 @@ def cfar_ca(signal, training_cells, guard_cells, p_fa):
 
     return detected_targets
 
+def cfar_ca_alpha(training_cells, p_fa):
+    """
+    Returns the CA-CFAR threshold factor, i.e. the ratio between the threshold and the noise estimate.
+
+    Args:
+        training_cells (int): Number of training cells on each side of the cell under test.
+        p_fa (float): Desired probability of false alarm.
+
+    Returns:
+        float: The threshold factor alpha = N * (p_fa^(-1/N) - 1), with N = 2 * training_cells.
+    """
+    N = 2 * training_cells
+    return N * (p_fa**(-1/N) - 1)
+
+def cfar_ca_batch(signals, training_cells, guard_cells, p_fa, return_threshold=False):
+    """
+    Performs CA-CFAR detection on a block of range profiles at once.
+
+    The training-cell sums are taken from a running sum along each profile, so the
+    whole block is handled with a handful of vectorized NumPy operations instead of
+    a Python loop over cells. Results match `cfar_ca` applied to every row.
+
+    Args:
+        signals (np.array): 2D array of shape (num_frames, num_cells).
+        training_cells (int): Number of training cells on each side of the cell under test.
+        guard_cells (int): Number of guard cells on each side of the cell under test.
+        p_fa (float): Desired probability of false alarm.
+        return_threshold (bool): If True, also return the CFAR threshold per cell
+                                 (NaN where the window does not fit).
+
+    Returns:
+        np.array: A boolean array of shape (num_frames, num_cells) marking detections,
+                  or a tuple (detections, threshold) if `return_threshold` is True.
+    """
+    signals = np.atleast_2d(np.asarray(signals, dtype=float))
+    num_frames, num_cells = signals.shape
+    detected_targets = np.zeros(signals.shape, dtype=bool)
+    threshold = np.full(signals.shape, np.nan)
+
+    N = 2 * training_cells
+    alpha = cfar_ca_alpha(training_cells, p_fa)
+    offset = training_cells + guard_cells
+
+    if num_cells > 2 * offset:
+        # cumsum[:, k] holds the sum of the first k cells of each profile
+        cumsum = np.zeros((num_frames, num_cells + 1))
+        np.cumsum(signals, axis=1, out=cumsum[:, 1:])
+
+        # Left window [i - offset, i - guard) and right window (i + guard, i + offset]
+        # for every cell under test i in [offset, num_cells - offset)
+        left = cumsum[:, offset - guard_cells:num_cells - offset - guard_cells] - cumsum[:, :num_cells - 2 * offset]
+        right = cumsum[:, 2 * offset + 1:] - cumsum[:, offset + guard_cells + 1:num_cells - offset + guard_cells + 1]
+
+        valid = slice(offset, num_cells - offset)
+        threshold[:, valid] = alpha * (left + right) / N
+        detected_targets[:, valid] = signals[:, valid] > threshold[:, valid]
+
+    if return_threshold:
+        return detected_targets, threshold
+    return detected_targets
+
 if __name__ == '__main__':
     # Example usage of CFAR
     # Create a sample signal with some peaks (targets) and noise
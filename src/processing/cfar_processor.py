@@ -3,18 +3,24 @@ import numpy as np
 import os
 import matplotlib.pyplot as plt
 import inspect
-from src.data_acquisition.radar_reader import read_radar_data
+from src.data_acquisition.data_parser import count_data_rows, read_data_header
+from src.data_acquisition.radar_reader import read_radar_data, read_radar_data_chunks
 from src.data_acquisition.imu_reader import read_and_merge_imu_data
 from src.fusion.imu_fusion import estimate_orientation
-from src.processing.cfar_detection import cfar_ca
 from src.processing.object_clustering import cluster_detected_points
+from src.processing.downsampling import downsample_points
+from src.processing.tiled_map import TiledMapStore
 from src.visualization import map_viewer
 print(f"map_viewer path: {inspect.getfile(map_viewer)}")
-from src.processing.radar_fft import polar_to_cartesian, perform_fft, correct_for_imu_orientation
-from src.visualization.map_viewer import create_2d_map, plot_cfar_detection, plot_raw_imu_data, plot_imu_orientation, plot_polar_map
+from src.visualization.map_viewer import cluster_centroids, create_2d_map, plot_cfar_detection, plot_raw_imu_data, plot_imu_orientation, plot_polar_map, plot_tiled_map
 from src.config import constants
+from src.pipeline.radar_graph import RADAR_GRAPH_OUTPUTS, RADAR_GRAPH_SUPPRESSED_OUTPUT, RADAR_GRAPH_VIZ_OUTPUTS, build_radar_graph, imu_orientation_lookup, radar_sources
+from src.pipeline.stage_graph import GraphRunner
+from src.pipeline.threaded_pipeline import PipelineStage, run_stage_pipeline
+from src.pipeline.checkpoint import (PipelineCheckpoint, session_signature, radar_point_rows, radar_progress_state,
+                                     restore_radar_progress, imu_angle_rows, imu_progress_state, restore_imu_progress)
 
-def process_and_cfar_data(file_path, imu_file_path=None, mag_file_path=None):
+def process_and_cfar_data(file_path, imu_file_path=None, mag_file_path=None, threaded=False):
     """
     Loads radar data, applies FFT and CFAR, clusters detected points, and visualizes the results, including a 2D map.
     Optionally loads and processes IMU and magnetometer data for orientation estimation.
@@ -23,29 +29,70 @@ def process_and_cfar_data(file_path, imu_file_path=None, mag_file_path=None):
         file_path (str): Absolute path to the Radar-Data.data file.
         imu_file_path (str, optional): Absolute path to the IMU data CSV file.
         mag_file_path (str, optional): Absolute path to the Magnetometer data file.
+        threaded (bool): If True, run the detection as a pipeline of concurrent stages: the file is
+                         streamed in blocks, clutter removal runs in one thread (it keeps state
+                         between blocks), FFT, CFAR and projection in PIPELINE_NUM_WORKERS threads,
+                         and the points are collected in order as the blocks come out.
+
+    If CHECKPOINT_ENABLED is set, the IMU filter state, the last processed frame and the points
+    detected since the previous save are saved every CHECKPOINT_INTERVAL_S seconds. A rerun with the same inputs
+    and settings continues from the latest checkpoint and produces the same output as an
+    uninterrupted run. The checkpoint is deleted once the run completes.
     """
     if not os.path.exists(file_path):
         print(f"Error: File not found at {file_path}")
         return
 
+    checkpoint = None
     try:
-        df = read_radar_data(file_path)
-        if df is None:
-            print("Error: Could not load radar data.")
-            return
-
-        radar_columns = [col for col in df.columns if col.startswith('f0_f0_')]
+        if threaded:
+            # The frames are streamed by the pipeline below; only the header and the row count are read here
+            column_names = read_data_header(file_path)
+            num_frames = count_data_rows(file_path)
+        else:
+            df = read_radar_data(file_path)
+            if df is None:
+                print("Error: Could not load radar data.")
+                return
+            column_names = df.columns
+            num_frames = len(df)
+
+        radar_columns = [col for col in column_names if col.startswith('f0_f0_')]
         if not radar_columns:
             print("Error: No radar data columns found (e.g., 'f0_f0_fX').")
             return
 
+        # --- Checkpointing ---
+        saved_state = {}
+        if constants.CHECKPOINT_ENABLED:
+            settings = {
+                'block_size': constants.PIPELINE_BLOCK_SIZE, 'max_range_m': constants.MAX_RANGE_M,
+                'cfar': [constants.CFAR_NUM_TRAINING_CELLS, constants.CFAR_NUM_GUARD_CELLS, constants.CFAR_P_FA],
+                'clutter': [constants.CLUTTER_REMOVAL_ENABLED, constants.CLUTTER_TIME_CONSTANT_S],
+            }
+            checkpoint = PipelineCheckpoint(constants.CHECKPOINT_DIR, session_signature([file_path, imu_file_path, mag_file_path], settings), interval_s=constants.CHECKPOINT_INTERVAL_S)
+            saved_state = checkpoint.load() or {}
+        imu_state = {}
+        imu_angles = np.empty((0, 3))
+        latest_imu_progress = {}
+
+        def save_imu_progress(progress):
+            latest_imu_progress.update(progress)
+            if checkpoint is not None and checkpoint.due():
+                checkpoint.save(imu_progress_state(progress),
+                                new_rows={'imu_angles': imu_angle_rows(progress, checkpoint.saved_rows('imu_angles'))})
+
         # --- IMU Data Processing ---
         imu_data_with_orientation = None
         if imu_file_path:
             df_imu = read_and_merge_imu_data(imu_file_path, mag_file_path)
             if df_imu is not None:
                 imu_dt = (df_imu['timestamp'].iloc[1] - df_imu['timestamp'].iloc[0]) if len(df_imu) > 1 else 0.01
-                imu_data_with_orientation = estimate_orientation(df_imu.copy(), dt=imu_dt)
+                imu_data_with_orientation = estimate_orientation(
+                    df_imu.copy(), dt=imu_dt, resume_state=restore_imu_progress(saved_state), on_progress=save_imu_progress
+                )
+                imu_state = imu_progress_state(latest_imu_progress)
+                imu_angles = imu_angle_rows(latest_imu_progress)
                 print("\nEstimated IMU Orientation (first 5 rows):")
                 print(imu_data_with_orientation[['timestamp', 'roll', 'pitch', 'yaw']].head())
                 
@@ -55,76 +102,126 @@ def process_and_cfar_data(file_path, imu_file_path=None, mag_file_path=None):
                 print("IMU data could not be loaded or processed.")
         # --- End IMU Data Processing ---
 
+        # --- Radar Detection ---
+        # The detection graph shared by all modes, run over blocks of frames so progress can be checkpointed
+        graph = build_radar_graph(imu_orientation_lookup(imu_data_with_orientation), sweep_frames=num_frames, clutter_removal=constants.CLUTTER_REMOVAL_ENABLED)
+        runner = GraphRunner(graph)
+        clutter = graph.stage('clutter').func if constants.CLUTTER_REMOVAL_ENABLED else None
         all_detected_points_cartesian = []
         all_detected_points_polar = []
-        
-        first_frame_range_profile = None
-        first_frame_cfar_threshold = None
-        first_frame_detected_indices = None
-
-        for index, row in df.iterrows():
-            raw_radar_profile = row[radar_columns].values.astype(float)
-            range_profile = perform_fft(raw_radar_profile)
-            range_bins = np.linspace(0, constants.MAX_RANGE_M, len(range_profile))
-
-            detections = cfar_ca(range_profile, constants.CFAR_NUM_TRAINING_CELLS, constants.CFAR_NUM_GUARD_CELLS, constants.CFAR_P_FA)
-            detected_indices = np.where(detections)[0]
-
-            if index == 0:
-                first_frame_range_profile = range_profile
-                first_frame_cfar_threshold = np.zeros_like(range_profile)
-                N = 2 * constants.CFAR_NUM_TRAINING_CELLS
-                alpha = N * (constants.CFAR_P_FA**(-1/N) - 1)
-                offset = constants.CFAR_NUM_TRAINING_CELLS + constants.CFAR_NUM_GUARD_CELLS
-                for i in range(len(range_profile)):
-                    if i < offset or i >= len(range_profile) - offset:
-                        first_frame_cfar_threshold[i] = np.nan
-                        continue
-                    sum_training_cells = np.sum(range_profile[i - offset : i - constants.CFAR_NUM_GUARD_CELLS])
-                    sum_training_cells += np.sum(range_profile[i + constants.CFAR_NUM_GUARD_CELLS + 1 : i + offset + 1])
-                    noise_estimate = sum_training_cells / N
-                    first_frame_cfar_threshold[i] = alpha * noise_estimate
-                first_frame_detected_indices = detected_indices
-            
-            azimuth_angle_rad = (index / len(df)) * np.pi
-
-            current_roll_rad, current_pitch_rad, current_yaw_rad = 0.0, 0.0, azimuth_angle_rad
-
-            if imu_data_with_orientation is not None and not imu_data_with_orientation.empty:
-                radar_timestamp = row['Time (seconds)']
-                closest_imu_data = imu_data_with_orientation.iloc[(imu_data_with_orientation['timestamp'] - radar_timestamp).abs().argsort()[:1]]
-                
-                if not closest_imu_data.empty:
-                    current_roll_rad = np.deg2rad(closest_imu_data['roll'].values[0])
-                    current_pitch_rad = np.deg2rad(closest_imu_data['pitch'].values[0])
-                    if 'yaw' in closest_imu_data.columns:
-                        current_yaw_rad = np.deg2rad(closest_imu_data['yaw'].values[0])
-
-            for detected_bin_index in detected_indices:
-                r = range_bins[detected_bin_index]
-                
-                corrected_r, corrected_azimuth_rad = correct_for_imu_orientation(
-                    r, azimuth_angle_rad, current_roll_rad, current_pitch_rad, current_yaw_rad
-                )
-                
-                all_detected_points_polar.append((corrected_r, corrected_azimuth_rad))
-                x, y = polar_to_cartesian(corrected_r, corrected_azimuth_rad)
-                all_detected_points_cartesian.append((x, y))
-
+        all_detection_snr = []
+        first_frame_viz_data = {}
+        # Detections on the raw range profiles that clutter removal took away
+        suppressed_detections = 0
+        start_frame = 0
+        if 'frames_done' in saved_state:
+            (start_frame, all_detected_points_cartesian, all_detected_points_polar, all_detection_snr,
+             clutter_background, first_frame_viz_data, suppressed_detections) = restore_radar_progress(saved_state)
+            if clutter is not None:
+                clutter.background = clutter_background
+            print(f"Resuming radar processing at frame {start_frame} of {num_frames}.")
+
+        def read_blocks():
+            # Streams the file, so reading overlaps with the stages instead of coming before them
+            chunk_start = 0
+            for chunk in read_radar_data_chunks(file_path, constants.PIPELINE_READ_CHUNK_FRAMES):
+                frames = chunk[radar_columns].to_numpy(dtype=float)
+                chunk_timestamps = chunk['Time (seconds)'].to_numpy(dtype=float)
+                for offset in range(0, len(chunk), constants.PIPELINE_BLOCK_SIZE):
+                    block = slice(offset, offset + constants.PIPELINE_BLOCK_SIZE)
+                    start = chunk_start + offset
+                    stop = start + len(frames[block])
+                    if stop > start_frame:
+                        yield start, stop, radar_sources(frames[block], chunk_timestamps[block], start)
+                chunk_start += len(chunk)
+
+        def load(start):
+            stop = min(start + constants.PIPELINE_BLOCK_SIZE, len(df))
+            return start, stop, radar_sources(df.iloc[start:stop, column_positions].to_numpy(dtype=float), timestamps[start:stop], start)
+
+        def remove_clutter(block):
+            start, stop, sources = block
+            if clutter is not None:
+                sources['clean_frames'] = runner.process(sources, ('clean_frames',))['clean_frames']
+            # Detection may run ahead of the checkpoints, so keep the background as of this block
+            return start, stop, sources, (clutter.background.copy() if clutter is not None else None)
+
+        def detect(block):
+            # Stateless: with the clean frames supplied, the runner skips the clutter stage
+            start, stop, sources, clutter_background = block
+            # Only the first block also returns the per-frame arrays, for the CFAR plot of frame 0
+            outputs = RADAR_GRAPH_OUTPUTS + (RADAR_GRAPH_VIZ_OUTPUTS if start == 0 else ())
+            out = runner.process(sources, outputs + ((RADAR_GRAPH_SUPPRESSED_OUTPUT,) if clutter is not None else ()))
+            return start, stop, out, clutter_background
+
+        if threaded:
+            blocks = run_stage_pipeline(read_blocks(), [
+                PipelineStage('clutter', remove_clutter),
+                PipelineStage('detect', detect, num_workers=constants.PIPELINE_NUM_WORKERS),
+            ])
+        else:
+            column_positions = [df.columns.get_loc(col) for col in radar_columns]
+            timestamps = df['Time (seconds)'].to_numpy(dtype=float)
+            blocks = (detect(remove_clutter(load(start))) for start in range(start_frame, len(df), constants.PIPELINE_BLOCK_SIZE))
+        unsaved_points = []
+        for start, stop, out, clutter_background in blocks:
+            all_detected_points_polar.extend(zip(out['point_range'].tolist(), out['point_azimuth'].tolist()))
+            all_detected_points_cartesian.extend(zip(out['point_x'].tolist(), out['point_y'].tolist()))
+            all_detection_snr.extend(out['point_snr'].tolist())
+            if clutter is not None:
+                suppressed_detections += int(out[RADAR_GRAPH_SUPPRESSED_OUTPUT].sum())
+            if start == 0:
+                first_frame_viz_data = {
+                    'range_profile': out['range_profile'][0],
+                    'cfar_threshold': out['threshold'][0],
+                    'detected_indices': np.where(out['detections'][0])[0],
+                }
+            if checkpoint is None:
+                continue
+            unsaved_points.append(radar_point_rows(out['point_x'], out['point_y'], out['point_range'], out['point_azimuth'], out['point_snr']))
+            if checkpoint.due():
+                # Radar checkpoints also carry the finished IMU state, so a resume skips the IMU step
+                checkpoint.save({**imu_state, **radar_progress_state(stop, clutter_background, first_frame_viz_data, suppressed_detections)},
+                                new_rows={'points': np.concatenate(unsaved_points),
+                                          'imu_angles': imu_angles[checkpoint.saved_rows('imu_angles'):]})
+                unsaved_points = []
+
+        if clutter is not None:
+            print(f"\nClutter removal suppressed {suppressed_detections} detections found on the raw range profiles.")
+
+        polar_centroids = None
         if all_detected_points_cartesian:
-            clusters_indices = cluster_detected_points(all_detected_points_cartesian, eps=constants.DBSCAN_EPS, min_samples=constants.DBSCAN_MIN_SAMPLES)
+            map_points, point_weights = all_detected_points_cartesian, None
+            if constants.DOWNSAMPLE_ENABLED:
+                centroids, point_weights, _ = downsample_points(all_detected_points_cartesian, constants.DOWNSAMPLE_CELL_SIZE_M, snr=all_detection_snr)
+                map_points = centroids.tolist()
+                print(f"\nDownsampled {len(all_detected_points_cartesian)} detected points to {len(map_points)} cells.")
+            clusters_indices = cluster_detected_points(map_points, eps=constants.DBSCAN_EPS, min_samples=constants.DBSCAN_MIN_SAMPLES, sample_weight=point_weights)
             print(f"\nDetected {len(clusters_indices)} clusters.")
-            create_2d_map(clusters=clusters_indices, all_detected_points_cartesian=all_detected_points_cartesian, title="2D Radar Occupancy Grid with Clusters", map_extent_m=constants.MAP_EXTENT_M, grid_resolution=constants.GRID_RESOLUTION_M, save_path=os.path.join(constants.PLOTS_OUTPUT_DIR, "2d_radar_map.png"))
+            create_2d_map(clusters=clusters_indices, all_detected_points_cartesian=map_points, title="2D Radar Occupancy Grid with Clusters", map_extent_m=constants.MAP_EXTENT_M, grid_resolution=constants.GRID_RESOLUTION_M, save_path=os.path.join(constants.PLOTS_OUTPUT_DIR, "2d_radar_map.png"), point_weights=point_weights)
             print(f"\nGenerated 2D occupancy grid with {len(all_detected_points_cartesian)} detected points.")
+            polar_centroids = cluster_centroids(map_points, clusters_indices)
+
+            if constants.TILED_MAP_ENABLED:
+                # Unlike the fixed grid above, the tiled map keeps points outside MAP_EXTENT_M
+                map_store = TiledMapStore(constants.TILED_MAP_DIR, resolution_m=constants.TILED_MAP_RESOLUTION_M, tile_size=constants.TILED_MAP_TILE_SIZE, num_levels=constants.TILED_MAP_LEVELS, overwrite=True)
+                map_store.add_points(map_points, weights=point_weights)
+                map_store.flush()
+                plot_tiled_map(map_store, max_pixels=constants.TILED_MAP_MAX_PIXELS, save_path=os.path.join(constants.PLOTS_OUTPUT_DIR, "tiled_radar_map.png"))
         else:
             print("\nNo points detected for clustering or mapping.")
 
-        if first_frame_range_profile is not None:
-            plot_cfar_detection(first_frame_range_profile, first_frame_cfar_threshold, first_frame_detected_indices, frame_index=0, save_path=os.path.join(constants.PLOTS_OUTPUT_DIR, "cfar_detection.png"))
-            print(f"\nCFAR applied to first frame. Detected targets at range bins: {first_frame_detected_indices.tolist()}")
+        if first_frame_viz_data:
+            plot_cfar_detection(first_frame_viz_data['range_profile'], first_frame_viz_data['cfar_threshold'], first_frame_viz_data['detected_indices'], frame_index=0, save_path=os.path.join(constants.PLOTS_OUTPUT_DIR, "cfar_detection.png"))
+            print(f"\nCFAR applied to first frame. Detected targets at range bins: {first_frame_viz_data['detected_indices'].tolist()}")
 
         if all_detected_points_polar:
-            plot_polar_map(all_detected_points_polar, save_path=os.path.join(constants.PLOTS_OUTPUT_DIR, "2d_radar_polar_plot.png"))
+            plot_polar_map(all_detected_points_polar, save_path=os.path.join(constants.PLOTS_OUTPUT_DIR, "2d_radar_polar_plot.png"), centroids_cartesian=polar_centroids)
+
+        if checkpoint is not None:
+            checkpoint.remove()
 
     except Exception as e:
         print(f"Error processing radar data: {e}")
+        if checkpoint is not None and os.path.exists(checkpoint.path):
+            print(f"Progress is saved in {checkpoint.path}; run again to resume.")
@@ -0,0 +1,90 @@
+import numpy as np
+from scipy.signal import lfilter
+from src.config import constants
+
+def background_alpha(time_constant_s, frame_dt):
+    """
+    Converts a background time constant into the per-frame update weight of an exponential average.
+
+    Args:
+        time_constant_s (float): Time constant of the background estimate in seconds.
+        frame_dt (float): Time between two radar frames in seconds.
+
+    Returns:
+        float: The weight given to each new frame (between 0 and 1).
+    """
+    if time_constant_s <= 0:
+        return 1.0
+    return 1.0 - np.exp(-frame_dt / time_constant_s)
+
+class BackgroundSubtractor:
+    """
+    Removes static clutter from radar frames by subtracting an exponential running mean.
+
+    Reflections that do not change between frames (the scanner housing, near-field leakage)
+    build up in the background estimate and are cancelled, while anything that changes
+    faster than the time constant passes through. The background is carried over between
+    calls, so a recording can be fed in blocks of any size with the same result.
+
+    The subtraction is linear, so it must be applied to the raw samples (or the complex
+    FFT output), not to magnitudes: this keeps the noise statistics CFAR relies on.
+
+    Args:
+        alpha (float): Weight of each new frame in the background, see `background_alpha`.
+        seed_frames (int): The background starts as the mean of up to this many first frames.
+    """
+    def __init__(self, alpha, seed_frames=constants.CLUTTER_SEED_FRAMES):
+        self.alpha = alpha
+        self.seed_frames = max(1, int(seed_frames))
+        self.background = None
+
+    def apply(self, frames):
+        """
+        Subtracts the background from a block of frames and updates the background.
+
+        Each frame is compared with the background estimated from the frames before it.
+        Before the first frame there is no such estimate, so the background starts as the
+        mean of the first `seed_frames` frames (a single frame would cancel the first frame
+        completely). The result does not depend on how the recording is split into blocks
+        as long as the first block holds at least `seed_frames` frames.
+
+        Args:
+            frames (np.array): 2D array of shape (num_frames, num_samples).
+
+        Returns:
+            np.array: The clutter-suppressed frames, same shape as the input.
+        """
+        frames = np.atleast_2d(np.asarray(frames))
+        if len(frames) == 0:
+            return frames
+        if self.background is None:
+            self.background = frames[:self.seed_frames].mean(axis=0)
+
+        # background[n] = alpha * frame[n] + (1 - alpha) * background[n - 1], for all samples at once
+        decay = 1.0 - self.alpha
+        zi = (decay * self.background)[np.newaxis, :]
+        updated, _ = lfilter([self.alpha], [1.0, -decay], frames, axis=0, zi=zi)
+
+        previous = np.vstack((self.background[np.newaxis, :], updated[:-1]))
+        self.background = updated[-1].copy()
+        return frames - previous
+
+if __name__ == "__main__":
+    # Example usage: a static reflector at bin 10 and a target moving away from bin 20
+    from src.processing.radar_fft import perform_fft_batch
+
+    num_frames, num_samples = 200, 128
+    np.random.seed(0)
+    t = np.arange(num_samples)
+    frames = np.random.randn(num_frames, num_samples) * 0.01
+    frames += np.cos(2 * np.pi * 10 * t / num_samples)
+    for n in range(num_frames):
+        frames[n] += 0.5 * np.cos(2 * np.pi * (20 + n / 10) * t / num_samples)
+
+    subtractor = BackgroundSubtractor(background_alpha(time_constant_s=0.5, frame_dt=0.005))
+    cleaned = np.vstack([subtractor.apply(block) for block in np.array_split(frames, 4)])
+    raw_profile = perform_fft_batch(frames[-1])[0]
+    cleaned_profile = perform_fft_batch(cleaned[-1])[0]
+    print(f"Static bin 10, last frame: raw {raw_profile[10]:.2f}, cleaned {cleaned_profile[10]:.2f}")
+    moving_bin = 20 + (num_frames - 1) // 10
+    print(f"Moving bin {moving_bin}, last frame: raw {raw_profile[moving_bin]:.2f}, cleaned {cleaned_profile[moving_bin]:.2f}")
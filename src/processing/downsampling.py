@@ -0,0 +1,190 @@
+import numpy as np
+
+def downsample_points(points, cell_size, snr=None):
+    """
+    Merges detected points that fall into the same grid cell into one weighted point.
+
+    Every occupied cell of size `cell_size` x `cell_size` is replaced by the centroid of its
+    points, the number of points it holds and their highest SNR. The hit counts can be passed
+    to DBSCAN as sample weights, so clustering on the merged points behaves like clustering on
+    the raw ones while the number of points is bounded by the number of occupied cells.
+
+    Args:
+        points (array-like): Detected points, shape (num_points, 2), or a list of (x, y) tuples.
+        cell_size (float): Edge length of a cell in meters.
+        snr (array-like, optional): SNR of every detected point.
+
+    Returns:
+        tuple: (centroids, hit_counts, max_snr), where centroids has shape (num_cells, 2),
+               hit_counts holds the number of points merged into each centroid and max_snr
+               holds the highest SNR per cell (None if `snr` is not given). Cells are ordered
+               by their first point in the input.
+    """
+    points = np.asarray(points, dtype=float).reshape(-1, 2)
+    if len(points) == 0:
+        return np.empty((0, 2)), np.empty(0, dtype=int), None if snr is None else np.empty(0)
+
+    cells = np.floor(points / cell_size).astype(np.int64)
+    cells -= cells.min(axis=0)
+    # One integer key per cell
+    keys = cells[:, 0] * (cells[:, 1].max() + 1) + cells[:, 1]
+    _, first_index, inverse = np.unique(keys, return_index=True, return_inverse=True)
+
+    # Renumber cells by first appearance so the output keeps the input order
+    order = np.argsort(first_index, kind='stable')
+    rank = np.empty_like(order)
+    rank[order] = np.arange(len(order))
+    inverse = rank[inverse.ravel()]
+    num_cells = len(order)
+
+    hit_counts = np.bincount(inverse, minlength=num_cells)
+    centroids = np.column_stack((
+        np.bincount(inverse, weights=points[:, 0], minlength=num_cells),
+        np.bincount(inverse, weights=points[:, 1], minlength=num_cells),
+    )) / hit_counts[:, np.newaxis]
+
+    max_snr = None
+    if snr is not None:
+        max_snr = np.full(num_cells, -np.inf)
+        np.maximum.at(max_snr, inverse, np.asarray(snr, dtype=float))
+
+    return centroids, hit_counts, max_snr
+
+# Offset that makes a cell's y index non-negative, so (x, y) packs into one ordered int64 key
+_KEY_OFFSET = 2**31
+
+def _cell_keys(cells):
+    return (cells[:, 0] << 32) + (cells[:, 1] + _KEY_OFFSET)
+
+def _key_cells(keys):
+    return np.column_stack((keys >> 32, (keys & 0xFFFFFFFF) - _KEY_OFFSET))
+
+class StreamingDownsampler:
+    """
+    Builds the same cells as `downsample_points` from points that arrive in chunks.
+
+    Only the per-cell sums are kept, so memory grows with the number of occupied cells
+    rather than with the number of points. Each chunk is looked up in a sorted table of the
+    occupied cells, so adding it costs O(chunk log cells) rather than a pass over all cells.
+    Cells are ordered by their first point, as in `downsample_points`.
+
+    With `max_cells`, the cell count is bounded: when a chunk pushes it over the limit, the
+    cell size is doubled and neighbouring cells are merged until it fits again.
+
+    Args:
+        cell_size (float): Edge length of a cell in meters.
+        max_cells (int, optional): Maximum number of cells to hold.
+    """
+    def __init__(self, cell_size, max_cells=None):
+        self.cell_size = cell_size
+        self.max_cells = max_cells
+        self.num_points = 0
+        # Per cell, in order of first appearance
+        self._keys = np.empty(0, dtype=np.int64)
+        self._sums = np.empty((0, 2))
+        self._counts = np.empty(0, dtype=np.int64)
+        self._max_snr = np.empty(0)
+        # The keys in ascending order and the cell each belongs to
+        self._sorted_keys = np.empty(0, dtype=np.int64)
+        self._sorted_cells = np.empty(0, dtype=np.int64)
+
+    def add(self, points, snr=None):
+        """
+        Merges a chunk of points into the cells.
+
+        Args:
+            points (array-like): Points of shape (num_points, 2).
+            snr (array-like, optional): SNR of every point. Cells without SNR get -inf.
+        """
+        points = np.asarray(points, dtype=float).reshape(-1, 2)
+        if len(points) == 0:
+            return
+        snr = np.full(len(points), -np.inf) if snr is None else np.asarray(snr, dtype=float)
+        keys = _cell_keys(np.floor(points / self.cell_size).astype(np.int64))
+        chunk_keys, first_index, inverse = np.unique(keys, return_index=True, return_inverse=True)
+        inverse = inverse.ravel()
+        num_chunk_cells = len(chunk_keys)
+
+        position = np.searchsorted(self._sorted_keys, chunk_keys)
+        known = position < len(self._sorted_keys)
+        known[known] = self._sorted_keys[position[known]] == chunk_keys[known]
+        cell_index = np.empty(num_chunk_cells, dtype=np.int64)
+        cell_index[known] = self._sorted_cells[position[known]]
+
+        # New cells are numbered in order of their first point in the chunk
+        new = np.flatnonzero(~known)
+        new = new[np.argsort(first_index[new], kind='stable')]
+        cell_index[new] = self.num_cells + np.arange(len(new))
+        self._sorted_keys = np.insert(self._sorted_keys, position[~known], chunk_keys[~known])
+        self._sorted_cells = np.insert(self._sorted_cells, position[~known], cell_index[~known])
+        self._keys = np.concatenate((self._keys, chunk_keys[new]))
+        self._sums = np.concatenate((self._sums, np.zeros((len(new), 2))))
+        self._counts = np.concatenate((self._counts, np.zeros(len(new), dtype=np.int64)))
+        self._max_snr = np.concatenate((self._max_snr, np.full(len(new), -np.inf)))
+
+        self._sums[cell_index, 0] += np.bincount(inverse, weights=points[:, 0], minlength=num_chunk_cells)
+        self._sums[cell_index, 1] += np.bincount(inverse, weights=points[:, 1], minlength=num_chunk_cells)
+        self._counts[cell_index] += np.bincount(inverse, minlength=num_chunk_cells)
+        chunk_max_snr = np.full(num_chunk_cells, -np.inf)
+        np.maximum.at(chunk_max_snr, inverse, snr)
+        self._max_snr[cell_index] = np.maximum(self._max_snr[cell_index], chunk_max_snr)
+        self.num_points += len(points)
+
+        if self.max_cells is not None and self.num_cells > self.max_cells:
+            self._coarsen()
+
+    def _coarsen(self):
+        # Doubles the cell size until the cells fit into max_cells, keeping first-appearance order
+        num_cells = self.num_cells
+        while self.num_cells > self.max_cells:
+            keys = _cell_keys(_key_cells(self._keys) // 2)
+            sorted_keys, first_index, inverse = np.unique(keys, return_index=True, return_inverse=True)
+            order = np.argsort(first_index, kind='stable')
+            rank = np.empty_like(order)
+            rank[order] = np.arange(len(order))
+            inverse = rank[inverse.ravel()]
+            num_merged = len(order)
+
+            self._keys = sorted_keys[order]
+            self._sums = np.column_stack((
+                np.bincount(inverse, weights=self._sums[:, 0], minlength=num_merged),
+                np.bincount(inverse, weights=self._sums[:, 1], minlength=num_merged),
+            ))
+            self._counts = np.bincount(inverse, weights=self._counts, minlength=num_merged).astype(np.int64)
+            max_snr = np.full(num_merged, -np.inf)
+            np.maximum.at(max_snr, inverse, self._max_snr)
+            self._max_snr = max_snr
+            self._sorted_keys = sorted_keys
+            self._sorted_cells = rank
+            self.cell_size *= 2
+        print(f"Map cells exceeded the limit of {self.max_cells}: merged {num_cells} cells into {self.num_cells} cells of {self.cell_size:g} m.")
+
+    @property
+    def num_cells(self):
+        return len(self._counts)
+
+    def nbytes(self):
+        """
+        Returns the memory held by the cell arrays in bytes.
+        """
+        return (self._keys.nbytes + self._sums.nbytes + self._counts.nbytes + self._max_snr.nbytes
+                + self._sorted_keys.nbytes + self._sorted_cells.nbytes)
+
+    def result(self):
+        """
+        Returns (centroids, hit_counts, max_snr) in the format of `downsample_points`.
+        """
+        if self.num_cells == 0:
+            return np.empty((0, 2)), np.empty(0, dtype=int), np.empty(0)
+        return self._sums / self._counts[:, np.newaxis], self._counts.copy(), self._max_snr.copy()
+
+if __name__ == "__main__":
+    # Example usage: 100000 noisy points around three reflectors
+    np.random.seed(0)
+    centers = np.array([[1.0, 2.0], [-2.0, 3.0], [0.5, -1.5]])
+    raw_points = centers[np.random.randint(0, 3, 100000)] + np.random.randn(100000, 2) * 0.05
+    raw_snr = np.random.rand(100000) * 20
+
+    centroids, hit_counts, max_snr = downsample_points(raw_points, cell_size=0.05, snr=raw_snr)
+    print(f"Downsampled {len(raw_points)} points to {len(centroids)} cells.")
+    print(f"Busiest cell: centroid {centroids[hit_counts.argmax()]}, {hit_counts.max()} hits, max SNR {max_snr[hit_counts.argmax()]:.1f}")
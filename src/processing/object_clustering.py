@@ -1,7 +1,7 @@
 import numpy as np
 from sklearn.cluster import DBSCAN # Using DBSCAN for robust clustering
 
-def cluster_detected_points(detected_points_cartesian, eps=0.5, min_samples=3):
+def cluster_detected_points(detected_points_cartesian, eps=0.5, min_samples=3, sample_weight=None):
     """
     Clusters detected Cartesian points into objects using DBSCAN.
 
@@ -9,20 +9,21 @@ def cluster_detected_points(detected_points_cartesian, eps=0.5, min_samples=3):
         detected_points_cartesian (list): A list of (x, y) tuples representing detected points.
         eps (float): The maximum distance between two samples for one to be considered as in the neighborhood of the other.
         min_samples (int): The number of samples (or total weight) in a neighborhood for a point to be considered as a core point.
+        sample_weight (array-like, optional): Weight of each point, e.g. the hit counts of downsampled points.
 
     Returns:
         list: A list of lists, where each inner list contains the *indices* of the points
               belonging to a cluster within the original `detected_points_cartesian` list.
               Noise points (label -1) are not included in any cluster list.
     """
-    if not detected_points_cartesian:
+    if len(detected_points_cartesian) == 0:
         return []
 
     # Convert list of tuples to a NumPy array for DBSCAN
     points_array = np.array(detected_points_cartesian)
 
     # Apply DBSCAN clustering
-    db = DBSCAN(eps=eps, min_samples=min_samples).fit(points_array)
+    db = DBSCAN(eps=eps, min_samples=min_samples).fit(points_array, sample_weight=sample_weight)
     labels = db.labels_
 
     # Extract clusters as lists of indices
@@ -18,6 +18,29 @@ def perform_fft(raw_radar_data):
     range_profile = np.abs(fft_output[:len(fft_output)//2])
     return range_profile
 
+def perform_fft_batch(raw_radar_frames, n_fft=None):
+    """
+    Performs the range FFT on a block of frames at once.
+
+    This is the batched counterpart of `perform_fft`: one NumPy call covers every
+    frame in the block, so the transform runs outside the GIL and can overlap with
+    other pipeline stages running in threads.
+
+    Args:
+        raw_radar_frames (np.array): 2D array of shape (num_frames, num_samples).
+        n_fft (int, optional): FFT length. Frames are zero-padded (or truncated) to this
+                               length. Defaults to the number of samples per frame.
+
+    Returns:
+        np.array: 2D array of shape (num_frames, n_fft // 2) with the range profiles.
+    """
+    raw_radar_frames = np.atleast_2d(np.asarray(raw_radar_frames, dtype=float))
+    if n_fft is None:
+        n_fft = raw_radar_frames.shape[-1]
+    # For real-valued input the one-sided transform holds the same first half as the full FFT.
+    fft_output = np.fft.rfft(raw_radar_frames, n=n_fft, axis=-1)
+    return np.abs(fft_output[:, :n_fft // 2])
+
 def correct_for_imu_orientation(range_val, radar_azimuth_rad, imu_roll_rad, imu_pitch_rad, imu_yaw_rad):
     """
     Corrects radar range and azimuth based on IMU orientation.
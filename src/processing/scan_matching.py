@@ -0,0 +1,82 @@
+import numpy as np
+from scipy.spatial import cKDTree
+from src.config import constants
+
+def transform_points(points, pose):
+    """
+    Applies a 2D pose (x, y, theta) to points: rotation by theta, then translation by (x, y).
+
+    Args:
+        points (np.array): Points of shape (num_points, 2).
+        pose (array-like): (x, y, theta in radians).
+
+    Returns:
+        np.array: The transformed points.
+    """
+    c, s = np.cos(pose[2]), np.sin(pose[2])
+    return points @ np.array([[c, s], [-s, c]]) + np.asarray(pose[:2], dtype=float)
+
+def align_scans(source, target, initial_pose=(0.0, 0.0, 0.0), max_iterations=constants.POSE_GRAPH_ICP_ITERATIONS,
+                max_distance_m=constants.POSE_GRAPH_ICP_MAX_DISTANCE_M, target_tree=None):
+    """
+    Finds the 2D pose that maps the source scan onto the target scan (point-to-point ICP).
+
+    Each iteration pairs every source point with its nearest target point (through a k-d tree
+    of the target), ignores pairs further apart than `max_distance_m` and solves for the
+    rigid transform of the remaining pairs in closed form.
+
+    Args:
+        source (np.array): Points of shape (n, 2) in the source frame.
+        target (np.array): Points of shape (m, 2) in the target frame.
+        initial_pose (array-like): Starting guess (x, y, theta) of the source frame in the target frame.
+        max_iterations (int): Maximum number of iterations.
+        max_distance_m (float): Largest distance of a valid correspondence.
+        target_tree (cKDTree, optional): A tree of `target`, when aligning several scans to it.
+
+    Returns:
+        tuple: (pose, inlier_ratio, rms_m): the pose (x, y, theta) of the source frame in the
+               target frame, the share of source points with a correspondence and the RMS
+               distance of the correspondences.
+    """
+    source = np.asarray(source, dtype=float).reshape(-1, 2)
+    target = np.asarray(target, dtype=float).reshape(-1, 2)
+    pose = np.array(initial_pose, dtype=float)
+    if len(source) < 3 or len(target) < 3:
+        return pose, 0.0, np.inf
+    tree = target_tree if target_tree is not None else cKDTree(target)
+
+    inliers = np.zeros(len(source), dtype=bool)
+    distances = np.full(len(source), np.inf)
+    for _ in range(max_iterations):
+        moved = transform_points(source, pose)
+        distances, nearest = tree.query(moved, distance_upper_bound=max_distance_m)
+        inliers = np.isfinite(distances)
+        if inliers.sum() < 3:
+            break
+        src, dst = moved[inliers], target[nearest[inliers]]
+        src_mean, dst_mean = src.mean(axis=0), dst.mean(axis=0)
+        # Closed-form rotation of the centred pairs (2D Kabsch)
+        cross = np.sum((src - src_mean) * (dst - dst_mean)[:, ::-1] * [1, -1])
+        dot = np.sum((src - src_mean) * (dst - dst_mean))
+        dtheta = np.arctan2(cross, dot)
+        step = np.array([*(dst_mean - transform_points(src_mean[np.newaxis], (0.0, 0.0, dtheta))[0]), dtheta])
+        # Compose the step with the current pose
+        pose = np.array([*transform_points(pose[np.newaxis, :2], step)[0], pose[2] + dtheta])
+        if abs(dtheta) < 1e-6 and np.hypot(step[0], step[1]) < 1e-5:
+            break
+
+    if not inliers.any():
+        return pose, 0.0, np.inf
+    return pose, float(inliers.mean()), float(np.sqrt(np.mean(distances[inliers] ** 2)))
+
+if __name__ == "__main__":
+    # Example usage: recover a known offset between two views of an L-shaped wall
+    rng = np.random.default_rng(0)
+    wall = np.vstack([np.column_stack((np.linspace(-2, 2, 200), np.full(200, 3.0))),
+                      np.column_stack((np.full(150, 2.0), np.linspace(0, 3, 150)))])
+    true_pose = np.array([0.1, -0.05, np.radians(4)])
+    # The source scan sees the wall from a frame whose pose in the target frame is true_pose
+    c, s = np.cos(true_pose[2]), np.sin(true_pose[2])
+    source = (wall - true_pose[:2]) @ np.array([[c, -s], [s, c]]) + rng.normal(scale=0.01, size=wall.shape)
+    pose, inlier_ratio, rms = align_scans(source, wall)
+    print(f"Estimated pose {np.round(pose, 4)} (true {np.round(true_pose, 4)}), {inlier_ratio:.0%} inliers, RMS {rms:.3f} m")
@@ -0,0 +1,221 @@
+import json
+import os
+import shutil
+from collections import OrderedDict
+import numpy as np
+
+class TiledMapStore:
+    """
+    A sparse occupancy map split into fixed-size tiles, with a resolution pyramid.
+
+    Tiles are allocated only where points land and are kept as memory-mapped `.npy` files,
+    so the map can cover any area at any resolution while only the tiles in use occupy RAM.
+    Level 0 has the base resolution; every further level halves it, so a viewer can read a
+    large area from a coarse level and zoom in on a fine one.
+
+    Files are laid out as `<root_dir>/level_<l>/tile_<tx>_<ty>.npy`, with the map settings
+    in `<root_dir>/map.json`.
+
+    An existing map is reopened with the settings it was created with; settings left as None
+    are taken from it. Settings that differ from the stored ones raise a ValueError, unless
+    `overwrite` is set, which deletes the existing map and starts an empty one with the new
+    settings. A new map uses 0.1 m cells, 256-cell tiles and 4 levels unless given otherwise.
+    """
+    def __init__(self, root_dir, resolution_m=None, tile_size=None, num_levels=None, max_open_tiles=64, overwrite=False):
+        self.root_dir = root_dir
+        requested = {'resolution_m': resolution_m, 'tile_size': tile_size, 'num_levels': num_levels}
+        metadata_path = os.path.join(root_dir, "map.json")
+        metadata = {'resolution_m': 0.1, 'tile_size': 256, 'num_levels': 4}
+        if os.path.exists(metadata_path) and not overwrite:
+            with open(metadata_path, 'r') as f:
+                metadata = json.load(f)
+            mismatched = [f"{key} {value} (stored: {metadata[key]})" for key, value in requested.items()
+                          if value is not None and value != metadata[key]]
+            if mismatched:
+                raise ValueError(f"the tiled map in {root_dir} was created with other settings: {', '.join(mismatched)}; "
+                                 "open it with overwrite=True to replace it")
+        else:
+            os.makedirs(root_dir, exist_ok=True)
+            # Only the map's own files are removed, in case root_dir holds anything else
+            for name in os.listdir(root_dir):
+                if name.startswith("level_"):
+                    shutil.rmtree(os.path.join(root_dir, name), ignore_errors=True)
+            metadata.update({key: value for key, value in requested.items() if value is not None})
+            with open(metadata_path, 'w') as f:
+                json.dump(metadata, f)
+        resolution_m = metadata['resolution_m']
+        tile_size = metadata['tile_size']
+        num_levels = metadata['num_levels']
+
+        self.resolution_m = resolution_m
+        self.tile_size = tile_size
+        self.num_levels = num_levels
+        self.max_open_tiles = max_open_tiles
+        self._open_tiles = OrderedDict()
+        self.tiles = [set() for _ in range(num_levels)]
+        for level in range(num_levels):
+            level_dir = self._level_dir(level)
+            os.makedirs(level_dir, exist_ok=True)
+            for name in os.listdir(level_dir):
+                if name.startswith("tile_") and name.endswith(".npy"):
+                    tx, ty = name[len("tile_"):-len(".npy")].split('_')
+                    self.tiles[level].add((int(tx), int(ty)))
+
+    def _level_dir(self, level):
+        return os.path.join(self.root_dir, f"level_{level}")
+
+    def _tile_path(self, level, tx, ty):
+        return os.path.join(self._level_dir(level), f"tile_{tx}_{ty}.npy")
+
+    def level_resolution(self, level):
+        """
+        Returns the cell size of a pyramid level in meters.
+        """
+        return self.resolution_m * (2 ** level)
+
+    def _get_tile(self, level, tx, ty, create=False):
+        key = (level, tx, ty)
+        if key in self._open_tiles:
+            self._open_tiles.move_to_end(key)
+            return self._open_tiles[key]
+        path = self._tile_path(level, tx, ty)
+        if (tx, ty) in self.tiles[level]:
+            tile = np.load(path, mmap_mode='r+')
+        elif create:
+            tile = np.lib.format.open_memmap(path, mode='w+', dtype=np.float32, shape=(self.tile_size, self.tile_size))
+            self.tiles[level].add((tx, ty))
+        else:
+            return None
+
+        self._open_tiles[key] = tile
+        if len(self._open_tiles) > self.max_open_tiles:
+            _, evicted = self._open_tiles.popitem(last=False)
+            evicted.flush()
+        return tile
+
+    def add_points(self, points, weights=None):
+        """
+        Accumulates points into every level of the map.
+
+        Args:
+            points (array-like): Points of shape (num_points, 2), in meters.
+            weights (array-like, optional): Weight of each point (e.g. hit counts). Defaults to 1.
+        """
+        points = np.asarray(points, dtype=float).reshape(-1, 2)
+        if len(points) == 0:
+            return
+        weights = np.ones(len(points), dtype=np.float32) if weights is None else np.asarray(weights, dtype=np.float32)
+
+        for level in range(self.num_levels):
+            cells = np.floor(points / self.level_resolution(level)).astype(np.int64)
+            tile_keys = np.floor_divide(cells, self.tile_size)
+            local = cells - tile_keys * self.tile_size
+            unique_tiles, inverse = np.unique(tile_keys, axis=0, return_inverse=True)
+            inverse = inverse.ravel()
+            # Group the points by tile, then update each touched tile in one call
+            order = np.argsort(inverse, kind='stable')
+            bounds = np.searchsorted(inverse[order], np.arange(len(unique_tiles) + 1))
+            for i, (tx, ty) in enumerate(unique_tiles):
+                members = order[bounds[i]:bounds[i + 1]]
+                tile = self._get_tile(level, int(tx), int(ty), create=True)
+                np.add.at(tile, (local[members, 1], local[members, 0]), weights[members])
+
+    def bounds(self):
+        """
+        Returns the area covered by allocated tiles as (min_x, max_x, min_y, max_y), or None if the map is empty.
+        """
+        if not self.tiles[0]:
+            return None
+        keys = np.array(sorted(self.tiles[0]))
+        tile_extent = self.tile_size * self.resolution_m
+        return (keys[:, 0].min() * tile_extent, (keys[:, 0].max() + 1) * tile_extent,
+                keys[:, 1].min() * tile_extent, (keys[:, 1].max() + 1) * tile_extent)
+
+    def choose_level(self, extent, max_pixels):
+        """
+        Picks the finest level at which `extent` spans at most `max_pixels` cells on its longest side.
+
+        Args:
+            extent (tuple): (min_x, max_x, min_y, max_y) in meters.
+            max_pixels (int): Maximum number of cells along either axis.
+
+        Returns:
+            int: The pyramid level.
+        """
+        span = max(extent[1] - extent[0], extent[3] - extent[2])
+        for level in range(self.num_levels):
+            if span / self.level_resolution(level) <= max_pixels:
+                return level
+        return self.num_levels - 1
+
+    def read_region(self, extent, level=None, max_pixels=1024):
+        """
+        Reads the part of the map inside `extent`, touching only the tiles that overlap it.
+
+        Args:
+            extent (tuple): (min_x, max_x, min_y, max_y) in meters.
+            level (int, optional): Pyramid level to read. Defaults to the level chosen by `choose_level`.
+            max_pixels (int): Used to choose the level when `level` is None.
+
+        Returns:
+            tuple: (grid, grid_extent, level), where grid is a 2D float32 array (rows along y)
+                   and grid_extent is the (min_x, max_x, min_y, max_y) it covers, aligned to cells.
+        """
+        if level is None:
+            level = self.choose_level(extent, max_pixels)
+        resolution = self.level_resolution(level)
+        min_cx, min_cy = int(np.floor(extent[0] / resolution)), int(np.floor(extent[2] / resolution))
+        max_cx, max_cy = int(np.ceil(extent[1] / resolution)), int(np.ceil(extent[3] / resolution))
+        grid = np.zeros((max_cy - min_cy, max_cx - min_cx), dtype=np.float32)
+
+        for tx in range(min_cx // self.tile_size, (max_cx - 1) // self.tile_size + 1):
+            for ty in range(min_cy // self.tile_size, (max_cy - 1) // self.tile_size + 1):
+                if (tx, ty) not in self.tiles[level]:
+                    continue
+                tile = self._get_tile(level, tx, ty)
+                # Overlap of this tile with the requested cells, in global cell coordinates
+                x0, x1 = max(min_cx, tx * self.tile_size), min(max_cx, (tx + 1) * self.tile_size)
+                y0, y1 = max(min_cy, ty * self.tile_size), min(max_cy, (ty + 1) * self.tile_size)
+                grid[y0 - min_cy:y1 - min_cy, x0 - min_cx:x1 - min_cx] = \
+                    tile[y0 - ty * self.tile_size:y1 - ty * self.tile_size, x0 - tx * self.tile_size:x1 - tx * self.tile_size]
+
+        grid_extent = (min_cx * resolution, max_cx * resolution, min_cy * resolution, max_cy * resolution)
+        return grid, grid_extent, level
+
+    def flush(self):
+        """
+        Writes all open tiles back to disk.
+        """
+        for tile in self._open_tiles.values():
+            tile.flush()
+
+    def clear(self):
+        """
+        Deletes all tiles, keeping the map settings.
+        """
+        self._open_tiles.clear()
+        for level in range(self.num_levels):
+            shutil.rmtree(self._level_dir(level), ignore_errors=True)
+            os.makedirs(self._level_dir(level), exist_ok=True)
+            self.tiles[level] = set()
+
+if __name__ == "__main__":
+    # Example usage: a 200 m x 200 m area at 5 cm resolution (16 gigacells if stored densely)
+    import tempfile
+
+    np.random.seed(0)
+    walls = np.concatenate([
+        np.column_stack((np.linspace(-100, 100, 200000), np.full(200000, 50.0))),
+        np.column_stack((np.full(200000, -30.0), np.linspace(-100, 100, 200000))),
+    ]) + np.random.randn(400000, 2) * 0.02
+
+    with tempfile.TemporaryDirectory() as map_dir:
+        store = TiledMapStore(map_dir, resolution_m=0.05, tile_size=256, num_levels=6, overwrite=True)
+        store.add_points(walls)
+        store.flush()
+        print(f"Allocated tiles per level: {[len(t) for t in store.tiles]}")
+
+        overview, overview_extent, overview_level = store.read_region(store.bounds(), max_pixels=512)
+        print(f"Overview: level {overview_level}, shape {overview.shape}, extent {overview_extent}")
+        detail, detail_extent, detail_level = store.read_region((-35, -25, 45, 55), max_pixels=512)
+        print(f"Detail: level {detail_level}, shape {detail.shape}, total weight {detail.sum():.0f}")
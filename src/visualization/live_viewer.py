@@ -0,0 +1,227 @@
+import threading
+import time
+from collections import deque
+import numpy as np
+import matplotlib.pyplot as plt
+from src.config import constants
+
+class LiveMapViewer:
+    """
+    A live 2D map that updates in place while points keep arriving.
+
+    The figure and its artists (occupancy image, newest detections, status text) are created
+    once and only their data changes afterwards. Each refresh folds the points added since the
+    last refresh into the occupancy grid, which costs O(new points), and redraws only the
+    newest detections and the status text over a cached background (blitting), so the refresh
+    time does not grow with the number of points seen so far. The occupancy image, the most
+    expensive artist to draw, is baked into the cached background at most every
+    `image_interval_s` seconds. Points may be added from any thread; the refresh loop runs in
+    the main thread at a fixed rate, independently of how fast processing produces points,
+    and measures its own frame time.
+
+    Args:
+        map_extent_m (float): Width and height of the mapped area in meters, centred on the sensor.
+        grid_resolution (float): Cell size of the occupancy grid in meters.
+        recent_points (int): Number of newest detections highlighted on top of the grid.
+        image_interval_s (float): Minimum time between two redraws of the occupancy image.
+        title (str): Figure title.
+    """
+    def __init__(self, map_extent_m=constants.MAP_EXTENT_M, grid_resolution=constants.GRID_RESOLUTION_M,
+                 recent_points=constants.LIVE_VIEWER_RECENT_POINTS, image_interval_s=constants.LIVE_VIEWER_IMAGE_INTERVAL_S,
+                 title="Live Radar Map"):
+        self.map_extent_m = map_extent_m
+        self.grid_resolution = grid_resolution
+        self.image_interval_s = image_interval_s
+        num_cells = int(round(map_extent_m / grid_resolution))
+        self.grid = np.zeros((num_cells, num_cells))
+        self.num_points = 0
+        self.frame_times = deque(maxlen=constants.LIVE_VIEWER_STATS_FRAMES)
+        # Target refresh rate of `run`; may be changed while it runs, e.g. by the adaptive quality controller
+        self.fps = constants.LIVE_VIEWER_FPS
+        self._lock = threading.Lock()
+        self._pending = []
+        self._recent = np.full((recent_points, 2), np.nan)
+        self._recent_next = 0
+        self._background = None       # Everything but the animated artists
+        self._image_background = None # The same with the occupancy image drawn in
+        self._image_dirty = False
+        self._last_image_update = 0.0
+        self._last_refresh = None
+
+        # Colours are looked up here rather than by the image artist, which saves its normalisation on every refresh
+        self._colors = (plt.get_cmap('Greys')(np.linspace(0, 1, 256)) * 255).astype(np.uint8)
+
+        half = map_extent_m / 2
+        self.fig, self.ax = plt.subplots(figsize=(8, 8))
+        self.image = self.ax.imshow(self._colors[np.zeros(self.grid.shape, dtype=np.uint8)], origin='lower',
+                                    extent=[-half, half, -half, half], interpolation='nearest', animated=True)
+        self.recent_artist = self.ax.scatter([], [], s=12, color='red', label='Newest detections', animated=True)
+        self.status_text = self.ax.text(0.02, 0.98, '', transform=self.ax.transAxes, va='top', animated=True)
+        self.ax.set_title(title)
+        self.ax.set_xlabel('X Position (m)')
+        self.ax.set_ylabel('Y Position (m)')
+        self.ax.set_aspect('equal', adjustable='box')
+        self.ax.legend(loc='lower right')
+        # The background must be captured again whenever the figure is fully redrawn (e.g. resized)
+        self.fig.canvas.mpl_connect('draw_event', self._on_draw)
+
+    def add_points(self, points, weights=None):
+        """
+        Queues detected points for the next refresh. Safe to call from any thread.
+
+        Args:
+            points (array-like): Points of shape (num_points, 2).
+            weights (array-like, optional): Weight of each point in the occupancy grid.
+        """
+        points = np.asarray(points, dtype=float).reshape(-1, 2)
+        if len(points) == 0:
+            return
+        weights = np.ones(len(points)) if weights is None else np.asarray(weights, dtype=float)
+        with self._lock:
+            self._pending.append((points, weights))
+
+    def _apply_pending(self):
+        with self._lock:
+            pending, self._pending = self._pending, []
+        if not pending:
+            return
+        points = np.concatenate([p for p, _ in pending])
+        weights = np.concatenate([w for _, w in pending])
+        self.num_points += len(points)
+        self._image_dirty = True
+
+        half = self.map_extent_m / 2
+        cells = np.floor((points + half) / self.grid_resolution).astype(np.int64)
+        num_cells = self.grid.shape[0]
+        inside = (cells >= 0).all(axis=1) & (cells < num_cells).all(axis=1)
+        np.add.at(self.grid, (cells[inside, 1], cells[inside, 0]), weights[inside])
+
+        newest = points[-len(self._recent):]
+        slots = (self._recent_next + np.arange(len(newest))) % len(self._recent)
+        self._recent[slots] = newest
+        self._recent_next = int((self._recent_next + len(newest)) % len(self._recent))
+
+    def _on_draw(self, event):
+        self._background = self.fig.canvas.copy_from_bbox(self.fig.bbox)
+        self._draw_image()
+        self._draw_overlay()
+
+    def _draw_image(self):
+        self.ax.draw_artist(self.image)
+        self._image_background = self.fig.canvas.copy_from_bbox(self.fig.bbox)
+
+    def _draw_overlay(self):
+        self.ax.draw_artist(self.recent_artist)
+        self.ax.draw_artist(self.status_text)
+
+    def _update_image(self):
+        density = np.log1p(self.grid)
+        density *= 255 / max(float(density.max()), 1e-9)
+        self.image.set_data(self._colors[density.astype(np.uint8)])
+        self._image_dirty = False
+        self._last_image_update = time.perf_counter()
+
+    def refresh(self):
+        """
+        Updates the artists with the points added since the last call and redraws them.
+
+        Returns:
+            float: The time the refresh took in seconds.
+        """
+        start = time.perf_counter()
+        self._apply_pending()
+        redraw_image = self._image_dirty and start - self._last_image_update >= self.image_interval_s
+        if redraw_image:
+            self._update_image()
+        self.recent_artist.set_offsets(self._recent[~np.isnan(self._recent[:, 0])])
+        stats = self.frame_time_stats()
+        self.status_text.set_text(f"{self.num_points} points | frame {stats['mean_ms']:.1f} ms | {stats['fps']:.0f} FPS")
+
+        canvas = self.fig.canvas
+        if self._background is None:
+            canvas.draw()
+        else:
+            if redraw_image:
+                canvas.restore_region(self._background)
+                self._draw_image()
+            else:
+                canvas.restore_region(self._image_background)
+            self._draw_overlay()
+            canvas.blit(self.fig.bbox)
+        canvas.flush_events()
+
+        now = time.perf_counter()
+        if self._last_refresh is not None:
+            self.frame_times.append((now - start, now - self._last_refresh))
+        self._last_refresh = now
+        return now - start
+
+    def frame_time_stats(self):
+        """
+        Returns the recent refresh performance.
+
+        Returns:
+            dict: 'mean_ms', 'p95_ms' and 'max_ms' of the time spent per refresh, and 'fps', the
+                  refreshes actually achieved per second, over the last LIVE_VIEWER_STATS_FRAMES refreshes.
+        """
+        if not self.frame_times:
+            return {'mean_ms': 0.0, 'p95_ms': 0.0, 'max_ms': 0.0, 'fps': 0.0}
+        durations, intervals = np.array(self.frame_times).T
+        return {
+            'mean_ms': float(durations.mean() * 1000),
+            'p95_ms': float(np.percentile(durations, 95) * 1000),
+            'max_ms': float(durations.max() * 1000),
+            'fps': float(1.0 / intervals.mean()),
+        }
+
+    def run(self, producer=None, fps=constants.LIVE_VIEWER_FPS, duration_s=None):
+        """
+        Refreshes the view at a fixed rate until the window is closed or the producer is done.
+
+        Args:
+            producer (callable, optional): Run in a background thread with this viewer as its argument;
+                                           it should call `add_points` as it detects points.
+            fps (float): Target refresh rate, kept in `self.fps`. Refreshes that would fall behind are skipped, not queued.
+            duration_s (float, optional): Stop after this many seconds.
+
+        Returns:
+            dict: The final `frame_time_stats`.
+        """
+        self.fps = fps
+        thread = None
+        if producer is not None:
+            thread = threading.Thread(target=producer, args=(self,), daemon=True)
+            thread.start()
+        plt.show(block=False)
+        start = next_tick = time.perf_counter()
+        try:
+            while plt.fignum_exists(self.fig.number):
+                producer_done = thread is not None and not thread.is_alive()
+                self.refresh()
+                if producer_done or (duration_s is not None and time.perf_counter() - start >= duration_s):
+                    break
+                next_tick += 1.0 / self.fps
+                delay = next_tick - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                else:
+                    # Skip the ticks that were missed instead of trying to catch up
+                    next_tick = time.perf_counter()
+        except KeyboardInterrupt:
+            print("\nLive view stopped by user.")
+        stats = self.frame_time_stats()
+        print(f"Live view: {self.num_points} points, refresh {stats['mean_ms']:.1f} ms on average "
+              f"(95th percentile {stats['p95_ms']:.1f} ms, max {stats['max_ms']:.1f} ms), {stats['fps']:.1f} FPS.")
+        return stats
+
+if __name__ == "__main__":
+    # Example usage: 10 seconds of simulated detections arriving at 200 frames/s
+    def simulate(viewer):
+        rng = np.random.default_rng(0)
+        walls = rng.uniform(-4, 4, size=(50, 2))
+        for _ in range(2000):
+            hits = walls[rng.integers(len(walls), size=5)] + rng.normal(scale=0.05, size=(5, 2))
+            viewer.add_points(hits)
+            time.sleep(0.005)
+
+    LiveMapViewer().run(producer=simulate, duration_s=10)
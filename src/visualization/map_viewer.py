@@ -1,46 +1,173 @@
 import matplotlib.pyplot as plt
 import numpy as np
-import matplotlib.cm as cm # For colormaps
+from matplotlib.colors import LogNorm
 import os
 from src.config import constants
 
-def create_2d_map(clusters, all_detected_points_cartesian=None, title="2D Radar Map with Clusters", grid_resolution=0.1, map_extent_m=10, save_path=None):
+def bin_points_2d(u, v, u_range, v_range, bins, weights=None):
+    """
+    Counts the points in each cell of a regular grid, without a Python loop over the points.
+
+    Args:
+        u (array-like): First coordinate of every point (grid columns).
+        v (array-like): Second coordinate of every point (grid rows).
+        u_range (tuple): (min, max) of the first coordinate covered by the grid.
+        v_range (tuple): (min, max) of the second coordinate covered by the grid.
+        bins (tuple): (columns, rows) of the grid.
+        weights (array-like, optional): Weight of every point. Defaults to 1.
+
+    Returns:
+        np.array: Grid of shape (rows, columns); points outside the ranges are not counted.
+    """
+    num_u, num_v = bins
+    u = np.asarray(u, dtype=float)
+    v = np.asarray(v, dtype=float)
+    cells_u = np.floor((u - u_range[0]) * (num_u / (u_range[1] - u_range[0]))).astype(np.int64)
+    cells_v = np.floor((v - v_range[0]) * (num_v / (v_range[1] - v_range[0]))).astype(np.int64)
+    inside = (cells_u >= 0) & (cells_u < num_u) & (cells_v >= 0) & (cells_v < num_v)
+    if weights is not None:
+        weights = np.asarray(weights, dtype=float)[inside]
+    counts = np.bincount(cells_v[inside] * num_u + cells_u[inside], weights=weights, minlength=num_u * num_v)
+    return counts.reshape(num_v, num_u)
+
+def cluster_centroids(points, clusters):
+    """
+    Returns the mean position of each cluster.
+
+    Args:
+        points (array-like): Points of shape (num_points, 2).
+        clusters (list): Point indices of each cluster, as returned by cluster_detected_points.
+
+    Returns:
+        np.array: Centroids of shape (num_clusters, 2), for the non-empty clusters.
+    """
+    points = np.asarray(points, dtype=float).reshape(-1, 2)
+    centroids = [points[list(indices)].mean(axis=0) for indices in clusters if len(indices)]
+    return np.array(centroids).reshape(-1, 2)
+
+def _axes_pixels(ax):
+    # Size of the axes in the saved image, so the bins match the output resolution
+    bbox = ax.get_window_extent()
+    return max(int(bbox.width), 1), max(int(bbox.height), 1)
+
+def _density_norm(grid):
+    return LogNorm(vmin=max(float(grid[grid > 0].min()), 1e-9), vmax=float(grid.max())) if grid.max() > 0 else None
+
+def _finish_plot(save_path, show, message):
+    if save_path:
+        os.makedirs(os.path.dirname(save_path) or '.', exist_ok=True)
+        plt.savefig(save_path)
+        print(f"{message} saved to {save_path}")
+    if show:
+        plt.show()
+    else:
+        plt.close()
+
+def plot_density_map(points_cartesian, clusters=None, title="2D Radar Density Map", map_extent_m=10, save_path=None, point_weights=None, show=True):
+    """
+    Draws the points as a density image with one bin per output pixel, and only the cluster centroids as markers.
+
+    The drawing time depends on the image size, not on the number of points, so this is the
+    way to map sessions with millions of detections.
+
+    Args:
+        points_cartesian (array-like): Points of shape (num_points, 2).
+        clusters (list, optional): Point indices of each cluster; their centroids are marked.
+        title (str): Plot title.
+        map_extent_m (float): Width and height of the mapped area in meters, centred on the sensor.
+        save_path (str, optional): Where to save the image.
+        point_weights (array-like, optional): Weight of every point, e.g. hit counts of downsampled points.
+        show (bool): If False, close the figure instead of showing it.
+    """
+    points = np.asarray(points_cartesian, dtype=float).reshape(-1, 2)
+    half = map_extent_m / 2
+    fig, ax = plt.subplots(figsize=(10, 10))
+    ax.set_aspect('equal', adjustable='box')
+    grid = bin_points_2d(points[:, 0], points[:, 1], (-half, half), (-half, half), _axes_pixels(ax), weights=point_weights)
+    image = ax.imshow(np.ma.masked_equal(grid, 0), cmap='viridis', norm=_density_norm(grid), origin='lower',
+                      extent=[-half, half, -half, half], interpolation='nearest')
+    fig.colorbar(image, ax=ax, shrink=0.8, label='Detections per pixel')
+    if clusters:
+        centroids = cluster_centroids(points, clusters)
+        ax.scatter(centroids[:, 0], centroids[:, 1], marker='x', color='red', s=60, label=f'Object centroids ({len(centroids)})')
+        ax.legend()
+    ax.set_title(f"{title} ({len(points)} points)")
+    ax.set_xlabel('X Position (m)')
+    ax.set_ylabel('Y Position (m)')
+    _finish_plot(save_path, show, "Density map")
+
+def plot_polar_density_map(polar_points, centroids_cartesian=None, title="2D Radar Polar Density Plot", save_path=None, show=True):
+    """
+    Draws polar points as a range-azimuth density image sized to the output resolution.
+
+    Args:
+        polar_points (array-like): (range, azimuth in radians) of every point.
+        centroids_cartesian (array-like, optional): Object centroids (x, y) to mark.
+        title (str): Plot title.
+        save_path (str, optional): Where to save the image.
+        show (bool): If False, close the figure instead of showing it.
+    """
+    points = np.asarray(polar_points, dtype=float).reshape(-1, 2)
+    r, theta = points[:, 0], np.mod(points[:, 1], 2 * np.pi)
+    fig = plt.figure(figsize=(10, 10))
+    ax = fig.add_subplot(111, projection='polar')
+    # One range bin per pixel of radius, and about one azimuth bin per pixel of circumference
+    radius_px = _axes_pixels(ax)[0] / 2
+    num_r = int(radius_px)
+    num_theta = int(min(2 * np.pi * radius_px, constants.DENSITY_POLAR_MAX_ANGLE_BINS))
+    max_r = float(r.max()) if len(r) and r.max() > 0 else 1.0
+    grid = bin_points_2d(theta, r, (0, 2 * np.pi), (0, max_r * (1 + 1e-9)), (num_theta, num_r))
+    mesh = ax.pcolormesh(np.linspace(0, 2 * np.pi, num_theta + 1), np.linspace(0, max_r, num_r + 1),
+                         np.ma.masked_equal(grid, 0), cmap='viridis', norm=_density_norm(grid), shading='flat')
+    fig.colorbar(mesh, ax=ax, shrink=0.8, pad=0.1, label='Detections per bin')
+    if centroids_cartesian is not None and len(centroids_cartesian):
+        centroids = np.asarray(centroids_cartesian, dtype=float).reshape(-1, 2)
+        ax.scatter(np.arctan2(centroids[:, 1], centroids[:, 0]), np.hypot(centroids[:, 0], centroids[:, 1]),
+                   marker='x', color='red', s=60, label=f'Object centroids ({len(centroids)})')
+        ax.legend(loc='lower left')
+    ax.set_title(f"{title} ({len(points)} points)", va='bottom')
+    ax.set_theta_zero_location('N')
+    ax.set_theta_direction(-1)
+    ax.set_rlabel_position(-22.5)
+    _finish_plot(save_path, show, "Polar density plot")
+
+def create_2d_map(clusters, all_detected_points_cartesian=None, title="2D Radar Map with Clusters", grid_resolution=0.1, map_extent_m=10, save_path=None, point_weights=None, show=True):
+    if all_detected_points_cartesian is not None and len(all_detected_points_cartesian) > constants.DENSITY_RENDER_MIN_POINTS:
+        # Too many points to scatter individually
+        plot_density_map(all_detected_points_cartesian, clusters=clusters, title=title, map_extent_m=map_extent_m,
+                         save_path=save_path, point_weights=point_weights, show=show)
+        return
     plt.figure(figsize=(10, 10))
     ax = plt.gca()
     min_x = -map_extent_m / 2
     max_x = map_extent_m / 2
     min_y = -map_extent_m / 2
     max_y = map_extent_m / 2
-    if all_detected_points_cartesian:
+    has_points = all_detected_points_cartesian is not None and len(all_detected_points_cartesian) > 0
+    if has_points:
         num_cells_x = int((max_x - min_x) / grid_resolution)
         num_cells_y = int((max_y - min_y) / grid_resolution)
         occupancy_grid = np.zeros((num_cells_y, num_cells_x))
-        for x, y in all_detected_points_cartesian:
-            if min_x <= x < max_x and min_y <= y < max_y:
-                grid_x = int((x - min_x) / grid_resolution)
-                grid_y = int((y - min_y) / grid_resolution)
-                occupancy_grid[grid_y, grid_x] += 1
+        points = np.asarray(all_detected_points_cartesian, dtype=float).reshape(-1, 2)
+        # Downsampled points stand for several detections; their hit counts weight the grid
+        weights = np.ones(len(points)) if point_weights is None else np.asarray(point_weights, dtype=float)
+        inside = (points[:, 0] >= min_x) & (points[:, 0] < max_x) & (points[:, 1] >= min_y) & (points[:, 1] < max_y)
+        grid_x = ((points[inside, 0] - min_x) / grid_resolution).astype(int)
+        grid_y = ((points[inside, 1] - min_y) / grid_resolution).astype(int)
+        # Guard against float rounding just below the upper edge
+        np.add.at(occupancy_grid, (np.minimum(grid_y, num_cells_y - 1), np.minimum(grid_x, num_cells_x - 1)), weights[inside])
         ax.imshow(occupancy_grid, cmap='Greys', origin='lower', extent=[min_x, max_x, min_y, max_y], alpha=0.5)
-    if all_detected_points_cartesian:
-        clustered_point_indices = set()
+    if has_points:
+        unclustered = np.ones(len(points), dtype=bool)
         for cluster_indices in clusters:
-            for idx in cluster_indices:
-                clustered_point_indices.add(idx)
-        unclustered_x = []
-        unclustered_y = []
-        for i, (x, y) in enumerate(all_detected_points_cartesian):
-            if i not in clustered_point_indices:
-                unclustered_x.append(x)
-                unclustered_y.append(y)
-        if unclustered_x:
-            ax.scatter(unclustered_x, unclustered_y, color='lightgray', label='Unclustered Points', s=10, alpha=0.6)
-    colors = cm.get_cmap('tab10', len(clusters))
+            unclustered[list(cluster_indices)] = False
+        if unclustered.any():
+            ax.scatter(points[unclustered, 0], points[unclustered, 1], color='lightgray', label='Unclustered Points', s=10, alpha=0.6)
+    colors = plt.get_cmap('tab10', max(len(clusters), 1))
     for i, cluster_indices in enumerate(clusters):
-        if cluster_indices:
-            cluster_points = [all_detected_points_cartesian[idx] for idx in cluster_indices]
-            cluster_x = [p[0] for p in cluster_points]
-            cluster_y = [p[1] for p in cluster_points]
-            ax.scatter(cluster_x, cluster_y, color=colors(i), label=f'Object {i+1}', s=30, edgecolor='black', linewidth=0.5)
+        if len(cluster_indices):
+            cluster_points = points[list(cluster_indices)]
+            ax.scatter(cluster_points[:, 0], cluster_points[:, 1], color=colors(i), label=f'Object {i+1}', s=30, edgecolor='black', linewidth=0.5)
     ax.set_title(title)
     ax.set_xlabel('X Position (m)')
     ax.set_ylabel('Y Position (m)')
@@ -50,7 +177,11 @@ def create_2d_map(clusters, all_detected_points_cartesian=None, title="2D Radar
     if save_path:
         plt.savefig(save_path)
         print(f"2D map saved to {save_path}")
-    plt.show()
+    if show:
+        plt.show()
+    else:
+        # Repeated updates (e.g. in follow mode) must not block or leak figures
+        plt.close()
 
 def plot_cfar_detection(radar_profile, cfar_threshold, detected_indices, frame_index=None, save_path=None):
     plt.figure(figsize=(12, 6))
@@ -121,15 +252,18 @@ def plot_imu_orientation(df_imu_orientation, save_path=None):
         print(f"IMU orientation plot saved to {save_path}")
     plt.show()
 
-def plot_polar_map(polar_points, title="2D Radar Polar Plot", save_path="output/plots/2d_radar_polar_plot.png"):
-    if not polar_points:
+def plot_polar_map(polar_points, title="2D Radar Polar Plot", save_path="output/plots/2d_radar_polar_plot.png", centroids_cartesian=None):
+    if polar_points is None or len(polar_points) == 0:
         print("No polar points to plot.")
         return
+    if len(polar_points) > constants.DENSITY_RENDER_MIN_POINTS:
+        # Too many points to scatter individually
+        plot_polar_density_map(polar_points, centroids_cartesian=centroids_cartesian, title=title, save_path=save_path)
+        return
     plt.figure(figsize=(10, 10))
     ax = plt.subplot(111, projection='polar')
-    r = [p[0] for p in polar_points]
-    theta = [p[1] for p in polar_points]
-    ax.scatter(theta, r, s=10)
+    points = np.asarray(polar_points, dtype=float).reshape(-1, 2)
+    ax.scatter(points[:, 1], points[:, 0], s=10)
     ax.set_title(title, va='bottom')
     ax.set_theta_zero_location('N')
     ax.set_theta_direction(-1)
@@ -139,4 +273,68 @@ def plot_polar_map(polar_points, title="2D Radar Polar Plot", save_path="output/
         os.makedirs(os.path.dirname(save_path), exist_ok=True)
         plt.savefig(save_path)
         print(f"Polar plot saved to {save_path}")
-    plt.show()
\ No newline at end of file
+    plt.show()
+
+def plot_tiled_map(map_store, extent=None, max_pixels=1024, title="Tiled Radar Occupancy Map", save_path=None):
+    """
+    Plots a region of a tiled map, read at the finest pyramid level that fits `max_pixels`.
+
+    Args:
+        map_store (TiledMapStore): The map to plot.
+        extent (tuple, optional): (min_x, max_x, min_y, max_y) in meters. Defaults to the whole map.
+        max_pixels (int): Maximum number of cells along either axis of the image.
+        title (str): Plot title.
+        save_path (str, optional): Where to save the figure.
+    """
+    if extent is None:
+        extent = map_store.bounds()
+    if extent is None:
+        print("Tiled map is empty.")
+        return
+    # Only the tiles overlapping the view are read, at the finest level that fits max_pixels
+    grid, grid_extent, level = map_store.read_region(extent, max_pixels=max_pixels)
+    plt.figure(figsize=(10, 10))
+    ax = plt.gca()
+    ax.imshow(np.log1p(grid), cmap='Greys', origin='lower', extent=grid_extent)
+    ax.set_title(f"{title} (level {level}, {map_store.level_resolution(level):.2f} m cells)")
+    ax.set_xlabel('X Position (m)')
+    ax.set_ylabel('Y Position (m)')
+    ax.set_aspect('equal', adjustable='box')
+    if save_path:
+        os.makedirs(os.path.dirname(save_path), exist_ok=True)
+        plt.savefig(save_path)
+        print(f"Tiled map saved to {save_path}")
+    plt.show()
+
+def plot_tracks(track_history, title="Object Tracks", min_updates=2, save_path=None):
+    """
+    Plots the trajectories of confirmed tracks.
+
+    Args:
+        track_history (np.array): Rows of (time, track_id, x, y, vx, vy), e.g. from MultiTargetTracker.history().
+        title (str): Plot title.
+        min_updates (int): Tracks with fewer updates are not drawn.
+        save_path (str, optional): Where to save the figure.
+    """
+    if len(track_history) == 0:
+        print("No tracks to plot.")
+        return
+    plt.figure(figsize=(10, 10))
+    ax = plt.gca()
+    track_ids, counts = np.unique(track_history[:, 1], return_counts=True)
+    track_ids = track_ids[counts >= min_updates]
+    colors = plt.get_cmap('tab20')
+    for i, track_id in enumerate(track_ids):
+        rows = track_history[track_history[:, 1] == track_id]
+        ax.plot(rows[:, 2], rows[:, 3], color=colors(i % 20), linewidth=1.5)
+        ax.scatter(rows[-1, 2], rows[-1, 3], color=colors(i % 20), s=25, edgecolor='black', linewidth=0.5)
+    ax.set_title(f"{title} ({len(track_ids)} tracks)")
+    ax.set_xlabel('X Position (m)')
+    ax.set_ylabel('Y Position (m)')
+    ax.grid(True)
+    ax.set_aspect('equal', adjustable='box')
+    if save_path:
+        os.makedirs(os.path.dirname(save_path), exist_ok=True)
+        plt.savefig(save_path)
+        print(f"Track plot saved to {save_path}")
+    plt.show()
@@ -0,0 +1,29 @@
+import numpy as np
+from src.pipeline.checkpoint import PipelineCheckpoint
+
+def test_saves_append_rows_and_ignore_interrupted_appends(tmp_path):
+    checkpoint = PipelineCheckpoint(str(tmp_path), "run", interval_s=0.0)
+    assert checkpoint.load() is None
+    checkpoint.save({'frames_done': np.int64(64)}, new_rows={'points': np.ones((3, 5))})
+    checkpoint.save({'frames_done': np.int64(128)}, new_rows={'points': np.full((2, 5), 2.0)})
+    assert checkpoint.saved_rows('points') == 5
+    # Rows appended by a save that stopped before its state was written
+    with open(checkpoint._log_path('points'), 'ab') as f:
+        np.full((4, 5), 9.0).tofile(f)
+
+    resumed = PipelineCheckpoint(str(tmp_path), "run", interval_s=0.0)
+    state = resumed.load()
+    assert int(state['frames_done']) == 128
+    np.testing.assert_array_equal(state['points'], np.vstack((np.ones((3, 5)), np.full((2, 5), 2.0))))
+    resumed.save({'frames_done': np.int64(192)}, new_rows={'points': np.zeros((1, 5))})
+    assert len(resumed.load()['points']) == 6
+
+    resumed.remove()
+    assert list(tmp_path.iterdir()) == []
+
+def test_checkpoint_of_other_run_is_ignored(tmp_path):
+    PipelineCheckpoint(str(tmp_path), "run", interval_s=0.0).save({'frames_done': np.int64(1)}, new_rows={'points': np.ones((1, 5))})
+    checkpoint = PipelineCheckpoint(str(tmp_path), "run", interval_s=0.0)
+    checkpoint.signature = "other"
+    assert checkpoint.load() is None
+    assert not any(p.suffix == ".rows" for p in tmp_path.iterdir())
@@ -0,0 +1,31 @@
+import numpy as np
+from src.data_acquisition.data_follower import DataFileFollower
+
+HEADER = "# Time (seconds),f0_f0_f0,f0_f0_f1\n"
+
+def test_partial_last_line_is_held_back(tmp_path):
+    path = tmp_path / "Radar-Data.data"
+    follower = DataFileFollower(str(path))
+    assert len(follower.poll()) == 0
+    path.write_text(HEADER + "0.0,1.0,2.0\n0.005,1.1,")
+    np.testing.assert_array_equal(follower.poll(), [[0.0, 1.0, 2.0]])
+    assert len(follower.poll()) == 0
+    with open(path, 'a') as f:
+        f.write("2.1\n\n0.01,1.2,2.2\n")
+    np.testing.assert_array_equal(follower.poll(), [[0.005, 1.1, 2.1], [0.01, 1.2, 2.2]])
+    assert follower.columns == ['Time (seconds)', 'f0_f0_f0', 'f0_f0_f1']
+    assert follower.rows_read == 3
+
+def test_malformed_line_is_dropped(tmp_path):
+    path = tmp_path / "Radar-Data.data"
+    path.write_text(HEADER + "0.0,1.0,2.0\n0.005,oops\n0.01,1.2,2.2\n")
+    np.testing.assert_array_equal(DataFileFollower(str(path)).poll(), [[0.0, 1.0, 2.0], [0.01, 1.2, 2.2]])
+
+def test_truncated_file_is_read_again(tmp_path):
+    path = tmp_path / "Radar-Data.data"
+    path.write_text(HEADER + "0.0,1.0,2.0\n0.005,1.1,2.1\n")
+    follower = DataFileFollower(str(path))
+    assert len(follower.poll()) == 2
+    path.write_text(HEADER + "0.0,5.0,6.0\n")
+    np.testing.assert_array_equal(follower.poll(), [[0.0, 5.0, 6.0]])
+    assert follower.rows_read == 1
@@ -0,0 +1,57 @@
+import numpy as np
+import pandas as pd
+import pytest
+from src.config import constants
+from src.data_acquisition.data_parser import count_data_rows, parse_data_file
+
+HEADER = "# Time (seconds),f0_f0_f0,f0_f0_f1\n"
+
+def write_data_file(tmp_path, body):
+    path = tmp_path / "Radar-Data.data"
+    path.write_text(HEADER + body)
+    return str(path)
+
+@pytest.mark.parametrize("body", [
+    "0,1,2\n0.005,3,4\n0.01,5,6\n\n",
+    "0,1,2\n0.005,3,4\n0.01,5,6\n\n\n",
+    "\n0,1,2\n\n0.005,3,4\r\n\r\n0.01,5,6\n",
+    " \n0,1,2\n  \t\n0.005,3,4\r\n \r\n0.01,5,6\n\t\n",
+])
+def test_blank_lines_are_skipped(tmp_path, body):
+    path = write_data_file(tmp_path, body)
+    _, time_s, values = parse_data_file(path, num_workers=1)
+    assert count_data_rows(path) == 3
+    np.testing.assert_array_equal(time_s, [0, 0.005, 0.01])
+    np.testing.assert_array_equal(values, [[1, 2], [3, 4], [5, 6]])
+
+def test_incomplete_last_row_is_padded_with_nan(tmp_path):
+    path = write_data_file(tmp_path, "0,1,2\n0.005,3,")
+    _, time_s, values = parse_data_file(path, num_workers=1)
+    assert count_data_rows(path) == 2
+    np.testing.assert_array_equal(time_s, [0, 0.005])
+    assert values[1, 0] == 3 and np.isnan(values[1, 1])
+
+def test_parallel_parse_matches_pandas(tmp_path, monkeypatch):
+    monkeypatch.setattr(constants, 'PARSER_PARALLEL_MIN_BYTES', 0)
+    rng = np.random.default_rng(0)
+    rows = np.column_stack((np.arange(3000) * 0.005, rng.normal(size=(3000, 2))))
+    lines = [",".join(repr(float(x)) for x in row) for row in rows]
+    for i in range(0, len(lines), 101):
+        lines[i] += "\n"
+    path = write_data_file(tmp_path, "\n".join(lines) + "\n\n")
+
+    _, time_s, values = parse_data_file(path, num_workers=3)
+    expected = pd.read_csv(path, float_precision='round_trip').to_numpy()
+    np.testing.assert_array_equal(time_s, expected[:, 0])
+    np.testing.assert_array_equal(values, expected[:, 1:].astype(np.float32))
+
+def test_parallel_parse_fills_the_reserved_row_with_the_last_line(tmp_path, monkeypatch):
+    monkeypatch.setattr(constants, 'PARSER_PARALLEL_MIN_BYTES', 0)
+    body = "".join(f"{i * 0.005:.3f},{i},{-i}\n" for i in range(500)) + "2.5,7,"
+    _, time_s, values = parse_data_file(write_data_file(tmp_path, body), num_workers=3)
+    assert len(time_s) == len(values) == 501
+    np.testing.assert_array_equal(values[:500, 0], np.arange(500))
+    assert time_s[-1] == 2.5 and values[-1, 0] == 7 and np.isnan(values[-1, 1])
+    # The arrays are writable and stay valid after the shared memory was released
+    values[0, 0] = -1.0
+    assert values[0, 0] == -1.0
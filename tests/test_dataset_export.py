@@ -0,0 +1,65 @@
+import numpy as np
+from src.config import constants
+from src.pipeline.dataset_export import ShardedArrayWriter, export_labeled_windows, load_window_dataset
+
+NUM_FRAMES = 100
+FRAME_DT = 0.01
+
+def write_session(root, name, label, label_start, label_length, bad_row=None):
+    session_dir = root / name
+    session_dir.mkdir()
+    lines = ["# Time (seconds),f0_f0_f0,f0_f0_f1,f0_f0_f2,f0_f0_f3"]
+    for frame in range(NUM_FRAMES):
+        value = "x" if frame == bad_row else str(frame)
+        lines.append(f"{frame * FRAME_DT:.3f},{value},{frame},{frame},{frame}")
+    (session_dir / "Radar-Data.data").write_text("\n".join(lines) + "\n")
+    (session_dir / "Live-Labeling.label").write_text(
+        "Time(Seconds),Length(Seconds),Label(string),Confidence(double),Comment(string)\n"
+        f"{label_start},{label_length},{label},1,\n")
+    return str(session_dir)
+
+def test_rollback_removes_the_windows_after_the_mark(tmp_path):
+    writer = ShardedArrayWriter(str(tmp_path), 'radar', (2,), shard_windows=3)
+    writer.append(np.arange(8).reshape(4, 2))
+    mark = writer.mark()
+    writer.append(np.full((5, 2), -1))
+    assert len(writer.shard_files) == 3
+    writer.rollback(mark)
+    assert writer.num_windows == 4 and writer.shard_files == ['radar_00000.npy', 'radar_00001.npy']
+    assert not (tmp_path / 'radar_00002.npy').exists()
+
+    shards, rows = writer.append(np.arange(8, 12).reshape(2, 2))
+    writer.close()
+    np.testing.assert_array_equal(shards, [1, 1])
+    np.testing.assert_array_equal(rows, [1, 2])
+    stored = np.concatenate([np.load(tmp_path / name) for name in writer.shard_files])
+    np.testing.assert_array_equal(stored, np.arange(12).reshape(6, 2))
+
+def test_sessions_are_windowed_and_labeled(tmp_path, monkeypatch):
+    monkeypatch.setattr(constants, 'DATASET_RADAR_SAMPLES', 4)
+    sessions = [
+        write_session(tmp_path, "a", "wave", 0.2, 0.4),
+        # Fails part-way, after some of its windows were written
+        write_session(tmp_path, "b", "bad", 0.0, 1.0, bad_row=60),
+        write_session(tmp_path, "c", "push", 0.5, 0.5),
+    ]
+    output_dir = str(tmp_path / "dataset")
+    metadata = export_labeled_windows(sessions, output_dir, window_frames=10, stride_frames=5, min_overlap=0.6,
+                                      shard_windows=3, chunk_frames=7)
+
+    # Windows starting at frames 20 to 50 lie inside 'wave', those from 50 to 90 inside 'push'
+    index, metadata, radar, imu = load_window_dataset(output_dir)
+    assert metadata['labels'] == {'wave': 0, 'push': 1}
+    assert metadata['sessions'] == {'a': 7, 'c': 9}
+    assert list(index['session']) == ['a'] * 7 + ['c'] * 9
+    np.testing.assert_array_equal(index['first_frame'], list(range(20, 55, 5)) + list(range(50, 95, 5)))
+    np.testing.assert_array_equal(index['label_id'], [0] * 7 + [1] * 9)
+    np.testing.assert_array_equal(index['window'], np.arange(16))
+    assert sum(len(shard) for shard in radar) == metadata['num_windows'] == 16
+
+    for row in index.itertuples():
+        window = radar[row.shard][row.row]
+        np.testing.assert_array_equal(window, np.repeat(np.arange(row.first_frame, row.first_frame + 10)[:, None], 4, axis=1))
+        assert np.isclose(row.start_time, row.first_frame * FRAME_DT)
+        # Without IMU data the IMU windows are NaN
+        assert np.isnan(imu[row.shard][row.row]).all()
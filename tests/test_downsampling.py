@@ -0,0 +1,32 @@
+import numpy as np
+from src.processing.downsampling import StreamingDownsampler, downsample_points
+
+def _points(seed=0, num_points=20000):
+    rng = np.random.default_rng(seed)
+    centers = np.array([[1.0, 2.0], [-2.0, 3.0], [0.5, -1.5]])
+    return centers[rng.integers(0, 3, num_points)] + rng.normal(0, 0.3, (num_points, 2)), rng.random(num_points) * 20
+
+def test_streaming_matches_downsample_points():
+    points, snr = _points()
+    expected = downsample_points(points, 0.05, snr)
+    cells = StreamingDownsampler(0.05)
+    for start in range(0, len(points), 1234):
+        cells.add(points[start:start + 1234], snr[start:start + 1234])
+    centroids, hit_counts, max_snr = cells.result()
+    assert cells.num_points == len(points)
+    np.testing.assert_allclose(centroids, expected[0])
+    np.testing.assert_array_equal(hit_counts, expected[1])
+    np.testing.assert_array_equal(max_snr, expected[2])
+
+def test_max_cells_merges_into_coarser_cells():
+    points, snr = _points(1)
+    cells = StreamingDownsampler(0.05, max_cells=300)
+    for start in range(0, len(points), 1000):
+        cells.add(points[start:start + 1000], snr[start:start + 1000])
+        assert cells.num_cells <= 300
+    expected = downsample_points(points, cells.cell_size, snr)
+    centroids, hit_counts, max_snr = cells.result()
+    assert cells.cell_size > 0.05
+    np.testing.assert_allclose(centroids, expected[0])
+    np.testing.assert_array_equal(hit_counts, expected[1])
+    np.testing.assert_array_equal(max_snr, expected[2])
@@ -0,0 +1,75 @@
+import os
+import pytest
+from src.data_acquisition.frame_recording import FrameRecordingReader, FrameRecordingWriter
+
+def payload(i):
+    return bytes([i % 256]) * 32
+
+def write_frames(path, frames, append=False, close=True):
+    writer = FrameRecordingWriter(str(path), config={'frame_bytes': 32}, append=append)
+    for i in frames:
+        writer.write_frame(payload(i), timestamp=i * 0.005)
+    if close:
+        writer.close()
+    else:
+        writer.flush()
+
+def test_frames_are_read_back_by_number_and_time(tmp_path):
+    path = tmp_path / "capture.rdr"
+    write_frames(path, range(100))
+    reader = FrameRecordingReader(str(path))
+    assert len(reader) == 100 and reader.config == {'frame_bytes': 32} and not reader.recovered
+    assert reader.read_frame(42) == (42 * 0.005, payload(42))
+    assert reader.frame_at_time(0.2) == 40
+    assert reader.frame_at_time(0.2001) == 41
+    assert reader.frame_at_time(10.0) == 100
+    assert [p for _, p in reader.iter_frames(98)] == [payload(98), payload(99)]
+    reader.close()
+
+def test_truncated_recording_is_recovered_and_appended_to(tmp_path):
+    path = tmp_path / "capture.rdr"
+    write_frames(path, range(100), close=False)
+    # A crash without an index, with the last frame cut in half
+    with open(path, 'r+b') as f:
+        f.truncate(os.path.getsize(path) - 16)
+
+    reader = FrameRecordingReader(str(path))
+    assert reader.recovered and len(reader) == 99
+    reader.close()
+
+    write_frames(path, range(99, 150), append=True)
+    reader = FrameRecordingReader(str(path))
+    assert not reader.recovered and len(reader) == 150
+    assert [p for _, p in reader.iter_frames()] == [payload(i) for i in range(150)]
+    assert reader.frame_at_time(99 * 0.005) == 99
+    reader.close()
+
+def test_corrupt_frame_is_rejected(tmp_path):
+    path = tmp_path / "capture.rdr"
+    write_frames(path, range(10))
+    reader = FrameRecordingReader(str(path))
+    offset = int(reader.offsets[5])
+    reader.close()
+    with open(path, 'r+b') as f:
+        # Flip a payload byte of frame 5; the index is still valid
+        f.seek(offset + 24)
+        f.write(b'\xff')
+
+    reader = FrameRecordingReader(str(path))
+    assert reader.read_frame(4) == (4 * 0.005, payload(4))
+    with pytest.raises(ValueError, match="frame 5"):
+        reader.read_frame(5)
+    reader.close()
+
+def test_scan_stops_at_the_first_corrupt_frame(tmp_path):
+    path = tmp_path / "capture.rdr"
+    write_frames(path, range(10), close=False)
+    reader = FrameRecordingReader(str(path))
+    offset = int(reader.offsets[7])
+    reader.close()
+    with open(path, 'r+b') as f:
+        f.seek(offset + 24)
+        f.write(b'\xff')
+    reader = FrameRecordingReader(str(path))
+    assert reader.recovered and len(reader) == 7
+    reader.close()
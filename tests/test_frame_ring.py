@@ -0,0 +1,39 @@
+import numpy as np
+from src.data_acquisition.frame_ring import FrameRingReader, SharedFrameRing
+
+def frames(first, count, width=4):
+    return np.repeat(np.arange(first, first + count, dtype=np.float32)[:, None], width, axis=1)
+
+def test_reader_lapped_by_the_writer_counts_the_lost_frames():
+    ring = SharedFrameRing(capacity=16, frame_width=4)
+    reader = FrameRingReader(ring.name, shares_tracker=True)
+    try:
+        ring.write_many(frames(0, 10), np.arange(10) * 0.005)
+        first_seq, _, block = reader.poll(max_frames=4)
+        assert first_seq == 0 and reader.still_valid(first_seq)
+        np.testing.assert_array_equal(block, frames(0, 4))
+
+        # The writer laps the reader: frames 4 to 13 are overwritten before they are read
+        ring.write_many(frames(10, 20), np.arange(10, 30) * 0.005)
+        assert not reader.still_valid(first_seq)
+        first_seq, timestamps, block = reader.poll()
+        assert reader.frames_lost == 10
+        assert first_seq == 14 and reader.still_valid(first_seq)
+        np.testing.assert_array_equal(block, frames(14, len(block)))
+        np.testing.assert_array_equal(timestamps, np.arange(14, 14 + len(block)) * 0.005)
+        assert reader.frames_read == 4 + len(block)
+        del timestamps, block
+    finally:
+        reader.close()
+        ring.close()
+
+def test_reader_stops_after_the_last_frame_of_a_closed_ring():
+    ring = SharedFrameRing(capacity=16, frame_width=4)
+    reader = FrameRingReader(ring.name, shares_tracker=True)
+    ring.write_many(frames(0, 20), np.arange(20) * 0.005)
+    # Only the frames still in the ring are read; the ring's memory stays mapped by the reader
+    ring.close()
+    read = [block.copy() for _, _, block in reader.iter_blocks()]
+    assert reader.frames_lost == 4
+    np.testing.assert_array_equal(np.concatenate(read), frames(4, 16))
+    reader.close()
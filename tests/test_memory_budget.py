@@ -0,0 +1,18 @@
+from src.pipeline import memory_budget
+from src.pipeline.memory_budget import MemoryMonitor
+
+def test_monitor_reports_the_peak_above_the_baseline(monkeypatch):
+    readings = iter([100 * 2**20, 300 * 2**20])
+    monkeypatch.setattr(memory_budget, 'resident_memory_bytes', lambda: next(readings))
+    monitor = MemoryMonitor(sample_interval_s=60.0)
+    monitor.start()
+    monitor.stop()
+    assert monitor.report(budget_mb=100) == 200
+
+def test_monitor_without_resident_memory_reports_unavailable(monkeypatch, capsys):
+    monkeypatch.setattr(memory_budget, 'resident_memory_bytes', lambda: None)
+    monitor = MemoryMonitor()
+    monitor.start()
+    monitor.stop()
+    assert monitor.report(budget_mb=100) is None
+    assert "unavailable" in capsys.readouterr().out
@@ -0,0 +1,40 @@
+import numpy as np
+from src.processing.pose_graph import PoseGraph, compose_pose, relative_pose, wrap_angle
+
+def drifting_loop(num_poses=200, seed=0):
+    rng = np.random.default_rng(seed)
+    angles = np.linspace(0, 2 * np.pi, num_poses, endpoint=False)
+    truth = np.column_stack((3 * np.cos(angles), 3 * np.sin(angles), wrap_angle(angles + np.pi / 2)))
+    graph = PoseGraph()
+    graph.add_node(truth[0])
+    odometry_std = np.array([0.01, 0.01, 0.002])
+    for k in range(1, num_poses):
+        # A small heading bias makes the dead-reckoned loop drift open
+        delta = relative_pose(truth[k - 1], truth[k]) + rng.normal(scale=odometry_std) + [0, 0, 0.002]
+        graph.add_node(compose_pose(graph.poses[k - 1], delta))
+        graph.add_edge(k - 1, k, delta, odometry_std)
+    return graph, truth
+
+def position_error(graph, truth):
+    return np.max(np.hypot(*(graph.poses[:, :2] - truth[:, :2]).T))
+
+def test_odometry_alone_is_already_optimal():
+    graph, truth = drifting_loop()
+    error_before = position_error(graph, truth)
+    stats = graph.optimize()
+    assert stats['initial_cost'] < 1e-6 and stats['final_cost'] < 1e-6
+    np.testing.assert_allclose(position_error(graph, truth), error_before, atol=1e-6)
+
+def test_loop_closure_reduces_the_drift():
+    graph, truth = drifting_loop()
+    num_poses = graph.num_nodes
+    error_before = position_error(graph, truth)
+    assert error_before > 0.5
+    graph.add_edge(num_poses - 1, 0, relative_pose(truth[-1], truth[0]), [0.01, 0.01, 0.002])
+
+    stats = graph.optimize()
+    assert stats['iterations'] > 0
+    assert stats['final_cost'] < 0.01 * stats['initial_cost']
+    assert position_error(graph, truth) < 0.2 * error_before
+    # The anchored first pose does not move
+    np.testing.assert_allclose(graph.poses[0], truth[0], atol=1e-9)
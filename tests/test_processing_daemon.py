@@ -0,0 +1,26 @@
+import pytest
+from src.pipeline.processing_daemon import SessionCache
+
+def write_session(root, name):
+    session_dir = root / name
+    session_dir.mkdir()
+    lines = ["# Time (seconds),f0_f0_f0,f0_f0_f1"] + [f"{frame * 0.005:.3f},{frame},{frame}" for frame in range(20)]
+    (session_dir / "Radar-Data.data").write_text("\n".join(lines) + "\n")
+    return str(session_dir)
+
+def test_load_locks_are_dropped_with_their_sessions(tmp_path):
+    cache = SessionCache(max_sessions=2)
+    sessions = [write_session(tmp_path, f"s{i}") for i in range(5)]
+    for session_dir in sessions:
+        cache.get(session_dir)
+    assert cache.status()['sessions'] == sessions[-2:]
+    assert sorted(cache._load_locks) == sessions[-2:]
+
+    cache.get(sessions[-1])
+    assert cache.hits == 1 and cache.misses == 5
+
+def test_load_lock_of_a_failed_load_is_dropped(tmp_path):
+    cache = SessionCache()
+    with pytest.raises(FileNotFoundError):
+        cache.get(str(tmp_path / "missing"))
+    assert not cache._load_locks and not cache.status()['sessions']
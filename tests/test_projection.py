@@ -0,0 +1,44 @@
+import numpy as np
+from src.config import constants
+from src.processing.projection import project_detections
+from src.processing.radar_fft import correct_for_imu_orientation, polar_to_cartesian
+
+def rotation(roll, pitch, yaw):
+    # R = Rz(yaw) @ Ry(pitch) @ Rx(roll)
+    cr, sr, cp, sp, cy, sy = np.cos(roll), np.sin(roll), np.cos(pitch), np.sin(pitch), np.cos(yaw), np.sin(yaw)
+    rz = np.array([[cy, -sy, 0], [sy, cy, 0], [0, 0, 1]])
+    ry = np.array([[cp, 0, sp], [0, 1, 0], [-sp, 0, cp]])
+    rx = np.array([[1, 0, 0], [0, cr, -sr], [0, sr, cr]])
+    return rz @ ry @ rx
+
+def synthetic_block(num_frames=500, num_bins=64):
+    rng = np.random.default_rng(0)
+    rows, bins = np.nonzero(rng.random((num_frames, num_bins)) < 0.05)
+    roll, pitch = rng.normal(scale=0.3, size=num_frames), rng.normal(scale=0.3, size=num_frames)
+    yaw = np.linspace(-np.pi, np.pi, num_frames, endpoint=False)
+    return rows, bins, roll, pitch, yaw, num_bins
+
+def test_forward_boresight_matches_the_per_detection_projection():
+    rows, bins, roll, pitch, yaw, num_bins = synthetic_block()
+    r, azimuth, x, y = project_detections(rows, bins, roll, pitch, yaw, num_bins, boresight=(1.0, 0.0, 0.0))
+    range_bins = np.linspace(0, constants.MAX_RANGE_M, num_bins)
+    expected_r, expected_azimuth = correct_for_imu_orientation(range_bins[bins], 0.0, roll[rows], pitch[rows], yaw[rows])
+    expected_x, expected_y = polar_to_cartesian(expected_r, expected_azimuth)
+    np.testing.assert_allclose(r, expected_r, atol=1e-12)
+    np.testing.assert_allclose(azimuth, expected_azimuth, atol=1e-12)
+    np.testing.assert_allclose(x, expected_x, atol=1e-12)
+    np.testing.assert_allclose(y, expected_y, atol=1e-12)
+
+def test_off_axis_boresight_follows_the_full_rotation():
+    rows, bins, roll, pitch, yaw, num_bins = synthetic_block()
+    boresight = np.array([0.6, 0.8, 0.0])
+    r, azimuth, x, y = project_detections(rows, bins, roll, pitch, yaw, num_bins, boresight=tuple(boresight))
+    beams = np.array([rotation(roll[row], pitch[row], yaw[row]) @ boresight for row in rows])
+    slant_range = np.linspace(0, constants.MAX_RANGE_M, num_bins)[bins]
+    np.testing.assert_allclose(x, slant_range * beams[:, 0], atol=1e-12)
+    np.testing.assert_allclose(y, slant_range * beams[:, 1], atol=1e-12)
+    np.testing.assert_allclose(r, slant_range * np.hypot(beams[:, 0], beams[:, 1]), atol=1e-12)
+    np.testing.assert_allclose(np.exp(1j * azimuth), np.exp(1j * np.arctan2(beams[:, 1], beams[:, 0])), atol=1e-9)
+    # Unlike the forward boresight, this beam moves with roll
+    _, _, x_without_roll, _ = project_detections(rows, bins, np.zeros_like(roll), pitch, yaw, num_bins, boresight=tuple(boresight))
+    assert np.max(np.abs(x - x_without_roll)) > 0.1
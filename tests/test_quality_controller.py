@@ -0,0 +1,80 @@
+import numpy as np
+import pytest
+from src.pipeline.follow_pipeline import IncrementalFrameProcessor
+from src.pipeline.quality_controller import QualityController
+
+LEVELS = tuple({'decimation': 2 ** level, 'map_interval_scale': 1, 'render_fps_scale': 1.0} for level in range(3))
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+def make_controller(clock):
+    return QualityController(1.0, levels=LEVELS, smoothing=1.0, headroom=0.5, hold_s=2.0, upgrade_after_s=10.0, clock=clock)
+
+def test_steps_down_only_after_the_hold_time():
+    clock = FakeClock()
+    controller = make_controller(clock)
+    clock.now = 1.0
+    assert controller.observe(2.0) is None
+    clock.now = 2.0
+    assert controller.observe(2.0) == LEVELS[1]
+    clock.now = 3.0
+    assert controller.observe(2.0) is None
+    clock.now = 4.0
+    assert controller.observe(2.0) == LEVELS[2]
+    clock.now = 6.0
+    assert controller.observe(2.0) is None
+    assert controller.level == 2
+
+def test_latency_between_headroom_and_target_keeps_the_level():
+    clock = FakeClock()
+    controller = make_controller(clock)
+    clock.now = 2.0
+    controller.observe(2.0)
+    for step in range(1, 30):
+        clock.now = 2.0 + step
+        assert controller.observe(0.7) is None
+    assert controller.level == 1
+
+def test_steps_up_after_a_calm_period_that_restarts_on_spikes():
+    clock = FakeClock()
+    controller = make_controller(clock)
+    clock.now = 2.0
+    controller.observe(2.0)
+    clock.now = 3.0
+    controller.observe(0.1)
+    clock.now = 12.0
+    assert controller.observe(0.6) is None
+    # The calm period started again at 13 s
+    for now in (13.0, 18.0, 22.0):
+        clock.now = now
+        assert controller.observe(0.1) is None
+    clock.now = 23.0
+    assert controller.observe(0.1) == LEVELS[0]
+    assert [(change['from'], change['to']) for change in controller.changes] == [(0, 1), (1, 0)]
+
+def test_rejects_a_non_positive_target():
+    with pytest.raises(ValueError):
+        QualityController(0)
+
+@pytest.mark.parametrize("batch_sizes", [(5, 3, 7, 1, 9), (1,) * 12, (4, 4, 4)])
+def test_decimation_keeps_every_nth_frame_across_batches(batch_sizes):
+    processor = IncrementalFrameProcessor()
+    processor.set_quality(LEVELS[2])
+    kept = []
+    process = processor._graph.process
+
+    def recording_process(sources, outputs):
+        kept.extend(sources['frame_index'].tolist())
+        return process(sources, outputs)
+
+    processor._graph.process = recording_process
+    rng = np.random.default_rng(0)
+    for size in batch_sizes:
+        processor.detect_frames(rng.normal(size=(size, 128)), np.arange(size) * 0.005)
+    assert kept == list(range(0, sum(batch_sizes), 4))
+    assert processor.frames_processed == sum(batch_sizes)
@@ -0,0 +1,55 @@
+import os
+import numpy as np
+import pytest
+from src.pipeline.result_archive import ResultArchiveReader, ResultArchiveWriter
+
+def make_frames(num_frames, num_bins=64, seed=0):
+    rng = np.random.default_rng(seed)
+    timestamps = np.arange(num_frames) * 0.005
+    magnitude = rng.gamma(2.0, 10.0, size=(num_frames, num_bins)).astype(np.float32)
+    detections = rng.random((num_frames, num_bins)) < 0.05
+    orientation = np.column_stack((np.sin(timestamps), np.cos(timestamps) * 0.1, timestamps * 0.3))
+    return timestamps, magnitude, detections, orientation
+
+def test_round_trip(tmp_path):
+    path = str(tmp_path / "session.rarc")
+    timestamps, magnitude, detections, orientation = make_frames(1000)
+    with ResultArchiveWriter(path, num_bins=64, block_frames=128, magnitude_bits=8, orientation_bits=16) as writer:
+        for start in range(0, 1000, 300):
+            stop = start + 300
+            writer.write(timestamps[start:stop], magnitude[start:stop], detections[start:stop], tuple(orientation[start:stop].T))
+
+    with ResultArchiveReader(path) as reader:
+        assert len(reader) == 1000
+        result = reader.read()
+        np.testing.assert_array_equal(result['timestamps'], timestamps)
+        np.testing.assert_array_equal(result['detections'], detections)
+        for block_start in range(0, 1000, 128):
+            block = slice(block_start, block_start + 128)
+            # Each block and bin is quantized over its own range
+            magnitude_step = (magnitude[block].max(axis=0) - magnitude[block].min(axis=0)) / 255
+            assert np.all(np.abs(result['magnitude'][block] - magnitude[block]) <= magnitude_step / 2 + 1e-4)
+            orientation_step = (orientation[block].max(axis=0) - orientation[block].min(axis=0)) / 65535
+            assert np.all(np.abs(result['orientation'][block] - orientation[block]) <= orientation_step / 2 + 1e-12)
+
+        window = reader.read(250, 517, fields=('detections',))
+        assert set(window) == {'timestamps', 'detections'}
+        np.testing.assert_array_equal(window['timestamps'], timestamps[250:517])
+        np.testing.assert_array_equal(window['detections'], detections[250:517])
+        assert [start for start, _ in reader.iter_blocks()] == list(range(0, 1000, 128))
+
+def test_failed_write_removes_the_archive(tmp_path):
+    path = str(tmp_path / "session.rarc")
+    timestamps, magnitude, detections, orientation = make_frames(10)
+    with pytest.raises(RuntimeError):
+        with ResultArchiveWriter(path, num_bins=64) as writer:
+            writer.write(timestamps, magnitude, detections, orientation)
+            raise RuntimeError("processing failed")
+    assert not os.path.exists(path)
+
+def test_missing_field_is_rejected(tmp_path):
+    timestamps, magnitude, _, _ = make_frames(10)
+    writer = ResultArchiveWriter(str(tmp_path / "session.rarc"), num_bins=64)
+    with pytest.raises(ValueError):
+        writer.write(timestamps, magnitude=magnitude)
+    writer.abort()
@@ -0,0 +1,106 @@
+import threading
+import time
+import numpy as np
+import pytest
+from src.config import constants
+from src.pipeline.threaded_pipeline import PipelineStage, run_stage_pipeline
+
+def slow(block):
+    time.sleep(0.001)
+    return block
+
+def pipeline_threads():
+    return [thread for thread in threading.enumerate() if thread.name.startswith("pipeline-")]
+
+def test_output_keeps_the_input_order():
+    stages = [PipelineStage('square', lambda x: x * x, num_workers=3), PipelineStage('slow', slow)]
+    assert list(run_stage_pipeline(range(100), stages)) == [x * x for x in range(100)]
+    assert not pipeline_threads()
+
+def test_stage_error_is_raised_and_threads_stop():
+    def fail_on_five(block):
+        if block == 5:
+            raise ValueError("bad block")
+        return block
+
+    results = []
+    with pytest.raises(RuntimeError, match="bad block"):
+        for block in run_stage_pipeline(range(1000), [PipelineStage('check', fail_on_five, num_workers=2), PipelineStage('slow', slow)], queue_size=2):
+            results.append(block)
+    assert results == [0, 1, 2, 3, 4]
+    assert not pipeline_threads()
+
+def test_input_error_is_raised_after_the_blocks_before_it():
+    def blocks():
+        yield 1
+        yield 2
+        raise OSError("disk gone")
+
+    results = []
+    with pytest.raises(RuntimeError, match="disk gone"):
+        for block in run_stage_pipeline(blocks(), [PipelineStage('slow', slow)]):
+            results.append(block)
+    assert results == [1, 2]
+    assert not pipeline_threads()
+
+def test_closing_the_generator_early_stops_the_threads():
+    outputs = run_stage_pipeline(iter(range(10 ** 6)), [PipelineStage('slow', slow, num_workers=2)], queue_size=2)
+    assert [next(outputs), next(outputs)] == [0, 1]
+    outputs.close()
+    assert not pipeline_threads()
+
+def test_stages_overlap_on_different_blocks():
+    active, overlaps, lock = set(), [], threading.Lock()
+
+    def timed(name, block):
+        with lock:
+            active.add(name)
+            overlaps.append(len(active))
+        time.sleep(0.005)
+        with lock:
+            active.discard(name)
+        return block
+
+    def read():
+        for block in range(30):
+            yield timed('read', block)
+
+    stages = [PipelineStage('clutter', lambda block: timed('clutter', block)),
+              PipelineStage('detect', lambda block: timed('detect', block), num_workers=3)]
+    assert list(run_stage_pipeline(read(), stages)) == list(range(30))
+    assert max(overlaps) > 1
+
+@pytest.mark.parametrize("clutter_removal", [False, True])
+def test_threaded_detection_matches_sequential(tmp_path, monkeypatch, capsys, clutter_removal):
+    import src.processing.cfar_processor as cfar_processor
+
+    # A target whose range drifts over the recording, so clutter removal keeps it, and a static reflector it removes
+    rng = np.random.default_rng(1)
+    num_frames, num_samples = 1500, 64
+    t = np.arange(num_samples)
+    target_bin = 12 + 3 * np.arange(num_frames) / num_frames
+    frames = rng.normal(size=(num_frames, num_samples)) + 20 * np.cos(2 * np.pi * target_bin[:, None] * t / num_samples)
+    frames += 20 * np.cos(2 * np.pi * 19 * t / num_samples)
+    rows = np.column_stack((np.arange(num_frames) * 0.005, frames))
+    path = tmp_path / "Radar-Data.data"
+    header = "Time (seconds)," + ",".join(f"f0_f0_f{i}" for i in range(num_samples))
+    np.savetxt(path, rows, delimiter=",", fmt="%.6f", header=header)
+
+    points = []
+    monkeypatch.setattr(cfar_processor, 'cluster_detected_points', lambda map_points, **kwargs: points.append(np.array(map_points)) or [])
+    monkeypatch.setattr(cfar_processor, 'cluster_centroids', lambda *args: None)
+    for name in ('create_2d_map', 'plot_cfar_detection', 'plot_polar_map'):
+        monkeypatch.setattr(cfar_processor, name, lambda *args, **kwargs: None)
+    monkeypatch.setattr(constants, 'PIPELINE_NUM_WORKERS', 3)
+    monkeypatch.setattr(constants, 'CLUTTER_REMOVAL_ENABLED', clutter_removal)
+
+    cfar_processor.process_and_cfar_data(str(path))
+    cfar_processor.process_and_cfar_data(str(path), threaded=True)
+    assert len(points) == 2 and len(points[0]) > num_frames // 2
+    np.testing.assert_array_equal(points[1], points[0])
+    suppressed = [line for line in capsys.readouterr().out.splitlines() if "suppressed" in line]
+    if clutter_removal:
+        assert len(suppressed) == 2 and suppressed[0] == suppressed[1]
+        assert int(suppressed[0].split()[3]) >= num_frames // 2
+    else:
+        assert not suppressed
@@ -0,0 +1,71 @@
+import os
+import numpy as np
+from src.data_acquisition.data_parser import parse_data_file
+from src.data_acquisition.time_index import load_time_index, read_data_window
+
+def write_rows(path, first_row, num_rows, mode='a'):
+    with open(path, mode) as f:
+        if mode == 'w':
+            f.write("# Time (seconds),f0_f0_f0,f0_f0_f1\n")
+        for row in range(first_row, first_row + num_rows):
+            f.write(f"{row * 0.005:.3f},{row},{row % 7}\n")
+
+def assert_window(path, t0, t1):
+    _, time_s, values = parse_data_file(str(path), num_workers=1)
+    inside = (time_s >= t0) & (time_s <= t1)
+    _, window_time, window_values, first_row = read_data_window(str(path), t0, t1)
+    np.testing.assert_array_equal(window_time, time_s[inside])
+    np.testing.assert_array_equal(window_values, values[inside])
+    assert first_row == int(np.argmax(inside))
+
+def test_window_matches_full_parse(tmp_path):
+    path = tmp_path / "Radar-Data.data"
+    write_rows(path, 0, 1000, mode='w')
+    load_time_index(str(path), stride=16)
+    assert_window(path, 1.2, 2.5)
+    assert_window(path, 0.0, 0.0)
+    assert_window(path, 4.99, 10.0)
+
+def test_index_is_extended_when_the_file_grows(tmp_path):
+    path = tmp_path / "Radar-Data.data"
+    write_rows(path, 0, 1000, mode='w')
+    index = load_time_index(str(path), stride=16)
+    write_rows(path, 1000, 500)
+    extended = load_time_index(str(path), stride=16)
+    assert extended.num_rows == 1500
+    np.testing.assert_array_equal(extended.offsets[:len(index.offsets)], index.offsets)
+    assert_window(path, 4.5, 6.0)
+
+def test_index_is_rebuilt_after_an_edit_in_the_middle(tmp_path):
+    path = tmp_path / "Radar-Data.data"
+    write_rows(path, 0, 20000, mode='w')
+    load_time_index(str(path), stride=16)
+    stat = os.stat(path)
+    with open(path, 'r+b') as f:
+        # Same size, outside the checked head and tail: change the time of indexed row 8000
+        lines = f.read().split(b'\n')
+        position = sum(len(line) + 1 for line in lines[:8001])
+        assert lines[8001].startswith(b"40.000,")
+        f.seek(position)
+        f.write(b"40.001")
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+    index = load_time_index(str(path), stride=16)
+    _, time_s, _ = parse_data_file(str(path), num_workers=1)
+    expected_times = time_s[np.arange(0, len(time_s), 16)]
+    np.testing.assert_array_equal(index.times, expected_times)
+
+def test_blank_lines_are_not_rows(tmp_path):
+    path = tmp_path / "Radar-Data.data"
+    write_rows(path, 0, 50, mode='w')
+    with open(path, 'a') as f:
+        f.write("\n  \t\r\n")
+    write_rows(path, 50, 46)
+    # The last data row is row 95; the blank lines after it fall on the stride positions 96 and 112
+    with open(path, 'a') as f:
+        f.write("\n" + " \n" * 16)
+    index = load_time_index(str(path), stride=16)
+    assert index.num_rows == 96
+    np.testing.assert_array_equal(index.rows, np.arange(0, 96, 16))
+    np.testing.assert_allclose(index.times, index.rows * 0.005)
+    assert_window(path, 0.2, 0.3)
+    assert_window(path, 0.45, 10.0)
@@ -0,0 +1,46 @@
+import numpy as np
+from src.processing.tracking import MultiTargetTracker, gate_candidates, greedy_assignment
+
+def test_gate_candidates_matches_brute_force():
+    rng = np.random.default_rng(0)
+    tracks = rng.uniform(-20, 20, size=(200, 2))
+    measurements = rng.uniform(-20, 20, size=(300, 2))
+    track_indices, measurement_indices = gate_candidates(tracks, measurements, 1.0)
+    distance = np.linalg.norm(tracks[:, np.newaxis] - measurements[np.newaxis], axis=2)
+    expected = set(zip(*np.nonzero(distance <= 1.0)))
+    assert set(zip(track_indices.tolist(), measurement_indices.tolist())) == expected
+
+def test_greedy_assignment_matches_sequential_greedy():
+    rng = np.random.default_rng(1)
+    tracks = rng.integers(0, 30, 200)
+    measurements = rng.integers(0, 40, 200)
+    costs = rng.random(200)
+    expected = []
+    used_tracks, used_measurements = set(), set()
+    for i in np.argsort(costs):
+        if tracks[i] not in used_tracks and measurements[i] not in used_measurements:
+            expected.append((tracks[i], measurements[i]))
+            used_tracks.add(tracks[i])
+            used_measurements.add(measurements[i])
+    assigned = greedy_assignment(tracks, measurements, costs)
+    assert set(zip(*(a.tolist() for a in assigned))) == set((int(t), int(m)) for t, m in expected)
+
+def test_tracks_follow_moving_objects_and_retire():
+    rng = np.random.default_rng(2)
+    start = np.array([[0.0, 0.0], [10.0, 5.0], [-8.0, 3.0]])
+    velocity = np.array([[1.0, 0.0], [0.0, -0.5], [0.5, 0.5]])
+    tracker = MultiTargetTracker(confirm_hits=3, max_coast_s=0.5)
+    for frame in range(400):
+        t = frame * 0.005
+        positions = start + velocity * t + rng.normal(scale=0.02, size=start.shape)
+        ids = tracker.update(t, positions)
+    confirmed = tracker.confirmed_tracks()
+    assert tracker.num_tracks_created == 3
+    np.testing.assert_array_equal(np.sort(confirmed['id']), ids[np.argsort(ids)])
+    order = np.argsort(confirmed['id'])
+    np.testing.assert_allclose(confirmed['state'][order, 2:], velocity[np.argsort(ids)], atol=0.2)
+    assert tracker.history().shape[1] == 6
+
+    # Without measurements the tracks coast and are retired after max_coast_s
+    tracker.update(2.0 + 0.6, np.empty((0, 2)))
+    assert len(tracker) == 0 and tracker.num_tracks_retired == 3